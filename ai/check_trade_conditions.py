@@ -1,11 +1,17 @@
 # ===================== Rejection logging (мінімально інвазивно) =====================
-import json, os, time
+import json, os, time, threading
 from typing import Dict, Any, List, Tuple
 
+from utils.log_writer import get_log_writer
+from utils.rejection_store import RejectionStore, TTLDedupIndex, reason_codes
+
 REJECTION_LOG_PATH = os.path.join("logs", "rejections.jsonl")
 ENABLE_REJECTION_LOG = True
 LOG_ONLY_CLOSED_CANDLE = True          # щоб не засмічувати лог сирими тиками
 MAX_REASONS_IN_SUMMARY = 3             # коротке резюме
+MAX_REJECTIONS = 1000
+REJECTION_DEDUP_SEC = 15               # однакові відмови (symbol, side) у цьому вікні не пишемо
+REJECTION_DEDUP_MAX_KEYS = 10_000      # стеля індексу дедуплікації
 
 def _reason_summary(res: dict) -> str:
     reasons = res.get("reasons", []) or []
@@ -27,56 +33,86 @@ def _key_evidence(ev: dict) -> dict:
             out[k] = ev.get(k)
     return out
 
-# ===== Dedup cache for rejections (skip identical within N seconds) =====
-_GLOBAL_REJ_CACHE = {}  # key: (symbol, side) -> {"sig": (rounded_score, reason_summary), "ts": epoch}
+# ===== Dedup index for rejections (skip identical within N seconds; обмежений за розміром) =====
+_REJ_DEDUP = TTLDedupIndex(ttl=REJECTION_DEDUP_SEC, max_keys=REJECTION_DEDUP_MAX_KEYS)
 
-def _is_duplicate_rejection(symbol: str, side: str, payload: dict, window_sec: int = 15) -> bool:
-    import time
+def _is_duplicate_rejection(symbol: str, side: str, payload: dict) -> bool:
     rs = round(float(payload.get("score", 0.0)), 2)
     sig = (rs, _reason_summary(payload))
-    k = (symbol or "UNKNOWN", side)
-    now = time.time()
-    prev = _GLOBAL_REJ_CACHE.get(k)
-    if prev and prev.get("sig") == sig and (now - prev.get("ts", 0)) < window_sec:
-        return True
-    _GLOBAL_REJ_CACHE[k] = {"sig": sig, "ts": now}
-    return False
-
-def _log_rejection(symbol: str | None, side: str, payload: dict) -> None:
+    return _REJ_DEDUP.seen((symbol or "UNKNOWN", side), sig)
+
+# ===== Сховище відмов для аналітики (utils.rejection_store, SQLite) =====
+_REJECTION_STORE = None
+_REJECTION_STORE_FAILED = False
+_REJECTION_STORE_LOCK = threading.Lock()
+
+def get_rejection_store() -> RejectionStore | None:
+    """Спільне сховище відмов (лінива ініціалізація); None → лише rejections.jsonl."""
+    global _REJECTION_STORE, _REJECTION_STORE_FAILED
+    if _REJECTION_STORE is None and not _REJECTION_STORE_FAILED:
+        with _REJECTION_STORE_LOCK:
+            if _REJECTION_STORE is None and not _REJECTION_STORE_FAILED:
+                try:
+                    from config import REJECTIONS_DB, REJECTIONS_RETENTION_SEC
+                    if REJECTIONS_DB:
+                        _REJECTION_STORE = RejectionStore(REJECTIONS_DB, retention_sec=REJECTIONS_RETENTION_SEC)
+                    else:
+                        _REJECTION_STORE_FAILED = True
+                except Exception as e:
+                    _REJECTION_STORE_FAILED = True
+                    print(f"❌ [get_rejection_store] SQLite недоступний → лише JSONL: {e}")
+    return _REJECTION_STORE
+
+def _rejection_entry(symbol: str | None, side: str, payload: dict) -> Dict[str, Any] | None:
+    """Запис відмови або None (дублікат / лог вимкнено / незакрита свічка)."""
     symbol_key = symbol or payload.get("evidence", {}).get("symbol", "UNKNOWN")
     if _is_duplicate_rejection(symbol_key, side, payload):
-        return
+        return None
     if not ENABLE_REJECTION_LOG:
-        return
-    try:
-        if LOG_ONLY_CLOSED_CANDLE and not payload.get("evidence", {}).get("bar_closed", True):
-            return
-
-        os.makedirs(os.path.dirname(REJECTION_LOG_PATH), exist_ok=True)
-
-        entry = {
-            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
-            "symbol": symbol or payload.get("evidence", {}).get("symbol", "UNKNOWN"),
-            "side": side,
-            "score": payload.get("score", 0),
-            "reason_summary": _reason_summary(payload),
-            "key_evidence": _key_evidence(payload.get("evidence", {})),
-            "matched": payload.get("matched", [])[:5]
-        }
+        return None
+    if LOG_ONLY_CLOSED_CANDLE and not payload.get("evidence", {}).get("bar_closed", True):
+        return None
 
-        # === ⏳ Самоочистка, якщо більше ніж 1000 рядків ===
-        MAX_REJECTIONS = 1000
-        lines = []
-        if os.path.exists(REJECTION_LOG_PATH):
-            with open(REJECTION_LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
-                lines = f.readlines()
-            if len(lines) >= MAX_REJECTIONS:
-                lines = lines[-MAX_REJECTIONS // 2:]
+    return {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "symbol": symbol or payload.get("evidence", {}).get("symbol", "UNKNOWN"),
+        "side": side,
+        "score": payload.get("score", 0),
+        "reason_summary": _reason_summary(payload),
+        "key_evidence": _key_evidence(payload.get("evidence", {})),
+        "matched": payload.get("matched", [])[:5]
+    }
 
-        lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+def _log_rejection(symbol: str | None, side: str, payload: dict) -> None:
+    _log_rejections([(symbol, side, payload)])
 
-        with open(REJECTION_LOG_PATH, "w", encoding="utf-8") as f:
-            f.writelines(lines)
+def _log_rejections(items: List[Tuple[str | None, str, dict]]) -> None:
+    """Пачка відмов → один запис у лог і одна транзакція у сховище (а не файлова операція на кожну)."""
+    try:
+        entries = []
+        for symbol, side, payload in items:
+            entry = _rejection_entry(symbol, side, payload)
+            if entry:
+                entries.append((entry, payload))
+        if not entries:
+            return
+        # === ⏳ Самоочистка: append-only, при > MAX_REJECTIONS лишаються останні MAX_REJECTIONS // 2 ===
+        lines = [json.dumps(entry, ensure_ascii=False) for entry, _ in entries]
+        get_log_writer().write(REJECTION_LOG_PATH, "\n".join(lines), max_lines=MAX_REJECTIONS)
+
+        store = get_rejection_store()
+        if store is not None:
+            now = time.time()
+            store.append_many({
+                "ts": now,
+                "symbol": entry["symbol"],
+                "side": entry["side"],
+                "score": entry["score"],
+                "threshold": payload.get("threshold"),
+                "codes": reason_codes(payload.get("reasons"), payload.get("score"), payload.get("threshold")),
+                "summary": entry["reason_summary"],
+                "evidence": entry["key_evidence"],
+            } for entry, payload in entries)
 
     except Exception as e:
         print(f"❌ [_log_rejection] Помилка: {e}")
@@ -661,15 +697,18 @@ def _score_son(side: str, c: Dict[str, Any], regime: Dict[str, Any]) -> Dict[str
 CheckTradeConditions — SON-style rule engine (15m)
 Тепер з підтримкою кастомних умов через custom_conditions.json
 - API: evaluate_long, evaluate_short, evaluate_both(raw_conditions: dict) -> dict
+- evaluate_batch(conditions_list) -> рейтинг рішень для багатьох символів за один виклик
 """
 
-import json, os, time
+import json, os, time, threading
 from typing import Dict, Any, List, Tuple
-from utils.logger import log_message
+from utils.logger import log_message, log_error
+from ai.rule_engine import RuleSet, compile_rules
 
 # === ⚙️ КОНФІГУРАЦІЯ ===
 USE_CUSTOM_CONDITIONS = True
 CUSTOM_CONDITIONS_PATH = "config/custom_conditions.json"
+CUSTOM_RELOAD_CHECK_SEC = 2.0   # як часто перевіряти mtime файлу (гаряче перезавантаження)
 
 # === ПЕРЕВАНТАЖЕННЯ КАСТОМНИХ ПРАВИЛ ===
 def load_custom_conditions() -> Dict[str, Any]:
@@ -682,8 +721,60 @@ def load_custom_conditions() -> Dict[str, Any]:
         log_message(f"❌ Не вдалося завантажити кастомні умови: {e}")
         return {}
 
+def _conditions_mtime() -> float | None:
+    try:
+        return os.path.getmtime(CUSTOM_CONDITIONS_PATH)
+    except OSError:
+        return None
+
 CUSTOM_RULES = load_custom_conditions()
 
+# Скомпільовані правила: перекомпілюються, коли змінився файл (mtime) або CUSTOM_RULES підмінили
+_COMPILED = {"source": None, "rules": {"long": None, "short": None}, "mtime": _conditions_mtime(), "checked": time.time()}
+_COMPILED_LOCK = threading.Lock()
+
+def _reload_if_changed() -> None:
+    """♻️ Гаряче перезавантаження custom_conditions.json за mtime (не частіше CUSTOM_RELOAD_CHECK_SEC)."""
+    global CUSTOM_RULES
+    now = time.time()
+    if now - _COMPILED["checked"] < CUSTOM_RELOAD_CHECK_SEC:
+        return
+    _COMPILED["checked"] = now
+    mtime = _conditions_mtime()
+    if mtime == _COMPILED["mtime"]:
+        return
+    rules = {}
+    if mtime is not None:
+        # файл може бути записаний наполовину → лишаємо попередні правила, mtime не фіксуємо (повтор на наступній перевірці)
+        try:
+            with open(CUSTOM_CONDITIONS_PATH, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+            if not isinstance(rules, dict):
+                raise ValueError(f"очікувався JSON-об'єкт, отримано {type(rules).__name__}")
+            compile_rules(rules, {"long": THRESH_LONG, "short": THRESH_SHORT})
+        except Exception as e:
+            log_error(f"❌ {CUSTOM_CONDITIONS_PATH} некоректний ({e}) → лишаємо попередні кастомні правила")
+            return
+    _COMPILED["mtime"] = mtime
+    CUSTOM_RULES = rules
+    log_message(f"♻️ {CUSTOM_CONDITIONS_PATH} змінено → кастомні правила перезавантажено")
+
+def get_compiled_rules() -> Dict[str, RuleSet | None]:
+    """{"long": RuleSet | None, "short": RuleSet | None} для поточних CUSTOM_RULES."""
+    if not USE_CUSTOM_CONDITIONS:
+        return {"long": None, "short": None}
+    _reload_if_changed()
+    rules = CUSTOM_RULES
+    with _COMPILED_LOCK:
+        if _COMPILED["source"] is not rules:
+            try:
+                compiled = compile_rules(rules, {"long": THRESH_LONG, "short": THRESH_SHORT})
+            except (TypeError, ValueError) as e:
+                log_error(f"❌ Некоректні кастомні правила ({e}) → вбудований SON")
+                compiled = {"long": None, "short": None}
+            _COMPILED["source"], _COMPILED["rules"] = rules, compiled
+        return _COMPILED["rules"]
+
 # === КАСТОМНА ЛОГІКА ===
 def get_custom_logic(side: str) -> Dict[str, Any] | None:
     if not USE_CUSTOM_CONDITIONS:
@@ -694,59 +785,45 @@ def get_custom_logic(side: str) -> Dict[str, Any] | None:
 
 # === ПЕРЕЗАПИСУЄМО _score_son ===
 def _score_custom(side: str, c: Dict[str, Any], regime: Dict[str, Any], logic: Dict[str, Any]) -> Dict[str, Any]:
-    core = logic.get("core", [])
-    pairs = logic.get("pairs", [])
-    weights = logic.get("weights", {}) or {}
-    soft_factors = logic.get("soft_factors", {}) or {}
-    w_core = weights.get("core", 3.5)
-    w_pair = weights.get("pair", 1.6)
-    w_bonus = weights.get("bonus", 0.8)
-
-    score = 0.0
-    reasons: List[str] = []
-    matched: List[str] = []
+    """Разова оцінка за сирим dict правил (гарячий шлях бере вже скомпільовані — get_compiled_rules)."""
+    return RuleSet(logic).score(side, c, regime)
 
-    core_hits = [(k, v) for (k, v) in core if c.get(k) == v]
-    score += w_core * len(core_hits)
-    if core_hits:
-        reasons.append(f"{side}.custom.core hits={len(core_hits)} → {core_hits}")
-        matched.extend([f"{k}={v}" for k, v in core_hits])
-
-    pair_hits: List[List[Tuple[str, str]]] = []
-    for pp in pairs:
-        if all(c.get(k) == v for k, v in pp):
-            score += w_pair
-            pair_hits.append(pp)
-            matched.append("&".join([f"{k}={v}" for k, v in pp]))
-    if pair_hits:
-        reasons.append(f"{side}.custom.pairs hits={len(pair_hits)} → {pair_hits}")
-
-    # бонус за трендовість
-    if regime["is_trend"]:
-        score += w_bonus
-        reasons.append(f"{side}.custom bonus: trend regime")
+# === ПЕРЕЗАПИСУЄМО evaluate ===
+def _evaluate_side(side: str, c: Dict[str, Any], regime: Dict[str, Any], plan: RuleSet | None) -> Dict[str, Any]:
+    """Оцінка однієї сторони на вже похідних ознаках (без логування відмов)."""
+    default_threshold = THRESH_LONG if side == "LONG" else THRESH_SHORT
+    res = plan.score(side, c, regime) if plan else _score_son(side, c, regime)
+    allow = res["score"] >= (plan.threshold if plan else default_threshold)
+    allow, res = _apply_anti_filters(side, c, res, allow)
+    payload = _public_payload(side, allow, res, c, regime)
+    payload["threshold"] = plan.threshold if plan else default_threshold
+    return payload
 
-    # підтримка кастомного soft_factors (необовʼязково)
-    # тут можна додати щось з soft_factors у майбутньому
+def _evaluate_pair(raw_conditions: Dict[str, Any], rules: Dict[str, RuleSet | None]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Ознаки й режим рахуються один раз, обидві сторони — зі спільного контексту."""
+    c = _build_derived(raw_conditions)
+    regime = _detect_regime(c)
+    L = _evaluate_side("LONG", c, regime, rules["long"])
+    S = _evaluate_side("SHORT", c, regime, rules["short"])
+    return c, L, S
 
-    return {
-        "score": score,
-        "matched": matched,
-        "reasons": reasons,
-        "_pair_hits_count": len(pair_hits),
-        "_core_hits_count": len(core_hits)
-    }
+def _decide(L: Dict[str, Any], S: Dict[str, Any]) -> str:
+    decision = "SKIP"
+    if L["allow"] and not S["allow"]:
+        decision = "LONG"
+    elif S["allow"] and not L["allow"]:
+        decision = "SHORT"
+    elif L["allow"] and S["allow"]:
+        if abs((L["score"] or 0.0) - (S["score"] or 0.0)) < float(DECISION_DELTA):
+            decision = "SKIP"
+        else:
+            decision = "LONG" if L["score"] >= S["score"] else "SHORT"
+    return decision
 
-# === ПЕРЕЗАПИСУЄМО evaluate ===
 def evaluate_long(raw_conditions: Dict[str, Any]) -> Dict[str, Any]:
     c = _build_derived(raw_conditions)
     regime = _detect_regime(c)
-
-    logic = get_custom_logic("long")
-    res = _score_custom("LONG", c, regime, logic) if logic else _score_son("LONG", c, regime)
-    allow = res["score"] >= (logic.get("threshold", THRESH_LONG) if logic else THRESH_LONG)
-    allow, res = _apply_anti_filters("LONG", c, res, allow)
-    payload = _public_payload("LONG", allow, res, c, regime)
+    payload = _evaluate_side("LONG", c, regime, get_compiled_rules()["long"])
     if not payload["allow"]:
         _log_rejection(c.get("symbol"), "LONG", payload)
     return payload
@@ -754,27 +831,54 @@ def evaluate_long(raw_conditions: Dict[str, Any]) -> Dict[str, Any]:
 def evaluate_short(raw_conditions: Dict[str, Any]) -> Dict[str, Any]:
     c = _build_derived(raw_conditions)
     regime = _detect_regime(c)
-
-    logic = get_custom_logic("short")
-    res = _score_custom("SHORT", c, regime, logic) if logic else _score_son("SHORT", c, regime)
-    allow = res["score"] >= (logic.get("threshold", THRESH_SHORT) if logic else THRESH_SHORT)
-    allow, res = _apply_anti_filters("SHORT", c, res, allow)
-    payload = _public_payload("SHORT", allow, res, c, regime)
+    payload = _evaluate_side("SHORT", c, regime, get_compiled_rules()["short"])
     if not payload["allow"]:
         _log_rejection(c.get("symbol"), "SHORT", payload)
     return payload
 
 def evaluate_both(raw_conditions: Dict[str, Any]) -> Dict[str, Any]:
-    L = evaluate_long(raw_conditions)
-    S = evaluate_short(raw_conditions)
-    decision = "SKIP"
-    if L["allow"] and not S["allow"]:
-        decision = "LONG"
-    elif S["allow"] and not L["allow"]:
-        decision = "SHORT"
-    elif L["allow"] and S["allow"]:
-        if abs((L["score"] or 0.0) - (S["score"] or 0.0)) < float(DECISION_DELTA):
-            decision = "SKIP"
-        else:
-            decision = "LONG" if L["score"] >= S["score"] else "SHORT"
-    return {"decision": decision, "long": L, "short": S}
+    c, L, S = _evaluate_pair(raw_conditions, get_compiled_rules())
+    _log_rejections([(c.get("symbol"), p["side"], p) for p in (L, S) if not p["allow"]])
+    return {"decision": _decide(L, S), "long": L, "short": S}
+
+def evaluate_batch(conditions_list: List[Dict[str, Any]], log_rejections: bool = True,
+                   sides: List[str | None] | None = None) -> List[Dict[str, Any]]:
+    """
+    📦 Оцінка багатьох записів (символів) за один виклик:
+    ознаки/режим — один раз на запис, обидві сторони — зі спільного контексту,
+    правила компілюються один раз на батч, відмови пишуться в лог одним записом.
+    sides — (необов'язково) сторона, яку викликач розглядає для кожного запису:
+    тоді в лог відмов іде лише вона (як у evaluate_long / evaluate_short).
+    Повертає рейтинг: [{"rank", "index", "symbol", "decision", "score", "long", "short"}] —
+    спершу LONG/SHORT за score (спадно), далі SKIP; index — позиція у вхідному списку.
+    """
+    rules = get_compiled_rules()
+    ranked: List[Dict[str, Any]] = []
+    rejected: List[Tuple[str | None, str, dict]] = []
+    for i, raw in enumerate(conditions_list or []):
+        try:
+            c, L, S = _evaluate_pair(raw, rules)
+        except Exception as e:
+            log_error(f"❌ evaluate_batch[{i}]: {e}")
+            continue
+        decision = _decide(L, S)
+        best = L if decision == "LONG" else S if decision == "SHORT" else max(L, S, key=lambda p: p["score"])
+        ranked.append({
+            "index": i,
+            "symbol": c.get("symbol"),
+            "decision": decision,
+            "score": best["score"],
+            "long": L,
+            "short": S,
+        })
+        wanted = str(sides[i]).upper() if sides and i < len(sides) and sides[i] else None
+        rejected.extend((c.get("symbol"), p["side"], p) for p in (L, S)
+                        if not p["allow"] and wanted in (None, p["side"]))
+
+    if log_rejections:
+        _log_rejections(rejected)
+
+    ranked.sort(key=lambda r: (r["decision"] != "SKIP", r["score"]), reverse=True)
+    for rank, row in enumerate(ranked, 1):
+        row["rank"] = rank
+    return ranked
@@ -1,6 +1,6 @@
 
-from ai.check_trade_conditions import evaluate_long, evaluate_short
-from typing import Dict, Any, Optional
+from ai.check_trade_conditions import evaluate_long, evaluate_short, evaluate_batch
+from typing import Dict, Any, List, Optional, Tuple
 
 
 def _to_result(side: str, allow: bool, score: float, reasons, matched, evidence, min_points: Optional[int] = None):
@@ -57,3 +57,30 @@ def check_trade_conditions_short(conditions: Dict[str, Any], min_points: Optiona
         evidence=res.get("evidence", {}),
         min_points=min_points,
     )
+
+
+def check_trade_conditions_batch(items: List[Tuple[Dict[str, Any], str]],
+                                 min_points: Optional[int] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Пакетний варіант check_trade_conditions_long/short для скану / watchlist:
+    items — [(conditions, "LONG"|"SHORT"), ...]; один evaluate_batch (спільні правила,
+    один запис у лог відмов). Результати — у порядку items, у тому ж форматі; None — помилка оцінки.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    if not items:
+        return results
+    sides = [str(side).upper() for _, side in items]
+    ranked = evaluate_batch([conditions for conditions, _ in items], sides=sides)
+    for row in ranked:
+        side = sides[row["index"]]
+        res = row["long"] if side == "LONG" else row["short"]
+        results[row["index"]] = _to_result(
+            side=side,
+            allow=bool(res.get("allow")),
+            score=float(res.get("score", 0.0)),
+            reasons=res.get("reasons", []),
+            matched=res.get("matched", []),
+            evidence=res.get("evidence", {}),
+            min_points=min_points,
+        )
+    return results
@@ -0,0 +1,172 @@
+# ai/rule_engine.py
+# -*- coding: utf-8 -*-
+"""
+🧩 Компілятор кастомних правил (config/custom_conditions.json → індексований план).
+
+Замість того щоб на кожну оцінку заново обходити списки core/pairs і порівнювати рядки:
+  - ключі, що фігурують у правилах, отримують фіксовані позиції (колонки);
+  - категоріальні значення кожного ключа кодуються цілими один раз при компіляції
+    (0 — «будь-що інше», в т.ч. відсутній ключ);
+  - кожен предикат core/pairs — пара (колонка, код), а перевірка — цілочисельне порівняння.
+
+Один запис (dict умов) кодується у кортеж кодів і перевіряється чистими int-порівняннями
+(без накладних витрат numpy на малих масивах); багато записів — у матрицю (N × K),
+і всі core/pairs для всіх записів рахуються одним векторизованим проходом
+(реплей історії, мультисимвольні скани).
+"""
+
+from operator import itemgetter
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Ваги за замовчуванням (як у _score_custom)
+DEFAULT_W_CORE = 3.5
+DEFAULT_W_PAIR = 1.6
+DEFAULT_W_BONUS = 0.8
+
+
+def _lookup(mapping: Dict[Any, int], value: Any) -> int:
+    try:
+        return mapping.get(value, 0)
+    except TypeError:  # нехешоване значення (dict/list) ніколи не дорівнює категорії з правил
+        return 0
+
+
+class RuleSet:
+    """⚙️ Скомпільований набір правил однієї сторони (core, pairs, weights, threshold)."""
+
+    def __init__(self, logic: Dict[str, Any], default_threshold: float = 0.0):
+        core = [tuple(p) for p in (logic.get("core") or [])]
+        pairs = [list(pp) for pp in (logic.get("pairs") or [])]
+        weights = logic.get("weights", {}) or {}
+        self.w_core = weights.get("core", DEFAULT_W_CORE)
+        self.w_pair = weights.get("pair", DEFAULT_W_PAIR)
+        self.w_bonus = weights.get("bonus", DEFAULT_W_BONUS)
+        self.threshold = logic.get("threshold", default_threshold)
+
+        # словник: ключ → колонка, значення → код (з 1)
+        self.keys: List[str] = []
+        self._codes: List[Dict[Any, int]] = []
+        index: Dict[str, int] = {}
+
+        def encode(k: str, v: Any) -> Tuple[int, int]:
+            if k not in index:
+                index[k] = len(self.keys)
+                self.keys.append(k)
+                self._codes.append({})
+            codes = self._codes[index[k]]
+            if v not in codes:  # TypeError для нехешованих значень → некоректні правила
+                codes[v] = len(codes) + 1
+            return index[k], codes[v]
+
+        self.core = core
+        core_plan = [encode(k, v) for k, v in core]
+        self._core_plan = tuple(core_plan)
+        self._core_col = np.array([c for c, _ in core_plan], dtype=np.intp)
+        self._core_code = np.array([v for _, v in core_plan], dtype=np.int32)
+
+        # pairs: пласка таблиця предикатів + межі груп (для reduceat)
+        self.pairs = pairs
+        pair_plan = [[encode(k, v) for k, v in pp] for pp in pairs]
+        # для одного запису: itemgetter(колонки)(коди) == очікувані коди — одне порівняння кортежів
+        self._pair_checks = [
+            (itemgetter(*[c for c, _ in plan]), tuple(v for _, v in plan) if len(plan) > 1 else plan[0][1])
+            if plan else None
+            for plan in pair_plan
+        ]
+        flat = [p for plan in pair_plan for p in plan]
+        sizes = [len(pp) for pp in pairs]
+        self._pair_col = np.array([c for c, _ in flat], dtype=np.intp)
+        self._pair_code = np.array([v for _, v in flat], dtype=np.int32)
+        self._pair_size = np.array(sizes, dtype=np.int64)
+        self._pair_start = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp) if sizes else np.empty(0, np.intp)
+
+    # ---------- кодування ----------
+    def encode(self, c: Dict[str, Any]) -> Tuple[int, ...]:
+        """Один запис → кортеж кодів (K,)."""
+        return tuple(_lookup(codes, c.get(k)) for k, codes in zip(self.keys, self._codes))
+
+    def encode_many(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Багато записів → матриця кодів (N × K)."""
+        out = np.zeros((len(records), len(self.keys)), dtype=np.int32)
+        for j, (k, codes) in enumerate(zip(self.keys, self._codes)):
+            out[:, j] = [_lookup(codes, c.get(k)) for c in records]
+        return out
+
+    # ---------- оцінка ----------
+    def hits(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(core_mask N×C, pair_mask N×P) для матриці кодів N×K."""
+        codes = np.atleast_2d(codes)
+        n = codes.shape[0]
+        core = codes[:, self._core_col] == self._core_code if len(self._core_col) else np.zeros((n, 0), bool)
+        if not len(self._pair_size):
+            return core, np.zeros((n, 0), bool)
+        # порожня пара (без предикатів) — як all([]) → True
+        ok = (codes[:, self._pair_col] == self._pair_code).astype(np.int64)
+        if ok.shape[1]:
+            got = np.add.reduceat(ok, np.minimum(self._pair_start, ok.shape[1] - 1), axis=1)
+        else:
+            got = np.zeros((n, len(self._pair_size)), np.int64)
+        empty = self._pair_size == 0
+        if empty.any():
+            got[:, empty] = 0
+        return core, got == self._pair_size
+
+    def score_many(self, codes: np.ndarray, trend: np.ndarray) -> Dict[str, np.ndarray]:
+        """Векторизовано: score, кількість core/pair-хітів для N записів (trend — bool[N] режиму)."""
+        core, pairs = self.hits(codes)
+        core_n, pair_n = core.sum(axis=1), pairs.sum(axis=1)
+        score = self.w_core * core_n + self.w_pair * pair_n + np.where(np.asarray(trend, bool), self.w_bonus, 0.0)
+        return {"score": score, "core_hits": core_n, "pair_hits": pair_n, "core_mask": core, "pair_mask": pairs}
+
+    def score(self, side: str, c: Dict[str, Any], regime: Dict[str, Any], codes: Sequence[int] | None = None) -> Dict[str, Any]:
+        """Один запис → той самий dict, що й _score_custom (score/matched/reasons/лічильники)."""
+        x = self.encode(c) if codes is None else codes
+        core_hits = [p for p, (col, code) in zip(self.core, self._core_plan) if x[col] == code]
+        pair_hits = [pp for pp, check in zip(self.pairs, self._pair_checks)
+                     if check is None or check[0](x) == check[1]]
+
+        score = 0.0
+        reasons: List[str] = []
+        matched: List[str] = []
+
+        score += self.w_core * len(core_hits)
+        if core_hits:
+            reasons.append(f"{side}.custom.core hits={len(core_hits)} → {core_hits}")
+            matched.extend([f"{k}={v}" for k, v in core_hits])
+
+        for pp in pair_hits:
+            score += self.w_pair
+            matched.append("&".join([f"{k}={v}" for k, v in pp]))
+        if pair_hits:
+            reasons.append(f"{side}.custom.pairs hits={len(pair_hits)} → {pair_hits}")
+
+        # бонус за трендовість
+        if regime["is_trend"]:
+            score += self.w_bonus
+            reasons.append(f"{side}.custom bonus: trend regime")
+
+        return {
+            "score": score,
+            "matched": matched,
+            "reasons": reasons,
+            "_pair_hits_count": len(pair_hits),
+            "_core_hits_count": len(core_hits)
+        }
+
+
+def compile_rules(rules: Any, default_thresholds: Dict[str, float] | None = None) -> Dict[str, RuleSet | None]:
+    """
+    Увесь custom_conditions.json → {"long": RuleSet | None, "short": RuleSet | None}.
+    None — для сторони без правил (тоді оцінка йде через вбудований SON).
+    """
+    default_thresholds = default_thresholds or {}
+    out: Dict[str, RuleSet | None] = {"long": None, "short": None}
+    if not isinstance(rules, dict):
+        return out
+    for side in out:
+        logic = rules.get(side)
+        if logic and isinstance(logic, dict):
+            out[side] = RuleSet(logic, default_thresholds.get(side, 0.0))
+    return out
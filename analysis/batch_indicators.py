@@ -0,0 +1,250 @@
+# analysis/batch_indicators.py
+
+"""
+🧮 Batch-режим індикаторів для всього універсу символів.
+
+Замість "на кожен символ — окремі talib/pandas виклики" ціни всіх символів
+вирівнюються в 2-D матриці (symbols × bars), і кожен індикатор рахується одним
+векторизованим проходом по всіх символах одразу:
+    macd_matrix   ↔ talib.MACD(close, 12, 26, 9)
+    rsi_matrix    ↔ ta.momentum.rsi(close, 14)  (Wilder)
+    atr_matrix    ↔ talib.ATR(high, low, close, 14)
+    bbands_matrix ↔ talib.BBANDS(close, 20, 2, 2)  (σ генеральної сукупності)
+    cci_matrix    ↔ talib.CCI(high, low, close, 20)
+    stoch_matrix  ↔ talib.STOCH(high, low, close, 14, 3, SMA, 3, SMA)
+Рекурсивні ряди (EMA/Wilder) — цикл по часу, векторизований по символах;
+віконні (SMA/σ/CCI/STOCH) — через sliding_window_view без циклів.
+
+compute_batch() повертає для кожного символу ті самі dict-и, що й аналізатори
+(analyze_macd_atr, analyze_rsi, ...), під ключами задач build_monitor_snapshot —
+тож результат напряму йде у snapshot → convert_snapshot_to_conditions.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis.indicators import (
+    _bollinger_result,
+    _cci_result,
+    _macd_atr_result,
+    _rsi_result,
+    _stochastic_result,
+    _volatility_result,
+    get_indicator_graph,
+)
+from utils.logger import log_debug, log_error
+
+# Класифікатори дивляться лише на хвіст рядів (≤ 40 барів) — у них передається зріз
+_RESULT_TAIL = 60
+# Мінімальна довжина фрейму (як у analyze_macd_atr)
+_MIN_BARS = 60
+
+# Ключі задач build_monitor_snapshot, які покриває batch-режим
+BATCH_JOBS = ("macd", "rsi", "stochastic", "bollinger", "cci", "volatility")
+
+
+# ============================ 📐 ВИРІВНЮВАННЯ ============================
+def align_frames(frames, bars):
+    """
+    Вирівнює фрейми {symbol: OHLCV | DataFrame} у матриці (S × bars) по останніх барах.
+    Символи з коротшою історією або NaN у вікні пропускаються (для них — звичайний шлях).
+    Повертає (symbols, {"high": H, "low": L, "close": C}).
+    """
+    symbols, rows = [], {"high": [], "low": [], "close": []}
+    for symbol, df in frames.items():
+        if df is None or len(df) < bars:
+            continue
+        tail = df.tail(bars)
+        values = {col: np.asarray(tail[col], dtype=float) for col in rows}
+        if any(np.isnan(v).any() for v in values.values()):
+            continue
+        symbols.append(symbol)
+        for col, v in values.items():
+            rows[col].append(v)
+    shape = (len(symbols), bars)
+    return symbols, {col: (np.vstack(v) if v else np.empty(shape)) for col, v in rows.items()}
+
+
+def _nan_like(x):
+    return np.full(x.shape, np.nan)
+
+
+def _rolling(x, n):
+    """Вікна довжини n по осі часу: (S, T-n+1, n)."""
+    return sliding_window_view(x, n, axis=1)
+
+
+# ============================ ⚙️ КЕРНЕЛИ ============================
+def _seeded_ema(x, n, start):
+    """EMA як у TA-Lib: seed = SMA(x[start-n+1 : start+1]) у колонці start, далі крок k=2/(n+1)."""
+    out = _nan_like(x)
+    k = 2.0 / (n + 1.0)
+    prev = x[:, start - n + 1:start + 1].mean(axis=1)
+    out[:, start] = prev
+    for t in range(start + 1, x.shape[1]):
+        prev = prev + k * (x[:, t] - prev)
+        out[:, t] = prev
+    return out
+
+
+def macd_matrix(close, fast=12, slow=26, signal=9):
+    """(macd, signal, hist) як talib.MACD: значення з колонки (slow-1)+(signal-1)."""
+    start = slow - 1
+    macd = _seeded_ema(close, fast, start) - _seeded_ema(close, slow, start)
+    sig = _nan_like(close)
+    sig_start = start + signal - 1
+    if close.shape[1] > sig_start:
+        sig[:, sig_start:] = _seeded_ema(macd[:, start:], signal, signal - 1)[:, signal - 1:]
+    macd[:, :sig_start] = np.nan
+    return macd, sig, macd - sig
+
+
+def rsi_matrix(close, n=14):
+    """Wilder RSI як ta.momentum.rsi: EWM(alpha=1/n, adjust=False) від першого бару (дельта 0), min_periods=n."""
+    out = _nan_like(close)
+    diff = np.diff(close, axis=1)
+    gain, loss = np.clip(diff, 0.0, None), np.clip(-diff, 0.0, None)
+    alpha = 1.0 / n
+    up, down = np.zeros(close.shape[0]), np.zeros(close.shape[0])
+    for t in range(1, close.shape[1]):
+        up += alpha * (gain[:, t - 1] - up)
+        down += alpha * (loss[:, t - 1] - down)
+        if t >= n - 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi = 100.0 - 100.0 / (1.0 + up / down)
+            out[:, t] = np.where(down != 0, rsi, 100.0)
+    return out
+
+
+def true_range_matrix(high, low, close):
+    """TR з prev close; колонка 0 — NaN (як у talib)."""
+    tr = _nan_like(close)
+    prev = close[:, :-1]
+    tr[:, 1:] = np.maximum.reduce([
+        high[:, 1:] - low[:, 1:],
+        np.abs(high[:, 1:] - prev),
+        np.abs(low[:, 1:] - prev),
+    ])
+    return tr
+
+
+def atr_matrix(high, low, close, n=14):
+    """ATR як talib.ATR: seed = SMA(TR[1..n]) у колонці n, далі (atr*(n-1)+tr)/n."""
+    tr = true_range_matrix(high, low, close)
+    out = _nan_like(close)
+    if close.shape[1] <= n:
+        return out
+    atr = tr[:, 1:n + 1].mean(axis=1)
+    out[:, n] = atr
+    for t in range(n + 1, close.shape[1]):
+        atr = (atr * (n - 1) + tr[:, t]) / n
+        out[:, t] = atr
+    return out
+
+
+def sma_std_matrix(close, n=20, ddof=0):
+    """Ковзні SMA і σ (ddof) по вікну n; перші n-1 колонок — NaN."""
+    mean, std = _nan_like(close), _nan_like(close)
+    windows = _rolling(close, n)
+    mean[:, n - 1:] = windows.mean(axis=2)
+    std[:, n - 1:] = windows.std(axis=2, ddof=ddof)
+    return mean, std
+
+
+def bbands_matrix(close, n=20, k=2.0):
+    """(upper, middle, lower) як talib.BBANDS(n, k, k, SMA) — σ генеральної сукупності."""
+    middle, std = sma_std_matrix(close, n, ddof=0)
+    return middle + k * std, middle, middle - k * std
+
+
+def cci_matrix(high, low, close, n=20):
+    """CCI як talib.CCI: (TP - SMA(TP)) / (0.015 · mean|TP - SMA(TP)|); нульове відхилення → 0."""
+    tp = (high + low + close) / 3.0
+    windows = _rolling(tp, n)
+    mean = windows.mean(axis=2)
+    mean_dev = np.abs(windows - mean[:, :, None]).mean(axis=2)
+    dev = tp[:, n - 1:] - mean
+    out = _nan_like(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, n - 1:] = np.where((dev != 0) & (mean_dev != 0), dev / (0.015 * mean_dev), 0.0)
+    return out
+
+
+def stoch_matrix(high, low, close, fastk=14, slowk=3, slowd=3):
+    """(slowk, slowd) як talib.STOCH з SMA-згладженням; нульовий діапазон → 0."""
+    hh = _rolling(high, fastk).max(axis=2)
+    ll = _rolling(low, fastk).min(axis=2)
+    rng = hh - ll
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k_fast = np.where(rng != 0, (close[:, fastk - 1:] - ll) / rng * 100.0, 0.0)
+    k_slow = _rolling(k_fast, slowk).mean(axis=2)
+    d_slow = _rolling(k_slow, slowd).mean(axis=2)
+    lookback = fastk + slowk + slowd - 3
+    out_k, out_d = _nan_like(close), _nan_like(close)
+    out_k[:, lookback:] = k_slow[:, slowd - 1:]
+    out_d[:, lookback:] = d_slow
+    return out_k, out_d
+
+
+# ============================ 📦 РЕЗУЛЬТАТИ ============================
+def compute_batch(frames, bars=None):
+    """
+    Рахує індикатори для всіх символів {symbol: df} одним проходом.
+    Повертає {symbol: {job: result}}, де job ∈ BATCH_JOBS, а result — той самий dict,
+    що повернув би відповідний аналізатор (analyze_macd_atr, analyze_rsi, ...).
+    Символи, які не вдалося вирівняти, у відповідь не потрапляють.
+    """
+    if bars is None:
+        lengths = [len(df) for df in frames.values() if df is not None]
+        bars = max(lengths) if lengths else 0
+    if bars < _MIN_BARS:
+        return {}
+
+    symbols, m = align_frames(frames, bars)
+    if not symbols:
+        return {}
+    high, low, close = m["high"], m["low"], m["close"]
+
+    macd, signal, hist = macd_matrix(close)
+    atr = atr_matrix(high, low, close)
+    rsi = rsi_matrix(close)
+    upper, middle, lower = bbands_matrix(close)
+    cci = cci_matrix(high, low, close)
+    slowk, slowd = stoch_matrix(high, low, close)
+    # волатильність — σ вибірки (ddof=1), як close.rolling(20).std()
+    std20 = close[:, -20:].std(axis=1, ddof=1)
+    sma20 = close[:, -20:].mean(axis=1)
+
+    tail = slice(-_RESULT_TAIL, None)
+    results = {}
+    for i, symbol in enumerate(symbols):
+        try:
+            results[symbol] = {
+                "macd": _macd_atr_result(close[i, tail], macd[i, tail], signal[i, tail], hist[i, tail], atr[i, tail]),
+                "rsi": _rsi_result(rsi[i, tail]),
+                "stochastic": _stochastic_result(slowk[i, tail], slowd[i, tail]),
+                "bollinger": _bollinger_result(close[i, tail], upper[i, tail], middle[i, tail], lower[i, tail]),
+                "cci": _cci_result(symbol, cci[i, tail]),
+                "volatility": _volatility_result(symbol, std20[i], sma20[i]),
+            }
+        except Exception as e:
+            log_error(f"❌ compute_batch {symbol}: {e}")
+    return results
+
+
+def analyze_universe(symbols, interval="15m"):
+    """
+    Batch-аналіз універсу на спільних фреймах графа індикаторів (ті самі свічки,
+    що бачать аналізатори). {symbol: {job: result}}; символи без даних — пропущені.
+    """
+    frames = {}
+    for symbol in symbols:
+        try:
+            g = get_indicator_graph(symbol, interval)
+            if g is not None:
+                frames[symbol] = g.frame
+        except Exception as e:
+            log_error(f"❌ analyze_universe {symbol}: {e}")
+    results = compute_batch(frames)
+    log_debug("🧮 batch-індикатори: %d/%d символів", len(results), len(symbols))
+    return results
@@ -0,0 +1,201 @@
+# analysis/candles.py
+
+"""
+🕯️ Векторизований рушій свічкових патернів.
+
+Ознаки свічки (тіло, діапазон, тіні) рахуються один раз масивами на всю серію,
+кожен патерн — булева маска по всіх барах (TA-Lib сигнали + власні морфологічні фільтри):
+    candle_features(o, h, l, c)   → {"body", "range", "u_wick", "l_wick"}
+    pattern_masks(o, h, l, c)     → {(type, direction): bool[]} у порядку PATTERNS
+    collect_patterns(masks, n)    → знахідки в останніх last_n барах з вагою «свіжості»
+    resolve_patterns(patterns)    → (patterns без конфліктів, score) — як у detect_candlestick_patterns
+    pattern_score_series(o, h, l, c) — batch: score для кожного бару серії (бектести),
+        рівний тому, що дав би detect_candlestick_patterns на фреймі, що закінчується цим баром.
+"""
+
+import numpy as np
+import talib
+
+# Порядок важливий: так формувались кандидати на свічці (впливає на порядок у відповіді)
+PATTERNS = (
+    ("engulfing", "bullish"),
+    ("engulfing", "bearish"),
+    ("hammer", "bullish"),
+    ("shooting_star", "bearish"),
+    ("evening_star", "bearish"),
+    ("morning_star", "bullish"),
+    ("doji", "neutral"),
+)
+
+# Базові ваги типів
+BASE_WEIGHTS = {
+    "engulfing": 8.0,
+    "hammer": 6.0,
+    "shooting_star": 6.0,
+    "evening_star": 10.0,
+    "morning_star": 10.0,
+    "doji": 2.5,
+}
+
+# Скільки останніх свічок оцінюємо і стеля підсумкового score
+RECENT_BARS = 12
+MAX_SCORE = 25.0
+
+_TALIB_FUNCS = {
+    "engulfing": talib.CDLENGULFING,
+    "hammer": talib.CDLHAMMER,
+    "shooting_star": talib.CDLSHOOTINGSTAR,
+    "evening_star": talib.CDLEVENINGSTAR,
+    "morning_star": talib.CDLMORNINGSTAR,
+    "doji": talib.CDLDOJI,
+}
+
+
+def _ohlc(open_, high, low, close):
+    return tuple(np.asarray(x, dtype=float) for x in (open_, high, low, close))
+
+
+def talib_signals(open_, high, low, close):
+    """Сирі сигнали TA-Lib {type: int[]} (>0 bull, <0 bear)."""
+    o, h, l, c = _ohlc(open_, high, low, close)
+    return {name: func(o, h, l, c) for name, func in _TALIB_FUNCS.items()}
+
+
+def candle_features(open_, high, low, close):
+    """Тіло, діапазон (≥ 1e-12) і тіні для кожної свічки."""
+    o, h, l, c = _ohlc(open_, high, low, close)
+    return {
+        "body": np.abs(c - o),
+        "range": np.maximum(h - l, 1e-12),
+        "u_wick": h - np.maximum(o, c),
+        "l_wick": np.minimum(o, c) - l,
+    }
+
+
+def pattern_masks(open_, high, low, close, signals=None, features=None):
+    """{(type, direction): bool[]} для всієї серії; signals/features можна передати готові."""
+    o, h, l, c = _ohlc(open_, high, low, close)
+    sig = signals if signals is not None else talib_signals(o, h, l, c)
+    f = features if features is not None else candle_features(o, h, l, c)
+    body, rng, uw, lw = f["body"], f["range"], f["u_wick"], f["l_wick"]
+    body_ratio = body / rng
+
+    # engulfing: тіло повністю перекриває тіло попередньої свічки (на першій свічці — ні)
+    body_low, body_high = np.minimum(o, c), np.maximum(o, c)
+    covers = np.zeros(len(c), dtype=bool)
+    covers[1:] = (body_low[1:] <= body_low[:-1]) & (body_high[1:] >= body_high[:-1])
+
+    # hammer / shooting star: довга тінь, коротка протилежна, невелике тіло
+    hammer = (lw >= 2.5 * body) & (uw <= 0.35 * body) & (body_ratio <= 0.35)
+    shooting = (uw >= 2.5 * body) & (lw <= 0.35 * body) & (body_ratio <= 0.35)
+
+    return {
+        ("engulfing", "bullish"): (covers & (c > o)) | (sig["engulfing"] > 0),
+        ("engulfing", "bearish"): (covers & (c < o)) | (sig["engulfing"] < 0),
+        ("hammer", "bullish"): hammer | (sig["hammer"] != 0),
+        ("shooting_star", "bearish"): shooting | (sig["shooting_star"] != 0),
+        # evening/morning star з TA-Lib (вони самі вже строгі)
+        ("evening_star", "bearish"): sig["evening_star"] != 0,
+        ("morning_star", "bullish"): sig["morning_star"] != 0,
+        # doji — лише «тонкі»
+        ("doji", "neutral"): (body_ratio <= 0.08) | ((sig["doji"] != 0) & (body_ratio <= 0.12)),
+    }
+
+
+def collect_patterns(masks, n, last_n=RECENT_BARS):
+    """
+    Знахідки в останніх last_n барах: [{"type", "direction", "index", "quality"}]
+    за зростанням index, на одній свічці — у порядку PATTERNS.
+    quality = базова вага × «свіжість» (0.4 на найстарішій свічці → 1.0 на останній).
+    """
+    last_n = min(last_n, n)
+    start = n - last_n
+    hits = np.stack([masks[key][start:n] for key in PATTERNS], axis=1)  # (last_n, K)
+    rows, cols = np.nonzero(hits)
+    patterns = []
+    for r, k in zip(rows.tolist(), cols.tolist()):
+        ptype, direction = PATTERNS[k]
+        i = start + r
+        pos = (i - start) / max(last_n - 1, 1)
+        w = 0.4 + 0.6 * pos
+        patterns.append({
+            "type": ptype,
+            "direction": direction,
+            "index": int(i),
+            "quality": round(BASE_WEIGHTS.get(ptype, 3.0) * w, 2),
+        })
+    return patterns
+
+
+def resolve_patterns(patterns):
+    """(patterns без конфліктів, відсортовані за свіжістю/якістю; підсумковий score ≤ MAX_SCORE)."""
+    # 1) усунення конфліктів: якщо є bull і bear одного типу — беремо найсвіжіший з вищою якістю
+    dedup = {}
+    for p in patterns:
+        key = (p["type"], p["direction"])
+        existing_same = dedup.get(key)
+        if existing_same is None or (p["index"] > existing_same["index"] and p["quality"] >= existing_same["quality"]):
+            dedup[key] = p
+
+    # 2) якщо після цього лишились і bull, і bear для одного типу — залишимо той, що ближче до поточної свічки
+    by_type = {}
+    for p in dedup.values():
+        by_type.setdefault(p["type"], []).append(p)
+    resolved = []
+    for lst in by_type.values():
+        if len({x["direction"] for x in lst}) == 2:
+            lst.sort(key=lambda x: (x["index"], x["quality"]), reverse=True)
+            resolved.append(lst[0])
+        else:
+            resolved.extend(lst)
+
+    total_score = round(min(sum(p["quality"] for p in resolved), MAX_SCORE), 2)
+    resolved.sort(key=lambda x: (x["index"], x["quality"]), reverse=True)
+    return resolved, total_score
+
+
+def pattern_score_series(open_, high, low, close, last_n=RECENT_BARS, masks=None):
+    """
+    📈 Batch: score патернів для кожного бару t (вікно з last_n свічок, що закінчується на t).
+    Після resolve від кожного типу лишається найсвіжіша знахідка, тож
+    score_t = min(Σ_type base_w · (0.4 + 0.6 · pos(last_t(type))), MAX_SCORE) без циклу по барах.
+    """
+    o, h, l, c = _ohlc(open_, high, low, close)
+    masks = masks if masks is not None else pattern_masks(o, h, l, c)
+    n = len(c)
+    t = np.arange(n)
+    width = np.minimum(last_n, t + 1)
+    start = t - width + 1
+
+    total = np.zeros(n)
+    for ptype, weight in BASE_WEIGHTS.items():
+        hit = np.zeros(n, dtype=bool)
+        for (kind, _direction), mask in masks.items():
+            if kind == ptype:
+                hit |= mask
+        last = np.maximum.accumulate(np.where(hit, t, -1))
+        inside = last >= start
+        # quality з тим самим округленням, що й у collect_patterns: таблиця [width, pos]
+        table = _quality_table(weight, last_n)
+        total += np.where(inside, table[width, np.clip(last - start, 0, None)], 0.0)
+    return np.round(np.minimum(total, MAX_SCORE), 2)
+
+
+def _quality_table(weight, last_n):
+    table = np.zeros((last_n + 1, last_n))
+    for width in range(1, last_n + 1):
+        for pos in range(width):
+            table[width, pos] = round(weight * (0.4 + 0.6 * (pos / max(width - 1, 1))), 2)
+    return table
+
+
+def strongest_talib_pattern(open_, high, low, close):
+    """Найсильніший TA-Lib патерн на кожній свічці за пріоритетом ("<type>_bull/_bear" або "none")."""
+    o, h, l, c = _ohlc(open_, high, low, close)
+    sig = talib_signals(o, h, l, c)
+    priority = ("engulfing", "hammer", "shooting_star", "morning_star", "evening_star", "doji")
+    conds, choices = [], []
+    for name in priority:
+        conds += [sig[name] > 0, sig[name] < 0]
+        choices += [f"{name}_bull", f"{name}_bear"]
+    return np.select(conds, choices, default="none").tolist()
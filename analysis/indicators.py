@@ -1,14 +1,274 @@
 import pandas as pd
 import numpy as np
 import talib
-from utils.logger import log_message
+from utils.logger import log_message, log_debug
 from utils.tools import get_current_futures_price
 from utils.logger import log_error
-import ta
 from utils.tools import get_historical_data
 from utils.tools import get_klines
-from utils.get_klines_bybit import get_klines_clean_bybit
+from utils.get_klines_bybit import get_klines_clean_bybit, get_ohlcv_bybit
+from utils.ohlcv import OHLCV
 import json
+import re
+import threading
+from config import INDICATOR_GRAPH_BARS, STREAMING_INDICATORS
+from analysis.streaming import get_indicator_stream
+from analysis.levels import SwingCache, cluster_levels, swing_points
+from analysis.candles import (
+    RECENT_BARS, candle_features, collect_patterns, pattern_masks,
+    resolve_patterns, strongest_talib_pattern, talib_signals,
+)
+
+
+# ============================ 🧮 ГРАФ ІНДИКАТОРІВ ============================
+# Спільні проміжні ряди для одного фрейму (symbol, interval, останній бар):
+# кожен аналізатор оголошує, які ряди йому потрібні (needs), а граф рахує кожен ряд один раз.
+#
+# Назви рядів:
+#   open/high/low/close/volume  — колонки OHLCV (Series поверх read-only масивів, без копій)
+#   tr           — true range (з prev close)          hl_range    — |high - low|
+#   atr{n}       — ATR Wilder (talib)                 atr_sma{n}  — SMA(tr, n)
+#   hl_ema{n}    — EMA(|high-low|, n)
+#   ema{n}, sma{n}, std{n} (ddof=1) — по close
+#   rsi{n}       — RSI Wilder (як ta.momentum.rsi)
+#   bbands{n}    — (upper, middle, lower), 2σ, з sma{n}/std{n}
+#   cci{n}, stoch{n} (slowk, slowd), macd (macd, signal, hist) — talib
+#
+# Рекурсивні ряди (EMA/ATR/RSI) рахуються на спільному вікні INDICATOR_GRAPH_BARS барів.
+
+_GRAPH_INTERVALS = {"1h": "60", "15m": "15", "5m": "5", "1m": "1"}
+_BASE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class IndicatorGraph:
+    """🧮 Ледачий кеш рядів індикаторів для одного фрейму свічок (OHLCV або DataFrame)."""
+
+    def __init__(self, data, key=None):
+        frame = data if isinstance(data, OHLCV) else OHLCV.from_dataframe(data)
+        self.frame = frame if frame is not None else OHLCV([], [], [], [], [], [])
+        self.index = pd.RangeIndex(len(self.frame))
+        self.key = key
+        self._df = None
+        self._series = {}
+        self._lock = threading.RLock()
+        self.computed = 0
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def df(self):
+        """DataFrame на вимогу (для споживачів, яким потрібна таблиця); ряди графа його не потребують."""
+        with self._lock:
+            if self._df is None:
+                self._df = self.frame.to_frame()
+            return self._df
+
+    def need(self, *names):
+        for name in names:
+            self.get(name)
+        return self
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._series:
+                self._series[name] = self._compute(name)
+                self.computed += 1
+            return self._series[name]
+
+    def _compute(self, name):
+        if name in _BASE_COLUMNS:
+            # float64 без копії; у режимі float32 (KLINE_CACHE_DTYPE) — одна копія на бар
+            return pd.Series(np.asarray(self.frame[name], dtype=float), index=self.index, name=name)
+        if name == "hl_range":
+            return (self.get("high") - self.get("low")).abs()
+        if name == "tr":
+            high, low, prev_close = self.get("high"), self.get("low"), self.get("close").shift(1)
+            return pd.concat([
+                (high - low).abs(),
+                (high - prev_close).abs(),
+                (low - prev_close).abs()
+            ], axis=1).max(axis=1)
+        if name == "macd":
+            return tuple(pd.Series(x, index=self.index) for x in talib.MACD(self.get("close")))
+
+        m = re.fullmatch(r"([a-z_]+?)(\d+)", name)
+        if not m:
+            raise KeyError(f"IndicatorGraph: невідомий ряд {name}")
+        kind, n = m.group(1), int(m.group(2))
+        close = self.get("close")
+
+        if kind == "ema":
+            return close.ewm(span=n, adjust=False).mean()
+        if kind == "sma":
+            return close.rolling(n, min_periods=n).mean()
+        if kind == "std":
+            return close.rolling(n, min_periods=n).std()
+        if kind == "hl_ema":
+            return self.get("hl_range").ewm(span=n, adjust=False).mean()
+        if kind == "atr_sma":
+            return self.get("tr").rolling(n, min_periods=n).mean()
+        if kind == "atr":
+            return pd.Series(talib.ATR(self.get("high"), self.get("low"), close, timeperiod=n), index=self.index)
+        if kind == "rsi":
+            diff = close.diff()
+            up = diff.where(diff > 0, 0.0).ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
+            down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
+            rsi = 100 - (100 / (1 + up / down))
+            return rsi.where(down != 0, 100.0).where(up.notna())
+        if kind == "bbands":
+            # talib.BBANDS рахує σ по генеральній сукупності (ddof=0)
+            middle = self.get(f"sma{n}")
+            band = 2.0 * self.get(f"std{n}") * np.sqrt((n - 1) / n)
+            return middle + band, middle, middle - band
+        if kind == "cci":
+            return pd.Series(talib.CCI(self.get("high"), self.get("low"), close, timeperiod=n), index=self.index)
+        if kind == "stoch":
+            slowk, slowd = talib.STOCH(
+                self.get("high"), self.get("low"), close,
+                fastk_period=n, slowk_period=3, slowk_matype=0,
+                slowd_period=3, slowd_matype=0
+            )
+            return pd.Series(slowk, index=self.index), pd.Series(slowd, index=self.index)
+        raise KeyError(f"IndicatorGraph: невідомий ряд {name}")
+
+
+_GRAPHS = {}  # (symbol, interval) -> IndicatorGraph для останнього бару
+_GRAPHS_LOCK = threading.Lock()
+
+
+def _frame_key(frame):
+    return (len(frame), frame.last_timestamp, *(float(frame[c][-1]) for c in _BASE_COLUMNS))
+
+
+def get_indicator_graph(symbol, interval="15m", needs=(), limit=None):
+    """
+    Граф індикаторів для (symbol, interval, останній бар).
+    Повторні виклики на тому ж барі (інші аналізатори, snapshot + scan) віддають той самий граф.
+    None — якщо свічок немає.
+    """
+    interval = _GRAPH_INTERVALS.get(str(interval), str(interval))
+    frame = get_ohlcv_bybit(symbol, interval=interval, limit=max(int(limit or 0), INDICATOR_GRAPH_BARS))
+    if frame is None or frame.empty:
+        return None
+    key = _frame_key(frame)
+    with _GRAPHS_LOCK:
+        graph = _GRAPHS.get((symbol, interval))
+        if graph is None or graph.key != key:
+            graph = IndicatorGraph(frame, key)
+            _GRAPHS[(symbol, interval)] = graph
+    return graph.need(*needs)
+
+
+# Підтверджені swing-точки 15m для analyze_support_resistance (по символу)
+_SR_SWINGS = SwingCache(left=2, right=2)
+
+
+def _stream_fetch(symbol, interval, limit):
+    return get_klines_clean_bybit(symbol, interval=interval, limit=limit)
+
+
+def get_streaming_indicators(symbol, interval, needs):
+    """
+    ⚡ Інкрементальний стан індикаторів (analysis.streaming) для (symbol, interval):
+    після warm-up кожен виклик обробляє лише нові/змінені бари (O(1)).
+    None — якщо вимкнено (STREAMING_INDICATORS) або даних немає → аналізатор бере граф.
+    """
+    if not STREAMING_INDICATORS:
+        return None
+    try:
+        interval = _GRAPH_INTERVALS.get(str(interval), str(interval))
+        return get_indicator_stream(symbol, interval, needs, _stream_fetch, warmup_bars=INDICATOR_GRAPH_BARS)
+    except Exception as e:
+        log_error(f"❌ get_streaming_indicators {symbol} {interval}: {e}")
+        return None
+
+
+
+def _macd_atr_result(close, macd_raw, signal_raw, hist_raw, atr_raw):
+    """🧩 Класифікація MACD+ATR за готовими рядами (спільна для аналізатора і batch-режиму)."""
+    if pd.isna(macd_raw).all() or pd.isna(signal_raw).all() or pd.isna(hist_raw).all() or pd.isna(atr_raw).all():
+        return default_macd_atr()
+
+    macd = pd.Series(macd_raw).fillna(0.0)
+    signal = pd.Series(signal_raw).fillna(0.0)
+    hist = pd.Series(hist_raw).fillna(0.0)
+    atr = pd.Series(atr_raw).fillna(0.0)
+
+    macd_now, signal_now, hist_now = macd.iloc[-1], signal.iloc[-1], hist.iloc[-1]
+    atr_now = atr.iloc[-1]
+    price_now = float(np.asarray(close, dtype=float)[-1])
+
+    # --- Тренд за rolling-вікном гістограми (середнє за 5 барів)
+    hist_ma5 = hist.tail(5).mean()
+    if hist_ma5 > 0:
+        macd_trend = "bullish"
+    elif hist_ma5 < 0:
+        macd_trend = "bearish"
+    else:
+        macd_trend = "neutral"
+
+    # --- Напрям гістограми: дивимось дельту за 3 останні бари
+    dh = hist.diff().tail(3).sum()
+    if dh > 0:
+        hist_direction = "up"
+    elif dh < 0:
+        hist_direction = "down"
+    else:
+        hist_direction = "flat"
+
+    # --- "Теплий" перетин: шукаємо перетин за останні 3 бари
+    crossed = "none"
+    last3 = min(3, len(macd) - 1)
+    for i in range(1, last3 + 1):
+        m_prev, s_prev = macd.iloc[-1 - i], signal.iloc[-1 - i]
+        m_cur, s_cur = macd.iloc[-i], signal.iloc[-i]
+        if m_prev < s_prev and m_cur > s_cur:
+            crossed = "bullish_cross"
+            break
+        if m_prev > s_prev and m_cur < s_cur:
+            crossed = "bearish_cross"
+            break
+
+    # --- ATR як % від ціни: нейтралізуємо лише при дуже низькій волатильності
+    atr_pct = (atr_now / max(price_now, 1e-8)) * 100
+    if atr_pct < 0.2:
+        macd_trend = "neutral"
+        hist_direction = "flat"
+        crossed = "none"
+
+    # --- Оцінка "сили" за гістограмою + інерцією
+    score = float(hist_ma5) * 10  # масштабуємо, щоб не було мікро-оцінок
+    score = round(max(min(score, 10.0), -10.0), 2)
+
+    macd_result = {
+        "trend": macd_trend,
+        "hist_direction": hist_direction,
+        "crossed": crossed,
+        "score": score,
+        "raw_values": {
+            "macd_now": round(float(macd_now), 6),
+            "signal_now": round(float(signal_now), 6),
+            "hist_now": round(float(hist_now), 6),
+            "hist_ma5": round(float(hist_ma5), 6)
+        },
+        "last_5_values": hist.tail(5).round(4).tolist()
+    }
+
+    atr_result = {
+        "level": round(float(atr_now), 4),
+        "score": round(float(atr_pct), 2),  # ATR як відсоток від ціни
+        "raw_values": {
+            "atr_now": round(float(atr_now), 6),
+            "atr_pct": round(float(atr_pct), 4)
+        },
+        "last_5_values": atr.tail(5).round(4).tolist()
+    }
+
+    return {
+        "macd": macd_result,
+        "atr": atr_result
+    }
 
 
 def analyze_macd_atr(symbol):
@@ -20,98 +280,13 @@ def analyze_macd_atr(symbol):
     - ATR-фільтр м’якший (нейтралізуємо тільки при дуже тихому ринку)
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=200)
-        if df is None or df.empty or len(df) < 60:
+        g = get_indicator_graph(symbol, "15m", needs=("macd", "atr14"))
+        if g is None or len(g) < 60:
             return default_macd_atr()
 
-        df = df.dropna(subset=["close", "high", "low"])
-        close, high, low = df["close"].astype(float), df["high"].astype(float), df["low"].astype(float)
-
-        macd_raw, signal_raw, hist_raw = talib.MACD(close)
-        atr_raw = talib.ATR(high, low, close, timeperiod=14)
-
-        if pd.isna(macd_raw).all() or pd.isna(signal_raw).all() or pd.isna(hist_raw).all() or pd.isna(atr_raw).all():
-            return default_macd_atr()
-
-        macd = pd.Series(macd_raw).fillna(0.0)
-        signal = pd.Series(signal_raw).fillna(0.0)
-        hist = pd.Series(hist_raw).fillna(0.0)
-        atr = pd.Series(atr_raw).fillna(0.0)
-
-        macd_now, signal_now, hist_now = macd.iloc[-1], signal.iloc[-1], hist.iloc[-1]
-        atr_now = atr.iloc[-1]
-        price_now = float(close.iloc[-1])
-
-        # --- Тренд за rolling-вікном гістограми (середнє за 5 барів)
-        hist_ma5 = hist.tail(5).mean()
-        if hist_ma5 > 0:
-            macd_trend = "bullish"
-        elif hist_ma5 < 0:
-            macd_trend = "bearish"
-        else:
-            macd_trend = "neutral"
-
-        # --- Напрям гістограми: дивимось дельту за 3 останні бари
-        dh = hist.diff().tail(3).sum()
-        if dh > 0:
-            hist_direction = "up"
-        elif dh < 0:
-            hist_direction = "down"
-        else:
-            hist_direction = "flat"
-
-        # --- "Теплий" перетин: шукаємо перетин за останні 3 бари
-        crossed = "none"
-        last3 = min(3, len(macd) - 1)
-        for i in range(1, last3 + 1):
-            m_prev, s_prev = macd.iloc[-1 - i], signal.iloc[-1 - i]
-            m_cur, s_cur = macd.iloc[-i], signal.iloc[-i]
-            if m_prev < s_prev and m_cur > s_cur:
-                crossed = "bullish_cross"
-                break
-            if m_prev > s_prev and m_cur < s_cur:
-                crossed = "bearish_cross"
-                break
-
-        # --- ATR як % від ціни: нейтралізуємо лише при дуже низькій волатильності
-        atr_pct = (atr_now / max(price_now, 1e-8)) * 100
-        if atr_pct < 0.2:
-            macd_trend = "neutral"
-            hist_direction = "flat"
-            crossed = "none"
-
-        # --- Оцінка "сили" за гістограмою + інерцією
-        score = float(hist_ma5) * 10  # масштабуємо, щоб не було мікро-оцінок
-        score = round(max(min(score, 10.0), -10.0), 2)
-
-        macd_result = {
-            "trend": macd_trend,
-            "hist_direction": hist_direction,
-            "crossed": crossed,
-            "score": score,
-            "raw_values": {
-                "macd_now": round(float(macd_now), 6),
-                "signal_now": round(float(signal_now), 6),
-                "hist_now": round(float(hist_now), 6),
-                "hist_ma5": round(float(hist_ma5), 6)
-            },
-            "last_5_values": hist.tail(5).round(4).tolist()
-        }
-
-        atr_result = {
-            "level": round(float(atr_now), 4),
-            "score": round(float(atr_pct), 2),  # ATR як відсоток від ціни
-            "raw_values": {
-                "atr_now": round(float(atr_now), 6),
-                "atr_pct": round(float(atr_pct), 4)
-            },
-            "last_5_values": atr.tail(5).round(4).tolist()
-        }
-
-        return {
-            "macd": macd_result,
-            "atr": atr_result
-        }
+        close = g.get("close")
+        macd_raw, signal_raw, hist_raw = g.get("macd")
+        return _macd_atr_result(close, macd_raw, signal_raw, hist_raw, g.get("atr14"))
 
     except Exception as e:
         log_error(f"❌ [MACD+ATR] analyze_macd_atr помилка: {e}")
@@ -138,29 +313,73 @@ def default_macd_atr():
     }
 
 
+def _cci_result(symbol, cci):
+    """🧩 Класифікація CCI за готовим рядом (спільна для аналізатора і batch-режиму)."""
+    cci = pd.Series(cci).dropna()
+
+    if cci.empty:
+        return {
+            "cci": {
+                "signal": "neutral",
+                "value": None,
+                "score": 0.0,
+                "last_5": [],
+                "slope": "flat"
+            }
+        }
+
+    cci_now = cci.iloc[-1]
+    cci_last_5 = cci.tail(5).round(2).tolist()
+
+    # === Класичні сигнали
+    signal = "neutral"
+    score = 0.0
+
+    if cci_now > 200:
+        signal, score = "strong_overbought", -6.0
+    elif cci_now > 100:
+        signal, score = "overbought", -3.0
+    elif cci_now < -200:
+        signal, score = "strong_oversold", +6.0
+    elif cci_now < -100:
+        signal, score = "oversold", +3.0
+
+    # === Momentum сигнали для [-100..100]
+    if -100 < cci_now < 100:
+        slope_check = cci.diff().tail(3).tolist()
+        if all(s > 0 for s in slope_check):
+            signal, score = "bullish_momentum", +1.5
+        elif all(s < 0 for s in slope_check):
+            signal, score = "bearish_momentum", -1.5
+
+    # === Визначення slope
+    slope = "flat"
+    if len(cci_last_5) >= 2:
+        if cci_last_5[-1] > cci_last_5[-2]:
+            slope = "up"
+        elif cci_last_5[-1] < cci_last_5[-2]:
+            slope = "down"
+
+    log_message(f"📊 CCI {symbol}: {cci_now:.2f} → {signal} | Score: {score} | Slope: {slope}")
+
+    return {
+        "cci": {
+            "signal": signal,
+            "value": round(cci_now, 2),
+            "score": round(score, 2),
+            "last_5": cci_last_5,
+            "slope": slope
+        }
+    }
+
+
 def analyze_cci(symbol):
     """
     📊 Розширений CCI аналіз (15-хв) з momentum сигналами для скальпінгу.
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=150)
-        if df is None or df.empty or len(df) < 40:
-            return {
-                "cci": {
-                    "signal": "neutral",
-                    "value": None,
-                    "score": 0.0,
-                    "last_5": [],
-                    "slope": "flat"
-                }
-            }
-
-        df.dropna(subset=["high", "low", "close"], inplace=True)
-        high, low, close = df["high"].astype(float), df["low"].astype(float), df["close"].astype(float)
-        cci_series = talib.CCI(high, low, close, timeperiod=20)
-        cci = pd.Series(cci_series).dropna()
-
-        if cci.empty:
+        g = get_indicator_graph(symbol, "15m", needs=("cci20",))
+        if g is None or len(g) < 40:
             return {
                 "cci": {
                     "signal": "neutral",
@@ -171,49 +390,7 @@ def analyze_cci(symbol):
                 }
             }
 
-        cci_now = cci.iloc[-1]
-        cci_last_5 = cci.tail(5).round(2).tolist()
-
-        # === Класичні сигнали
-        signal = "neutral"
-        score = 0.0
-
-        if cci_now > 200:
-            signal, score = "strong_overbought", -6.0
-        elif cci_now > 100:
-            signal, score = "overbought", -3.0
-        elif cci_now < -200:
-            signal, score = "strong_oversold", +6.0
-        elif cci_now < -100:
-            signal, score = "oversold", +3.0
-
-        # === Momentum сигнали для [-100..100]
-        if -100 < cci_now < 100:
-            slope_check = cci.diff().tail(3).tolist()
-            if all(s > 0 for s in slope_check):
-                signal, score = "bullish_momentum", +1.5
-            elif all(s < 0 for s in slope_check):
-                signal, score = "bearish_momentum", -1.5
-
-        # === Визначення slope
-        slope = "flat"
-        if len(cci_last_5) >= 2:
-            if cci_last_5[-1] > cci_last_5[-2]:
-                slope = "up"
-            elif cci_last_5[-1] < cci_last_5[-2]:
-                slope = "down"
-
-        log_message(f"📊 CCI {symbol}: {cci_now:.2f} → {signal} | Score: {score} | Slope: {slope}")
-
-        return {
-            "cci": {
-                "signal": signal,
-                "value": round(cci_now, 2),
-                "score": round(score, 2),
-                "last_5": cci_last_5,
-                "slope": slope
-            }
-        }
+        return _cci_result(symbol, g.get("cci20"))
 
     except Exception as e:
         return {
@@ -227,6 +404,82 @@ def analyze_cci(symbol):
         }
 
 
+def _stochastic_result(slowk, slowd):
+    """🧩 Класифікація STOCH за готовими slowk/slowd (спільна для аналізатора і batch-режиму)."""
+    slowk, slowd = pd.Series(slowk), pd.Series(slowd)
+
+    if slowk.isna().all() or slowd.isna().all():
+        return {
+            "stochastic": {
+                "signal": "neutral",
+                "k": None,
+                "d": None,
+                "score": 0.0,
+                "raw_values": {},
+                "last_5_values": {}
+            }
+        }
+
+    k, d = float(slowk.iloc[-1]), float(slowd.iloc[-1])
+    k_prev, d_prev = float(slowk.iloc[-2]), float(slowd.iloc[-2])
+
+    k_last_5 = slowk.tail(5).round(2).tolist()
+    d_last_5 = slowd.tail(5).round(2).tolist()
+
+    signal, score = "neutral", 0.0
+
+    # Теплий крос за останні 2 бари
+    crossed_up = False
+    crossed_down = False
+    for i in range(1, min(2, len(slowk) - 1) + 1):
+        kp, dp = float(slowk.iloc[-1 - i]), float(slowd.iloc[-1 - i])
+        kc, dc = float(slowk.iloc[-i]), float(slowd.iloc[-i])
+        if kp < dp and kc > dc:
+            crossed_up = True
+            break
+        if kp > dp and kc < dc:
+            crossed_down = True
+            break
+
+    if k < 20 and (crossed_up or (k_prev < d_prev and k > d)):
+        signal, score = "oversold_cross_up", +8.0
+    elif k > 80 and (crossed_down or (k_prev > d_prev and k < d)):
+        signal, score = "overbought_cross_down", -8.0
+    elif k < 20:
+        signal, score = "oversold", +3.0
+    elif k > 80:
+        signal, score = "overbought", -3.0
+    else:
+        # Momentum у середині діапазону
+        slope_k = pd.Series(slowk).diff().tail(3).sum()
+        slope_d = pd.Series(slowd).diff().tail(3).sum()
+        if slope_k > 0 and slope_d > 0:
+            signal, score = "bullish_momentum", +1.5
+        elif slope_k < 0 and slope_d < 0:
+            signal, score = "bearish_momentum", -1.5
+
+    return {
+        "stochastic": {
+            "signal": signal,
+            "k": round(k, 2),
+            "d": round(d, 2),
+            "score": round(score, 2),
+            "raw_values": {
+                "k_current": round(k, 4),
+                "d_current": round(d, 4),
+                "k_previous": round(k_prev, 4),
+                "d_previous": round(d_prev, 4),
+                "crossed_up_last2": crossed_up,
+                "crossed_down_last2": crossed_down
+            },
+            "last_5_values": {
+                "k": k_last_5,
+                "d": d_last_5
+            }
+        }
+    }
+
+
 def analyze_stochastic(symbol):
     """
     📉 STOCH (15m) — більш чутливий:
@@ -235,30 +488,8 @@ def analyze_stochastic(symbol):
     - Пороги перекуп/перепродані залишені 80/20, але сигналів стане більше
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=150)
-        if df is None or df.empty or len(df) < 40:
-            return {
-                "stochastic": {
-                    "signal": "neutral",
-                    "k": None,
-                    "d": None,
-                    "score": 0.0,
-                    "raw_values": {},
-                    "last_5_values": {}
-                }
-            }
-
-        df["high"] = df["high"].astype(float)
-        df["low"] = df["low"].astype(float)
-        df["close"] = df["close"].astype(float)
-
-        slowk, slowd = talib.STOCH(
-            df['high'], df['low'], df['close'],
-            fastk_period=14, slowk_period=3, slowk_matype=0,
-            slowd_period=3, slowd_matype=0
-        )
-
-        if slowk.isna().all() or slowd.isna().all():
+        g = get_indicator_graph(symbol, "15m", needs=("stoch14",))
+        if g is None or len(g) < 40:
             return {
                 "stochastic": {
                     "signal": "neutral",
@@ -270,64 +501,8 @@ def analyze_stochastic(symbol):
                 }
             }
 
-        k, d = float(slowk.iloc[-1]), float(slowd.iloc[-1])
-        k_prev, d_prev = float(slowk.iloc[-2]), float(slowd.iloc[-2])
-
-        k_last_5 = slowk.tail(5).round(2).tolist()
-        d_last_5 = slowd.tail(5).round(2).tolist()
-
-        signal, score = "neutral", 0.0
-
-        # Теплий крос за останні 2 бари
-        crossed_up = False
-        crossed_down = False
-        for i in range(1, min(2, len(slowk) - 1) + 1):
-            kp, dp = float(slowk.iloc[-1 - i]), float(slowd.iloc[-1 - i])
-            kc, dc = float(slowk.iloc[-i]), float(slowd.iloc[-i])
-            if kp < dp and kc > dc:
-                crossed_up = True
-                break
-            if kp > dp and kc < dc:
-                crossed_down = True
-                break
-
-        if k < 20 and (crossed_up or (k_prev < d_prev and k > d)):
-            signal, score = "oversold_cross_up", +8.0
-        elif k > 80 and (crossed_down or (k_prev > d_prev and k < d)):
-            signal, score = "overbought_cross_down", -8.0
-        elif k < 20:
-            signal, score = "oversold", +3.0
-        elif k > 80:
-            signal, score = "overbought", -3.0
-        else:
-            # Momentum у середині діапазону
-            slope_k = pd.Series(slowk).diff().tail(3).sum()
-            slope_d = pd.Series(slowd).diff().tail(3).sum()
-            if slope_k > 0 and slope_d > 0:
-                signal, score = "bullish_momentum", +1.5
-            elif slope_k < 0 and slope_d < 0:
-                signal, score = "bearish_momentum", -1.5
-
-        return {
-            "stochastic": {
-                "signal": signal,
-                "k": round(k, 2),
-                "d": round(d, 2),
-                "score": round(score, 2),
-                "raw_values": {
-                    "k_current": round(k, 4),
-                    "d_current": round(d, 4),
-                    "k_previous": round(k_prev, 4),
-                    "d_previous": round(d_prev, 4),
-                    "crossed_up_last2": crossed_up,
-                    "crossed_down_last2": crossed_down
-                },
-                "last_5_values": {
-                    "k": k_last_5,
-                    "d": d_last_5
-                }
-            }
-        }
+        slowk, slowd = g.get("stoch14")
+        return _stochastic_result(slowk, slowd)
 
     except Exception as e:
         log_message(f"❌ [STOCH] analyze_stochastic помилка: {e}")
@@ -343,6 +518,67 @@ def analyze_stochastic(symbol):
         }
 
 
+def _bollinger_result(arr, upper, middle, lower):
+    """🧩 Класифікація Bollinger (позиція, squeeze, breakout) за готовими смугами."""
+    arr, upper, middle, lower = (np.asarray(x, dtype=float) for x in (arr, upper, middle, lower))
+
+    last_close = float(arr[-1])
+    up = float(upper[-1]) if np.isfinite(upper[-1]) else last_close
+    lo = float(lower[-1]) if np.isfinite(lower[-1]) else last_close
+    mid = float(middle[-1]) if np.isfinite(middle[-1]) else last_close
+
+    width_now = up - lo
+    if not np.isfinite(width_now) or width_now <= 0:
+        width_now = 1e-9  # захист від нульової ширини
+
+    # Позиція в каналі (клампимо 0..100)
+    pos_raw = ((last_close - lo) / width_now) * 100.0
+    position = round(max(0.0, min(100.0, pos_raw)), 2)
+
+    # Динамічний squeeze: порівнюємо поточну ширину з Q25 за 40 барів
+    widths_series = pd.Series(upper - lower)
+    widths_series = widths_series.replace([np.inf, -np.inf], np.nan).ffill().bfill()
+    widths_last40 = widths_series.tail(40)
+    q25 = float(widths_last40.quantile(0.25)) if not widths_last40.isna().all() else width_now
+    is_squeeze = width_now <= max(q25, 1e-9)
+
+    # Ширина у відсотках до середньої смуги — зручно для діагностики
+    width_pct = float(width_now / mid) if mid > 0 else 0.0
+
+    # Сигнали
+    signal, score = "neutral", 0.0
+    if last_close > up:
+        signal, score = "breakout_up", +10.0
+    elif last_close < lo:
+        signal, score = "breakout_down", -10.0
+    elif is_squeeze:
+        signal, score = "squeeze", +3.0
+    elif position >= 65.0:
+        signal, score = "bullish_momentum", +1.5
+    elif position <= 35.0:
+        signal, score = "bearish_momentum", -1.5
+
+    last_5_widths = widths_series.tail(5).round(4).fillna(0.0).tolist()
+
+    return {
+        "bollinger": {
+            "signal": signal,
+            "position": position,                    # 0..100
+            "width": round(float(width_now), 4),     # абсолютна ширина
+            "status": signal,
+            "score": round(float(score), 2),
+            "raw_values": {
+                "last_close": round(last_close, 6),
+                "upper_val": round(up, 6),
+                "lower_val": round(lo, 6),
+                "q25_width": round(float(q25), 6),
+                "width_pct": round(float(width_pct), 6)
+            },
+            "last_5_widths": last_5_widths
+        }
+    }
+
+
 def analyze_bollinger_bands(symbol):
     """
     📊 Bollinger Bands (15m, 20 періодів, 2σ) — стабільніша версія:
@@ -353,12 +589,8 @@ def analyze_bollinger_bands(symbol):
     Повертає ту ж структуру, що й раніше (drop-in).
     """
     try:
-        import pandas as pd
-        import numpy as np
-        import talib
-
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=300)
-        if df is None or df.empty or len(df) < 40:
+        g = get_indicator_graph(symbol, "15m", needs=("bbands20",))
+        if g is None or len(g) < 40:
             return {
                 "bollinger": {
                     "signal": "neutral",
@@ -371,8 +603,7 @@ def analyze_bollinger_bands(symbol):
                 }
             }
 
-        close = pd.to_numeric(df["close"], errors="coerce").astype(float)
-        close = close.dropna()
+        close = g.get("close")
         if close.empty or len(close) < 40:
             return {
                 "bollinger": {
@@ -387,64 +618,10 @@ def analyze_bollinger_bands(symbol):
             }
 
         arr = close.values
-        # Класичні параметри: 20 періодів, 2σ
-        upper, middle, lower = talib.BBANDS(arr, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
-
-        last_close = float(arr[-1])
-        up = float(upper[-1]) if np.isfinite(upper[-1]) else last_close
-        lo = float(lower[-1]) if np.isfinite(lower[-1]) else last_close
-        mid = float(middle[-1]) if np.isfinite(middle[-1]) else last_close
-
-        width_now = up - lo
-        if not np.isfinite(width_now) or width_now <= 0:
-            width_now = 1e-9  # захист від нульової ширини
-
-        # Позиція в каналі (клампимо 0..100)
-        pos_raw = ((last_close - lo) / width_now) * 100.0
-        position = round(max(0.0, min(100.0, pos_raw)), 2)
-
-        # Динамічний squeeze: порівнюємо поточну ширину з Q25 за 40 барів
-        widths_series = pd.Series(upper - lower)
-        widths_series = widths_series.replace([np.inf, -np.inf], np.nan).ffill().bfill()
-        widths_last40 = widths_series.tail(40)
-        q25 = float(widths_last40.quantile(0.25)) if not widths_last40.isna().all() else width_now
-        is_squeeze = width_now <= max(q25, 1e-9)
-
-        # Ширина у відсотках до середньої смуги — зручно для діагностики
-        width_pct = float(width_now / mid) if mid > 0 else 0.0
-
-        # Сигнали
-        signal, score = "neutral", 0.0
-        if last_close > up:
-            signal, score = "breakout_up", +10.0
-        elif last_close < lo:
-            signal, score = "breakout_down", -10.0
-        elif is_squeeze:
-            signal, score = "squeeze", +3.0
-        elif position >= 65.0:
-            signal, score = "bullish_momentum", +1.5
-        elif position <= 35.0:
-            signal, score = "bearish_momentum", -1.5
+        # Класичні параметри: 20 періодів, 2σ (спільні sma20/std20 з графа)
+        upper, middle, lower = (band.values for band in g.get("bbands20"))
 
-        last_5_widths = widths_series.tail(5).round(4).fillna(0.0).tolist()
-
-        return {
-            "bollinger": {
-                "signal": signal,
-                "position": position,                    # 0..100
-                "width": round(float(width_now), 4),     # абсолютна ширина
-                "status": signal,
-                "score": round(float(score), 2),
-                "raw_values": {
-                    "last_close": round(last_close, 6),
-                    "upper_val": round(up, 6),
-                    "lower_val": round(lo, 6),
-                    "q25_width": round(float(q25), 6),
-                    "width_pct": round(float(width_pct), 6)
-                },
-                "last_5_widths": last_5_widths
-            }
-        }
+        return _bollinger_result(arr, upper, middle, lower)
 
     except Exception as e:
         log_error(f"❌ analyze_bollinger_bands помилка: {e}")
@@ -474,10 +651,10 @@ def analyze_support_resistance(symbol):
         import math
         import pandas as pd
 
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=200)
+        g = get_indicator_graph(symbol, "15m", needs=("atr_sma14", "sma20", "std20"))
         price = get_current_futures_price(symbol)
 
-        if df is None or len(df) < 30 or price is None:
+        if g is None or len(g) < 30 or price is None:
             support = resistance = float(price) if price else 0.0
             return {
                 "support_resistance": {
@@ -491,12 +668,9 @@ def analyze_support_resistance(symbol):
                 }
             }
 
-        # -- Витяг числових колонок
-        df = df.copy()
-        for c in ("open", "high", "low", "close"):
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        df = df.dropna(subset=["high", "low", "close"])
-        if df.empty:
+        # -- Числові колонки (read-only масиви OHLCV, вже очищені при завантаженні)
+        frame = g.frame
+        if frame.empty:
             support = resistance = float(price)
             return {
                 "support_resistance": {
@@ -511,76 +685,42 @@ def analyze_support_resistance(symbol):
             }
 
         # ---------- Допоміжні обчислення ----------
-        # ATR(14)
-        high = df["high"].astype(float)
-        low = df["low"].astype(float)
-        close = df["close"].astype(float)
-        prev_close = close.shift(1)
-
-        tr = pd.concat([
-            (high - low).abs(),
-            (high - prev_close).abs(),
-            (low - prev_close).abs()
-        ], axis=1).max(axis=1)
-
-        atr = tr.rolling(14, min_periods=14).mean().iloc[-1]
+        # ATR(14) — SMA true range
+        atr = g.get("atr_sma14").iloc[-1]
         atr = float(atr) if pd.notna(atr) else 0.0
 
         # Bollinger width (20), абсолютна (upper-lower)
-        sma20 = close.rolling(20, min_periods=20).mean()
-        std20 = close.rolling(20, min_periods=20).std()
+        sma20 = g.get("sma20")
+        std20 = g.get("std20")
         bb_width_abs = float((std20.iloc[-1] * 4.0)) if pd.notna(std20.iloc[-1]) else 0.0  # 2σ вгору + 2σ вниз
         bb_width_pct = (bb_width_abs / float(sma20.iloc[-1])) if (pd.notna(sma20.iloc[-1]) and sma20.iloc[-1] > 0) else 0.0
 
         # ---------- Swing-рівні (фрактали) ----------
-        # Локальні мінімуми/максимуми у вікні (left/right = 2)
-        def _swing_points(series, is_low=True, left=2, right=2):
-            s = series.values
-            idxs = []
-            for i in range(left, len(s) - right):
-                window = s[i-left:i+right+1]
-                val = s[i]
-                if is_low:
-                    if val == window.min() and (window[:left] > val).all() and (window[-right:] > val).all():
-                        idxs.append(i)
-                else:
-                    if val == window.max() and (window[:left] < val).all() and (window[-right:] < val).all():
-                        idxs.append(i)
-            return idxs
-
+        # Локальні мінімуми/максимуми у вікні (left/right = 2); підтверджені точки кешуються
+        # по символу — на новому барі перевіряються лише нові кандидати
         lookback = 120  # останні N барів для пошуку фракталів
-        df_look = df.tail(lookback)
-        lows_idx = _swing_points(df_look["low"], is_low=True, left=2, right=2)
-        highs_idx = _swing_points(df_look["high"], is_low=False, left=2, right=2)
+        n = len(frame)
+        lows = np.asarray(frame.low, dtype=float)
+        highs = np.asarray(frame.high, dtype=float)
+        lows_idx, highs_idx = _SR_SWINGS.update(symbol, frame.timestamp, lows, highs)
+        # лише точки, чиє вікно повністю в останніх lookback барах
+        first = n - lookback + _SR_SWINGS.left
+        lows_idx, highs_idx = lows_idx[lows_idx >= first], highs_idx[highs_idx >= first]
 
-        swing_lows = df_look["low"].iloc[lows_idx].astype(float).tolist()
-        swing_highs = df_look["high"].iloc[highs_idx].astype(float).tolist()
+        swing_lows = lows[lows_idx].tolist()
+        swing_highs = highs[highs_idx].tolist()
 
         # Якщо свінгів нема — fallback на останні 20 екстремумів (як було)
         if not swing_lows:
-            swing_lows = df["low"].tail(20).astype(float).tolist()
+            swing_lows = lows[-20:].tolist()
         if not swing_highs:
-            swing_highs = df["high"].tail(20).astype(float).tolist()
+            swing_highs = highs[-20:].tolist()
 
         # ---------- Легка кластеризація рівнів ----------
         # Об'єднуємо дуже близькі рівні, щоб не дублювати шум (поріг ~0.15 ATR або 0.1% ціни)
-        def _cluster_levels(levels, tol_abs):
-            if not levels:
-                return []
-            levels = sorted(levels)
-            clusters = [[levels[0]]]
-            for v in levels[1:]:
-                if abs(v - clusters[-1][-1]) <= tol_abs:
-                    clusters[-1].append(v)
-                else:
-                    clusters.append([v])
-            # представник кластера — медіана
-            import statistics as _st
-            return [float(_st.median(c)) for c in clusters]
-
         tol_abs = max(0.15 * atr, 0.001 * float(price)) if atr > 0 else 0.0015 * float(price)
-        lows_cl = _cluster_levels(swing_lows, tol_abs)
-        highs_cl = _cluster_levels(swing_highs, tol_abs)
+        lows_cl = cluster_levels(swing_lows, tol_abs)
+        highs_cl = cluster_levels(swing_highs, tol_abs)
 
         # Вибираємо найближчу підтримку нижче/≈ ціни та опір вище/≈ ціни
         p = float(price)
@@ -737,14 +877,64 @@ def analyze_support_resistance(symbol):
 
 
 
+def _volatility_result(symbol, std_dev, avg_price):
+    """🧩 Класифікація волатильності за std20/sma20 (спільна для аналізатора і batch-режиму)."""
+    if pd.isna(std_dev) or pd.isna(avg_price) or avg_price == 0:
+        result = {
+            "volatility": {
+                "percentage": 0.0,
+                "level": "unknown",
+                "score": 0.0,
+                "raw_values": {}
+            }
+        }
+      
+        return result
+
+    volatility_pct = (std_dev / avg_price) * 100
+
+    # 🧠 Категоризація
+    if volatility_pct < 0.5:
+        level = "very_low"
+        score = -5.0
+    elif volatility_pct < 1.0:
+        level = "low"
+        score = -2.0
+    elif volatility_pct < 2.0:
+        level = "medium"
+        score = 0.0
+    elif volatility_pct < 3.5:
+        level = "high"
+        score = 2.0
+    else:
+        level = "very_high"
+        score = 5.0
+
+    log_message(f"📊 Волатильність {symbol}: {volatility_pct:.2f}% → {level} | Score: {score}")
+
+    result = {
+        "volatility": {
+            "percentage": round(volatility_pct, 2),
+            "level": level,
+            "score": round(score, 2),
+            "raw_values": {
+                "std_dev": round(std_dev, 6),
+                "avg_price": round(avg_price, 6)
+            }
+        }
+    }
+   
+    return result
+
+
 def get_volatility(symbol):
     """
     📊 Оцінка волатильності (15хв) із класифікацією та score.
     Повертає структурований dict для SignalStats.
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="15m", limit=150)
-        if df is None or df.empty or len(df) < 20:
+        g = get_indicator_graph(symbol, "15m", needs=("std20", "sma20"))
+        if g is None or len(g) < 20:
             result = {
                 "volatility": {
                     "percentage": 0.0,
@@ -756,58 +946,9 @@ def get_volatility(symbol):
            
             return result
 
-        df["close"] = pd.to_numeric(df["close"], errors="coerce")
-        df.dropna(subset=["close"], inplace=True)
-
-        std_dev = df["close"].rolling(window=20).std().iloc[-1]
-        avg_price = df["close"].rolling(window=20).mean().iloc[-1]
-
-        if pd.isna(std_dev) or pd.isna(avg_price) or avg_price == 0:
-            result = {
-                "volatility": {
-                    "percentage": 0.0,
-                    "level": "unknown",
-                    "score": 0.0,
-                    "raw_values": {}
-                }
-            }
-          
-            return result
-
-        volatility_pct = (std_dev / avg_price) * 100
-
-        # 🧠 Категоризація
-        if volatility_pct < 0.5:
-            level = "very_low"
-            score = -5.0
-        elif volatility_pct < 1.0:
-            level = "low"
-            score = -2.0
-        elif volatility_pct < 2.0:
-            level = "medium"
-            score = 0.0
-        elif volatility_pct < 3.5:
-            level = "high"
-            score = 2.0
-        else:
-            level = "very_high"
-            score = 5.0
-
-        log_message(f"📊 Волатильність {symbol}: {volatility_pct:.2f}% → {level} | Score: {score}")
-
-        result = {
-            "volatility": {
-                "percentage": round(volatility_pct, 2),
-                "level": level,
-                "score": round(score, 2),
-                "raw_values": {
-                    "std_dev": round(std_dev, 6),
-                    "avg_price": round(avg_price, 6)
-                }
-            }
-        }
-       
-        return result
+        std_dev = g.get("std20").iloc[-1]
+        avg_price = g.get("sma20").iloc[-1]
+        return _volatility_result(symbol, std_dev, avg_price)
 
     except Exception as e:
         log_error(f"❌ get_volatility помилка: {e}")
@@ -843,165 +984,35 @@ def detect_candlestick_patterns(symbol, interval="15m", limit=40):
         df = df.dropna(subset=["open", "high", "low", "close"]).copy()
         open_, high, low, close = [df[c].astype(float).values for c in ["open","high","low","close"]]
 
-        # TA-Lib сирі сигнали
-        eng = talib.CDLENGULFING(open_, high, low, close)
-        ham = talib.CDLHAMMER(open_, high, low, close)
-        sst = talib.CDLSHOOTINGSTAR(open_, high, low, close)
-        evs = talib.CDLEVENINGSTAR(open_, high, low, close)
-        mns = talib.CDLMORNINGSTAR(open_, high, low, close)
-        dji = talib.CDLDOJI(open_, high, low, close)
+        # TA-Lib сирі сигнали + морфологія (тіло/діапазон/тіні) — масивами на всю серію
+        signals = talib_signals(open_, high, low, close)
+        feats = candle_features(open_, high, low, close)
+        masks = pattern_masks(open_, high, low, close, signals=signals, features=feats)
 
         n = len(df)
-        last_n = min(12, n)          # дивимось ширше в історію, але з пріоритетом «свіжих»
-        look_idxs = list(range(n - last_n, n))
-
-        patterns = []
-        raws = {}  # для діагностики по індексах
-
-        def body(i):
-            return abs(close[i] - open_[i])
-
-        def range_(i):
-            return max(high[i] - low[i], 1e-12)
-
-        def upper_wick(i):
-            return high[i] - max(open_[i], close[i])
-
-        def lower_wick(i):
-            return min(open_[i], close[i]) - low[i]
-
-        # якісні умови
-        def is_doji(i):   # дуже мале тіло
-            return body(i) / range_(i) <= 0.08
-
-        def is_hammer(i): # довга нижня тінь, короткий верх, невелике тіло
-            return (lower_wick(i) >= 2.5 * body(i)) and (upper_wick(i) <= 0.35 * body(i)) and (body(i)/range_(i) <= 0.35)
-
-        def is_shooting_star(i):
-            return (upper_wick(i) >= 2.5 * body(i)) and (lower_wick(i) <= 0.35 * body(i)) and (body(i)/range_(i) <= 0.35)
-
-        def is_engulf_bull(i):
-            if i == 0: return False
-            prev_body_low  = min(open_[i-1], close[i-1])
-            prev_body_high = max(open_[i-1], close[i-1])
-            cur_body_low   = min(open_[i], close[i])
-            cur_body_high  = max(open_[i], close[i])
-            # тіло bullish і повністю перекриває попереднє тіло
-            return (close[i] > open_[i]) and (cur_body_low <= prev_body_low) and (cur_body_high >= prev_body_high)
-
-        def is_engulf_bear(i):
-            if i == 0: return False
-            prev_body_low  = min(open_[i-1], close[i-1])
-            prev_body_high = max(open_[i-1], close[i-1])
-            cur_body_low   = min(open_[i], close[i])
-            cur_body_high  = max(open_[i], close[i])
-            return (close[i] < open_[i]) and (cur_body_low <= prev_body_low) and (cur_body_high >= prev_body_high)
-
-        # вага за «свіжість» (останнє > попередні)
-        def recency_weight(i):
-            # i ближче до n-1 → вага ближча до 1.0; глибше → до 0.4
-            pos = (i - (n - last_n)) / max(last_n - 1, 1)
-            return 0.4 + 0.6 * pos
-
-        # базові ваги типів
-        base_w = {
-            "engulfing": 8.0,
-            "hammer": 6.0,
-            "shooting_star": 6.0,
-            "evening_star": 10.0,
-            "morning_star": 10.0,
-            "doji": 2.5
+        last_n = min(RECENT_BARS, n)  # дивимось ширше в історію, але з пріоритетом «свіжих»
+
+        # діагностика по індексах останніх свічок
+        tail = slice(n - last_n, n)
+        cols = {
+            "open": open_[tail], "close": close[tail], "high": high[tail], "low": low[tail],
+            "body": feats["body"][tail], "range": feats["range"][tail],
+            "u_wick": feats["u_wick"][tail], "l_wick": feats["l_wick"][tail],
         }
-
-        # обхід останніх свічок
-        for i in look_idxs:
-            r = {
-                "idx": int(i),
-                "open": float(open_[i]),
-                "close": float(close[i]),
-                "high": float(high[i]),
-                "low": float(low[i]),
-                "body": float(body(i)),
-                "range": float(range_(i)),
-                "u_wick": float(upper_wick(i)),
-                "l_wick": float(lower_wick(i)),
-                "talib": {
-                    "engulfing": int(eng[i]),
-                    "hammer": int(ham[i]),
-                    "shooting_star": int(sst[i]),
-                    "evening_star": int(evs[i]),
-                    "morning_star": int(mns[i]),
-                    "doji": int(dji[i]),
-                }
-            }
-            raws[i] = r
-
-            cand = []
-            # суворі engulfing
-            if is_engulf_bull(i) or eng[i] > 0:
-                cand.append(("engulfing", "bullish"))
-            if is_engulf_bear(i) or eng[i] < 0:
-                cand.append(("engulfing", "bearish"))
-
-            # hammer / shooting star з морфологією
-            if is_hammer(i) or ham[i] != 0:
-                cand.append(("hammer", "bullish"))
-            if is_shooting_star(i) or sst[i] != 0:
-                cand.append(("shooting_star", "bearish"))
-
-            # evening/morning star з TA-Lib (вони самі вже строгі)
-            if evs[i] != 0:
-                cand.append(("evening_star", "bearish"))
-            if mns[i] != 0:
-                cand.append(("morning_star", "bullish"))
-
-            # doji — лише «тонкі»
-            if is_doji(i) or dji[i] != 0 and body(i)/range_(i) <= 0.12:
-                cand.append(("doji", "neutral"))
-
-            if not cand:
-                continue
-
-            w = recency_weight(i)
-            for (ptype, direction) in cand:
-                quality = base_w.get(ptype, 3.0) * w
-                patterns.append({
-                    "type": ptype,
-                    "direction": direction,
-                    "index": int(i),
-                    "quality": round(quality, 2)
-                })
-
+        cols = {k: v.tolist() for k, v in cols.items()}
+        tal = {k: v[tail].astype(int).tolist() for k, v in signals.items()}
+        raws = {}
+        for r, i in enumerate(range(n - last_n, n)):
+            raws[i] = {"idx": int(i), **{k: v[r] for k, v in cols.items()},
+                       "talib": {k: v[r] for k, v in tal.items()}}
+
+        patterns = collect_patterns(masks, n, last_n)
         if not patterns:
             log_message(f"🕯️ Патернів не знайдено для {symbol}")
             return {"candlestick": {"patterns": [], "score": 0.0, "raw_values": {}}}
 
-        # 1) усунення конфліктів: якщо є bull і bear одного типу — беремо найсвіжіший з вищою якістю
-        dedup = {}
-        for p in patterns:
-            key = (p["type"], p["direction"])
-            # для протилежних напрямків одного типу дозволимо лише найновіший запис
-            existing_same = dedup.get(key)
-            if existing_same is None or (p["index"] > existing_same["index"] and p["quality"] >= existing_same["quality"]):
-                dedup[key] = p
-
-        # 2) якщо після цього лишились і bull, і bear для одного типу — залишимо той, що ближче до поточної свічки
-        by_type = {}
-        for p in dedup.values():
-            by_type.setdefault(p["type"], []).append(p)
-        resolved = []
-        for t, lst in by_type.items():
-            if len({x["direction"] for x in lst}) == 2:
-                lst.sort(key=lambda x: (x["index"], x["quality"]), reverse=True)
-                resolved.append(lst[0])
-            else:
-                resolved.extend(lst)
-
-        # підсумковий скор (обмежимо, щоб не «перегрівати»)
-        total_score = round(min(sum(p["quality"] for p in resolved), 25.0), 2)
-
-        # відсортуємо за «свіжістю/якістю»
-        resolved.sort(key=lambda x: (x["index"], x["quality"]), reverse=True)
+        # усунення конфліктів bull/bear + підсумковий скор (обмежений, щоб не «перегрівати»)
+        resolved, total_score = resolve_patterns(patterns)
 
         log_message(f"🕯️ {symbol}: знайдено {len(resolved)} патернів → {', '.join(p['type'] for p in resolved)} | score={total_score}")
 
@@ -1018,6 +1029,62 @@ def detect_candlestick_patterns(symbol, interval="15m", limit=40):
         return {"candlestick": {"patterns": [], "score": 0.0, "raw_values": {}}}
 
 
+def _rsi_result(rsi):
+    """🧩 Класифікація RSI за готовим рядом (спільна для аналізатора і batch-режиму)."""
+    rsi = pd.Series(rsi)
+    if rsi.isna().all():
+        raise ValueError("RSI all NaN")
+
+    latest = float(rsi.iloc[-1])
+    prev = float(rsi.iloc[-2])
+    last_5 = rsi.tail(5).round(2).tolist()
+
+    # Тренд за останні 3 дельти
+    d3 = rsi.diff().tail(3).sum()
+    if d3 > 0:
+        trend = "up"
+    elif d3 < 0:
+        trend = "down"
+    else:
+        trend = "flat"
+
+    # Базові сигнали зон
+    signal = "neutral"
+    score = 0.0
+    if latest >= 80:
+        signal, score = "extremely_overbought", -6.0
+    elif latest >= 70:
+        signal, score = "overbought", -3.0
+    elif latest <= 20:
+        signal, score = "extremely_oversold", +6.0
+    elif latest <= 30:
+        signal, score = "oversold", +3.0
+
+    # Моментум-зони 40/60
+    if 40 < latest < 60:
+        # лишаємо поточний signal (може бути neutral), але оцінюємо моментум
+        pass
+    elif latest >= 60 and trend == "up":
+        signal, score = "bullish_momentum", max(score, +1.5)
+    elif latest <= 40 and trend == "down":
+        signal, score = "bearish_momentum", min(score, -1.5)
+
+    return {
+        "rsi": {
+            "signal": signal,
+            "value": round(latest, 2),
+            "trend": trend,
+            "score": round(score, 2),
+            "raw_values": {
+                "latest_rsi": round(latest, 4),
+                "previous_rsi": round(prev, 4),
+                "delta3": round(float(d3), 4)
+            },
+            "last_5_values": last_5
+        }
+    }
+
+
 def analyze_rsi(symbol, period=14, interval="15"):
     """
     📉 RSI (15m) з підвищеною чутливістю:
@@ -1025,8 +1092,14 @@ def analyze_rsi(symbol, period=14, interval="15"):
     - Зони 40/60 замість 45/55 для моментуму
     - Розширені лейбли: bullish_momentum / bearish_momentum, але не душимо інші сигнали
     """
-    df = get_klines_clean_bybit(symbol, interval=interval, limit=120)
-    if df is None or df.empty or len(df) < period + 10:
+    name = f"rsi{period}"
+    stream = get_streaming_indicators(symbol, interval, (name,))
+    if stream is not None:
+        bars, rsi = stream.bars, pd.Series(stream.values(name, 5))
+    else:
+        g = get_indicator_graph(symbol, interval, needs=(name,))
+        bars, rsi = (len(g), g.get(name)) if g is not None else (0, None)
+    if bars < period + 10:
         return {
             "rsi": {
                 "signal": "neutral",
@@ -1039,59 +1112,7 @@ def analyze_rsi(symbol, period=14, interval="15"):
         }
 
     try:
-        close = df["close"].astype(float)
-        df['rsi'] = ta.momentum.rsi(close, window=period)
-        if df['rsi'].isna().all():
-            raise ValueError("RSI all NaN")
-
-        latest = float(df['rsi'].iloc[-1])
-        prev = float(df['rsi'].iloc[-2])
-        last_5 = df['rsi'].tail(5).round(2).tolist()
-
-        # Тренд за останні 3 дельти
-        d3 = df['rsi'].diff().tail(3).sum()
-        if d3 > 0:
-            trend = "up"
-        elif d3 < 0:
-            trend = "down"
-        else:
-            trend = "flat"
-
-        # Базові сигнали зон
-        signal = "neutral"
-        score = 0.0
-        if latest >= 80:
-            signal, score = "extremely_overbought", -6.0
-        elif latest >= 70:
-            signal, score = "overbought", -3.0
-        elif latest <= 20:
-            signal, score = "extremely_oversold", +6.0
-        elif latest <= 30:
-            signal, score = "oversold", +3.0
-
-        # Моментум-зони 40/60
-        if 40 < latest < 60:
-            # лишаємо поточний signal (може бути neutral), але оцінюємо моментум
-            pass
-        elif latest >= 60 and trend == "up":
-            signal, score = "bullish_momentum", max(score, +1.5)
-        elif latest <= 40 and trend == "down":
-            signal, score = "bearish_momentum", min(score, -1.5)
-
-        return {
-            "rsi": {
-                "signal": signal,
-                "value": round(latest, 2),
-                "trend": trend,
-                "score": round(score, 2),
-                "raw_values": {
-                    "latest_rsi": round(latest, 4),
-                    "previous_rsi": round(prev, 4),
-                    "delta3": round(float(d3), 4)
-                },
-                "last_5_values": last_5
-            }
-        }
+        return _rsi_result(rsi)
 
     except Exception as e:
         log_error(f"❌ analyze_rsi помилка для {symbol}: {e}")
@@ -1117,8 +1138,8 @@ def get_micro_trend_1m(symbol):
     СХЕМА ВИХОДУ НЕ ЗМІНЕНА.
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="1m", limit=200)
-        if df is None or df.empty or len(df) < 40:
+        g = get_indicator_graph(symbol, "1m", needs=("ema10", "ema30", "hl_ema10"))
+        if g is None or len(g) < 40:
             return {
                 "micro_trend_1m": {
                     "direction": "NEUTRAL",
@@ -1135,16 +1156,13 @@ def get_micro_trend_1m(symbol):
                 "microtrend_direction": "NEUTRAL"
             }
 
-        # числові колонки
-        for col in ("open", "high", "low", "close"):
-            df[col] = pd.to_numeric(df.get(col), errors="coerce")
-        df = df.dropna(subset=["open", "high", "low", "close"])
-        if df.empty:
+        close = np.asarray(g.frame.close, dtype=float)
+        if not len(close):
             raise ValueError("no valid OHLC data")
 
         # EMA10 / EMA30
-        ema_fast = df["close"].ewm(span=10, adjust=False).mean()
-        ema_slow = df["close"].ewm(span=30, adjust=False).mean()
+        ema_fast = g.get("ema10")
+        ema_slow = g.get("ema30")
 
         # Похідна EMA10 + згладження за останні 3 бари
         ema10_diff = ema_fast.diff()
@@ -1152,10 +1170,9 @@ def get_micro_trend_1m(symbol):
 
         # ATR(10) як мікроволатильність (масштаб змін)
         # ATR≈ |high-low| з EMA усередненням
-        tr = (df["high"] - df["low"]).abs()
-        atr10 = tr.ewm(span=10, adjust=False).mean()
+        atr10 = g.get("hl_ema10")
 
-        last_close = float(df["close"].iloc[-1])
+        last_close = float(close[-1])
         last_ema_fast = float(ema_fast.iloc[-1])
         last_atr = float(atr10.iloc[-1]) if pd.notna(atr10.iloc[-1]) else 0.0
 
@@ -1209,9 +1226,9 @@ def get_micro_trend_1m(symbol):
                 trend = "UNCERTAIN"
                 score = 0.0
 
-        log_message(
-            f"📈 [DEBUG] Micro1m {symbol} → Close={last_close:.5f}, EMA10={last_ema_fast:.5f}, "
-            f"diff={diff_pct:.2f}%, slope%={slope_pct:.3f}%, ATR10={last_atr:.6f} → {trend} ({strength})"
+        log_debug(
+            "📈 [DEBUG] Micro1m %s → Close=%.5f, EMA10=%.5f, diff=%.2f%%, slope%%=%.3f%%, ATR10=%.6f → %s (%s)",
+            symbol, last_close, last_ema_fast, diff_pct, slope_pct, last_atr, trend, strength,
         )
 
         return {
@@ -1232,7 +1249,7 @@ def get_micro_trend_1m(symbol):
                 "last_5_values": {
                     "ema10": [float(x) if np.isfinite(x) else 0.0 for x in ema_fast.tail(5).round(6).tolist()],
                     "ema10_slope": [float(x) if np.isfinite(x) else 0.0 for x in ema10_diff.tail(5).round(6).tolist()],
-                    "close": [float(x) if np.isfinite(x) else 0.0 for x in df["close"].tail(5).round(6).tolist()]
+                    "close": [float(x) if np.isfinite(x) else 0.0 for x in np.round(close[-5:], 6).tolist()]
                 }
             },
             "microtrend_direction": trend
@@ -1312,36 +1329,8 @@ def detect_patterns_for_dataframe(df: pd.DataFrame) -> list:
 
         df = df.dropna(subset=required_cols)
 
-        # 🔢 Явний пріоритет патернів
-        pattern_funcs = {
-            "engulfing": talib.CDLENGULFING,
-            "hammer": talib.CDLHAMMER,
-            "shooting_star": talib.CDLSHOOTINGSTAR,
-            "morning_star": talib.CDLMORNINGSTAR,
-            "evening_star": talib.CDLEVENINGSTAR,
-            "doji": talib.CDLDOJI,
-        }
-
-        results = {
-            name: func(df["open"], df["high"], df["low"], df["close"])
-            for name, func in pattern_funcs.items()
-        }
-
-        patterns = []
-        for i in range(len(df)):
-            selected_pattern = "none"
-            for name in pattern_funcs.keys():  # Дотримуйся пріоритету
-                series = results[name]
-                if i >= len(series):
-                    continue
-                value = series.iloc[i]
-                if value > 0:
-                    selected_pattern = f"{name}_bull"
-                    break
-                elif value < 0:
-                    selected_pattern = f"{name}_bear"
-                    break
-            patterns.append(selected_pattern)
+        # 🔢 Явний пріоритет патернів: engulfing → hammer → shooting_star → morning/evening star → doji
+        patterns = strongest_talib_pattern(df["open"], df["high"], df["low"], df["close"])
 
         return patterns
 
@@ -1447,8 +1436,20 @@ def get_micro_trend_5m(symbol):
     СХЕМА ВИХОДУ НЕ ЗМІНЕНА.
     """
     try:
-        df = get_klines_clean_bybit(symbol, interval="5m", limit=120)
-        if df is None or df.empty or len(df) < 20:
+        needs = ("ema20", "ema50", "hl_ema14")
+        stream = get_streaming_indicators(symbol, "5m", needs)
+        if stream is not None:
+            # O(1): останні значення з інкрементального стану
+            bars, df = stream.bars, stream.tail(6)
+            ema_fast = pd.Series(stream.values("ema20", 4))
+            ema_slow = pd.Series(stream.values("ema50", 1))
+            atr14 = pd.Series(stream.values("hl_ema14", 1))
+        else:
+            g = get_indicator_graph(symbol, "5m", needs=needs)
+            bars = len(g) if g is not None else 0
+            if g is not None:
+                df, ema_fast, ema_slow, atr14 = g.frame.tail(6).to_frame(), g.get("ema20"), g.get("ema50"), g.get("hl_ema14")
+        if bars < 20:
             return {
                 "microtrend_direction": "flat",
                 "micro_trend_5m": {
@@ -1463,10 +1464,6 @@ def get_micro_trend_5m(symbol):
                 }
             }
 
-        # числові стовпці
-        for col in ("open", "high", "low", "close"):
-            df[col] = pd.to_numeric(df.get(col), errors="coerce")
-        df = df.dropna(subset=["open", "high", "low", "close"])
         if df.empty:
             raise ValueError("no valid OHLC data")
 
@@ -1481,10 +1478,7 @@ def get_micro_trend_5m(symbol):
 
         change_pct = ((end_price - start_price) / start_price) * 100.0
 
-        # EMA20 / EMA50
-        ema_fast = df["close"].ewm(span=20, adjust=False).mean()
-        ema_slow = df["close"].ewm(span=50, adjust=False).mean()
-
+        # EMA20 / EMA50 (ema_fast / ema_slow вище)
         # Нахил EMA20 (середній за 3 бари)
         ema20_diff = ema_fast.diff()
         slope_mean3 = float(ema20_diff.tail(3).mean() or 0.0)
@@ -1500,8 +1494,6 @@ def get_micro_trend_5m(symbol):
         slope_pct = (slope_mean3 / last_ema20) * 100.0
 
         # ATR(14) і його % до ціни як «волатильність»
-        tr = (df["high"] - df["low"]).abs()
-        atr14 = tr.ewm(span=14, adjust=False).mean()
         last_atr = float(atr14.iloc[-1]) if pd.notna(atr14.iloc[-1]) else 0.0
         vol_pct = (last_atr / last_close) * 100.0 if last_close > 0 else 0.0
 
@@ -1735,14 +1727,8 @@ def detect_rsi_divergence(symbol, interval="5", limit=60):
         df["rsi"] = rsi
 
         # локальні екстремуми (простий 3-барний підхід)
-        def local_minima(s: pd.Series):
-            return (s.shift(1) > s) & (s.shift(-1) > s)
-
-        def local_maxima(s: pd.Series):
-            return (s.shift(1) < s) & (s.shift(-1) < s)
-
-        mins_idx = df.index[local_minima(df["close"]).fillna(False)]
-        maxs_idx = df.index[local_maxima(df["close"]).fillna(False)]
+        mins_idx = df.index[swing_points(df["close"], 1, 1, "low")]
+        maxs_idx = df.index[swing_points(df["close"], 1, 1, "high")]
 
         # візьмемо останні 6 кандидатів кожного типу
         mins_idx = mins_idx[-6:]
@@ -0,0 +1,131 @@
+# analysis/levels.py
+
+"""
+📐 Векторизовані swing-точки (фрактали) і кластеризація рівнів.
+
+    swing_points(values, left, right, kind)  — індекси локальних мінімумів/максимумів:
+        значення строго менше (для "low") / більше (для "high") за всі left барів зліва
+        і right барів справа; рахується через sliding_window_view без циклів по барах.
+    cluster_levels(levels, tol)              — сортування + розриви там, де сусідні рівні
+        далі за tol; представник кластера — медіана (як statistics.median).
+    SwingCache                               — підтверджені swing-точки по ключу (symbol):
+        точка, вікно якої повністю на закритих барах, не змінюється, тож при новому барі
+        перевіряються лише нові кандидати, а не вся історія.
+"""
+
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_EMPTY = np.empty(0, dtype=int)
+
+
+def swing_points(values, left=2, right=2, kind="low"):
+    """Індекси swing-точок (за зростанням). NaN ніколи не є swing-точкою."""
+    s = np.asarray(values, dtype=float)
+    left, right = int(left), int(right)
+    if len(s) < left + right + 1:
+        return _EMPTY
+    windows = sliding_window_view(s, left + right + 1)
+    center = windows[:, left]
+    ok = ~np.isnan(center)
+    if kind == "low":
+        if left:
+            ok &= windows[:, :left].min(axis=1) > center
+        if right:
+            ok &= windows[:, left + 1:].min(axis=1) > center
+    else:
+        if left:
+            ok &= windows[:, :left].max(axis=1) < center
+        if right:
+            ok &= windows[:, left + 1:].max(axis=1) < center
+    return np.flatnonzero(ok) + left
+
+
+def cluster_levels(levels, tol):
+    """Об'єднує рівні, між сусідами яких ≤ tol; повертає медіани кластерів за зростанням."""
+    v = np.sort(np.asarray(levels, dtype=float))
+    if v.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(v) > tol) + 1
+    starts = np.concatenate(([0], breaks))
+    sizes = np.diff(np.concatenate((starts, [v.size])))
+    medians = (v[starts + (sizes - 1) // 2] + v[starts + sizes // 2]) / 2.0
+    return medians.tolist()
+
+
+class SwingCache:
+    """
+    🗂️ Кеш підтверджених swing-точок: key -> мітки часу swing low/high.
+    Останній бар вважається формуючим: точки, вікно яких зачіпає його, не кешуються
+    і перераховуються на кожен виклик (їх не більше right + 1).
+    """
+
+    def __init__(self, left=2, right=2, max_points=1000):
+        self.left = int(left)
+        self.right = int(right)
+        self.max_points = int(max_points)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.scanned = 0  # скільки кандидатів перевірено (діагностика)
+
+    def update(self, key, timestamps, lows, highs):
+        """
+        Повертає (low_idx, high_idx) — позиційні індекси swing-точок у поточному фреймі.
+        timestamps мають бути впорядковані за зростанням (як у кеші klines).
+        """
+        ts = np.asarray(timestamps)
+        lows, highs = np.asarray(lows, dtype=float), np.asarray(highs, dtype=float)
+        n, left, right = len(ts), self.left, self.right
+        last_final = n - 2 - right  # найбільший кандидат, чиє вікно — лише закриті бари
+
+        with self._lock:
+            entry = self._entries.get(key)
+            start = left
+            if entry is not None:
+                pos = int(np.searchsorted(ts, entry["final_ts"])) if entry["final_ts"] is not None else -1
+                if 0 <= pos < n and ts[pos] == entry["final_ts"]:
+                    start = max(left, pos + 1)
+                else:
+                    entry = None  # розрив історії → повний перерахунок
+            if entry is None:
+                entry = {"final_ts": None, "lows": ts[:0], "highs": ts[:0]}
+                self._entries[key] = entry
+
+            offset = max(0, start - left)
+            new_lo = swing_points(lows[offset:], left, right, "low") + offset
+            new_hi = swing_points(highs[offset:], left, right, "high") + offset
+            self.scanned += max(0, n - right - start)
+
+            entry["lows"] = np.concatenate((entry["lows"], ts[new_lo[new_lo <= last_final]]))
+            entry["highs"] = np.concatenate((entry["highs"], ts[new_hi[new_hi <= last_final]]))
+            if last_final >= start:
+                entry["final_ts"] = ts[last_final]
+
+            low_idx = self._positions(entry, "lows", ts)
+            high_idx = self._positions(entry, "highs", ts)
+
+        return (np.concatenate((low_idx, new_lo[new_lo > last_final])),
+                np.concatenate((high_idx, new_hi[new_hi > last_final])))
+
+    def _positions(self, entry, field, ts):
+        """Мітки часу → індекси у ts; точки, чиє вікно вийшло за межі фрейму, відкидаються."""
+        cached = entry[field]
+        if not len(cached):
+            return _EMPTY
+        keep = cached >= ts[0]
+        if not keep.all() or len(cached) > self.max_points:
+            cached = entry[field] = cached[keep][-self.max_points:]
+        pos = np.searchsorted(ts, cached)
+        valid = (pos < len(ts))
+        valid[valid] = ts[pos[valid]] == cached[valid]
+        valid &= pos >= self.left
+        return pos[valid]
+
+    def clear(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
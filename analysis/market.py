@@ -5,7 +5,6 @@ import requests
 import datetime
 import pandas as pd
 import numpy as np
-import talib
 from dotenv import load_dotenv
 from config import client
 from utils.tools import get_current_futures_price
@@ -22,6 +21,9 @@ import os
 import time
 
 from utils.get_klines_bybit import get_klines_clean_bybit
+from analysis.indicators import get_indicator_graph
+from utils.ticker_service import get_ticker_service
+from config import TICKER_SERVICE_ENABLED
 import openai
 from pybit.unified_trading import HTTP
 openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -105,6 +107,11 @@ def get_order_book_top(symbol, depth=10):
 def get_current_price(symbol):
     """💰 Отримує поточну ціну криптовалюти з Bybit Unified API"""
     try:
+        if TICKER_SERVICE_ENABLED:
+            price = get_ticker_service().get_last_price(symbol)
+            if price is not None:
+                return price
+
         response = client.get_tickers(category="linear", symbol=symbol)
 
         if response.get("retCode", 0) != 0:
@@ -151,13 +158,16 @@ def get_top_symbols(min_volume=None, limit=None):
         if _TOP_CACHE["data"] and (now - _TOP_CACHE["ts"] < 300):  # 5 хв кеш
             syms = _TOP_CACHE["data"]
         else:
-            from config import client  # або імпортуй клієнт звідти, де він в тебе
-            resp = client.get_tickers(category="linear")
-            if not resp or "result" not in resp or "list" not in resp["result"]:
-                log_error("❌ Не вдалося отримати tickers з Bybit")
-                return []
-
-            rows = resp["result"]["list"]
+            # спершу — спільний знімок тікерів, прямий запит лише як fallback
+            rows = get_ticker_service().rows() if TICKER_SERVICE_ENABLED else []
+            if not rows:
+                from config import client  # або імпортуй клієнт звідти, де він в тебе
+                resp = client.get_tickers(category="linear")
+                if not resp or "result" not in resp or "list" not in resp["result"]:
+                    log_error("❌ Не вдалося отримати tickers з Bybit")
+                    return []
+
+                rows = resp["result"]["list"]
             syms = []
             for it in rows:
                 symbol = it.get("symbol")
@@ -217,16 +227,16 @@ def analyze_market(symbol: str, market_type: str = "spot") -> dict | None:
         log_message(f"📡 Аналіз ринку для {symbol}")
 
         intervals = ["1h", "15m", "5m"]
-        df = None
+        g = None
 
-        # === Спроба отримати дані з кількох інтервалів ===
+        # === Спроба отримати дані з кількох інтервалів (спільний граф індикаторів) ===
         for interval in intervals:
-            df = get_klines_clean_bybit(symbol, interval=interval, limit=300)
-            if df is not None and not df.empty and len(df) >= 50:
+            g = get_indicator_graph(symbol, interval, needs=("sma50", "sma200", "cci14", "macd", "atr14", "rsi14"))
+            if g is not None and len(g) >= 50:
                 log_message(f"✅ Дані отримано для {symbol} на інтервалі {interval}")
                 break
 
-        if df is None or df.empty:
+        if g is None or g.df.empty:
             # 🛡 Використати кеш, якщо даних нема
             cached = TREND_CACHE.get(symbol)
             if cached and (time.time() - cached["timestamp"]) < 300:
@@ -234,13 +244,14 @@ def analyze_market(symbol: str, market_type: str = "spot") -> dict | None:
             else:
                 return None
 
-        # === Індикатори ===
-        df["SMA_50"] = talib.SMA(df["close"], timeperiod=50)
-        df["SMA_200"] = talib.SMA(df["close"], timeperiod=200)
-        df["CCI"] = talib.CCI(df["high"], df["low"], df["close"], timeperiod=14)
-        df["MACD"], df["MACD_Signal"], _ = talib.MACD(df["close"], 12, 26, 9)
-        df["ATR"] = talib.ATR(df["high"], df["low"], df["close"], 14)
-        df["RSI"] = talib.RSI(df["close"], 14)
+        # === Індикатори (з графа: рахуються один раз на бар для всіх аналізаторів) ===
+        df = g.df.copy()
+        df["SMA_50"] = g.get("sma50")
+        df["SMA_200"] = g.get("sma200")
+        df["CCI"] = g.get("cci14")
+        df["MACD"], df["MACD_Signal"], _ = g.get("macd")
+        df["ATR"] = g.get("atr14")
+        df["RSI"] = g.get("rsi14")
 
         df.fillna(method="ffill", inplace=True)
         df.fillna(method="bfill", inplace=True)
@@ -520,8 +531,12 @@ def analyze_volume(symbol):
 
         # --- Fallback: Bybit tickers (turnover24hUsd) ---
         try:
-            response = client.get_tickers(category="linear", symbol=symbol)
-            data = response.get("result", {}).get("list", [])
+            row = get_ticker_service().get(symbol) if TICKER_SERVICE_ENABLED else None
+            if row:
+                data = [row["raw"]]
+            else:
+                response = client.get_tickers(category="linear", symbol=symbol)
+                data = response.get("result", {}).get("list", [])
             if not data:
                 raise ValueError("Empty API list")
 
@@ -14,7 +14,7 @@ from analysis.sentiment import get_news_sentiment
 from utils.tools import get_price_change
 import time
 from utils.tools import get_current_futures_price
-from utils.logger import log_message, log_error
+from utils.logger import log_message, log_error, log_debug
 import os
 import json
 
@@ -31,6 +31,15 @@ from utils.get_klines_bybit import get_klines_clean_bybit
 from analysis.indicators import get_micro_trend_1m
 from analysis.market import analyze_volume, get_news_trend_summary
 
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import SNAPSHOT_PARALLEL, SNAPSHOT_WORKERS, SNAPSHOT_ANALYZER_TIMEOUT, SNAPSHOT_QUEUE_TIMEOUT
+from utils.request_scheduler import request_lane, current_request_lane
+
+# Спільний пул для аналізаторів snapshot (обмежений, створюється ліниво)
+_SNAPSHOT_POOL = None
+_SNAPSHOT_POOL_LOCK = threading.Lock()
+
 def safe_analyze(func, symbol, default=None):
     """
     🛡️ Безпечний виклик аналізатора. Якщо помилка або None → повертає default або {}.
@@ -46,31 +55,158 @@ def safe_analyze(func, symbol, default=None):
         return default or {}
 
 
-def build_monitor_snapshot(symbol):
-    log_message(f"🛠 [DEBUG] ВХІД у build_monitor_snapshot для {symbol}")
+def _get_snapshot_pool():
+    global _SNAPSHOT_POOL
+    with _SNAPSHOT_POOL_LOCK:
+        if _SNAPSHOT_POOL is None:
+            _SNAPSHOT_POOL = ThreadPoolExecutor(
+                max_workers=max(1, int(SNAPSHOT_WORKERS)),
+                thread_name_prefix="snapshot",
+            )
+        return _SNAPSHOT_POOL
+
+
+def _snapshot_jobs(symbol):
+    """
+    🧩 Незалежні задачі snapshot: name -> (callable, default).
+    Default створюється заново на кожен виклик (без спільних mutable-об'єктів).
+    """
+    return {
+        "market_trend":   (lambda: safe_analyze(analyze_market, symbol), {}),
+        "macd":           (lambda: safe_analyze(analyze_macd_atr, symbol), {}),
+        "rsi":            (lambda: safe_analyze(analyze_rsi, symbol), {}),
+        "stochastic":     (lambda: safe_analyze(analyze_stochastic, symbol), {}),
+        "bollinger":      (lambda: safe_analyze(analyze_bollinger_bands, symbol), {}),
+        "support":        (lambda: safe_analyze(analyze_support_resistance, symbol), {}),
+        "cci":            (lambda: safe_analyze(analyze_cci, symbol), {}),
+        "volatility":     (lambda: safe_analyze(get_volatility, symbol), {}),
+        "candle_patterns": (lambda: safe_analyze(detect_candlestick_patterns, symbol, []), {}),
+        "rsi_divergence": (lambda: safe_analyze(detect_rsi_divergence, symbol), {}),
+        "microtrend_1m":  (lambda: safe_analyze(get_micro_trend_1m, symbol), {}),
+        "microtrend_5m":  (lambda: safe_analyze(get_micro_trend_5m, symbol), {}),
+        "volume":         (lambda: safe_analyze(analyze_volume, symbol), {}),
+        "global_trend":   (analyze_global_trend, {}),
+        "news":           (get_news_trend_summary, {"news_summary": "UNKNOWN"}),
+        "price":          (lambda: get_current_futures_price(symbol), 0.0),
+        "delta_1m":       (lambda: get_price_change(symbol, 1), 0.0),
+        "delta_5m":       (lambda: get_price_change(symbol, 5), 0.0),
+        "sentiment":      (lambda: get_news_sentiment(symbol), "neutral"),
+        "price_trail":    (lambda: get_recent_price_trail(symbol, minutes=3), []),
+        "patterns_1m":    (lambda: detect_candlestick_patterns(symbol, interval="1m"), {}),
+        "patterns_5m":    (lambda: detect_candlestick_patterns(symbol, interval="5m"), {}),
+        "klines_1m":      (lambda: get_klines_clean_bybit(symbol, interval="1m", limit=20), None),
+    }
+
+
+def _call_job(symbol, name, func, default, started=None, lane=None):
+    if started is not None:
+        started[name] = time.time()  # таймаут задачі рахується від старту, а не від розсилки
+    try:
+        with request_lane(lane):  # смуга потоку-замовника (напр. klines відкритої угоди)
+            result = func()
+        return default if result is None else result
+    except Exception as e:
+        log_error(f"❌ snapshot[{name}] помилка для {symbol}: {e}")
+        return default
+
+
+# Лічильники default-ів через таймаут (деградовані snapshot-и мають бути видимі)
+_SNAPSHOT_FALLBACKS = {"snapshots": 0, "jobs": 0, "queued": 0}
+_SNAPSHOT_FALLBACKS_LOCK = threading.Lock()
+
+
+def get_snapshot_fallback_stats():
+    """📊 Скільки snapshot-ів / задач отримали default через таймаут (queued — так і не стартували)."""
+    with _SNAPSHOT_FALLBACKS_LOCK:
+        return dict(_SNAPSHOT_FALLBACKS)
+
+
+def _run_snapshot_jobs(symbol, jobs, parallel=None):
+    """
+    ⚡ Виконує задачі snapshot послідовно або паралельно (спільний обмежений пул).
+    У паралельному режимі кожна задача має таймаут SNAPSHOT_ANALYZER_TIMEOUT від моменту,
+    коли вона реально почала виконуватись (черга в пулі під кількома сканами не з'їдає час);
+    задача, що так і не стартувала за SNAPSHOT_QUEUE_TIMEOUT, теж отримує default.
+    Кожен default через таймаут — log_error + лічильник get_snapshot_fallback_stats().
+    """
+    parallel = SNAPSHOT_PARALLEL if parallel is None else parallel
+    if not parallel:
+        return {name: _call_job(symbol, name, fn, default) for name, (fn, default) in jobs.items()}
+
+    pool = _get_snapshot_pool()
+    started = {}
+    lane = current_request_lane()
+    futures = {pool.submit(_call_job, symbol, name, fn, default, started, lane): name
+               for name, (fn, default) in jobs.items()}
+    submitted_at = time.time()
+    timeout = float(SNAPSHOT_ANALYZER_TIMEOUT)
+
+    results, timed_out, never_started = {}, [], []
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+        for fut in done:
+            results[futures[fut]] = fut.result()
+        now = time.time()
+        for fut in list(pending):
+            name = futures[fut]
+            began = started.get(name)
+            if began is not None and now - began >= timeout:
+                timed_out.append(name)
+            elif began is None and now - submitted_at >= float(SNAPSHOT_QUEUE_TIMEOUT) and fut.cancel():
+                never_started.append(name)
+            else:
+                continue
+            pending.discard(fut)
+            results[name] = jobs[name][1]
+
+    if timed_out or never_started:
+        with _SNAPSHOT_FALLBACKS_LOCK:
+            _SNAPSHOT_FALLBACKS["snapshots"] += 1
+            _SNAPSHOT_FALLBACKS["jobs"] += len(timed_out) + len(never_started)
+            _SNAPSHOT_FALLBACKS["queued"] += len(never_started)
+        log_error(
+            f"⏱️ snapshot {symbol} деградований → default: таймаут {timeout}s {timed_out or '-'}, "
+            f"не стартували за {SNAPSHOT_QUEUE_TIMEOUT}s {never_started or '-'}"
+        )
+    return results
+
+
+def build_monitor_snapshot(symbol, parallel=None, precomputed=None):
+    log_debug("🛠 [DEBUG] ВХІД у build_monitor_snapshot для %s", symbol)
 
     """
     📦 Створює повний snapshot для монети, використовуючи всі аналітичні модулі.
+    parallel=None → за SNAPSHOT_PARALLEL з конфігу; схема snapshot не залежить від режиму.
+    precomputed — готові результати задач {job: result} (напр. batch-індикатори з
+    analysis.batch_indicators); відповідні аналізатори не викликаються.
     """
     try:
-        log_message(f"🔍 [DEBUG] Старт build_monitor_snapshot для {symbol}")
-
-        # === Отримання даних з аналізаторів ===
-        market_trend_data   = safe_analyze(analyze_market, symbol) or {}
-        macd_data           = safe_analyze(analyze_macd_atr, symbol) or {}
-        rsi_data            = safe_analyze(analyze_rsi, symbol) or {}
-        stoch_data          = safe_analyze(analyze_stochastic, symbol) or {}
-        bollinger_data      = safe_analyze(analyze_bollinger_bands, symbol) or {}
-        support_data        = safe_analyze(analyze_support_resistance, symbol) or {}
-        cci_data            = safe_analyze(analyze_cci, symbol) or {}
-        volatility_data     = safe_analyze(get_volatility, symbol) or {}
-        candle_patterns     = safe_analyze(detect_candlestick_patterns, symbol, []) or {}
-        rsi_divergence      = safe_analyze(detect_rsi_divergence, symbol) or {}
-        microtrend_1m_data  = safe_analyze(get_micro_trend_1m, symbol) or {}
-        microtrend_5m_data  = safe_analyze(get_micro_trend_5m, symbol) or {}
-        volume_data         = safe_analyze(analyze_volume, symbol) or {}
-        global_trend_data   = analyze_global_trend() or {}
-        news_data           = get_news_trend_summary() or {"news_summary": "UNKNOWN"}
+        log_debug("🔍 [DEBUG] Старт build_monitor_snapshot для %s", symbol)
+
+        # === Отримання даних з аналізаторів (незалежні задачі — послідовно або паралельно) ===
+        jobs = _snapshot_jobs(symbol)
+        ready = {name: result for name, result in (precomputed or {}).items() if name in jobs and result}
+        for name in ready:
+            del jobs[name]
+        data = _run_snapshot_jobs(symbol, jobs, parallel)
+        data.update(ready)
+
+        market_trend_data   = data["market_trend"] or {}
+        macd_data           = data["macd"] or {}
+        rsi_data            = data["rsi"] or {}
+        stoch_data          = data["stochastic"] or {}
+        bollinger_data      = data["bollinger"] or {}
+        support_data        = data["support"] or {}
+        cci_data            = data["cci"] or {}
+        volatility_data     = data["volatility"] or {}
+        candle_patterns     = data["candle_patterns"] or {}
+        rsi_divergence      = data["rsi_divergence"] or {}
+        microtrend_1m_data  = data["microtrend_1m"] or {}
+        microtrend_5m_data  = data["microtrend_5m"] or {}
+        volume_data         = data["volume"] or {}
+        global_trend_data   = data["global_trend"] or {}
+        news_data           = data["news"] or {"news_summary": "UNKNOWN"}
 
         # --- дістаємо внутрішні об’єкти один раз (правильні шляхи)
         _macd      = macd_data.get("macd", {})                  # trend, hist_direction, crossed, score
@@ -93,17 +229,17 @@ def build_monitor_snapshot(symbol):
         volume_level = volume_data.get("volume_analysis", {}).get("level", "unknown")
 
         log_message(
-            f"🔎 {symbol} | Trend: {trend_dir} | MACD: {macd_trend} | "
-            f"RSI: {rsi_signal} | Volume: {volume_level}"
+            "🔎 %s | Trend: %s | MACD: %s | RSI: %s | Volume: %s",
+            symbol, trend_dir, macd_trend, rsi_signal, volume_level,
         )
 
         # === Додаткові дані ===
-        price       = get_current_futures_price(symbol) or 0.0
-        log_message(f"🧪 [DEBUG] Отримано ціну для {symbol}: {price}")
-        delta_1m    = round(get_price_change(symbol, 1) or 0.0, 2)
-        delta_5m    = round(get_price_change(symbol, 5) or 0.0, 2)
-        sentiment   = get_news_sentiment(symbol) or "neutral"
-        price_trail = get_recent_price_trail(symbol, minutes=3) or []
+        price       = data["price"] or 0.0
+        log_debug("🧪 [DEBUG] Отримано ціну для %s: %s", symbol, price)
+        delta_1m    = round(data["delta_1m"] or 0.0, 2)
+        delta_5m    = round(data["delta_5m"] or 0.0, 2)
+        sentiment   = data["sentiment"] or "neutral"
+        price_trail = data["price_trail"] or []
 
         # === bars_in_state з price_trail (без нових залежностей)
         # рахуємо скільки останніх 1m кроків йшли в одному напрямку
@@ -130,7 +266,7 @@ def build_monitor_snapshot(symbol):
                         break
                 bars_in_state = max(1, cnt)
         except Exception as e:
-            log_message(f"⚠️ [DEBUG] bars_in_state calc fail: {e}")
+            log_debug("⚠️ [DEBUG] bars_in_state calc fail: %s", e)
             bars_in_state = 1
 
 
@@ -138,13 +274,13 @@ def build_monitor_snapshot(symbol):
         micro_1m = {
             "trend": _mt1m_dir,
             "change_pct": delta_1m,
-            "pattern": detect_candlestick_patterns(symbol, interval="1m").get("candlestick", {}).get("patterns", [])
+            "pattern": (data["patterns_1m"] or {}).get("candlestick", {}).get("patterns", [])
         }
 
         micro_5m = {
             "trend": _mt5m_dir,
             "change_pct": delta_5m,
-            "pattern": detect_candlestick_patterns(symbol, interval="5m").get("candlestick", {}).get("patterns", [])
+            "pattern": (data["patterns_5m"] or {}).get("candlestick", {}).get("patterns", [])
         }
 
         # === Нормалізація RSI divergence до dict у indicators
@@ -251,20 +387,21 @@ def build_monitor_snapshot(symbol):
 
         # === Proximity to local high ===
         try:
-            df_1m = get_klines_clean_bybit(symbol, interval="1m", limit=20)
+            df_1m = data["klines_1m"]
             if df_1m is not None and not df_1m.empty:
+                df_1m = df_1m.copy()
                 df_1m["close"] = pd.to_numeric(df_1m["close"], errors="coerce")
                 local_high = df_1m["close"].max()
                 snapshot["proximity_to_high"] = round(price / local_high, 4) if local_high else 0.0
             else:
                 snapshot["proximity_to_high"] = 0.0
-            log_message(f"📊 [DEBUG] Proximity to High для {symbol}: {snapshot['proximity_to_high']}")
+            log_debug("📊 [DEBUG] Proximity to High для %s: %s", symbol, snapshot["proximity_to_high"])
         except Exception as e:
             log_error(f"❌ proximity_to_high помилка: {e}")
             snapshot["proximity_to_high"] = 0.0
 
         snapshot["current_price"] = price  # 👈 для сумісності
-        log_message(f"✅ [DEBUG] Готовий snapshot для {symbol}")
+        log_debug("✅ [DEBUG] Готовий snapshot для %s", symbol)
 
         # === 15m bar_closed (без дергання біржі зайвий раз)
         now_ms = int(datetime.datetime.utcnow().timestamp() * 1000)
@@ -275,7 +412,8 @@ def build_monitor_snapshot(symbol):
 
         # === Останні дві свічки (для перевірки розвороту)
         try:
-            df = get_klines_clean_bybit(symbol, interval="1m", limit=2)
+            # ті самі 1m klines, що й для proximity (останні 2 бари)
+            df = data["klines_1m"]
             if df is not None and len(df) >= 2:
                 last_candle = df.iloc[-1].to_dict()
                 prev_candle = df.iloc[-2].to_dict() 
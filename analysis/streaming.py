@@ -0,0 +1,379 @@
+# analysis/streaming.py
+
+"""
+⚡ Інкрементальні (streaming) індикатори: O(1) на оновлення бару.
+
+Кожен індикатор тримає стан, зафіксований на останньому ЗАКРИТОМУ барі (base),
+і поточний стан з урахуванням формуючого бару:
+    update(..., new_bar=True)   — закрився попередній бар, прийшов новий;
+    update(..., new_bar=False)  — змінився формуючий бар (перерахунок від base).
+Обидва випадки — константа часу (незалежно від довжини історії).
+
+Значення збігаються з batch-версіями, якими користуються аналізатори:
+    StreamingEMA        ↔ close.ewm(span=n, adjust=False).mean()
+    StreamingRSI        ↔ ta.momentum.rsi(close, window=n)  (Wilder)
+    StreamingATR        ↔ talib.ATR(high, low, close, n)
+    StreamingMACD       ↔ talib.MACD(close, 12, 26, 9)
+    StreamingStochastic ↔ talib.STOCH(high, low, close, n, 3, SMA, 3, SMA)
+    StreamingBollinger  ↔ close.rolling(n).mean() / .std(), смуги 2σ як talib.BBANDS
+
+IndicatorStream — набір індикаторів для (symbol, interval), синхронізується з
+кешем klines: після warm-up кожен sync() обробляє лише нові/змінені бари.
+"""
+
+import math
+import threading
+from collections import deque
+
+import pandas as pd
+
+NAN = float("nan")
+
+
+class StreamingIndicator:
+    """Базовий клас: чистий крок _step(state, *inputs) -> (state, value)."""
+
+    def __init__(self):
+        self._base = self._initial()
+        self._state = self._base
+        self.value = NAN
+
+    def _initial(self):
+        raise NotImplementedError
+
+    def _step(self, state, *inputs):
+        raise NotImplementedError
+
+    def update(self, *inputs, new_bar=True):
+        if new_bar:
+            self._base = self._state
+        self._state, self.value = self._step(self._base, *inputs)
+        return self.value
+
+
+class StreamingEMA(StreamingIndicator):
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        super().__init__()
+
+    def _initial(self):
+        return None  # попереднє значення EMA
+
+    def _step(self, prev, x):
+        ema = x if prev is None else prev + self.alpha * (x - prev)
+        return ema, ema
+
+
+class StreamingRSI(StreamingIndicator):
+    """Wilder RSI з seed як у ta: EWM(alpha=1/n, adjust=False) від першого бару, min_periods=n."""
+
+    def __init__(self, period=14):
+        self.period = int(period)
+        self.alpha = 1.0 / self.period
+        super().__init__()
+
+    def _initial(self):
+        return (None, 0, 0.0, 0.0)  # prev_close, count, avg_up, avg_down
+
+    def _step(self, state, close):
+        prev_close, count, up, down = state
+        if prev_close is None:
+            gain = loss = 0.0
+            up, down = 0.0, 0.0
+        else:
+            diff = close - prev_close
+            gain, loss = max(diff, 0.0), max(-diff, 0.0)
+            up += self.alpha * (gain - up)
+            down += self.alpha * (loss - down)
+        count += 1
+        if count < self.period:
+            value = NAN
+        elif down == 0:
+            value = 100.0
+        else:
+            value = 100.0 - 100.0 / (1.0 + up / down)
+        return (close, count, up, down), value
+
+
+class StreamingATR(StreamingIndicator):
+    """ATR Wilder як у TA-Lib: seed = SMA(TR) перших n барів (з другого бару), далі (atr*(n-1)+tr)/n."""
+
+    def __init__(self, period=14):
+        self.period = int(period)
+        super().__init__()
+
+    def _initial(self):
+        return (None, 0, 0.0, None)  # prev_close, tr_count, tr_sum, atr
+
+    def _step(self, state, high, low, close):
+        prev_close, count, tr_sum, atr = state
+        if prev_close is None:
+            return (close, 0, 0.0, None), NAN
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        count += 1
+        n = self.period
+        if count < n:
+            return (close, count, tr_sum + tr, None), NAN
+        if count == n:
+            atr = (tr_sum + tr) / n
+        else:
+            atr = (atr * (n - 1) + tr) / n
+        return (close, count, tr_sum, atr), atr
+
+
+class _SeededEMA:
+    """EMA TA-Lib: seed = SMA перших n значень, далі класичний крок (для MACD)."""
+
+    __slots__ = ("n", "k")
+
+    def __init__(self, n):
+        self.n = n
+        self.k = 2.0 / (n + 1.0)
+
+    def step(self, prev, x):
+        return prev + self.k * (x - prev)
+
+
+class StreamingMACD(StreamingIndicator):
+    """
+    MACD як talib.MACD(close, fast, slow, signal):
+    повільна EMA з seed = SMA(close[0:slow]), швидка — seed = SMA(close[slow-fast:slow]),
+    сигнальна — seed = SMA перших `signal` значень MACD. value = (macd, signal, hist).
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = _SeededEMA(fast), _SeededEMA(slow), _SeededEMA(signal)
+        super().__init__()
+
+    def _initial(self):
+        # warm-up буфер closes (≤ slow), fast, slow, буфер macd (≤ signal), signal
+        return ((), None, None, (), None)
+
+    def _step(self, state, close):
+        closes, fast, slow, macds, sig = state
+        nan3 = (NAN, NAN, NAN)
+        if slow is None:
+            closes = closes + (close,)
+            if len(closes) < self.slow.n:
+                return (closes, None, None, (), None), nan3
+            slow = sum(closes) / self.slow.n
+            fast = sum(closes[-self.fast.n:]) / self.fast.n
+            closes = ()
+        else:
+            fast = self.fast.step(fast, close)
+            slow = self.slow.step(slow, close)
+        macd = fast - slow
+        if sig is None:
+            macds = macds + (macd,)
+            if len(macds) < self.signal.n:
+                return (closes, fast, slow, macds, None), nan3
+            sig = sum(macds) / self.signal.n
+            macds = ()
+        else:
+            sig = self.signal.step(sig, macd)
+        return (closes, fast, slow, macds, sig), (macd, sig, macd - sig)
+
+
+class StreamingStochastic(StreamingIndicator):
+    """talib.STOCH(fastk=n, slowk=3 SMA, slowd=3 SMA). value = (slowk, slowd)."""
+
+    def __init__(self, fastk_period=14, slowk_period=3, slowd_period=3):
+        self.n, self.nk, self.nd = int(fastk_period), int(slowk_period), int(slowd_period)
+        super().__init__()
+
+    def _initial(self):
+        return ((), (), ())  # останні n (high, low), останні nk fastK, останні nd slowK
+
+    def _step(self, state, high, low, close):
+        window, fastks, slowks = state
+        window = (window + ((high, low),))[-self.n:]
+        if len(window) < self.n:
+            return (window, fastks, slowks), (NAN, NAN)
+        hh = max(h for h, _ in window)
+        ll = min(lo for _, lo in window)
+        diff = hh - ll
+        fastk = (close - ll) / diff * 100.0 if diff != 0 else 0.0
+        fastks = (fastks + (fastk,))[-self.nk:]
+        if len(fastks) < self.nk:
+            return (window, fastks, slowks), (NAN, NAN)
+        slowk = sum(fastks) / self.nk
+        slowks = (slowks + (slowk,))[-self.nd:]
+        if len(slowks) < self.nd:
+            return (window, fastks, slowks), (NAN, NAN)
+        return (window, fastks, slowks), (slowk, sum(slowks) / self.nd)
+
+
+class StreamingBollinger(StreamingIndicator):
+    """
+    Ковзні середнє / σ за n барів (ковзний Welford: O(1) на бар).
+    value = (upper, middle, lower) з σ генеральної сукупності (як talib.BBANDS);
+    self.std — σ з ddof=1 (як close.rolling(n).std()).
+    """
+
+    def __init__(self, period=20, nbdev=2.0):
+        self.period = int(period)
+        self.nbdev = float(nbdev)
+        self.std = NAN
+        super().__init__()
+
+    def _initial(self):
+        return ((), 0.0, 0.0)  # вікно closes, середнє, M2
+
+    def _step(self, state, close):
+        window, mean, m2 = state
+        n = self.period
+        if len(window) < n:
+            # накопичення вікна: класичний Welford
+            window = window + (close,)
+            delta = close - mean
+            mean += delta / len(window)
+            m2 += delta * (close - mean)
+        else:
+            old = window[0]
+            window = window[1:] + (close,)
+            new_mean = mean + (close - old) / n
+            m2 += (close - old) * (close - new_mean + old - mean)
+            mean = new_mean
+        if len(window) < n:
+            return (window, mean, m2), (NAN, NAN, NAN)
+        var = max(m2, 0.0) / n
+        band = self.nbdev * math.sqrt(var)
+        return (window, mean, m2), (mean + band, mean, mean - band)
+
+    def update(self, *inputs, new_bar=True):
+        value = super().update(*inputs, new_bar=new_bar)
+        window, _, m2 = self._state
+        n = len(window)
+        self.std = math.sqrt(max(m2, 0.0) / (n - 1)) if n == self.period and n > 1 else NAN
+        return value
+
+
+# ============================ 📡 НАБІР ДЛЯ (symbol, interval) ============================
+# Назви — як у графі індикаторів (analysis.indicators.IndicatorGraph)
+def _make_indicator(name):
+    if name == "macd":
+        return StreamingMACD(), "close"
+    kind = name.rstrip("0123456789")
+    n = int(name[len(kind):] or 0)
+    if kind == "ema":
+        return StreamingEMA(n), "close"
+    if kind == "hl_ema":
+        return StreamingEMA(n), "hl_range"
+    if kind == "rsi":
+        return StreamingRSI(n), "close"
+    if kind == "atr":
+        return StreamingATR(n), "hlc"
+    if kind == "stoch":
+        return StreamingStochastic(n), "hlc"
+    if kind == "bbands":
+        return StreamingBollinger(n), "close"
+    raise KeyError(f"IndicatorStream: невідомий індикатор {name}")
+
+
+class IndicatorStream:
+    """
+    🔁 Стан індикаторів одного (symbol, interval).
+    sync(df) приймає свіжий хвіст свічок: нові бари → new_bar=True, зміна формуючого → new_bar=False.
+    Історія закритих значень — останні `history` на індикатор (для last_5 / нахилів).
+    """
+
+    def __init__(self, names, history=8):
+        self.names = tuple(dict.fromkeys(names))
+        self._ind = {}
+        for name in self.names:
+            self._ind[name] = _make_indicator(name)
+        self._hist = {name: deque(maxlen=history) for name in self.names}
+        self._bars = deque(maxlen=history)   # закриті бари (dict)
+        self.forming = None                  # поточний (останній) бар
+        self.last_ts = None
+        self.bars = 0
+        self.lock = threading.RLock()
+
+    def _feed(self, bar, new_bar):
+        h, lo, c = bar["high"], bar["low"], bar["close"]
+        for name, (ind, src) in self._ind.items():
+            if new_bar and self.bars > 0:
+                self._hist[name].append(ind.value)
+            if src == "close":
+                ind.update(c, new_bar=new_bar)
+            elif src == "hl_range":
+                ind.update(abs(h - lo), new_bar=new_bar)
+            else:
+                ind.update(h, lo, c, new_bar=new_bar)
+        if new_bar:
+            if self.forming is not None:
+                self._bars.append(self.forming)
+            self.bars += 1
+        self.forming = bar
+        self.last_ts = bar["timestamp"]
+
+    def sync(self, df):
+        """
+        Обробляє бари з df, новіші за останній відомий (і формуючий, якщо змінився).
+        False — якщо df не стикується з поточним станом (розрив) → потрібен warm-up.
+        """
+        if df is None or df.empty:
+            return True
+        with self.lock:
+            ts = df["timestamp"]
+            if self.last_ts is not None and ts.iloc[0] > self.last_ts:
+                return False
+            start = 0 if self.last_ts is None else int((ts < self.last_ts).sum())
+            for row in df.iloc[start:].itertuples(index=False):
+                bar = {"timestamp": row.timestamp, "open": float(row.open), "high": float(row.high),
+                       "low": float(row.low), "close": float(row.close)}
+                if self.last_ts is not None and bar["timestamp"] == self.last_ts:
+                    if bar != self.forming:
+                        self._feed(bar, new_bar=False)
+                else:
+                    self._feed(bar, new_bar=True)
+            return True
+
+    def value(self, name):
+        return self._ind[name][0].value
+
+    def values(self, name, k):
+        """Останні k значень (закриті + поточний формуючий бар)."""
+        with self.lock:
+            hist = list(self._hist[name])[-(k - 1):] if k > 1 else []
+            return hist + [self._ind[name][0].value]
+
+    def indicator(self, name):
+        return self._ind[name][0]
+
+    def tail(self, k):
+        """Останні k барів (закриті + формуючий) як DataFrame."""
+        with self.lock:
+            rows = list(self._bars)[-(k - 1):] if k > 1 else []
+            if self.forming is not None:
+                rows.append(self.forming)
+        return pd.DataFrame(rows, columns=["timestamp", "open", "high", "low", "close"])
+
+
+_STREAMS = {}  # (symbol, interval) -> IndicatorStream
+_STREAMS_LOCK = threading.Lock()
+
+
+def get_indicator_stream(symbol, interval, needs, fetch, warmup_bars=300, sync_bars=3):
+    """
+    Спільний IndicatorStream для (symbol, interval) з індикаторами needs.
+    fetch(symbol, interval, limit) -> DataFrame свічок (кеш klines).
+    Warm-up — один раз на warmup_bars; далі кожен виклик тягне лише sync_bars останніх барів.
+    """
+    key = (symbol, str(interval))
+    with _STREAMS_LOCK:
+        stream = _STREAMS.get(key)
+        if stream is not None and not set(needs) <= set(stream.names):
+            stream = None  # нові індикатори → перебудова з warm-up
+        if stream is None:
+            names = tuple(_STREAMS[key].names) + tuple(needs) if key in _STREAMS else tuple(needs)
+            stream = _STREAMS[key] = IndicatorStream(names)
+
+    with stream.lock:
+        if stream.bars == 0 or not stream.sync(fetch(symbol, interval, sync_bars)):
+            fresh = IndicatorStream(stream.names)
+            fresh.sync(fetch(symbol, interval, warmup_bars))
+            with _STREAMS_LOCK:
+                _STREAMS[key] = fresh
+            return fresh if fresh.bars else None
+    return stream
@@ -141,4 +141,125 @@ SMART_AVG = UI.get("SMART_AVG", {
 BLOCK_INNOVATION = True
 INNOVATION_MIN_LISTING_DAYS = 14
 INNOVATION_MIN_24H_TURNOVER = 5_000_000
-INNOVATION_CACHE_FILE = "data/innovation_cache.json"
+
+# ============================ 🏷️ SYMBOL REGISTRY ============================
+# Метадані інструментів (tickSize, qtyStep, minQty, плече, innovation, лістинг) — у пам'яті,
+# bulk-оновлення раз на N секунд; знімок на диску для теплого старту
+SYMBOL_REGISTRY_FILE = UI.get("SYMBOL_REGISTRY_FILE", "data/symbol_registry.json")
+SYMBOL_REGISTRY_REFRESH_SEC = UI.get("SYMBOL_REGISTRY_REFRESH_SEC", 900)
+SYMBOL_REGISTRY_BACKGROUND = UI.get("SYMBOL_REGISTRY_BACKGROUND", True)
+
+# ============================ 🚦 ELIGIBILITY ============================
+# Індекс допуску символів (cooldown / blacklist / відкриті угоди / innovation) — перевірка до snapshot
+ELIGIBILITY_FILE = UI.get("ELIGIBILITY_FILE", "data/eligibility.json")
+# Як часто звіряти множину відкритих угод зі сховищем (сек)
+ELIGIBILITY_OPEN_SYNC_SEC = UI.get("ELIGIBILITY_OPEN_SYNC_SEC", 5.0)
+# ⚠️ Вхідний фільтр: після збиткової угоди символ не сканується і не відкривається LOSS_BLACKLIST_SEC сек
+# (раніше loss_blacklist.json лише записувався); 0 — не блокувати
+LOSS_BLACKLIST_SEC = UI.get("LOSS_BLACKLIST_SEC", 4 * 60 * 60)
+
+# ============================ 📦 KLINE CACHE ============================
+# Спільний кеш klines: один запит на (symbol, interval, category) до закриття бару
+KLINE_CACHE_ENABLED = UI.get("KLINE_CACHE_ENABLED", True)
+# Максимальний вік формуючого бару в кеші (сек); оновлення інкрементальне, тож TTL може бути коротким
+KLINE_CACHE_FORMING_TTL = UI.get("KLINE_CACHE_FORMING_TTL", 5)
+# Тип колонок OHLCV у кеші: "float64" або "float32" (удвічі менше пам'яті для великих універсів)
+KLINE_CACHE_DTYPE = UI.get("KLINE_CACHE_DTYPE", "float64")
+# Старші таймфрейми (5m/15m/1h) добудовуються з 1m-серії; з біржі — лише backfill історії
+KLINE_RESAMPLE_FROM_1M = UI.get("KLINE_RESAMPLE_FROM_1M", True)
+
+# ============================ ⚡ SNAPSHOT ============================
+# Паралельний збір аналізаторів у build_monitor_snapshot
+SNAPSHOT_PARALLEL = UI.get("SNAPSHOT_PARALLEL", True)
+SNAPSHOT_WORKERS = UI.get("SNAPSHOT_WORKERS", 8)
+# Таймаут на кожен аналізатор (сек) → після нього використовується default
+SNAPSHOT_ANALYZER_TIMEOUT = UI.get("SNAPSHOT_ANALYZER_TIMEOUT", 12)
+# Скільки задача може чекати в черзі спільного пулу (кілька сканів одночасно), перш ніж → default
+SNAPSHOT_QUEUE_TIMEOUT = UI.get("SNAPSHOT_QUEUE_TIMEOUT", 60)
+
+# ============================ 🔭 SCAN ============================
+# Паралельне сканування універсуму у find_best_scalping_targets
+SCAN_PARALLEL = UI.get("SCAN_PARALLEL", True)
+SCAN_WORKERS = UI.get("SCAN_WORKERS", 4)
+# True → універсум з get_top_symbols() (GET_TOP_SYMBOLS_CONFIG) замість ручного списку
+SCAN_USE_TOP_SYMBOLS = UI.get("SCAN_USE_TOP_SYMBOLS", False)
+# Індикатори 15m для всього універсу — одним векторизованим проходом (матриця symbols × bars)
+SCAN_BATCH_INDICATORS = UI.get("SCAN_BATCH_INDICATORS", True)
+# Відкриття після скану: якщо свіжа ціна відійшла від ціни зі скану більше ніж на N % → пропуск
+SCAN_MAX_PRICE_DRIFT_PCT = UI.get("SCAN_MAX_PRICE_DRIFT_PCT", 0.3)
+
+# ============================ 📡 TICKERS ============================
+# Один bulk get_tickers(category="linear") замість запиту на кожен символ
+TICKER_SERVICE_ENABLED = UI.get("TICKER_SERVICE_ENABLED", True)
+TICKER_SERVICE_BACKGROUND = UI.get("TICKER_SERVICE_BACKGROUND", True)
+TICKER_REFRESH_SEC = UI.get("TICKER_REFRESH_SEC", 1.0)
+# Якщо знімок старший — ціна з кешу не віддається (fallback на прямий запит)
+TICKER_MAX_AGE = UI.get("TICKER_MAX_AGE", 3.0)
+
+# ============================ 📌 POSITIONS ============================
+# Один get_positions(settleCoin=USDT) раз на N сек для всіх читачів (monitor / reconcile / executor / ...)
+POSITIONS_SERVICE_BACKGROUND = UI.get("POSITIONS_SERVICE_BACKGROUND", True)
+POSITIONS_REFRESH_SEC = UI.get("POSITIONS_REFRESH_SEC", 2.0)
+# Якщо знімок старший — синхронне оновлення при читанні
+POSITIONS_MAX_AGE = UI.get("POSITIONS_MAX_AGE", 5.0)
+
+# ============================ 💼 ACCOUNT ============================
+# Один get_wallet_balance на N сек для get_balance / get_usdt_balance / allocator / risk;
+# власні fills оновлюють знімок інкрементально до наступного запиту
+ACCOUNT_TTL_SEC = UI.get("ACCOUNT_TTL_SEC", 5.0)
+
+# ============================ 🚦 REQUEST SCHEDULER ============================
+# Усі REST-виклики config.bybit — через token bucket на групу ендпоінтів і пріоритетні смуги
+# (ордери > позиції/ціни відкритих угод > скан klines); backoff за X-Bapi-Limit-Status
+REQUEST_SCHEDULER_ENABLED = UI.get("REQUEST_SCHEDULER_ENABLED", True)
+# Перевизначення лімітів груп: {"market": {"rate": 20, "burst": 40}, "global": {...}, ...}
+REQUEST_RATE_LIMITS = UI.get("REQUEST_RATE_LIMITS", {})
+# Поріг попередження про довге очікування слота (запит усе одно чекає на токен)
+REQUEST_MAX_WAIT_SEC = UI.get("REQUEST_MAX_WAIT_SEC", 30.0)
+REQUEST_STATS_LOG_SEC = UI.get("REQUEST_STATS_LOG_SEC", 60.0)
+if REQUEST_SCHEDULER_ENABLED and not isinstance(bybit, MockHTTP):
+    from utils.request_scheduler import RequestScheduler, ScheduledClient
+    bybit = client = ScheduledClient(bybit, RequestScheduler(
+        REQUEST_RATE_LIMITS, max_wait=REQUEST_MAX_WAIT_SEC, report_sec=REQUEST_STATS_LOG_SEC))
+
+# ============================ ⚡ PRICE ENGINE ============================
+# Подієвий моніторинг угод: один фід цін, дії лише при перетині рівнів DCA/TP
+PRICE_ENGINE_ENABLED = UI.get("PRICE_ENGINE_ENABLED", True)
+PRICE_ENGINE_TICK_SEC = UI.get("PRICE_ENGINE_TICK_SEC", 0.25)
+# Період для перевірок без рівня (trend-flip cut)
+PRICE_ENGINE_TIMER_SEC = UI.get("PRICE_ENGINE_TIMER_SEC", 30)
+PRICE_ENGINE_WORKERS = UI.get("PRICE_ENGINE_WORKERS", 4)
+
+# ============================ 📡 MARKET STREAM ============================
+# "off" — лише REST; "bybit" — публічний WebSocket v5; "replay" — програвання JSONL-запису
+# (з MockHTTP-клієнтом "bybit" автоматично стає "replay")
+MARKET_STREAM = UI.get("MARKET_STREAM", "off")
+MARKET_STREAM_REPLAY_FILE = UI.get("MARKET_STREAM_REPLAY_FILE", None)
+MARKET_STREAM_REPLAY_SPEED = UI.get("MARKET_STREAM_REPLAY_SPEED", 1.0)
+
+# ============================ 📝 LOGS ============================
+# Append-only запис логів з фонової черги (False → синхронний дозапис у потоці виклику)
+LOG_ASYNC = UI.get("LOG_ASYNC", True)
+LOG_FLUSH_SEC = UI.get("LOG_FLUSH_SEC", 0.5)
+# Ротація: при перевищенні файл обрізається до останніх LOG_MAX_LINES // 2 рядків
+LOG_MAX_LINES = UI.get("LOG_MAX_LINES", 1000)
+# Поріг логування: "DEBUG" | "INFO" | "WARN" | "ERROR" (нижчі рівні відкидаються без форматування)
+LOG_LEVEL = UI.get("LOG_LEVEL", "DEBUG")
+
+# ============================ 🗄️ ACTIVE TRADES ============================
+# SQLite (WAL) сховище угод; ACTIVE_TRADES_FILE лишається JSON-експортом. None → лише JSON (старий режим)
+ACTIVE_TRADES_DB = UI.get("ACTIVE_TRADES_DB", "data/active_trades.db")
+# JSON-експорт не частіше, ніж раз на N секунд
+ACTIVE_TRADES_EXPORT_SEC = UI.get("ACTIVE_TRADES_EXPORT_SEC", 2.0)
+
+# ============================ 🗃️ REJECTIONS ============================
+# SQLite (WAL) журнал відмов для аналітики порогів (logs/rejections.jsonl лишається). None → лише JSONL
+REJECTIONS_DB = UI.get("REJECTIONS_DB", "data/rejections.db")
+# Скільки зберігати відмови (сек)
+REJECTIONS_RETENTION_SEC = UI.get("REJECTIONS_RETENTION_SEC", 7 * 86400)
+
+# ============================ 🧮 INDICATORS ============================
+# Спільне вікно (барів) графа індикаторів: один фрейм на (symbol, interval) для всіх аналізаторів
+INDICATOR_GRAPH_BARS = UI.get("INDICATOR_GRAPH_BARS", 300)
+# Інкрементальні індикатори (O(1) на оновлення бару) для analyze_rsi / get_micro_trend_5m
+STREAMING_INDICATORS = UI.get("STREAMING_INDICATORS", True)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+
+from utils.account_service import AccountService
+
+
+def _wallet(equity="100", available="80", im="20", usdt_available="75"):
+    return {
+        "retCode": 0,
+        "result": {"list": [{
+            "totalEquity": equity,
+            "totalAvailableBalance": available,
+            "totalInitialMargin": im,
+            "totalWalletBalance": equity,
+            "coin": [
+                {"coin": "BTC", "walletBalance": "0.1"},
+                {"coin": "USDT", "walletBalance": "99", "availableToWithdraw": usdt_available, "availableToTrade": ""},
+            ],
+        }]},
+    }
+
+
+class _Client:
+    def __init__(self, resp):
+        self.resp = resp
+        self.calls = 0
+
+    def get_wallet_balance(self, accountType):
+        self.calls += 1
+        return self.resp
+
+
+def test_burst_of_reads_within_ttl_is_one_request():
+    client = _Client(_wallet())
+    svc = AccountService(client, ttl=60)
+    threads = [threading.Thread(target=svc.snapshot) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.calls == 1
+    assert svc.equity() == 100.0 and svc.available() == 80.0
+    assert svc.coin_value("availableToTrade", "availableToWithdraw") == 75.0
+    assert svc.coin_value("walletBalance") == 99.0  # USDT, а не перша монета у списку
+    assert client.calls == 1
+
+
+def test_own_fills_update_snapshot_until_refresh():
+    client = _Client(_wallet())
+    svc = AccountService(client, ttl=60)
+    svc.apply_fill(10.0)  # ще немає знімка — ігнорується
+    svc.snapshot()
+    svc.apply_fill(10.0)
+    snap = svc.snapshot()
+    assert snap["available"] == 70.0 and snap["used_margin"] == 30.0 and snap["equity"] == 100.0
+    assert svc.coin_value("availableToWithdraw") == 65.0
+    assert client.calls == 1
+
+    svc.invalidate()
+    assert svc.available() == 80.0 and client.calls == 2
+
+
+def test_failed_refresh_keeps_last_snapshot():
+    client = _Client(_wallet())
+    svc = AccountService(client, ttl=60)
+    svc.snapshot()
+    client.resp = {"retCode": 10002, "retMsg": "timestamp"}
+    svc.invalidate()
+    assert svc.equity() == 100.0
+    assert svc.stats()["errors"] == 1
+    assert AccountService(_Client({"retCode": 0, "result": {"list": []}})).snapshot() is None
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+talib = pytest.importorskip("talib")
+ta = pytest.importorskip("ta")
+
+import analysis.batch_indicators as batch
+import analysis.indicators as ind
+from utils.ohlcv import OHLCV
+
+
+def _frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 50 + np.cumsum(rng.normal(0, 0.4, n))
+    spread = np.abs(rng.normal(0.3, 0.1, n))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(np.arange(n) * 900_000, unit="ms"),
+        "open": close, "high": close + spread, "low": close - spread * 0.8, "close": close, "volume": 1.0,
+    })
+
+
+FRAMES = {f"S{i}USDT": _frame(seed=i) for i in range(6)}
+
+
+def _matrices():
+    return batch.align_frames(FRAMES, 300)
+
+
+def test_kernels_match_talib_and_ta():
+    symbols, m = _matrices()
+    h, l, c = m["high"], m["low"], m["close"]
+    macd = batch.macd_matrix(c)
+    atr = batch.atr_matrix(h, l, c)
+    rsi = batch.rsi_matrix(c)
+    bb = batch.bbands_matrix(c)
+    cci = batch.cci_matrix(h, l, c)
+    stoch = batch.stoch_matrix(h, l, c)
+
+    for i, symbol in enumerate(symbols):
+        df = FRAMES[symbol]
+        hs, ls, cs = df["high"].values, df["low"].values, df["close"].values
+        for got, exp in zip(macd, talib.MACD(cs)):
+            assert np.allclose(got[i], exp, equal_nan=True)
+        assert np.allclose(atr[i], talib.ATR(hs, ls, cs, timeperiod=14), equal_nan=True)
+        assert np.allclose(rsi[i], ta.momentum.rsi(df["close"], window=14), equal_nan=True)
+        for got, exp in zip(bb, talib.BBANDS(cs, timeperiod=20)):
+            assert np.allclose(got[i], exp, equal_nan=True)
+        assert np.allclose(cci[i], talib.CCI(hs, ls, cs, timeperiod=20), equal_nan=True)
+        exp_k, exp_d = talib.STOCH(hs, ls, cs, fastk_period=14, slowk_period=3, slowk_matype=0,
+                                   slowd_period=3, slowd_matype=0)
+        assert np.allclose(stoch[0][i], exp_k, equal_nan=True)
+        assert np.allclose(stoch[1][i], exp_d, equal_nan=True)
+
+
+def _assert_close(a, b, path=""):
+    if isinstance(a, dict):
+        assert set(a) == set(b), path
+        for k in a:
+            _assert_close(a[k], b[k], f"{path}.{k}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            _assert_close(x, y, f"{path}[{i}]")
+    elif isinstance(a, (float, np.floating)):
+        assert b == pytest.approx(a, abs=1e-4), path
+    else:
+        assert a == b, path
+
+
+def test_batch_results_match_per_symbol_analyzers(monkeypatch):
+    frames = {**FRAMES, "NEWUSDT": _frame(n=80, seed=7)}
+
+    def fake_fetch(symbol, interval="1h", limit=200, category=None):
+        return frames[symbol].tail(limit).reset_index(drop=True)
+
+    monkeypatch.setattr(ind, "get_ohlcv_bybit", lambda *a, **k: OHLCV.from_dataframe(fake_fetch(*a, **k)))
+    monkeypatch.setattr(ind, "_GRAPHS", {})
+    monkeypatch.setattr(ind, "STREAMING_INDICATORS", False)
+
+    results = batch.analyze_universe(list(frames))
+
+    assert "NEWUSDT" not in results  # коротка історія → звичайний шлях через аналізатори
+    assert set(results) == set(frames) - {"NEWUSDT"}
+    analyzers = {
+        "macd": ind.analyze_macd_atr, "rsi": ind.analyze_rsi, "stochastic": ind.analyze_stochastic,
+        "bollinger": ind.analyze_bollinger_bands, "cci": ind.analyze_cci, "volatility": ind.get_volatility,
+    }
+    for symbol, jobs in results.items():
+        assert set(jobs) == set(batch.BATCH_JOBS)
+        for job, analyzer in analyzers.items():
+            _assert_close(analyzer(symbol), jobs[job], f"{symbol}.{job}")
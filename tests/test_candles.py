@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("talib")
+
+from analysis.candles import (
+    collect_patterns,
+    pattern_masks,
+    pattern_score_series,
+    resolve_patterns,
+    strongest_talib_pattern,
+    talib_signals,
+)
+
+
+def _ohlc(n=600, seed=2):
+    rng = np.random.default_rng(seed)
+    c = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    o = np.r_[c[0], c[:-1]] + rng.normal(0, 0.05, n)
+    doji = rng.random(n) < 0.08
+    o[doji] = c[doji]
+    h = np.maximum(o, c) + np.abs(rng.normal(0, 0.3, n)) * (rng.random(n) < 0.7)
+    l = np.minimum(o, c) - np.abs(rng.normal(0, 0.3, n)) * (rng.random(n) < 0.7)
+    return o, h, l, c
+
+
+def test_masks_match_per_candle_rules():
+    o, h, l, c = _ohlc()
+    masks = pattern_masks(o, h, l, c)
+    sig = talib_signals(o, h, l, c)
+    for i in range(len(c)):
+        body = abs(c[i] - o[i])
+        rng = max(h[i] - l[i], 1e-12)
+        uw, lw = h[i] - max(o[i], c[i]), min(o[i], c[i]) - l[i]
+        covers = i > 0 and min(o[i], c[i]) <= min(o[i - 1], c[i - 1]) and max(o[i], c[i]) >= max(o[i - 1], c[i - 1])
+        assert masks[("engulfing", "bullish")][i] == ((covers and c[i] > o[i]) or sig["engulfing"][i] > 0)
+        assert masks[("engulfing", "bearish")][i] == ((covers and c[i] < o[i]) or sig["engulfing"][i] < 0)
+        hammer = lw >= 2.5 * body and uw <= 0.35 * body and body / rng <= 0.35
+        assert masks[("hammer", "bullish")][i] == (hammer or sig["hammer"][i] != 0)
+        doji = body / rng <= 0.08 or (sig["doji"][i] != 0 and body / rng <= 0.12)
+        assert masks[("doji", "neutral")][i] == doji
+
+
+def test_score_series_matches_sliding_frames():
+    o, h, l, c = _ohlc()
+    series = pattern_score_series(o, h, l, c)
+    masks = pattern_masks(o, h, l, c)
+    for t in range(len(c)):
+        frame = {k: v[:t + 1] for k, v in masks.items()}
+        patterns = collect_patterns(frame, t + 1)
+        score = resolve_patterns(patterns)[1] if patterns else 0.0
+        assert series[t] == score
+
+
+def test_resolve_keeps_freshest_direction_per_type():
+    patterns = [
+        {"type": "engulfing", "direction": "bullish", "index": 30, "quality": 4.0},
+        {"type": "doji", "direction": "neutral", "index": 31, "quality": 1.2},
+        {"type": "engulfing", "direction": "bearish", "index": 35, "quality": 6.5},
+    ]
+    resolved, score = resolve_patterns(patterns)
+    assert [(p["type"], p["direction"]) for p in resolved] == [("engulfing", "bearish"), ("doji", "neutral")]
+    assert score == 7.7
+
+
+def test_strongest_talib_pattern_follows_priority():
+    o, h, l, c = _ohlc()
+    sig = talib_signals(o, h, l, c)
+    got = strongest_talib_pattern(o, h, l, c)
+    for i, label in enumerate(got):
+        expected = "none"
+        for name in ("engulfing", "hammer", "shooting_star", "morning_star", "evening_star", "doji"):
+            if sig[name][i] != 0:
+                expected = f"{name}_{'bull' if sig[name][i] > 0 else 'bear'}"
+                break
+        assert label == expected
@@ -1,6 +1,18 @@
 from __future__ import annotations
 
+import pytest
+
 from ai import check_trade_conditions as ctc
+from utils.rejection_store import RejectionStore
+
+
+@pytest.fixture(autouse=True)
+def _rejection_store(monkeypatch):
+    store = RejectionStore(":memory:")
+    monkeypatch.setattr(ctc, "get_rejection_store", lambda: store)
+    ctc._REJ_DEDUP.clear()
+    yield store
+    store.close()
 
 
 def test_evaluate_long_with_custom_logic(monkeypatch):
@@ -49,3 +61,124 @@ def test_evaluate_long_with_custom_logic(monkeypatch):
 
     both = ctc.evaluate_both({"rsi_trend": "down", "symbol": "BTCUSDT"})
     assert both["decision"] in {"LONG", "SHORT", "SKIP"}
+
+
+def test_custom_rules_hot_reload_on_mtime_change(monkeypatch, tmp_path):
+    import json
+    import os
+
+    path = tmp_path / "custom_conditions.json"
+    path.write_text(json.dumps({"long": {"core": [["rsi_trend", "up"]], "threshold": 1.0}}))
+    monkeypatch.setattr(ctc, "CUSTOM_CONDITIONS_PATH", str(path))
+    monkeypatch.setattr(ctc, "CUSTOM_RELOAD_CHECK_SEC", 0.0)
+    monkeypatch.setitem(ctc._COMPILED, "mtime", None)
+    monkeypatch.setattr(ctc, "CUSTOM_RULES", ctc.CUSTOM_RULES)
+
+    first = ctc.get_compiled_rules()
+    assert first["long"].threshold == 1.0
+    assert first["short"] is None
+    assert ctc.get_compiled_rules() is first  # файл не змінювався → без перекомпіляції
+
+    path.write_text(json.dumps({"long": {"core": [["rsi_trend", "up"]], "threshold": 7.0}}))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    assert ctc.get_compiled_rules()["long"].threshold == 7.0
+
+
+def test_invalid_custom_rules_file_keeps_previous_rules_and_retries(monkeypatch, tmp_path):
+    import json
+    import os
+
+    path = tmp_path / "custom_conditions.json"
+    path.write_text(json.dumps({"long": {"core": [["rsi_trend", "up"]], "threshold": 3.0}}))
+    monkeypatch.setattr(ctc, "CUSTOM_CONDITIONS_PATH", str(path))
+    monkeypatch.setattr(ctc, "CUSTOM_RELOAD_CHECK_SEC", 0.0)
+    monkeypatch.setitem(ctc._COMPILED, "mtime", None)
+    monkeypatch.setattr(ctc, "CUSTOM_RULES", ctc.CUSTOM_RULES)
+    errors = []
+    monkeypatch.setattr(ctc, "log_error", errors.append)
+    assert ctc.get_compiled_rules()["long"].threshold == 3.0
+
+    path.write_text('{"long": {"core": [["rsi_trend", ')  # записаний наполовину
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    assert ctc.get_compiled_rules()["long"].threshold == 3.0
+    assert len(errors) == 1
+
+    path.write_text(json.dumps({"long": {"core": [["rsi_trend", "up"]], "threshold": 4.0}}))
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))  # той самий mtime, що й у битого файлу
+    assert ctc.get_compiled_rules()["long"].threshold == 4.0
+
+
+def test_evaluate_batch_ranks_and_logs_once(monkeypatch, _rejection_store):
+    writes = []
+
+    class _Writer:
+        def write(self, path, text, max_lines=None, keep_lines=None):
+            writes.append(text)
+
+    monkeypatch.setattr(ctc, "get_log_writer", lambda: _Writer())
+    monkeypatch.setattr(ctc, "ENABLE_REJECTION_LOG", True)
+    monkeypatch.setitem(ctc.ANTI_FALSE_OPEN, "min_pair_hits_long", 0)
+    monkeypatch.setitem(ctc.ANTI_FALSE_OPEN, "min_pair_hits_short", 0)
+    monkeypatch.setattr(ctc, "MIN_BB_WIDTH", 0.0)
+
+    base = {"bars_in_state": 2, "atr_percent": 1.0, "bollinger_width": 1.0, "bar_closed": True}
+    records = [
+        {**base, "symbol": "AAAUSDT", "rsi_trend": "neutral"},
+        {**base, "symbol": "BBBUSDT", "rsi_trend": "up", "macd_crossed": "bullish_cross",
+         "macd_hist_direction": "up", "microtrend_5m": "bullish", "microtrend_1m": "bullish"},
+        {**base, "symbol": "CCCUSDT", "rsi_trend": "down", "macd_crossed": "bearish_cross",
+         "macd_hist_direction": "down", "microtrend_5m": "bearish"},
+    ]
+    ranked = ctc.evaluate_batch(records)
+
+    assert [r["rank"] for r in ranked] == [1, 2, 3]
+    assert ranked[0]["symbol"] == "BBBUSDT" and ranked[0]["decision"] == "LONG"
+    assert ranked[-1]["decision"] == "SKIP"
+    for row in ranked:
+        single = ctc.evaluate_both(records[row["index"]])
+        assert row["long"] == single["long"] and row["short"] == single["short"]
+        assert row["decision"] == single["decision"]
+
+    # усі відмови батчу — один запис у лог-писар
+    batch_lines = writes[0].split("\n")
+    assert len(batch_lines) == sum(not r[s]["allow"] for r in ranked for s in ("long", "short"))
+
+    # ті самі відмови — у сховищі з кодами причин і порогом
+    assert _rejection_store.count() == len(batch_lines)
+    codes = {r["code"] for r in _rejection_store.top_reasons(symbol="AAAUSDT")}
+    assert "below_threshold" in codes
+
+
+def test_decision_batch_matches_single_side_checks(monkeypatch):
+    import json
+
+    from ai import decision
+
+    writes = []
+
+    class _Writer:
+        def write(self, path, text, max_lines=None, keep_lines=None):
+            writes.append(text)
+
+    monkeypatch.setattr(ctc, "get_log_writer", lambda: _Writer())
+    monkeypatch.setattr(ctc, "ENABLE_REJECTION_LOG", True)
+    monkeypatch.setattr(ctc, "MIN_BB_WIDTH", 0.0)
+
+    base = {"bars_in_state": 2, "atr_percent": 1.0, "bollinger_width": 1.0, "bar_closed": True}
+    items = [
+        ({**base, "symbol": "AAAUSDT", "rsi_trend": "neutral"}, "LONG"),
+        ({**base, "symbol": "BBBUSDT", "rsi_trend": "up", "macd_crossed": "bullish_cross"}, "SHORT"),
+    ]
+    results = decision.check_trade_conditions_batch(items)
+    # у лог відмов — лише маршрутизована сторона кожного символу, одним записом
+    assert len(writes) == 1
+    logged = [json.loads(line) for line in writes[0].split("\n")]
+    assert {(e["symbol"], e["side"]) for e in logged} <= {("AAAUSDT", "LONG"), ("BBBUSDT", "SHORT")}
+    assert len(logged) == sum(r["open_trade"] is None for r in results)
+
+    monkeypatch.setattr(ctc, "ENABLE_REJECTION_LOG", False)
+    assert results[0] == decision.check_trade_conditions_long(items[0][0])
+    assert results[1] == decision.check_trade_conditions_short(items[1][0])
+    assert decision.check_trade_conditions_batch([]) == []
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from utils.eligibility import EligibilityIndex
+
+
+def test_blocks_expire_and_persist_write_through(tmp_path):
+    path = str(tmp_path / "eligibility.json")
+    idx = EligibilityIndex(path)
+    idx.block("AAAUSDT", "cooldown", until=1_000.0)
+    idx.block("BBBUSDT", "blacklist", ttl=3600)
+    idx.block("CCCUSDT", "manual", ttl=3600)           # не persisted
+
+    assert idx.check("AAAUSDT", now=999.0) == (False, "cooldown")
+    assert idx.check("AAAUSDT", now=1_001.0) == (True, None)
+    assert idx.check("BBBUSDT") == (False, "blacklist")
+    assert idx.check("CCCUSDT") == (False, "manual")
+
+    warm = EligibilityIndex(path)
+    assert warm.check("BBBUSDT") == (False, "blacklist")
+    assert warm.check("CCCUSDT") == (True, None)
+    assert warm.blocked_until("AAAUSDT", "cooldown") is None  # прострочене не завантажується
+
+    warm.unblock("BBBUSDT", "blacklist")
+    assert EligibilityIndex(path).check("BBBUSDT") == (True, None)
+
+
+def test_open_trades_are_synced_from_source_at_most_every_n_sec():
+    calls = []
+    open_now = {"ETHUSDT"}
+
+    def source():
+        calls.append(1)
+        return set(open_now)
+
+    idx = EligibilityIndex(open_symbols_source=source, open_sync_sec=5.0)
+    assert idx.check("ETHUSDT", now=100.0) == (False, "open_trade")
+    open_now.clear()
+    assert idx.check("ETHUSDT", now=102.0) == (False, "open_trade")
+    assert len(calls) == 1
+    assert idx.check("ETHUSDT", now=106.0) == (True, None)
+    assert len(calls) == 2
+
+    idx.mark_open("SOLUSDT")
+    assert idx.check("SOLUSDT", now=107.0) == (False, "open_trade")
+
+
+def test_opening_guard_and_risk_flags_are_cached():
+    checked = []
+
+    def risk(symbol):
+        checked.append(symbol)
+        return {"risky": symbol == "NEWUSDT"}
+
+    idx = EligibilityIndex(risk_check=risk, risk_ttl=60)
+    assert idx.begin_opening("XRPUSDT") is True
+    assert idx.begin_opening("XRPUSDT") is False
+    assert idx.check("XRPUSDT") == (False, "opening")
+    idx.end_opening("XRPUSDT")
+
+    eligible, skipped = idx.filter(["XRPUSDT", "NEWUSDT", "XRPUSDT"])
+    assert eligible == ["XRPUSDT", "XRPUSDT"] and skipped == {"NEWUSDT": "risky"}
+    assert checked == ["XRPUSDT", "NEWUSDT"]
+
+
+def test_legacy_cooldown_and_blacklist_files_are_imported(tmp_path):
+    import json
+    import time
+    from datetime import datetime, timedelta
+
+    cooldown = tmp_path / "cooldown_success.json"
+    blacklist = tmp_path / "loss_blacklist.json"
+    soon = (datetime.now() + timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M:%S")
+    past = (datetime.now() - timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M:%S")
+    cooldown.write_text(json.dumps({"AAAUSDT": soon, "OLDUSDT": past}))
+    blacklist.write_text(json.dumps({"BBBUSDT": time.time() - 3600, "DEADUSDT": time.time() - 5 * 3600}))
+
+    path = str(tmp_path / "eligibility.json")
+    idx = EligibilityIndex(path)
+    assert idx.import_legacy(str(cooldown), str(blacklist), blacklist_ttl=4 * 3600) == 2
+    assert idx.check("AAAUSDT") == (False, "cooldown")
+    assert idx.check("BBBUSDT") == (False, "blacklist")
+    assert idx.check("OLDUSDT") == (True, None) and idx.check("DEADUSDT") == (True, None)
+    assert EligibilityIndex(path).check("BBBUSDT") == (False, "blacklist")  # перенесене збережено
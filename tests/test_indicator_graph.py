@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("talib")
+ta = pytest.importorskip("ta")
+
+import analysis.indicators as ind
+from utils.ohlcv import OHLCV
+
+
+def _frame(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(np.arange(n) * 900_000, unit="ms"),
+        "open": close, "high": close + 0.3, "low": close - 0.3, "close": close, "volume": 1.0,
+    })
+
+
+def test_shared_series_are_computed_once(monkeypatch):
+    df = _frame()
+    fetches = []
+
+    def fake_fetch(symbol, interval="1h", limit=200, category=None):
+        fetches.append((interval, limit))
+        return df.tail(limit).reset_index(drop=True)
+
+    monkeypatch.setattr(ind, "get_ohlcv_bybit", lambda *a, **k: OHLCV.from_dataframe(fake_fetch(*a, **k)))
+    monkeypatch.setattr(ind, "_GRAPHS", {})
+
+    g1 = ind.get_indicator_graph("BTCUSDT", "15m", needs=("sma20", "std20"))
+    computed = g1.computed
+    g2 = ind.get_indicator_graph("BTCUSDT", "15", needs=("sma20", "std20", "bbands20"))
+
+    assert g1 is g2                      # той самий бар → той самий граф ("15m" == "15")
+    assert g2.computed == computed + 1   # bbands20 перевикористав sma20/std20
+    assert fetches == [("15", 300), ("15", 300)]
+
+
+def test_rsi_matches_ta():
+    df = _frame()
+    g = ind.IndicatorGraph(df)
+    expected = ta.momentum.rsi(df["close"], window=14)
+    assert np.allclose(g.get("rsi14"), expected, equal_nan=True)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import time
+
+import pandas as pd
+
+from utils.kline_store import KlineStore
+
+
+def _make_df(rows: int, interval_min: int = 15, last_open: float | None = None) -> pd.DataFrame:
+    last_open = time.time() if last_open is None else last_open
+    start = last_open - (rows - 1) * interval_min * 60
+    ts = pd.to_datetime([(start + i * interval_min * 60) * 1000 for i in range(rows)], unit="ms")
+    close = [100.0 + i for i in range(rows)]
+    return pd.DataFrame({
+        "timestamp": ts,
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": [1.0] * rows,
+    })
+
+
+class _Fetcher:
+    def __init__(self, **kwargs):
+        self.calls = []
+        self.kwargs = kwargs
+
+    def __call__(self, symbol, interval, limit, category, start=None):
+        if start is not None:
+            return None  # інкрементальне дотягування не підтримується → повний fetch
+        self.calls.append((symbol, interval, limit, category))
+        return _make_df(limit, **self.kwargs)
+
+
+def test_superset_fetch_serves_smaller_limits():
+    fetcher = _Fetcher()
+    store = KlineStore(fetcher, forming_ttl=60)
+
+    big = store.get("BTCUSDT", "15", 300, "linear")
+    small = store.get("BTCUSDT", "15", 150, "linear")
+
+    assert len(big) == 300
+    assert len(small) == 150
+    assert small["close"].iloc[-1] == big["close"].iloc[-1]
+    assert len(fetcher.calls) == 1
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_larger_limit_refetches_and_keys_are_separate():
+    fetcher = _Fetcher()
+    store = KlineStore(fetcher, forming_ttl=60)
+
+    store.get("BTCUSDT", "15", 100, "linear")
+    store.get("BTCUSDT", "15", 200, "linear")
+    store.get("BTCUSDT", "5", 100, "linear")
+
+    assert [c[2] for c in fetcher.calls] == [100, 200, 100]
+    assert store.stats()["entries"] == 2
+
+
+def test_closed_bar_triggers_refresh():
+    # останній бар відкрився 20 хв тому → 15m бар вже закрився
+    fetcher = _Fetcher(last_open=time.time() - 20 * 60)
+    store = KlineStore(fetcher, forming_ttl=60)
+
+    store.get("ETHUSDT", "15", 50, "linear")
+    store.get("ETHUSDT", "15", 50, "linear")
+
+    assert len(fetcher.calls) == 2
+    assert store.stats()["hits"] == 0
+
+
+def test_served_frames_are_independent_copies():
+    store = KlineStore(_Fetcher(), forming_ttl=60)
+
+    first = store.get("BTCUSDT", "15", 10, "linear")
+    first["ema"] = 1.0
+    second = store.get("BTCUSDT", "15", 10, "linear")
+
+    assert "ema" not in second.columns
+
+
+def test_incremental_refresh_fetches_only_new_bars():
+    bar = 60
+    now = time.time()
+    base_open = now - now % bar - 3 * bar  # формуючий бар у буфері відкрився 3 хв тому
+    calls = []
+
+    def fetcher(symbol, interval, limit, category, start=None):
+        calls.append((limit, start))
+        if start is None:
+            return _make_df(limit, interval_min=1, last_open=base_open)
+        # біржа віддає бари від start до поточного формуючого
+        df = _make_df(limit - 1, interval_min=1, last_open=base_open + (limit - 2) * bar)
+        df["close"] = 500.0
+        return df
+
+    store = KlineStore(fetcher, forming_ttl=60)
+    first = store.get("BTCUSDT", "1", 200, "linear")
+    refreshed = store.get("BTCUSDT", "1", 200, "linear")
+
+    assert calls[0] == (200, None)
+    assert calls[1][1] == int(base_open * 1000)
+    assert calls[1][0] < 10
+    assert len(refreshed) == 200
+    assert refreshed["timestamp"].is_unique
+    assert refreshed["timestamp"].iloc[-1] > first["timestamp"].iloc[-1]
+    # формуючий бар перезаписано, закриті бари збережено
+    assert refreshed["close"].iloc[-1] == 500.0
+    assert refreshed["close"].iloc[0] == first["close"].iloc[3]
+    assert store.stats()["incremental"] == 1
+
+
+class _Exchange:
+    """Біржа з 1m-серією до поточного (формуючого) бару; старші інтервали — агрегати тих самих барів."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def minute_bars(self):
+        end = int(self.clock["now"] // 60) * 60_000
+        ts = list(range(end - 7000 * 60_000, end + 1, 60_000))
+
+        def price(minute):
+            return 100.0 + minute % 37 + (minute % 5) * 0.25
+
+        df = pd.DataFrame({
+            "timestamp": pd.to_datetime(ts, unit="ms"),
+            "open": [price(t // 60_000 - 1) for t in ts],
+            "close": [price(t // 60_000) for t in ts],
+        })
+        df["high"] = df[["open", "close"]].max(axis=1) + 0.5
+        df["low"] = df[["open", "close"]].min(axis=1) - 0.5
+        df["volume"] = [1.0 + (t // 60_000) % 3 for t in ts]
+        return df
+
+    def bars(self, interval):
+        df = self.minute_bars()
+        if interval == "1":
+            return df
+        return (df.set_index("timestamp").resample(f"{interval}min")
+                .agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+                .reset_index())
+
+    def __call__(self, symbol, interval, limit, category, start=None):
+        self.calls.append((interval, start))
+        df = self.bars(interval)
+        if start is not None:
+            df = df[df["timestamp"] >= pd.to_datetime(start, unit="ms")]
+        return df.tail(limit).reset_index(drop=True)
+
+
+def test_higher_timeframes_are_built_from_1m(monkeypatch):
+    import utils.kline_store as ks
+
+    clock = {"now": 1_700_000_000 // 3600 * 3600 + 7 * 60 + 20}
+    monkeypatch.setattr(ks.time, "time", lambda: clock["now"])
+    exchange = _Exchange(clock)
+    store = KlineStore(exchange, forming_ttl=5, resample_base="1")
+
+    for step in (0, 20 * 60, 3 * 60, 41 * 60):
+        clock["now"] += step
+        for interval in ("5", "15", "60"):
+            got = store.get("BTCUSDT", interval, 100, "linear")
+            expected = exchange.bars(interval).tail(100).reset_index(drop=True)
+            pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+
+    # з біржі старші інтервали тягнулись лише для backfill
+    assert [c for c in exchange.calls if c[0] != "1"] == [("5", None), ("15", None), ("60", None)]
+    assert store.stats()["resampled"] == 9
+
+
+def test_weekly_interval_is_not_resampled():
+    store = KlineStore(_Fetcher(), resample_base="1")
+    assert store._can_resample("60")
+    assert store._can_resample("D")
+    assert not store._can_resample("W")
+    assert not store._can_resample("1")
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import statistics
+
+import numpy as np
+import pytest
+
+from analysis.levels import SwingCache, cluster_levels, swing_points
+
+
+def _loop_swings(s, left, right, is_low):
+    idxs = []
+    for i in range(left, len(s) - right):
+        window = s[i - left:i + right + 1]
+        val = s[i]
+        if is_low:
+            if val == window.min() and (window[:left] > val).all() and (window[-right:] > val).all():
+                idxs.append(i)
+        else:
+            if val == window.max() and (window[:left] < val).all() and (window[-right:] < val).all():
+                idxs.append(i)
+    return idxs
+
+
+def _loop_clusters(levels, tol):
+    if not levels:
+        return []
+    levels = sorted(levels)
+    clusters = [[levels[0]]]
+    for v in levels[1:]:
+        if abs(v - clusters[-1][-1]) <= tol:
+            clusters[-1].append(v)
+        else:
+            clusters.append([v])
+    return [float(statistics.median(c)) for c in clusters]
+
+
+@pytest.mark.parametrize("left,right", [(1, 1), (2, 2), (3, 1), (1, 4)])
+def test_swing_points_match_loop(left, right):
+    rng = np.random.default_rng(left * 10 + right)
+    s = np.round(100 + np.cumsum(rng.normal(0, 1, 400)), 1)  # округлення → є рівні значення
+    assert swing_points(s, left, right, "low").tolist() == _loop_swings(s, left, right, True)
+    assert swing_points(s, left, right, "high").tolist() == _loop_swings(s, left, right, False)
+
+
+def test_cluster_levels_match_loop():
+    rng = np.random.default_rng(5)
+    levels = np.round(rng.uniform(90, 110, 60), 2).tolist()
+    for tol in (0.0, 0.05, 0.4, 2.0):
+        assert cluster_levels(levels, tol) == _loop_clusters(levels, tol)
+    assert cluster_levels([], 1.0) == []
+
+
+def test_cache_extends_only_with_new_bars():
+    rng = np.random.default_rng(11)
+    total = 500
+    ts = np.arange(total) * 900
+    lows = 100 + np.cumsum(rng.normal(0, 1, total))
+    highs = lows + 1.0
+    cache = SwingCache(left=2, right=2)
+
+    for end in range(120, total):
+        start = end - 120
+        lo, hi = lows[start:end].copy(), highs[start:end].copy()
+        for forming in (lo[-1], lo[-1] - 3.0):  # той самий бар змінюється, поки формується
+            lo[-1], hi[-1] = forming, forming + 1.0
+            got_lo, got_hi = cache.update("BTCUSDT", ts[start:end], lo, hi)
+            assert got_lo.tolist() == swing_points(lo, 2, 2, "low").tolist()
+            assert got_hi.tolist() == swing_points(hi, 2, 2, "high").tolist()
+
+    # після warm-up кожен новий бар додає лише кілька кандидатів, а не всю історію
+    assert cache.scanned < 120 + (total - 120) * 2 * 4
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from utils.log_writer import AppendLogWriter
+
+
+def _lines(path):
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_background_writes_are_appended_in_order(tmp_path):
+    path = tmp_path / "logs" / "trades.log"
+    writer = AppendLogWriter(max_lines=1000)
+    for i in range(50):
+        writer.write(str(path), f"line {i}")
+    writer.flush()
+
+    assert _lines(path) == [f"line {i}" for i in range(50)]
+    assert writer.stats()["written"] == 50
+
+
+def test_rotation_keeps_last_lines(tmp_path):
+    path = tmp_path / "debug.log"
+    path.write_text("".join(f"old {i}\n" for i in range(8)), encoding="utf-8")
+    writer = AppendLogWriter(max_lines=10, background=False)
+
+    for i in range(5):
+        writer.write(str(path), f"new {i}")
+
+    # 8 старих + 3 нових = 11 > 10 → лишаються останні 5, далі дописуються ще 2
+    assert _lines(path) == ["old 6", "old 7", "new 0", "new 1", "new 2", "new 3", "new 4"]
+    assert writer.rotations == 1
+
+
+def test_per_file_limit(tmp_path):
+    path = tmp_path / "rejections.jsonl"
+    writer = AppendLogWriter(max_lines=1000, background=False)
+    for i in range(7):
+        writer.write(str(path), str(i), max_lines=4)
+
+    assert len(_lines(path)) <= 4
+    assert _lines(path)[-1] == "6"
+
+
+def test_disabled_level_skips_formatting():
+    from utils import logger
+
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "payload"
+
+    logger.set_log_level("INFO")
+    try:
+        logger.log_debug(expensive)
+        logger.log_message("🔍 [DEBUG] %s", expensive)  # тег [DEBUG] → DEBUG-рівень
+        assert calls == []
+        assert not logger.is_debug_enabled()
+        assert logger.is_log_enabled("ERROR")
+    finally:
+        logger.set_log_level("DEBUG")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pandas as pd
+
+from trading.price_engine import PriceEngine
+from utils.kline_store import KlineStore
+from utils.market_stream import ReplayMarketStream, kline_callback, ticker_callback
+from utils.ticker_service import TickerService
+
+
+class _NoRest:
+    calls = 0
+
+    def get_tickers(self, **kwargs):
+        self.calls += 1
+        return {"retCode": 0, "result": {"list": []}}
+
+
+def _ticker(symbol, ts, **fields):
+    return {"topic": f"tickers.{symbol}", "type": "delta", "ts": ts, "data": {"symbol": symbol, **fields}}
+
+
+def test_replay_feeds_ticker_service_without_rest(tmp_path):
+    path = tmp_path / "replay.jsonl"
+    messages = [
+        _ticker("BTCUSDT", 1, lastPrice="100", markPrice="100.1", turnover24h="5000"),
+        _ticker("BTCUSDT", 2, lastPrice="101"),  # delta лише з ціною
+    ]
+    path.write_text("\n".join(json.dumps(m) for m in messages), encoding="utf-8")
+
+    client = _NoRest()
+    svc = TickerService(client, max_age=60)
+    stream = ReplayMarketStream(path=str(path), speed=0)
+    stream.ticker_stream(["BTCUSDT"], ticker_callback(svc))
+    stream.play()
+
+    assert svc.get_last_price("BTCUSDT") == 101.0
+    assert svc.get_mark_price("BTCUSDT") == 100.1
+    assert svc.get_turnover_24h("BTCUSDT") == 5000.0
+    assert client.calls == 0
+
+
+def test_kline_push_updates_cached_buffer():
+    now = time.time()
+    last_open = now - now % 60
+    calls = []
+
+    def fetcher(symbol, interval, limit, category, start=None):
+        calls.append(start)
+        ts = pd.to_datetime([(last_open - (limit - 1 - i) * 60) * 1000 for i in range(limit)], unit="ms")
+        return pd.DataFrame({"timestamp": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0})
+
+    store = KlineStore(fetcher, forming_ttl=60)
+    store.get("BTCUSDT", "1", 50, "linear")
+
+    stream = ReplayMarketStream()
+    stream.kline_stream("1", "BTCUSDT", kline_callback(store))
+    bar = {"start": int(last_open * 1000), "open": "1", "high": "2", "low": "1", "close": "1.5", "volume": "3", "confirm": False}
+    stream.publish({"topic": "kline.1.BTCUSDT", "type": "snapshot", "ts": 1, "data": [bar]})
+    bar_next = {**bar, "start": int((last_open + 60) * 1000), "close": "1.7"}
+    stream.publish({"topic": "kline.1.BTCUSDT", "type": "snapshot", "ts": 2, "data": [bar_next]})
+
+    df = store.get("BTCUSDT", "1", 50, "linear")
+    assert len(calls) == 1
+    assert len(df) == 50
+    assert df["close"].iloc[-2] == 1.5
+    assert df["close"].iloc[-1] == 1.7
+
+
+def test_price_engine_reacts_to_streamed_ticks():
+    class _Trade:
+        trade_id, symbol, closed = "t1", "ETHUSDT", False
+        crosses = []
+
+        def levels(self):
+            return [90.0], [110.0]
+
+        def track(self, price):
+            pass
+
+        def on_cross(self, price):
+            self.crosses.append(price)
+            self.closed = True
+
+        def on_timer(self):
+            pass
+
+    stream = ReplayMarketStream()
+    engine = PriceEngine(workers=1)
+    engine.attach_stream(stream)
+    trade = _Trade()
+    engine.register(trade)
+
+    stream.publish(_ticker("ETHUSDT", 1, lastPrice="100"))
+    stream.publish(_ticker("ETHUSDT", 2, lastPrice="111"))
+
+    deadline = time.time() + 2
+    while engine.has("t1") and time.time() < deadline:
+        time.sleep(0.01)
+    assert trade.crosses == [111.0]
+
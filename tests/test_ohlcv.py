@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ohlcv import OHLCV
+
+
+def _rows(n=10, start=1_700_000_000_000, step=60_000):
+    # Bybit v5 get_kline: список рядків, новіші першими
+    rows = []
+    for i in range(n):
+        p = 100.0 + i
+        rows.append([str(start + i * step), str(p), str(p + 1), str(p - 1), str(p + 0.5), "10", "1000"])
+    return rows[::-1]
+
+
+def test_from_rows_validates_once():
+    rows = _rows()
+    rows.insert(3, [rows[3][0], "1", "2", "0.5", "1.5", "1", "1"])  # дублікат часу
+    rows.append(["1700000000000", "nan", "1", "1", "1", "1", "1"])   # NaN в OHLC
+    frame = OHLCV.from_rows(rows)
+
+    assert len(frame) == 10
+    assert (np.diff(frame.timestamp) > 0).all()
+    assert frame.close[-1] == 109.5
+    assert frame.columns == ("timestamp", "open", "high", "low", "close", "volume", "turnover")
+    assert OHLCV.from_rows([]) is None
+
+
+def test_arrays_are_shared_read_only():
+    frame = OHLCV.from_rows(_rows())
+    tail = frame.tail(3)
+
+    assert np.shares_memory(tail.close, frame.close)
+    assert tail.close.flags.c_contiguous
+    with pytest.raises(ValueError):
+        frame.close[0] = 1.0
+    with pytest.raises(ValueError):
+        tail.high[-1] = 1.0
+
+
+def test_float32_mode_halves_price_memory():
+    f64 = OHLCV.from_rows(_rows(200))
+    f32 = OHLCV.from_rows(_rows(200), dtype="float32")
+
+    assert f32.close.dtype == np.float32
+    assert f32.close.nbytes * 2 == f64.close.nbytes
+    assert np.allclose(f32.close, f64.close)
+    assert f32.to_frame()["close"].dtype == np.float64
+
+
+def test_merge_and_with_bar_replace_forming_bar():
+    frame = OHLCV.from_rows(_rows(10))
+    last = frame.last_timestamp
+
+    updated = frame.with_bar(last, 1, 2, 0.5, 1.5, 3)
+    assert len(updated) == 10 and updated.close[-1] == 1.5
+    assert frame.close[-1] == 109.5  # старий фрейм не змінюється
+
+    grown = updated.with_bar(last + 60_000, 2, 3, 1, 2.5, 4, limit=10)
+    assert len(grown) == 10
+    assert grown.timestamp[0] == frame.timestamp[1]
+    assert grown.close[-2:].tolist() == [1.5, 2.5]
+
+
+def test_dataframe_round_trip():
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime([3, 1, 2], unit="m"),
+        "open": ["1", "2", "3"], "high": [2, 3, 4], "low": [0, 1, None], "close": [1, 2, 3], "volume": 1,
+    })
+    frame = OHLCV.from_dataframe(df)
+
+    assert len(frame) == 2  # рядок з NaN у low відкинуто
+    out = frame.to_frame()
+    assert out["timestamp"].tolist() == list(pd.to_datetime([1, 3], unit="m"))
+    assert out["close"].tolist() == [2.0, 1.0]
+    out.loc[0, "close"] = 99.0  # DataFrame — окрема копія
+    assert frame.close[0] == 2.0
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from utils.positions_service import PositionsService
+
+
+def _pos(symbol, side="Buy", size="1", **extra):
+    return {"symbol": symbol, "side": side, "size": size, "avgPrice": "100", **extra}
+
+
+class _Client:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_positions(self, category, settleCoin, limit, cursor=None):
+        self.calls.append(cursor)
+        start = int(cursor or 0)
+        page = self.rows[start:start + 2]
+        nxt = str(start + 2) if start + 2 < len(self.rows) else ""
+        return {"retCode": 0, "result": {"list": page, "nextPageCursor": nxt}}
+
+
+def test_one_paginated_snapshot_serves_all_readers():
+    client = _Client([_pos("BTCUSDT"), _pos("ETHUSDT", "Sell", "2"), _pos("SOLUSDT", positionSide="LONG")])
+    svc = PositionsService(client, max_age=60)
+    version, rows = svc.snapshot()
+    assert version == 1 and len(rows) == 3 and client.calls == [None, "2"]
+
+    assert svc.size("ETHUSDT", "SHORT") == 2.0
+    assert svc.get("ETHUSDT", "LONG") is None
+    assert svc.get("BTCUSDT_1", "BUY")["avgPrice"] == "100"
+    assert svc.count_by_side("LONG") == 2 and svc.count_by_side("SHORT") == 1
+    assert [r["symbol"] for r in svc.rows("SOLUSDT")] == ["SOLUSDT"]
+    assert len(client.calls) == 2  # усі читання — з того самого знімка
+
+
+def test_empty_response_needs_confirmation_in_background_refresh():
+    client = _Client([_pos("BTCUSDT")])
+    svc = PositionsService(client, max_age=60, empty_confirmations=2)
+    svc.refresh()
+    client.rows = []
+    svc.refresh()
+    assert svc.size("BTCUSDT", "LONG") == 1.0 and svc.version == 1
+    svc.refresh()
+    assert svc.version == 2 and svc.rows() == []
+
+
+def test_refresh_now_after_own_close_publishes_empty_immediately():
+    client = _Client([_pos("BTCUSDT")])
+    svc = PositionsService(client, max_age=60, empty_confirmations=2)
+    svc.refresh()
+    client.rows = []
+    assert svc.refresh_now() == 1  # після відкриття порожня відповідь ще потребує підтвердження
+    assert svc.refresh_now(trust_empty=True) == 2  # закрили останню позицію власним ордером
+    assert svc.size("BTCUSDT", "LONG") == 0.0 and svc.rows() == []
+
+
+def test_stream_updates_patch_the_snapshot():
+    svc = PositionsService(_Client([_pos("BTCUSDT"), _pos("XRPUSDT", "Sell")]), max_age=60)
+    svc.refresh()
+    svc.apply_position_update([
+        {"symbol": "BTCUSDT", "side": "Buy", "size": "3"},
+        {"symbol": "XRPUSDT", "side": "Sell", "size": "0"},
+    ])
+    assert svc.version == 2
+    assert svc.size("BTCUSDT", "LONG") == 3.0
+    assert svc.get("BTCUSDT", "LONG")["avgPrice"] == "100"
+    assert svc.get("XRPUSDT", "SHORT") is None
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+
+from trading.price_engine import LevelBook, PriceEngine
+
+
+class _Trade:
+    def __init__(self, trade_id, symbol, dca, tp):
+        self.trade_id = trade_id
+        self.symbol = symbol
+        self.dca = dca
+        self.tp = tp
+        self.closed = False
+        self.crosses = []
+        self.last_price = None
+
+    def levels(self):
+        return [self.dca], [self.tp]  # LONG: докупка знизу, TP зверху
+
+    def track(self, price):
+        self.last_price = price
+
+    def on_cross(self, price):
+        self.crosses.append(price)
+        if price >= self.tp:
+            self.closed = True
+        else:
+            self.dca *= 0.9  # наступна сходинка
+
+    def on_timer(self):
+        pass
+
+
+def _wait(cond, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not cond():
+        time.sleep(0.01)
+    return cond()
+
+
+def test_level_book_reports_only_crossed_levels():
+    book = LevelBook()
+    book.set_levels("BTCUSDT", "a", below=[95.0], above=[110.0])
+    book.set_levels("BTCUSDT", "b", below=[90.0], above=[105.0])
+
+    assert book.crossed("BTCUSDT", 100.0) == set()
+    assert book.crossed("BTCUSDT", 94.0) == {"a"}
+    assert book.crossed("BTCUSDT", 106.0) == {"b"}
+    assert book.crossed("ETHUSDT", 1.0) == set()
+
+    book.remove("a")
+    assert book.crossed("BTCUSDT", 80.0) == {"b"}
+
+
+def test_engine_triggers_handlers_only_on_crossings():
+    engine = PriceEngine(workers=1, retrigger_sec=0.0)
+    trade = _Trade("t1", "BTCUSDT", dca=95.0, tp=110.0)
+    engine.register(trade)
+
+    for px in (100.0, 99.0, 101.0):
+        engine.on_price("BTCUSDT", px)
+    assert trade.last_price == 101.0
+    assert trade.crosses == []
+
+    engine.on_price("BTCUSDT", 94.0)
+    assert _wait(lambda: trade.crosses == [94.0] and not engine.stats()["busy"])
+    # рівень докупки зсунувся → 94 більше не тригерить
+    engine.on_price("BTCUSDT", 94.0)
+    time.sleep(0.05)
+    assert trade.crosses == [94.0]
+
+    engine.on_price("BTCUSDT", 111.0)
+    assert _wait(lambda: not engine.has("t1"))
+    assert trade.closed
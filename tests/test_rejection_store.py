@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from utils.rejection_store import RejectionStore, TTLDedupIndex, reason_codes
+
+
+def _row(ts, symbol="BTCUSDT", side="LONG", score=5.0, threshold=6.0, codes=("below_threshold",)):
+    return {"ts": ts, "symbol": symbol, "side": side, "score": score, "threshold": threshold,
+            "codes": list(codes), "summary": "", "evidence": {"rsi": 50}}
+
+
+def test_reason_codes_strip_parameters():
+    reasons = [
+        "long.custom.core hits=1 → [('rsi_trend', 'up')]",
+        "anti: atr_out(0.2 not in 0.35-7.0)",
+        "anti: hysteresis<1",
+        "align: 1m against",
+        "anti: hysteresis<2",
+    ]
+    assert reason_codes(reasons, score=4.0, threshold=6.0) == [
+        "below_threshold", "anti:atr_out", "anti:hysteresis", "align",
+    ]
+    assert reason_codes(["anti: bb_width<0.5"], score=9.0, threshold=6.0) == ["anti:bb_width"]
+
+
+def test_ttl_index_expires_and_stays_bounded():
+    idx = TTLDedupIndex(ttl=10, max_keys=3)
+    assert idx.seen(("A", "LONG"), (1.0, "x"), now=0) is False
+    assert idx.seen(("A", "LONG"), (1.0, "x"), now=5) is True
+    assert idx.seen(("A", "LONG"), (2.0, "x"), now=6) is False   # інший підпис
+    assert idx.seen(("A", "LONG"), (2.0, "x"), now=17) is False  # вікно минуло
+    for i in range(10):
+        idx.seen((f"S{i}", "LONG"), (0.0, ""), now=20)
+    assert len(idx) == 3
+    idx.seen(("Z", "SHORT"), (0.0, ""), now=100)                 # усі старі прострочені
+    assert len(idx) == 1
+
+
+def test_top_reasons_and_score_distribution():
+    store = RejectionStore(":memory:")
+    now = 1_000_000.0
+    store.append_many([
+        _row(now - 10, score=5.5, codes=("below_threshold", "anti:hysteresis")),
+        _row(now - 20, score=4.0, codes=("below_threshold",)),
+        _row(now - 30, score=1.0, codes=("below_threshold", "anti:atr_out")),
+        _row(now - 40, symbol="ETHUSDT", score=5.9, codes=("anti:hysteresis",)),
+        _row(now - 90_000, score=5.8),                                  # поза вікном 24 год
+    ])
+    top = store.top_reasons(symbol="BTCUSDT", now=now)
+    assert top[0] == {"symbol": "BTCUSDT", "code": "below_threshold", "count": 3}
+    assert {r["code"] for r in top} == {"below_threshold", "anti:hysteresis", "anti:atr_out"}
+    assert {r["symbol"] for r in store.top_reasons(now=now)} == {"BTCUSDT", "ETHUSDT"}
+
+    dist = store.score_distribution(band=3.0, bins=3, now=now)
+    assert dist["threshold"] == 6.0
+    assert dist["total"] == 4 and dist["near"] == 3
+    assert dist["counts"] == [0, 1, 2]
+    store.close()
+
+
+def test_prune_drops_old_rows_and_reason_links():
+    store = RejectionStore(":memory:", retention_sec=100)
+    store.append_many([_row(10.0), _row(500.0)])
+    assert store.prune(older_than=100.0) == 1
+    assert store.count(window_sec=1e9, now=1000.0) == 1
+    links = store._conn.execute("SELECT COUNT(*) FROM rejection_reasons").fetchone()[0]
+    assert links == 1
+    store.close()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+
+from utils.request_scheduler import (
+    LANE_ORDER, LANE_POSITION, LANE_SCAN, RequestScheduler, ScheduledClient, get_request_scheduler_stats, request_lane,
+)
+
+
+def test_group_bucket_paces_requests():
+    sched = RequestScheduler({"market": {"rate": 20, "burst": 2}})
+    waits = [sched.acquire("market", LANE_SCAN) for _ in range(3)]
+    assert waits[0] < 0.01 and waits[1] < 0.01
+    assert 0.03 <= waits[2] < 0.5
+    stats = sched.stats()
+    assert stats["lanes"]["scan"]["requests"] == 3 and stats["lanes"]["scan"]["queued"] == 0
+
+
+def test_global_reserve_keeps_headroom_for_orders():
+    sched = RequestScheduler({"global": {"rate": 5, "burst": 5}}, lane_reserve={LANE_SCAN: 3})
+    sched.acquire("market", LANE_SCAN)
+    sched.acquire("market", LANE_SCAN)
+    assert sched.acquire("market", LANE_SCAN) >= 0.15  # скан упирається в резерв
+    assert sched.acquire("order", LANE_ORDER) < 0.01   # ордер проходить одразу
+
+
+def test_max_wait_never_bypasses_the_limiter():
+    sched = RequestScheduler({"market": {"rate": 5, "burst": 1}}, max_wait=0.05)
+    sched.acquire("market", LANE_SCAN)
+    assert sched.acquire("market", LANE_SCAN) >= 0.15  # чекає на токен, а не йде без слота
+    assert sched._bucket("market").tokens >= -1e-9
+    assert sched.stats()["lanes"]["scan"]["slow"] == 1
+
+
+def test_lane_override_only_raises_priority():
+    sched = RequestScheduler()
+    with sched.lane(LANE_POSITION):
+        assert sched.route("get_kline") == ("market", LANE_POSITION)
+        assert sched.route("place_order") == ("order", LANE_ORDER)
+    assert sched.route("get_kline") == ("market", LANE_SCAN)
+
+
+def test_low_quota_headers_and_rate_limit_code_back_off_the_group():
+    sched = RequestScheduler()
+    reset_ms = (time.time() + 0.2) * 1000
+    sched.observe("order", {"X-Bapi-Limit": "10", "X-Bapi-Limit-Status": "1",
+                            "X-Bapi-Limit-Reset-Timestamp": str(reset_ms)})
+    assert sched.acquire("order", LANE_ORDER) >= 0.1
+    assert sched.acquire("market", LANE_SCAN) < 0.01  # інші групи не чекають
+
+    sched.observe("market", ret_code=10006)
+    stats = sched.stats()["groups"]
+    assert stats["order"]["backoffs"] == 1 and stats["order"]["remaining"] == 1
+    assert stats["market"]["backoffs"] == 1 and stats["market"]["backoff_sec"] > 0
+
+
+def test_scheduled_client_unwraps_headers_and_routes_calls():
+    class _Http:
+        return_response_headers = False
+        testnet = False
+
+        def get_positions(self, **kwargs):
+            headers = {"X-Bapi-Limit": "50", "X-Bapi-Limit-Status": "49"} if self.return_response_headers else {}
+            return {"retCode": 0, "result": {"list": []}}, 0.01, headers
+
+    client = ScheduledClient(_Http(), RequestScheduler())
+    assert client.get_positions(category="linear") == {"retCode": 0, "result": {"list": []}}
+    assert client.testnet is False
+    stats = client.scheduler.stats()
+    assert stats["lanes"]["position"]["requests"] == 1
+    assert stats["groups"]["position"]["remaining"] == 49
+
+
+def test_shared_helpers_ignore_unwrapped_mock_client():
+    # MockHTTP відповідає на будь-який атрибут — без isinstance це виглядало б як планувальник
+    assert get_request_scheduler_stats() is None
+    with request_lane(LANE_POSITION):
+        pass
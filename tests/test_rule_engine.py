@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+from ai.rule_engine import RuleSet, compile_rules
+
+LOGIC = {
+    "core": [["macd_crossed", "bullish_cross"], ["rsi_trend", "up"], ["microtrend_5m", "bullish"]],
+    "pairs": [
+        [["support_position", "near_support"], ["microtrend_1m", "bullish"]],
+        [["boll_bucket", "<=30"], ["rsi_bucket", "<=30"]],
+        [["volume_category", "high"]],
+        [["bar_closed", True], ["rsi_trend", "up"]],
+    ],
+    "threshold": 5.0,
+    "weights": {"core": 3.0, "pair": 1.5, "bonus": 0.5},
+}
+
+VALUES = {
+    "macd_crossed": ["bullish_cross", "bearish_cross", "none"],
+    "rsi_trend": ["up", "down", "neutral"],
+    "microtrend_5m": ["bullish", "bearish"],
+    "microtrend_1m": ["bullish", "bearish"],
+    "support_position": ["near_support", "between"],
+    "boll_bucket": ["<=30", ">70"],
+    "rsi_bucket": ["<=30", "40-50"],
+    "volume_category": ["high", "low"],
+    "bar_closed": [True, False],
+}
+
+
+def _records(n=500, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        rec = {k: rng.choice(v) for k, v in VALUES.items() if rng.random() < 0.85}
+        rec["rsi_divergence"] = {"state": "none"}  # нехешоване значення не заважає
+        out.append(rec)
+    return out
+
+
+def _loop_score(c, logic, trend):
+    w = logic["weights"]
+    core = [(k, v) for k, v in logic["core"] if c.get(k) == v]
+    pairs = [pp for pp in logic["pairs"] if all(c.get(k) == v for k, v in pp)]
+    return w["core"] * len(core) + w["pair"] * len(pairs) + (w["bonus"] if trend else 0.0), core, pairs
+
+
+def test_single_record_matches_loop():
+    rules = RuleSet(LOGIC)
+    for i, c in enumerate(_records()):
+        trend = i % 3 == 0
+        score, core, pairs = _loop_score(c, LOGIC, trend)
+        res = rules.score("LONG", c, {"is_trend": trend})
+        assert res["score"] == score
+        assert res["_core_hits_count"] == len(core)
+        assert res["_pair_hits_count"] == len(pairs)
+        assert res["matched"][:len(core)] == [f"{k}={v}" for k, v in core]
+
+
+def test_batch_scores_match_single_records():
+    rules = RuleSet(LOGIC)
+    records = _records()
+    trend = np.arange(len(records)) % 3 == 0
+    out = rules.score_many(rules.encode_many(records), trend)
+    for i, c in enumerate(records):
+        res = rules.score("LONG", c, {"is_trend": bool(trend[i])})
+        assert out["score"][i] == res["score"]
+        assert out["pair_hits"][i] == res["_pair_hits_count"]
+
+
+def test_compile_rules_sides_and_defaults():
+    compiled = compile_rules({"long": LOGIC, "short": {}}, {"long": 9.5, "short": 9.5})
+    assert compiled["long"].threshold == 5.0
+    assert compiled["short"] is None
+    assert compile_rules("broken") == {"long": None, "short": None}
+    assert RuleSet({"core": [["rsi_trend", "up"]]}, 9.5).threshold == 9.5
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.streaming import (
+    IndicatorStream,
+    StreamingATR,
+    StreamingBollinger,
+    StreamingEMA,
+    StreamingMACD,
+    StreamingRSI,
+    StreamingStochastic,
+)
+
+
+def _ohlc(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.8, n))
+    high = close + rng.uniform(0, 1.0, n)
+    low = close - rng.uniform(0, 1.0, n)
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(np.arange(n) * 300_000, unit="ms"),
+        "open": close, "high": high, "low": low, "close": close,
+    })
+
+
+def _stream_values(ind, rows, forming=True, seed=1):
+    rng = np.random.default_rng(seed)
+    out = []
+    for args in rows:
+        if forming:
+            # бар відкрився з іншою ціною і кілька разів змінювався
+            ind.update(*[a + rng.normal(0, 0.5) for a in args], new_bar=True)
+            ind.update(*[a + rng.normal(0, 0.5) for a in args], new_bar=False)
+            value = ind.update(*args, new_bar=False)
+        else:
+            value = ind.update(*args, new_bar=True)
+        out.append(value)
+    return out
+
+
+def _close(a, b):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    assert np.array_equal(np.isnan(a), np.isnan(b))
+    assert np.allclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("forming", [False, True])
+def test_ema_and_bollinger_match_pandas(forming):
+    df = _ohlc()
+    closes = [(c,) for c in df["close"]]
+
+    _close(_stream_values(StreamingEMA(20), closes, forming), df["close"].ewm(span=20, adjust=False).mean())
+
+    bb = StreamingBollinger(20)
+    middles, stds = [], []
+    for (c,) in closes:
+        if forming:
+            bb.update(c + 1.0, new_bar=True)
+            bb.update(c, new_bar=False)
+        else:
+            bb.update(c, new_bar=True)
+        middles.append(bb.value[1])
+        stds.append(bb.std)
+    _close(middles, df["close"].rolling(20).mean())
+    _close(stds, df["close"].rolling(20).std())
+
+
+@pytest.mark.parametrize("forming", [False, True])
+def test_rsi_matches_ta(forming):
+    ta = pytest.importorskip("ta")
+    df = _ohlc()
+    got = _stream_values(StreamingRSI(14), [(c,) for c in df["close"]], forming)
+    _close(got, ta.momentum.rsi(df["close"], window=14))
+
+
+@pytest.mark.parametrize("forming", [False, True])
+def test_talib_indicators(forming):
+    talib = pytest.importorskip("talib")
+    df = _ohlc()
+    h, lo, c = df["high"].values, df["low"].values, df["close"].values
+    hlc = list(zip(h, lo, c))
+
+    _close(_stream_values(StreamingATR(14), hlc, forming), talib.ATR(h, lo, c, timeperiod=14))
+
+    macd = _stream_values(StreamingMACD(), [(x,) for x in c], forming)
+    m, s, hist = talib.MACD(c)
+    _close([v[0] for v in macd], m)
+    _close([v[1] for v in macd], s)
+    _close([v[2] for v in macd], hist)
+
+    stoch = _stream_values(StreamingStochastic(14), hlc, forming)
+    k, d = talib.STOCH(h, lo, c, fastk_period=14, slowk_period=3, slowk_matype=0, slowd_period=3, slowd_matype=0)
+    _close([v[0] for v in stoch], k)
+    _close([v[1] for v in stoch], d)
+
+    bb = _stream_values(StreamingBollinger(20), [(x,) for x in c], forming)
+    up, mid, low = talib.BBANDS(c, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    _close([v[0] for v in bb], up)
+    _close([v[2] for v in bb], low)
+
+
+def test_stream_sync_only_processes_new_bars():
+    df = _ohlc(120)
+    stream = IndicatorStream(["ema10", "rsi14"])
+    assert stream.sync(df.iloc[:100])
+    assert stream.bars == 100
+
+    # формуючий бар змінився + закрився і з'явився новий
+    assert stream.sync(df.iloc[98:101])
+    assert stream.bars == 101
+
+    expected = df["close"].iloc[:101].ewm(span=10, adjust=False).mean()
+    assert stream.value("ema10") == pytest.approx(expected.iloc[-1])
+    assert stream.values("ema10", 3) == pytest.approx(expected.tail(3).tolist())
+    assert list(stream.tail(2)["close"]) == pytest.approx(df["close"].iloc[99:101].tolist())
+
+    # розрив у даних → sync повідомляє, що потрібен warm-up
+    assert not stream.sync(df.iloc[110:])
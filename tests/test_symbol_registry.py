@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from utils.symbol_registry import SymbolRegistry
+
+
+def _instrument(symbol, tick="0.01", step="0.001", min_qty="0.001", max_lev="50", **extra):
+    return {
+        "symbol": symbol,
+        "status": "Trading",
+        "priceFilter": {"tickSize": tick},
+        "lotSizeFilter": {"qtyStep": step, "minOrderQty": min_qty, "minNotionalValue": "5"},
+        "leverageFilter": {"minLeverage": "1", "maxLeverage": max_lev},
+        "launchTime": "1600000000000",
+        **extra,
+    }
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+        self.linear = [_instrument(f"S{i}USDT") for i in range(5)]
+        self.spot = [{"symbol": "SPOTUSDT", "priceFilter": {"tickSize": "0.1"},
+                      "lotSizeFilter": {"basePrecision": "0.01", "minOrderQty": "0.1"}}]
+
+    def get_instruments_info(self, category, symbol=None, limit=None, cursor=None):
+        self.calls.append((category, symbol, cursor))
+        rows = self.linear if category == "linear" else self.spot
+        if symbol:
+            return {"retCode": 0, "result": {"list": [r for r in rows if r["symbol"] == symbol]}}
+        if category == "spot":
+            return {"retCode": 0, "result": {"list": rows}}
+        # дві сторінки по 3
+        start = int(cursor or 0)
+        page = rows[start:start + 3]
+        nxt = str(start + 3) if start + 3 < len(rows) else ""
+        return {"retCode": 0, "result": {"list": page, "nextPageCursor": nxt}}
+
+
+def test_bulk_refresh_paginates_and_lookups_are_local():
+    client = _Client()
+    reg = SymbolRegistry(client)
+    assert reg.refresh() is True
+    assert [c for c in client.calls] == [("linear", None, None), ("linear", None, "3"), ("spot", None, None)]
+    assert len(reg.symbols("linear")) == 5 and reg.symbols("spot") == ["SPOTUSDT"]
+
+    n = len(client.calls)
+    meta = reg.get("S3USDT_1")
+    assert meta["tick_size"] == 0.01 and meta["qty_step"] == 0.001 and meta["max_leverage"] == 50.0
+    assert reg.get("SPOTUSDT", "spot")["qty_step"] == 0.01
+    assert reg.category_of("S0USDT") == "linear" and reg.category_of("SPOTUSDT") == "spot"
+    assert reg.round_qty("S1USDT", 1.23456) == 1.234
+    assert reg.round_price("S1USDT", 101.23456) == 101.23
+    assert reg.listed_days("S1USDT", now=1600000000 + 3 * 86400) == 3
+    assert len(client.calls) == n
+
+
+def test_missing_symbol_is_fetched_once_per_ttl():
+    client = _Client()
+    reg = SymbolRegistry(client, miss_ttl=600)
+    reg.refresh()
+    client.linear.append(_instrument("NEWUSDT", tick="0.0001"))
+    n = len(client.calls)
+    assert reg.get("NEWUSDT")["price_precision"] == 4
+    assert reg.get("NEWUSDT") is not None
+    assert reg.get("NOPEUSDT") is None and reg.get("NOPEUSDT") is None
+    assert len(client.calls) == n + 2
+    assert reg.get("OTHERUSDT", fetch_missing=False) is None
+    assert len(client.calls) == n + 2
+
+    # залістений після refresh → категорія з точкового запиту, повтор промаху — не раніше miss_ttl
+    client.spot.append({"symbol": "FRESHUSDT", "priceFilter": {"tickSize": "0.1"},
+                        "lotSizeFilter": {"basePrecision": "0.01", "minOrderQty": "0.1"}})
+    assert reg.category_of("FRESHUSDT") == "spot"
+    assert reg.category_of("GHOSTUSDT") is None and reg.category_of("GHOSTUSDT") is None
+    assert len(client.calls) == n + 2 + 2 + 2
+
+
+def test_warm_start_from_disk_makes_no_requests(tmp_path):
+    path = str(tmp_path / "symbols.json")
+    first = SymbolRegistry(_Client(), cache_file=path)
+    first.refresh()
+
+    client = _Client()
+    warm = SymbolRegistry(client, cache_file=path)
+    assert warm.get("S2USDT")["min_qty"] == 0.001
+    assert warm.category_of("SPOTUSDT") == "spot"
+    assert warm.age() is not None and client.calls == []
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from utils.ticker_service import TickerService
+
+
+class _Client:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def get_tickers(self, category, symbol=None):
+        self.calls += 1
+        return {"retCode": 0, "result": {"list": self.rows}}
+
+
+def test_many_lookups_share_one_bulk_request():
+    client = _Client([
+        {"symbol": "BTCUSDT", "lastPrice": "65000.5", "markPrice": "65001", "turnover24h": "1000000"},
+        {"symbol": "ETHUSDT", "lastPrice": "3200", "markPrice": "3199.5", "turnover24h": "500000"},
+    ])
+    svc = TickerService(client, refresh_sec=1.0, max_age=60)
+
+    assert svc.get_last_price("BTCUSDT") == 65000.5
+    assert svc.get_mark_price("ETHUSDT") == 3199.5
+    assert svc.get_turnover_24h("ETHUSDT") == 500000.0
+    assert svc.get_last_price("DOGEUSDT") is None
+    assert client.calls == 1
+    assert len(svc.rows()) == 2
+
+
+def test_stale_snapshot_is_not_served():
+    client = _Client([{"symbol": "BTCUSDT", "lastPrice": "1"}])
+    svc = TickerService(client, refresh_sec=3600, max_age=5)
+    svc.get_last_price("BTCUSDT")
+
+    client.rows = []  # біржа перестала віддавати дані
+    svc._updated_at -= 10
+    svc._rows["BTCUSDT"]["ts"] -= 10
+
+    assert svc.get_last_price("BTCUSDT") is None
+    # повторна спроба не частіше за refresh_sec
+    assert client.calls == 1
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+
+from utils.trade_store import TradeStore
+
+
+def test_single_trade_updates_and_lookup(tmp_path):
+    store = TradeStore(str(tmp_path / "trades.db"), export_path=None)
+    store.upsert({"trade_id": "t1", "symbol": "BTCUSDT", "side": "long", "smart_avg": {"adds_done": 0}})
+    store.upsert({"trade_id": "t2", "symbol": "ETHUSDT", "side": "SHORT"})
+
+    assert store.patch("t1", {"smart_avg": {"adds_done": 1}})
+    assert not store.patch("missing", {"x": 1})
+    assert store.get("t1")["smart_avg"] == {"adds_done": 1}
+    assert store.get("t1")["symbol"] == "BTCUSDT"
+
+    assert store.find("BTCUSDT", "LONG") == "t1"
+    assert store.find("ETHUSDT", "long") is None
+    assert store.count_open() == 2
+
+    store.mark_closed("t2", {"exit_reason": "TP"})
+    assert store.count_open() == 1
+    assert not store.has_open("ETHUSDT")
+    assert store.remove_many(["t2", "nope"]) == 1
+    assert list(store.all()) == ["t1"]
+
+    store.upsert({"trade_id": "t3", "symbol": "SOLUSDT", "side": "LONG", "closed": True})
+    removed, before = store.remove_where(lambda tid, rec: bool(rec.get("closed")))
+    assert removed == ["t3"] and before == 2
+    assert list(store.all()) == ["t1"]
+
+
+def test_json_import_and_export(tmp_path):
+    export = tmp_path / "active_trades.json"
+    export.write_text(json.dumps({"BTCUSDT": {"trade_id": "BTCUSDT-1", "symbol": "BTCUSDT", "side": "LONG"}}), encoding="utf-8")
+
+    store = TradeStore(str(tmp_path / "trades.db"), export_path=str(export), export_sec=0)
+    # старий JSON імпортовано з тими самими ключами
+    assert store.find("BTCUSDT", "LONG") == "BTCUSDT"
+
+    store.upsert({"trade_id": "SOL-1", "symbol": "SOLUSDT", "side": "SHORT"})
+    store.flush()
+    data = json.loads(export.read_text(encoding="utf-8"))
+    assert set(data) == {"BTCUSDT", "SOL-1"}
+    assert data["SOL-1"]["symbol"] == "SOLUSDT"
@@ -2,13 +2,16 @@ import time
 import json
 from datetime import datetime
 import os
-from utils.logger import log_message, log_error
+from utils.logger import log_message, log_error, log_debug
 from utils.tools import get_current_futures_price
 from config import bybit
 import numpy as np
 import pandas as pd
 from utils.logger import deep_sanitize
 from config import USE_MANUAL_LEVERAGE, MANUAL_LEVERAGE
+from utils.symbol_registry import get_symbol_registry
+from utils.positions_service import get_positions_service
+from utils.account_service import get_account_service
 
 
 SIDE_BUY = "BUY"
@@ -39,23 +42,6 @@ def write_journal_entry(
     timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        # 🐞 Debug вхідних даних
-        log_message("🐞 DEBUG write_journal_entry input:\n" + json.dumps(deep_sanitize({
-            'symbol': symbol,
-            'side': side,
-            'leverage': leverage,
-            'result': result,
-            'gpt_decision': gpt_decision,
-            'signals': signals,
-            'notes': notes,
-            'violated_rules': violated_rules,
-            'pnl_result': pnl_result,
-            'duration_minutes': duration_minutes,
-            'exit_reason': exit_reason,
-            'exit_price': exit_price,
-            'llama_reflection': llama_reflection
-        }), indent=2, ensure_ascii=False))
-
         # 📝 Створюємо новий запис
         new_entry = {
             "timestamp": timestamp,
@@ -78,7 +64,8 @@ def write_journal_entry(
         }
         new_entry = deep_sanitize(new_entry)
 
-        log_message("🐞 DEBUG journal entry перед записом:\n" + json.dumps(new_entry, indent=2, ensure_ascii=False))
+        # 🐞 Debug: один дамп запису (вхідні дані вже в ньому), лише якщо DEBUG увімкнено
+        log_debug(lambda: "🐞 DEBUG journal entry перед записом:\n" + json.dumps(new_entry, indent=2, ensure_ascii=False))
 
         # 📖 Читаємо журнал або створюємо новий
         if os.path.exists(journal_file):
@@ -104,23 +91,17 @@ def write_journal_entry(
 
 
 def round_qty_bybit(symbol, qty):
-    import math
+    """Вниз до qtyStep — з реєстру метаданих (utils/symbol_registry.py), без запиту до біржі."""
     try:
-        info = bybit.get_instruments_info(category="linear", symbol=symbol)
-        qty_step = float(info["result"]["list"][0]["lotSizeFilter"]["qtyStep"])
-        rounded_qty = math.floor(qty / qty_step) * qty_step
-        return round(rounded_qty, 8)
+        return get_symbol_registry().round_qty(symbol, qty)
     except Exception as e:
         log_error(f"❌ [round_qty_bybit] Помилка: {e}")
         return round(qty, 8)
 
 def round_price_bybit(symbol, price):
-    import math
+    """До точності tickSize — з реєстру метаданих, без запиту до біржі."""
     try:
-        info = bybit.get_instruments_info(category="linear", symbol=symbol)
-        tick_size = float(info["result"]["list"][0]["priceFilter"]["tickSize"])
-        precision = abs(round(math.log10(tick_size)))
-        return round(price, precision)
+        return get_symbol_registry().round_price(symbol, price)
     except Exception as e:
         log_error(f"❌ [round_price_bybit] Помилка: {e}")
         return price
@@ -152,19 +133,18 @@ class OrderExecutor:
         return str(s).split("_")[0]
 
     def _get_symbol_info(self):
-        resp = bybit.get_instruments_info(category="linear", symbol=self._symbol_clean(self.symbol))
-        lst = (resp or {}).get("result", {}).get("list", []) or []
-        if not lst:
+        """Метадані інструмента з реєстру (tick_size, qty_step, min_qty, min/max_leverage, ...)."""
+        info = get_symbol_registry().get(self._symbol_clean(self.symbol))
+        if not info:
             raise Exception(f"❌ Не вдалося отримати instruments_info для {self.symbol}")
-        return lst[0]
+        return info
 
     def _ensure_min_qty(self, qty: float) -> float:
         """Прилипнути до кроку qtyStep і гарантувати minOrderQty."""
         import math
         info = self._get_symbol_info()
-        lot = info.get("lotSizeFilter", {}) or {}
-        step = float(lot.get("qtyStep", "0.001"))
-        minq = float(lot.get("minOrderQty", "0.001"))
+        step = info.get("qty_step") or 0.001
+        minq = info.get("min_qty") or 0.001
         # прилип до кроку вниз
         q = math.floor(float(qty) / step) * step
         # гарантія мінімуму
@@ -207,8 +187,7 @@ class OrderExecutor:
 
         # 3) перевірити біржові мінімальні обмеження
         info = self._get_symbol_info()
-        lot = info.get("lotSizeFilter", {}) or {}
-        minq = float(lot.get("minOrderQty", "0.0"))
+        minq = info.get("min_qty") or 0.0
         if minq > 0 and raw_qty < minq:
             # порахуємо, скільки маржі треба для мінімального контракту
             min_margin_needed = (minq * float(self.price)) / float(self.leverage)
@@ -250,6 +229,11 @@ class OrderExecutor:
                 log_message(f"✅ Ордер створено: {response['result'].get('orderId', '?')} qty={rounded_qty}")
                 # оновлюємо на фактично відправлене qty
                 self.quantity = float(rounded_qty)
+                # знімок позицій — одразу після власного ордера (читачі в інших потоках бачать нову позицію)
+                get_positions_service().refresh_now()
+                # знімок акаунта — інкрементально: зайнята маржа фактичного qty (до наступного запиту)
+                if self.price and self.leverage:
+                    get_account_service().apply_fill(self.quantity * float(self.price) / max(float(self.leverage), 1.0))
                 return True
             else:
                 log_error(f"❌ Помилка від Bybit: {response}")
@@ -290,20 +274,13 @@ class OrderExecutor:
             MAX_RETRIES = 3
             close_side = "Sell" if self.position_side == "LONG" else "Buy"
             symbol_clean = self._symbol_clean(self.symbol)
+            positions = get_positions_service()
 
             for attempt in range(1, MAX_RETRIES + 1):
                 log_message(f"🔁 [close_position] Спроба {attempt}/{MAX_RETRIES} закрити {symbol_clean}")
 
-                response = bybit.get_positions(category="linear", symbol=symbol_clean, positionSide=self.position_side)
-                positions = response.get("result", {}).get("list", []) or []
-                current_qty = 0.0
-
-                for pos in positions:
-                    if pos.get("symbol") == symbol_clean:
-                        size = float(pos.get("size", 0) or 0.0)
-                        if size > 0:
-                            current_qty = size
-                            break
+                # повторні спроби — зі знімка, новішого за паузу між ними
+                current_qty = positions.size(symbol_clean, self.position_side, max_age=1.0 if attempt > 1 else None)
 
                 if current_qty <= 0:
                     log_message(f"⚠️ [close_position] Немає відкритої позиції для {symbol_clean} (спроба {attempt})")
@@ -325,6 +302,9 @@ class OrderExecutor:
 
                 if response.get("retCode") == 0:
                     log_message(f"✅ Позиція {symbol_clean} закрита: {response['result'].get('orderId', '?')}")
+                    positions.refresh_now(trust_empty=True)
+                    # маржа звільнилась, PnL реалізовано — наступне читання балансу піде на біржу
+                    get_account_service().invalidate()
                     return True
                 else:
                     log_error(f"❌ [close_position] Помилка від Bybit: {response}")
@@ -340,21 +320,19 @@ class OrderExecutor:
     def set_safe_leverage(self):
         """
         🔧 Встановлює безпечне плече для символу:
-        - перевіряє межі з instruments_info
+        - перевіряє межі з реєстру метаданих (instruments_info)
         - ставить однакове buyLeverage/sellLeverage (v5)
         """
         try:
             symbol_clean = self._symbol_clean(self.symbol)
-            response = bybit.get_instruments_info(category="linear", symbol=symbol_clean)
-            symbols_info = response.get("result", {}).get("list", []) or []
+            info = get_symbol_registry().get(symbol_clean)
 
-            if not symbols_info:
+            if not info:
                 log_error(f"⚠️ Не вдалося отримати info для {self.symbol}, використовую дефолтне плече (10x)")
                 return
 
-            leverage_filter = symbols_info[0].get("leverageFilter", {}) or {}
-            min_leverage = int(float(leverage_filter.get("minLeverage", 1)))
-            max_leverage = int(float(leverage_filter.get("maxLeverage", 100)))
+            min_leverage = int(info.get("min_leverage") or 1)
+            max_leverage = int(info.get("max_leverage") or 100)
 
             if self.leverage > max_leverage:
                 log_message(f"⚠️ Плече {self.leverage}x > max {max_leverage}x → встановлюю max")
@@ -0,0 +1,276 @@
+# trading/price_engine.py
+
+"""
+⚡ Подієвий рушій цін для відкритих угод.
+
+Замість окремого потоку з polling-циклом на кожну угоду:
+  - усі рівні (DCA-сходинки, TP) тримаються в одній книзі рівнів LevelBook,
+    відсортовано по символу;
+  - один фід цін (знімок тікерів або стрім) викликає on_price(symbol, price);
+  - логіка угоди (докупка / TP / закриття) запускається лише тоді,
+    коли ціна перетнула один з її рівнів.
+
+Кількість потоків і API-запитів залежить від кількості оновлень цін,
+а не від кількості угод.
+
+Угода для рушія — будь-який об'єкт з атрибутами/методами:
+    trade_id, symbol, closed,
+    levels() -> (below, above)   # спрацювання при price <= level / price >= level
+    track(price)                 # дешеве оновлення peak/worst на кожен тік
+    on_cross(price)              # реакція на перетин рівня (може блокувати)
+    on_timer()                   # періодичні перевірки (тренд-фліп тощо)
+"""
+
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import log_error, log_debug
+from utils.request_scheduler import LANE_POSITION, request_lane
+
+
+class LevelBook:
+    """📚 Відсортовані рівні спрацювання по символах (bisect замість перебору)."""
+
+    def __init__(self):
+        # symbol -> ([levels...], [keys...]) — паралельні списки, відсортовані по level
+        self._below = {}   # спрацьовує, коли price <= level
+        self._above = {}   # спрацьовує, коли price >= level
+        self._owned = {}   # key -> symbol
+
+    @staticmethod
+    def _insert(book, symbol, level, key):
+        levels, keys = book.setdefault(symbol, ([], []))
+        i = bisect.bisect_right(levels, level)
+        levels.insert(i, level)
+        keys.insert(i, key)
+
+    @staticmethod
+    def _drop(book, symbol, key):
+        entry = book.get(symbol)
+        if not entry:
+            return
+        levels, keys = entry
+        for i in range(len(keys) - 1, -1, -1):
+            if keys[i] == key:
+                del keys[i]
+                del levels[i]
+        if not keys:
+            book.pop(symbol, None)
+
+    def set_levels(self, symbol, key, below=(), above=()):
+        """Замінює всі рівні ключа новими."""
+        self.remove(key)
+        for level in below:
+            if level is not None:
+                self._insert(self._below, symbol, float(level), key)
+        for level in above:
+            if level is not None:
+                self._insert(self._above, symbol, float(level), key)
+        self._owned[key] = symbol
+
+    def remove(self, key):
+        symbol = self._owned.pop(key, None)
+        if symbol is None:
+            return
+        self._drop(self._below, symbol, key)
+        self._drop(self._above, symbol, key)
+
+    def crossed(self, symbol, price):
+        """Ключі, чиї рівні перетнуто ціною price."""
+        price = float(price)
+        hit = set()
+        below = self._below.get(symbol)
+        if below:
+            levels, keys = below
+            hit.update(keys[bisect.bisect_left(levels, price):])
+        above = self._above.get(symbol)
+        if above:
+            levels, keys = above
+            hit.update(keys[:bisect.bisect_right(levels, price)])
+        return hit
+
+    def symbols(self):
+        return set(self._owned.values())
+
+
+class PriceEngine:
+    """🧠 Реєстр угод + книга рівнів + один фід цін."""
+
+    def __init__(self, price_source=None, tick_sec=0.25, timer_sec=30.0, workers=4, retrigger_sec=1.0):
+        # price_source(symbols) -> {symbol: price}; None — лише push через on_price()
+        self._price_source = price_source
+        self.tick_sec = float(tick_sec)
+        self.timer_sec = float(timer_sec)
+        # якщо рівень лишився перетнутим (TP не підтверджено / докупку заблоковано) —
+        # повторний виклик не частіше, ніж раз на retrigger_sec
+        self.retrigger_sec = float(retrigger_sec)
+        self._next_allowed = {}  # trade_id -> ts
+        self._stream = None
+        self._streamed = set()   # символи з підпискою tickers.* на стрім
+        self._trades = {}      # trade_id -> trade
+        self._busy = set()     # trade_id, для яких обробник зараз виконується
+        self._book = LevelBook()
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="price-engine")
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_timer = time.time()
+        self.ticks = 0
+        self.triggers = 0
+
+    # ---------- реєстр ----------
+    def register(self, trade):
+        with self._lock:
+            self._trades[trade.trade_id] = trade
+            self._relevel(trade)
+        self._subscribe(trade.symbol)
+        log_debug(f"[ENGINE] зареєстровано {trade.trade_id} ({trade.symbol})")
+
+    def unregister(self, trade_id):
+        with self._lock:
+            self._trades.pop(trade_id, None)
+            self._next_allowed.pop(trade_id, None)
+            self._book.remove(trade_id)
+
+    def has(self, trade_id):
+        with self._lock:
+            return trade_id in self._trades
+
+    def trade_ids(self):
+        with self._lock:
+            return set(self._trades)
+
+    def symbols(self):
+        with self._lock:
+            return {t.symbol for t in self._trades.values()}
+
+    def _relevel(self, trade):
+        below, above = trade.levels()
+        self._book.set_levels(trade.symbol, trade.trade_id, below, above)
+
+    # ---------- події ----------
+    def on_price(self, symbol, price):
+        """Оновлення ціни: трекінг PnL + запуск обробників для перетнутих рівнів."""
+        if price is None:
+            return
+        with self._lock:
+            self.ticks += 1
+            for trade in self._trades.values():
+                if trade.symbol == symbol:
+                    try:
+                        trade.track(price)
+                    except Exception as e:
+                        log_error(f"❌ [ENGINE] {trade.trade_id}.track: {e}")
+            now = time.time()
+            hit = self._book.crossed(symbol, price) - self._busy
+            for trade_id in hit:
+                trade = self._trades.get(trade_id)
+                if trade is None or now < self._next_allowed.get(trade_id, 0.0):
+                    continue
+                self._busy.add(trade_id)
+                self._next_allowed[trade_id] = now + self.retrigger_sec
+                self.triggers += 1
+                self._pool.submit(self._dispatch, trade, "on_cross", price)
+
+    def _dispatch(self, trade, method, *args):
+        try:
+            # ціни / klines відкритої угоди не стоять у черзі за сканом
+            with request_lane(LANE_POSITION):
+                getattr(trade, method)(*args)
+        except Exception as e:
+            log_error(f"❌ [ENGINE] {trade.trade_id}.{method}: {e}")
+        finally:
+            with self._lock:
+                self._busy.discard(trade.trade_id)
+                if trade.closed:
+                    self._trades.pop(trade.trade_id, None)
+                    self._next_allowed.pop(trade.trade_id, None)
+                    self._book.remove(trade.trade_id)
+                elif trade.trade_id in self._trades:
+                    self._relevel(trade)
+
+    def run_timers(self):
+        """Періодичні перевірки для всіх вільних угод (у пулі)."""
+        with self._lock:
+            for trade_id, trade in self._trades.items():
+                if trade_id in self._busy:
+                    continue
+                self._busy.add(trade_id)
+                self._pool.submit(self._dispatch, trade, "on_timer")
+
+    # ---------- стрім (push) ----------
+    def attach_stream(self, stream):
+        """Підписка на tickers.{symbol} стріму (MarketStream) для всіх угод."""
+        self._stream = stream
+        for symbol in self.symbols():
+            self._subscribe(symbol)
+
+    def _subscribe(self, symbol):
+        if self._stream is None:
+            return
+        with self._lock:
+            if symbol in self._streamed:
+                return
+            self._streamed.add(symbol)
+        self._stream.ticker_stream(symbol, self._on_ticker_message)
+
+    def _on_ticker_message(self, message):
+        data = message.get("data") or {}
+        symbol = data.get("symbol")
+        price = data.get("lastPrice")
+        # delta без lastPrice — ціна не змінилась
+        if symbol and price not in (None, ""):
+            self.on_price(symbol, float(price))
+
+    # ---------- фід ----------
+    def poll_once(self):
+        symbols = self.symbols()
+        if symbols and self._price_source is not None:
+            try:
+                prices = self._price_source(symbols) or {}
+            except Exception as e:
+                log_error(f"❌ [ENGINE] price_source: {e}")
+                prices = {}
+            for symbol, price in prices.items():
+                self.on_price(symbol, price)
+
+        now = time.time()
+        if now - self._last_timer >= self.timer_sec:
+            self._last_timer = now
+            self.run_timers()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="price-engine-feed", daemon=True)
+            self._thread.start()
+        log_debug(f"[ENGINE] фід цін запущено (tick={self.tick_sec}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.tick_sec)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "trades": len(self._trades),
+                "busy": len(self._busy),
+                "symbols": len(self.symbols()),
+                "ticks": self.ticks,
+                "triggers": self.triggers,
+            }
+
+
+def ticker_price_source(symbols):
+    """Ціни зі спільного знімка тікерів (один bulk-запит на всі символи)."""
+    from utils.ticker_service import get_ticker_service
+    svc = get_ticker_service()
+    return {s: svc.get_last_price(s) for s in symbols}
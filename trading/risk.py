@@ -1,9 +1,8 @@
-import pandas as pd
 import numpy as np
 
 from dotenv import load_dotenv
 import os
-from utils.get_klines_bybit import get_klines_clean_bybit
+from utils.get_klines_bybit import get_klines_clean_bybit, get_ohlcv_bybit
 from analysis.market import analyze_market
 from predict_lstm import predict_lstm
 from analysis.indicators import get_volatility
@@ -12,26 +11,20 @@ from utils.logger import log_message, log_error
 from analysis.whales import get_whale_score
 
 
-from config import bybit  # переконайся, що імпорт є
+from utils.account_service import get_account_service
 
 def risk_management(balance, symbol, market_type="futures", leverage=5):
     """📊 Оптимізоване динамічне управління капіталом"""
     try:
-        df = get_klines_clean_bybit(symbol, limit=50)
-        if df is None or df.empty:
+        # OHLCV з кешу klines: масиви вже числові й без NaN (валідація при завантаженні)
+        bars = get_ohlcv_bybit(symbol, limit=50)
+        if bars is None or bars.empty:
             log_message(f"❌ {symbol} | Дані відсутні → Ризик за замовчуванням (5%)")
             return max(balance * 0.05, 10)
 
-        for col in ["high", "low", "close", "volume"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-        df.dropna(inplace=True)
-        if df.empty:
-            log_message(f"❌ {symbol} | Дані NaN після обробки → Ризик за замовчуванням (5%)")
-            return max(balance * 0.05, 10)
-
         # Волатильність і обʼєм
-        volatility = np.mean(df["high"] - df["low"]) / df["close"].mean() * 100
-        avg_volume = df["volume"].mean()
+        volatility = np.mean(bars.high - bars.low, dtype=float) / np.mean(bars.close, dtype=float) * 100
+        avg_volume = float(np.mean(bars.volume, dtype=float))
         log_message(f"📊 {symbol} | Волатильність: {volatility:.2f}%, Обʼєм: {avg_volume:.2f}")
 
         # Аналіз тренду і прогнозу
@@ -70,8 +63,9 @@ def risk_management(balance, symbol, market_type="futures", leverage=5):
         # 🧾 Адаптація під фʼючерси (Bybit)
         if market_type == "futures":
             try:
-                balances = bybit.get_wallet_balance(accountType="UNIFIED")
-                usdt_balance = float(balances['result']['list'][0]['coin'][0]['walletBalance'])
+                usdt_balance = get_account_service().coin_value("walletBalance")
+                if usdt_balance is None:
+                    raise ValueError("немає даних акаунта")
                 max_allowed = usdt_balance * leverage * 0.05
                 adjusted_risk = min(risk_percent, max_allowed / balance)
 
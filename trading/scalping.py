@@ -34,18 +34,27 @@ getcontext().prec = 10  # для точного порівняння без ок
 from analysis.monitor_coin_behavior import convert_snapshot_to_conditions
 from utils.signal_logger import update_signal_record
 from trading.executor import OrderExecutor
-from ai.decision import check_trade_conditions_long, check_trade_conditions_short
+from ai.decision import check_trade_conditions_batch
 import random
 import numpy as np
 from utils.signal_logger import log_final_trade_result
 from uuid import uuid4
 from utils.logger import mark_trade_closed, remove_active_trade, prune_inactive_trades
 from utils.allocator import plan_allocation_for_new_trade
+from utils.account_service import get_account_service
 from utils.allocator import  has_open_trade_for,get_open_trades_count
 from config import MAX_LONG_TRADES, MAX_SHORT_TRADES
 from utils.tools import get_open_trades_count_by_side
 from config import SMART_AVG, bybit  # ✅ правильний імпорт
+from config import SCAN_PARALLEL, SCAN_WORKERS, SCAN_USE_TOP_SYMBOLS, SCAN_BATCH_INDICATORS, SCAN_MAX_PRICE_DRIFT_PCT
+from analysis.batch_indicators import analyze_universe
+from config import PRICE_ENGINE_ENABLED, PRICE_ENGINE_TICK_SEC, PRICE_ENGINE_TIMER_SEC, PRICE_ENGINE_WORKERS
+from trading.price_engine import PriceEngine, ticker_price_source
+from utils.market_stream import get_market_stream, attach_market_stream
 from utils.logger import append_active_trade
+from utils.eligibility import get_eligibility_index
+from utils.positions_service import get_positions_service
+from utils.request_scheduler import LANE_POSITION, request_lane
 
 ACTIVE_TRADES_FILE_SIMPLE = "data/ActiveTradesSimple.json"
 
@@ -57,8 +66,7 @@ bg_threads = {}       # фонові демони: monitor_all_open_trades, moni
 
 SIDE_BUY = "Buy"
 SIDE_SELL = "Sell"
-# 🔒 Набір символів, які прямо зараз відкриваються (антидубль)
-opening_symbols = set()
+# 🔒 Символи, які прямо зараз відкриваються (антидубль) — EligibilityIndex.begin_opening/end_opening
 
 
 RECENT_SCALPING_FILE = "data/recent_scalping.json"
@@ -76,32 +84,17 @@ def _symbol_clean(s: str) -> str:
 
 def update_active_trade(trade_id: str, patch: dict):
     """
-    Акуратно оновлює запис у ActiveTrades: якщо є утиліти mark/remove/append — користуємось ними.
-    Інакше — робимо ручний фолбек (видалити + додати назад).
+    Зливає patch у запис угоди в ActiveTrades (один рядок у сховищі, без перезапису всіх угод).
+    False — якщо угоди немає (noop).
     """
     try:
-        current = get_active_trade(trade_id)
-        if not current:
+        from utils.logger import update_active_trade as _store_update
+        if not _store_update(trade_id, patch or {}):
             log_message(f"[compat] update_active_trade: {trade_id} not found (noop)")
             return False
-        current.update(patch or {})
-        # якщо є прямий апдейтер у utils.logger — спробуємо ним
-        try:
-            from utils.logger import update_active_trade as _real_upd  # type: ignore
-            _real_upd(trade_id, current)
-            return True
-        except Exception:
-            pass
-        # фолбек: remove -> append
-        if 'remove_active_trade' in globals():
-            try: remove_active_trade(trade_id)
-            except Exception: pass
-        if 'append_active_trade' in globals():
-            try: append_active_trade(current)
-            except Exception: pass
         return True
     except Exception as e:
-        log_error(f"[compat] update_active_trade fallback error: {e}")
+        log_error(f"[compat] update_active_trade error: {e}")
         return False
 
 def place_or_update_tp(symbol: str, side: str, quantity: float, avg_entry: float, tp_from_avg_pct: float):
@@ -159,7 +152,7 @@ def has_liq_buffer_after_add(symbol: str, side: str, extra_qty: float, min_buffe
         перераховує середню та оцінює новий liqPrice ~ поточний_liq * clamp(new_avg/cur_avg).
         Якщо симульований буфер >= порога — дозволяє докупку.
     Якщо liqPrice недоступний/некоректний — поводимось поблажливо (True).
-    Примітка: дефолт «permissive True» збережено для зворотної сумісності.
+    Якщо позиції немає — False: докупка без позиції відкрила б нову.
     """
     try:
         symbol_clean = _symbol_clean(symbol)
@@ -178,12 +171,11 @@ def has_liq_buffer_after_add(symbol: str, side: str, extra_qty: float, min_buffe
             log_message("[liq] invalid mark_price → allow add (permissive)")
             return True
 
-        # Позиції
-        resp = bybit.get_positions(category="linear", symbol=symbol_clean)
-        lst = (resp.get("result", {}) or {}).get("list", []) or []
+        # Позиції (спільний знімок PositionsService)
+        lst = get_positions_service().rows(symbol_clean)
         if not lst:
-            log_message("[liq] no positions → allow add (permissive)")
-            return True
+            log_message("[liq] no positions → refuse add (докупка без позиції відкрила б нову)")
+            return False
 
         side_u = str(side).upper()
         for pos in lst:
@@ -272,9 +264,9 @@ def has_liq_buffer_after_add(symbol: str, side: str, extra_qty: float, min_buffe
 
             return bool(ok_sim)
 
-        # Якщо релевантної позиції не знайшли — поблажливо дозволяємо
-        log_message("[liq] no matching side position → allow add (permissive)")
-        return True
+        # Релевантної позиції немає — докупка відкрила б нову позицію
+        log_message("[liq] no matching side position → refuse add")
+        return False
 
     except Exception as e:
         log_error(f"[liq] has_liq_buffer_after_add error: {e}")
@@ -580,11 +572,22 @@ def monitor_watchlist_candidate():
     def is_open_signal(res: dict) -> bool:
         return isinstance(res, dict) and res.get("open_trade") in ("LONG", "SHORT")
 
-    def process_candidate(item):
+    def prepare_candidate(item):
+        """Допуск → snapshot → conditions; (item, snapshot, conditions) або None."""
         try:
             symbol = item["symbol"]
             side = item["side"]
 
+            # 🚦 спершу — допуск (cooldown / blacklist / відкрита угода / innovation), без snapshot
+            allowed, why = get_eligibility_index().check(symbol)
+            if not allowed:
+                log_watchlist_reason(symbol, side, f"not eligible: {why}", {})
+                return None
+
+            if side not in ("LONG", "SHORT"):
+                log_watchlist_reason(symbol, side, "unknown side", {})
+                return None
+
             snapshot = build_monitor_snapshot(symbol)
             if not snapshot:
                 log_watchlist_reason(symbol, side, "❌ snapshot is None", {})
@@ -595,13 +598,18 @@ def monitor_watchlist_candidate():
                 log_watchlist_reason(symbol, side, "❌ conditions is None", {})
                 return None
 
-            # Виклик фільтра за напрямком
-            if side == "LONG":
-                result = check_trade_conditions_long(conditions)
-            elif side == "SHORT":
-                result = check_trade_conditions_short(conditions)
-            else:
-                result = None
+            return item, snapshot, conditions
+
+        except Exception as e:
+            log_error(f"❌ [monitor_watchlist_candidates] помилка для {item}: {e}")
+            log_watchlist_reason(item.get("symbol", "UNKNOWN"), item.get("side", "UNKNOWN"), f"Помилка: {e}", {})
+            return None
+
+    def process_candidate(item, snapshot, conditions, result):
+        """Рішення вже оцінене пакетом → відкриття; повертає символ для видалення з watchlist."""
+        try:
+            symbol = item["symbol"]
+            side = item["side"]
 
             # Немає сигналу — чекаємо далі
             if not is_open_signal(result):
@@ -666,9 +674,18 @@ def monitor_watchlist_candidate():
             continue
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [executor.submit(process_candidate, item) for item in watchlist]
-            results = [f.result() for f in futures]
-            to_remove = [sym for sym in results if sym]
+            prepared = [p for p in executor.map(prepare_candidate, watchlist) if p]
+
+            # 📦 умови всіх кандидатів циклу — одним пакетом (один запис у лог відмов)
+            try:
+                results = check_trade_conditions_batch([(cond, item["side"]) for item, _, cond in prepared])
+            except Exception as e:
+                log_error(f"❌ [monitor_watchlist_candidates] пакетна оцінка: {e}")
+                results = [None] * len(prepared)
+
+            futures = [executor.submit(process_candidate, item, snap, cond, res)
+                       for (item, snap, cond), res in zip(prepared, results)]
+            to_remove = [sym for sym in (f.result() for f in futures) if sym]
 
         if to_remove:
             updated_watchlist = [item for item in watchlist if item["symbol"] not in to_remove]
@@ -677,11 +694,174 @@ def monitor_watchlist_candidate():
         time.sleep(MONITOR_INTERVAL)
 
 
+def _resolve_scan_universe():
+    """
+    🌐 Універсум для сканування:
+    - SCAN_USE_TOP_SYMBOLS=True → get_top_symbols() (GET_TOP_SYMBOLS_CONFIG);
+    - інакше / якщо топ порожній → ручний whitelist.
+    """
+    # 1) твій ручний список (редагуй тут)
+    symbols = [
+       "ADAUSDT","ETHUSDT","BNBUSDT","SOLUSDT","XRPUSDT",
+       "BCHUSDT","DOGEUSDT","TRXUSDT","LINKUSDT","HBARUSDT",
+       "AVAXUSDT","SUIUSDT","HYPEUSDT","LTCUSDT","CROUSDT"
+    ]
+    source = "manual"
+
+    if SCAN_USE_TOP_SYMBOLS:
+        try:
+            top = get_top_symbols() or []
+            if top:
+                symbols = list(top)
+                source = "top"
+        except Exception as e:
+            log_error(f"❌ get_top_symbols для сканування: {e} → manual whitelist")
+
+    random.shuffle(symbols)
+    log_debug(f"Монети для аналізу ({source}): {symbols}")
+    return symbols
+
+
+def _scan_symbol(symbol, block_innovation, is_innovation_or_risky_symbol, precomputed=None):
+    """
+    🔬 Аналіз одного символу без відкриття угоди (можна запускати паралельно):
+    фільтри → snapshot → conditions → маршрутизація (сторона).
+    Самі умови оцінюються пакетом для всього універсуму в _scan_universe (evaluate_batch).
+    precomputed — batch-індикатори символу (передаються у build_monitor_snapshot).
+    Повертає кандидата (dict; result=None — ще не оцінено) або None, якщо символ відсіяно.
+    """
+    # Фільтр 1 (innovation / young listing, cooldown, blacklist, відкриті угоди) —
+    # EligibilityIndex у find_best_scalping_targets, до будь-якої роботи зі snapshot.
+    log_message(f"🎯 Аналіз {symbol}")
+
+    # ---------- Snapshot ----------
+    snapshot = build_monitor_snapshot(symbol, precomputed=precomputed)
+    if not snapshot:
+        log_message(f"⚠️ [SKIP] {symbol} → snapshot None")
+        return None
+
+    # ---------- Фільтр 2: уточнення після snapshot (якщо з'явився turnover) ----------
+    # В snapshot/conditions часто є оборот. Якщо є — уточнюємо thin-флаг.
+    turnover_24h = (snapshot.get("turnover24hUsd")
+                    or snapshot.get("turnover_usd")
+                    or snapshot.get("turnover")  # про всяк випадок
+                    or None)
+    try:
+        flags = is_innovation_or_risky_symbol(symbol, turnover_24h_usd=turnover_24h)
+        if flags.get("risky") and block_innovation:
+            log_message(f"🧯 [SKIP] {symbol}: risky after snapshot "
+                        f"(innovation={flags.get('innovation')}, young_days={flags.get('days_listed')}, thin={flags.get('thin')})")
+            return None
+    except Exception:
+        pass
+
+    log_debug(f"Snapshot OK для {symbol}")
+    conditions = convert_snapshot_to_conditions(snapshot)
+    if not conditions:
+        log_message(f"⚠️ [SKIP] {symbol} → conditions None")
+        return None
+
+    log_debug(f"Conditions OK для {symbol}")
+
+    # ✅ Нормалізація support_position
+    support_position = str(conditions.get("support_position", "unknown")).lower()
+    if support_position in {"null", "unknown", ""}:
+        support_position = "between"
+
+    global_trend = str(conditions.get("global_trend", "unknown")).lower()
+
+    # ✅ Обробляємо near_support / near_resistance / between
+    result = None
+    side = None
+
+    if support_position == "near_support":
+        side = "LONG"
+
+    elif support_position == "near_resistance":
+        side = "SHORT"
+
+    elif support_position == "between":
+        # Маршрутизація за глобальним трендом — м’яко, як домовлялись
+        if global_trend in ("bullish", "strong_bullish", "flat"):
+            side = "LONG"
+        elif global_trend == "bearish":
+            side = "SHORT"
+        else:
+            log_message(f"⛔ [SKIP] {symbol} → BETWEEN, але global_trend={global_trend}")
+            side = "LONG"  # дефолт, щоб віддати у watchlist з напрямком
+            result = {"add_to_watchlist": True, "watch_reason": f"between + unknown global_trend"}
+
+    else:
+        log_message(f"⛔ [SKIP] {symbol} → support_position={support_position}")
+        return None
+
+    return {
+        "symbol": symbol,
+        "snapshot": snapshot,
+        "conditions": conditions,
+        "support_position": support_position,
+        "side": side,
+        "result": result,
+        "score": 0.0,
+    }
+
+
+def _evaluate_candidates(candidates):
+    """
+    📦 Оцінка умов для всіх кандидатів скану одним check_trade_conditions_batch
+    (спільні правила, один запис у лог відмов); заповнює result / score.
+    """
+    pending = [c for c in candidates if c["result"] is None]
+    results = check_trade_conditions_batch([(c["conditions"], c["side"]) for c in pending])
+    for cand, result in zip(pending, results):
+        cand["result"] = result
+        log_message(f"[TRACE] check_trade_conditions({cand['side']}) {cand['symbol']} → {result}")
+    for cand in candidates:
+        try:
+            cand["score"] = float((cand["result"] or {}).get("score") or 0.0)
+        except (TypeError, ValueError):
+            cand["score"] = 0.0
+    return candidates
+
+
+def _scan_universe(symbols, block_innovation, is_innovation_or_risky_symbol):
+    """
+    ⚡ Сканує символи паралельно (SCAN_WORKERS) або послідовно (SCAN_PARALLEL=False).
+    SCAN_BATCH_INDICATORS → MACD/RSI/ATR/BB/CCI/STOCH/волатильність для всіх символів
+    рахуються одним векторизованим проходом (analysis.batch_indicators) до сканування.
+    Умови всіх кандидатів оцінюються одним пакетом (_evaluate_candidates).
+    Порядок результатів не гарантується — кандидатів ранжуємо окремо.
+    """
+    batch = {}
+    if SCAN_BATCH_INDICATORS and len(symbols) > 1:
+        try:
+            batch = analyze_universe(symbols)
+        except Exception as e:
+            log_error(f"❌ [scan] batch-індикатори: {e}")
+
+    def _safe_scan(symbol):
+        try:
+            return _scan_symbol(symbol, block_innovation, is_innovation_or_risky_symbol, batch.get(symbol))
+        except Exception as e:
+            log_error(f"❌ [scan] {symbol}: {e}")
+            return None
+
+    if not SCAN_PARALLEL or len(symbols) <= 1:
+        return _evaluate_candidates([c for c in (_safe_scan(s) for s in symbols) if c])
+
+    from concurrent.futures import ThreadPoolExecutor
+    workers = max(1, min(int(SCAN_WORKERS), len(symbols)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        candidates = [c for c in pool.map(_safe_scan, symbols) if c]
+    return _evaluate_candidates(candidates)
+
+
 def find_best_scalping_targets():
     """
     🚀 Бойовий режим:
     - Відбір монет біля підтримки/опору, а також у стані between (маршрутизація за глобальним трендом).
-    - Якщо пройшла check_trade_conditions() → відкриття угоди.
+    - Символи аналізуються паралельно (SCAN_WORKERS), кандидати ранжуються за score.
+    - Якщо пройшла check_trade_conditions() → відкриття угоди (строго послідовно, антидубль EligibilityIndex.begin_opening).
     - Якщо не пройшла → додаємо в watchlist.json для моніторингу.
     - monitor_watchlist_candidate пише в logs/watchlist_debug.json кожні 5 сек.
     - ⛔ Анти-інноваційний фільтр: Innovation/молоді/тонкі символи — скіпаємо повністю.
@@ -721,104 +901,69 @@ def find_best_scalping_targets():
                 # фейковий safe-стаб, нічого не блокує
                 return {"innovation": False, "young": False, "thin": False, "risky": False, "days_listed": None}
 
-        # ---------------- Universe (manual whitelist) ----------------
-        # 1) твій ручний список (редагуй тут)
-        symbols = [
-           "ADAUSDT","ETHUSDT","BNBUSDT","SOLUSDT","XRPUSDT",
-           "BCHUSDT","DOGEUSDT","TRXUSDT","LINKUSDT","HBARUSDT",
-           "AVAXUSDT","SUIUSDT","HYPEUSDT","LTCUSDT","CROUSDT"
-        ]
+        # ---------------- Universe ----------------
+        symbols = _resolve_scan_universe()
 
-        import random
-        random.shuffle(symbols)
-        log_debug(f"Монети для аналізу (manual): {symbols}")
-        # ---------------- /Universe ----------------
+        # 🚦 Допуск до сканування: O(1) з пам'яті, до snapshot / batch-індикаторів
+        symbols, skipped = get_eligibility_index().filter(symbols)
+        for sym, why in skipped.items():
+            log_message(f"🧯 [SKIP] {sym}: {why}")
 
+        # 📡 Стрім ринкових даних для універсуму (klines/tickers пушем замість polling)
+        try:
+            stream = get_market_stream()
+            if stream is not None:
+                attach_market_stream(stream, symbols)
+        except Exception as e:
+            log_error(f"⚠️ attach_market_stream: {e} → REST-режим")
+
+        # ---------------- Scan (паралельно) ----------------
+        candidates = _scan_universe(symbols, BLOCK_INNOVATION, is_innovation_or_risky_symbol)
+
+        # Кандидати на відкриття — першими, за спаданням score
+        candidates.sort(
+            key=lambda c: (
+                isinstance(c["result"], dict) and c["result"].get("open_trade") in ("LONG", "SHORT"),
+                c["score"],
+            ),
+            reverse=True,
+        )
+        log_debug("Ранжування кандидатів: " + ", ".join(f"{c['symbol']}={c['score']:.2f}" for c in candidates))
 
         watchlist_data = load_watchlist() or []
 
-        for symbol in symbols:
-            # ---------- Фільтр 1: швидка перевірка до snapshot ----------
-            # Користуємось кешем Bybit: innovation / young listing / thin turnover (якщо буде).
-            flags = is_innovation_or_risky_symbol(symbol)
-            if flags.get("risky") and BLOCK_INNOVATION:
-                log_message(f"🧯 [SKIP] {symbol}: innovation={flags.get('innovation')}, "
-                            f"young_days={flags.get('days_listed')}, thin={flags.get('thin')}")
-                continue
-
-            log_message(f"🎯 Аналіз {symbol}")
-
-            # ---------- Snapshot ----------
-            snapshot = build_monitor_snapshot(symbol)
-            if not snapshot:
-                log_message(f"⚠️ [SKIP] {symbol} → snapshot None")
-                continue
-
-            # ---------- Фільтр 2: уточнення після snapshot (якщо з'явився turnover) ----------
-            # В snapshot/conditions часто є оборот. Якщо є — уточнюємо thin-флаг.
-            turnover_24h = (snapshot.get("turnover24hUsd")
-                            or snapshot.get("turnover_usd")
-                            or snapshot.get("turnover")  # про всяк випадок
-                            or None)
-            try:
-                flags = is_innovation_or_risky_symbol(symbol, turnover_24h_usd=turnover_24h)
-                if flags.get("risky") and BLOCK_INNOVATION:
-                    log_message(f"🧯 [SKIP] {symbol}: risky after snapshot "
-                                f"(innovation={flags.get('innovation')}, young_days={flags.get('days_listed')}, thin={flags.get('thin')})")
-                    continue
-            except Exception:
-                pass
-
-            log_debug(f"Snapshot OK для {symbol}")
-            conditions = convert_snapshot_to_conditions(snapshot)
-            if not conditions:
-                log_message(f"⚠️ [SKIP] {symbol} → conditions None")
-                continue
-
-            log_debug(f"Conditions OK для {symbol}")
-
-            # ✅ Нормалізація support_position
-            support_position = str(conditions.get("support_position", "unknown")).lower()
-            if support_position in {"null", "unknown", ""}:
-                support_position = "between"
-
-            global_trend = str(conditions.get("global_trend", "unknown")).lower()
-
-            # ✅ Обробляємо near_support / near_resistance / between
-            result = None
-            side = None
-
-            if support_position == "near_support":
-                side = "LONG"
-                result = check_trade_conditions_long(conditions)
-
-            elif support_position == "near_resistance":
-                side = "SHORT"
-                result = check_trade_conditions_short(conditions)
-
-            elif support_position == "between":
-                # Маршрутизація за глобальним трендом — м’яко, як домовлялись
-                if global_trend in ("bullish", "strong_bullish", "flat"):
-                    side = "LONG"
-                    result = check_trade_conditions_long(conditions)
-                elif global_trend == "bearish":
-                    side = "SHORT"
-                    result = check_trade_conditions_short(conditions)
-                else:
-                    log_message(f"⛔ [SKIP] {symbol} → BETWEEN, але global_trend={global_trend}")
-                    side = "LONG"  # дефолт, щоб віддати у watchlist з напрямком
-                    result = {"add_to_watchlist": True, "watch_reason": f"between + unknown global_trend"}
-
-            else:
-                log_message(f"⛔ [SKIP] {symbol} → support_position={support_position}")
-                continue
-
-            log_message(f"[TRACE] check_trade_conditions({side}) → {result}")
+        # ---------------- Open / watchlist (послідовно) ----------------
+        for cand in candidates:
+            symbol = cand["symbol"]
+            snapshot = cand["snapshot"]
+            conditions = cand["conditions"]
+            support_position = cand["support_position"]
+            side = cand["side"]
+            result = cand["result"]
 
             if isinstance(result, dict) and result.get("open_trade") in ["LONG", "SHORT"]:
                 # ✅ Всі умови виконані — відкриваємо угоду
                 position_side = result.get("open_trade")
                 price = conditions.get("price") or conditions.get("current_price") or snapshot.get("price")
+
+                # ⏱️ скан усього універсуму міг тривати — звіряємо ціну зі скану зі свіжою перед ринковим ордером
+                fresh_price = float(get_current_futures_price(symbol) or 0.0)
+                try:
+                    scan_price = float(price or 0.0)
+                except (TypeError, ValueError):
+                    scan_price = 0.0
+                if fresh_price <= 0 or scan_price <= 0:
+                    log_message(f"🧯 [SKIP] {symbol}: немає свіжої ціни або ціни зі скану → не відкриваємо")
+                    continue
+                drift_pct = abs(fresh_price - scan_price) / scan_price * 100.0
+                if drift_pct > float(SCAN_MAX_PRICE_DRIFT_PCT):
+                    log_message(
+                        f"🧯 [SKIP] {symbol}: ціна зрушила на {drift_pct:.2f}% від скану "
+                        f"({scan_price} → {fresh_price}) > {SCAN_MAX_PRICE_DRIFT_PCT}% → не відкриваємо"
+                    )
+                    continue
+                price = fresh_price
+
                 balance = get_usdt_balance()
                 execute_scalping_trade(
                     target={
@@ -875,10 +1020,10 @@ def execute_scalping_trade(target, balance, position_side, behavior_summary, man
         log_debug(f"Старт execute_scalping_trade для {symbol}")
 
         # ⛔ антидубль: якщо інший потік вже відкриває цей символ — виходимо
-        if symbol in opening_symbols:
+        eligibility = get_eligibility_index()
+        if not eligibility.begin_opening(symbol):
             log_message(f"⏳ {symbol} вже відкривається іншим потоком → пропуск")
             return
-        opening_symbols.add(symbol)
 
         def make_json_safe(obj):
             if isinstance(obj, dict):
@@ -928,7 +1073,8 @@ def execute_scalping_trade(target, balance, position_side, behavior_summary, man
 
             # ======================= [ALLOCATOR] резерв під повну DCA-драбину =======================
             # Використовуємо динамічний аллокатор: якщо не тягнемо повний план — НЕ відкриваємо.
-            alloc = plan_allocation_for_new_trade(symbol)
+            # один знімок акаунта (TTL-кеш AccountService) на все відкриття
+            alloc = plan_allocation_for_new_trade(symbol, account=get_account_service().snapshot())
             if not alloc or not alloc.get("allow"):
                 log_message(f"🛑 [ALLOCATOR] Blocked {symbol}: {alloc.get('reason') if isinstance(alloc, dict) else 'no_alloc'}")
                 return
@@ -1134,6 +1280,7 @@ def execute_scalping_trade(target, balance, position_side, behavior_summary, man
             # ✅ активні трейди + лог
             from utils.logger import append_active_trade
             append_active_trade(trade_record)
+            eligibility.mark_open(symbol)
 
             from utils.signal_logger import append_signal_record
             append_signal_record(trade_record)
@@ -1145,202 +1292,262 @@ def execute_scalping_trade(target, balance, position_side, behavior_summary, man
                 pass
 
         finally:
-            opening_symbols.discard(symbol)
+            eligibility.end_opening(symbol)
 
     except Exception as e:
         log_error(f"❌ [execute_scalping_trade] Помилка: {e}\n{traceback.format_exc()}")
 
 
-def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summary,
-                      trade_id=None, sessions=None, check_interval=1, entry_time=None, signals=None):
+class SmartAvgTrade:
     """
-    👁 Smart Averaging (DCA) моніторинг відкритої угоди — BOT-ONLY TP:
+    📐 Стан Smart Averaging (DCA) однієї угоди + реакції на ціну — BOT-ONLY TP:
     - Без SL.
     - TP рахується від СЕРЕДНЬОЇ (avg_entry) на +tp_from_avg_pct (LONG) / -tp_from_avg_pct (SHORT)
     - Докупки: за "драбиною" (ladder) кожні dca_step_pct від попереднього рівня
       або, опціонально, від avg ("avg") чи від entry0 компаундом ("entry0").
-    - Ніяких прямих bybit-викликів у цьому файлі — лише OrderExecutor з executor.py
+    - Ніяких прямих bybit-викликів у цьому класі — лише OrderExecutor з executor.py
+    Використовується і polling-циклом manage_open_trade, і подієвим PriceEngine.
     """
-    log_message(f"👁 [DCA] Старт manage_open_trade для {symbol} ({side}) @ {entry_price}")
-
-    symbol_clean = str(symbol).split("_")[0]
-    if entry_time is None:
-        entry_time = datetime.now()
-
-    is_long = side.upper() in ["LONG", "BUY"]
-    entry_price = Decimal(str(entry_price))
-
-    # ===== Конфіг =====
-    try:
-        from config import SMART_AVG, TP_EPSILON, USE_EXCHANGE_TP
-    except Exception:
-        SMART_AVG = {}
-        TP_EPSILON = 0.0007
-        USE_EXCHANGE_TP = False  # за замовчуванням — BOT-only
-
-    dca_enabled           = bool(SMART_AVG.get("enabled", True))
-    base_margin           = float(SMART_AVG.get("base_margin", float(amount or 0.0) or 100.0))
-    max_adds              = int(SMART_AVG.get("max_adds", 5))
-    dca_step_pct          = float(SMART_AVG.get("dca_step_pct", 0.045))  # 0.035 = 3.5%
-    dca_mode              = str(SMART_AVG.get("dca_mode", "equal"))
-    dca_factor            = float(SMART_AVG.get("dca_factor", 1.2))
-    tp_from_avg_pct       = float(SMART_AVG.get("tp_from_avg_pct", 0.01))
-    alt_tp_from_avg_pct   = float(SMART_AVG.get("alt_tp_from_avg_pct", 0.02))
-    max_margin_per_trade  = float(SMART_AVG.get("max_margin_per_trade", (float(amount or 0.0) + 500.0)))
-    min_liq_buffer        = float(SMART_AVG.get("min_liq_buffer", 0.40))
-    atr_pause_pct         = float(SMART_AVG.get("atr_pause_pct", 0.10))
-    trend_flip_cut_pct    = float(SMART_AVG.get("trend_flip_cut_pct", 0.0))
-    cooldown_min          = int(SMART_AVG.get("cooldown_min", 20))
-    anchor_default        = str(SMART_AVG.get("anchor", "ladder")).lower()  # "ladder" | "avg" | "entry0"
-
-    # ===== Стан DCA з ActiveTrades (якщо є) =====
-    smart = None
-    try:
-        if trade_id and 'get_active_trade' in globals():
-            tr = get_active_trade(trade_id)
-            if tr and isinstance(tr, dict):
-                smart = tr.get("smart_avg")
-    except Exception as e:
-        log_error(f"⚠️ Не вдалося отримати active_trade для {trade_id}: {e}")
 
-    if not smart:
+    def __init__(self, symbol, entry_price, side, amount, leverage,
+                 trade_id=None, entry_time=None, signals=None):
+        self.symbol = str(symbol).split("_")[0]
+        self.trade_id = trade_id or f"{self.symbol}_{side}"
+        self._persist = bool(trade_id)
+        self.side = side
+        self.leverage = leverage
+        self.signals = signals
+        self.entry_time = entry_time or datetime.now()
+        self.is_long = side.upper() in ["LONG", "BUY"]
+        entry_price = Decimal(str(entry_price))
+        is_long = self.is_long
+
+        # ===== Конфіг =====
         try:
-            init_qty = (float(amount) * float(leverage)) / float(entry_price)
+            from config import SMART_AVG, TP_EPSILON, USE_EXCHANGE_TP
         except Exception:
-            init_qty = 0.0
-
-        # --- ініціалізація "драбини" ---
-        entry0_init = float(entry_price)
-        step_init = float(dca_step_pct)
-        if is_long:
-            ladder_next_init = entry0_init * (1.0 - step_init)
-        else:
-            ladder_next_init = entry0_init * (1.0 + step_init)
-
-        smart = {
-            "enabled": dca_enabled,
-            "avg_entry": float(entry_price),
-            "adds_done": 0,
-            "max_adds": max_adds,
-            "dca_step_pct": dca_step_pct,
-            "dca_mode": dca_mode,
-            "dca_factor": dca_factor,
-            "tp_from_avg_pct": tp_from_avg_pct,
-            "alt_tp_from_avg_pct": alt_tp_from_avg_pct,
-            "tp_price": float(entry_price * (Decimal("1")+Decimal(str(tp_from_avg_pct)) if is_long else Decimal("1")-Decimal(str(tp_from_avg_pct)))),
-            "tp_order_id": None,  # біржовий TP не використовуємо (якщо USE_EXCHANGE_TP=False)
-            "total_margin_used": float(amount or 0.0),
-            "total_qty": init_qty,
-            "max_margin_per_trade": max_margin_per_trade,
-            "min_liq_buffer": min_liq_buffer,
-            "atr_pause_pct": atr_pause_pct,
-            "trend_flip_cut_pct": trend_flip_cut_pct,
-            "cooldown_min": cooldown_min,
-
-            # --- нові ключі для "драбини" ---
-            "anchor": anchor_default,                 # "ladder" | "avg" | "entry0"
-            "entry0": entry0_init,                    # початковий вхід
-            "ladder_next_price": float(ladder_next_init)  # наступний рівень для add
-        }
-
-    # Локальні змінні
-    avg_entry = Decimal(str(smart.get("avg_entry", float(entry_price))))
-    adds_done = int(smart.get("adds_done", 0))
-    total_margin_used = float(smart.get("total_margin_used", float(amount or 0.0)))
-    total_qty = float(smart.get("total_qty", 0.0))
-    tp_price = Decimal(str(smart.get("tp_price", float(avg_entry * (Decimal("1")+Decimal(str(tp_from_avg_pct)) if is_long else Decimal("1")-Decimal(str(tp_from_avg_pct)))))))
-    tp_order_id = smart.get("tp_order_id")
-
-    # нові поля стану (беквард-сумісно)
-    anchor_mode = str(smart.get("anchor", anchor_default)).lower()
-    entry0 = Decimal(str(smart.get("entry0", float(entry_price))))
-    ladder_next_price = Decimal(str(smart.get("ladder_next_price", float(entry_price * (Decimal("1")-Decimal(str(dca_step_pct))) if is_long else entry_price * (Decimal("1")+Decimal(str(dca_step_pct)))))))
-
-    # --- анти-спам між докупками (сек) ---
-    MIN_SECONDS_BETWEEN_ADDS = int(SMART_AVG.get("min_seconds_between_adds", 45))
-    _last_add_ts = 0.0
-
-    # --- захист від API-помилок ---
-    _api_fail_streak = 0
+            SMART_AVG = {}
+            TP_EPSILON = 0.0007
+            USE_EXCHANGE_TP = False  # за замовчуванням — BOT-only
+        self.tp_epsilon = TP_EPSILON
+        self.use_exchange_tp = USE_EXCHANGE_TP
+
+        self.dca_enabled          = bool(SMART_AVG.get("enabled", True))
+        self.base_margin          = float(SMART_AVG.get("base_margin", float(amount or 0.0) or 100.0))
+        self.max_adds             = int(SMART_AVG.get("max_adds", 5))
+        self.dca_step_pct         = float(SMART_AVG.get("dca_step_pct", 0.045))  # 0.035 = 3.5%
+        self.dca_mode             = str(SMART_AVG.get("dca_mode", "equal"))
+        self.dca_factor           = float(SMART_AVG.get("dca_factor", 1.2))
+        self.tp_from_avg_pct      = float(SMART_AVG.get("tp_from_avg_pct", 0.01))
+        alt_tp_from_avg_pct       = float(SMART_AVG.get("alt_tp_from_avg_pct", 0.02))
+        self.max_margin_per_trade = float(SMART_AVG.get("max_margin_per_trade", (float(amount or 0.0) + 500.0)))
+        self.min_liq_buffer       = float(SMART_AVG.get("min_liq_buffer", 0.40))
+        self.atr_pause_pct        = float(SMART_AVG.get("atr_pause_pct", 0.10))
+        self.trend_flip_cut_pct   = float(SMART_AVG.get("trend_flip_cut_pct", 0.0))
+        cooldown_min              = int(SMART_AVG.get("cooldown_min", 20))
+        anchor_default            = str(SMART_AVG.get("anchor", "ladder")).lower()  # "ladder" | "avg" | "entry0"
+        tp_from_avg_pct = self.tp_from_avg_pct
+        dca_step_pct = self.dca_step_pct
+
+        # ===== Стан DCA з ActiveTrades (якщо є) =====
+        smart = None
+        try:
+            if trade_id and 'get_active_trade' in globals():
+                tr = get_active_trade(trade_id)
+                if tr and isinstance(tr, dict):
+                    smart = tr.get("smart_avg")
+        except Exception as e:
+            log_error(f"⚠️ Не вдалося отримати active_trade для {trade_id}: {e}")
 
-    peak_pnl_percent = -9999.0
-    worst_pnl_percent =  9999.0
-    trade_closed = False
+        if not smart:
+            try:
+                init_qty = (float(amount) * float(leverage)) / float(entry_price)
+            except Exception:
+                init_qty = 0.0
 
-    def save_state():
-        if not trade_id:
+            # --- ініціалізація "драбини" ---
+            entry0_init = float(entry_price)
+            step_init = float(dca_step_pct)
+            if is_long:
+                ladder_next_init = entry0_init * (1.0 - step_init)
+            else:
+                ladder_next_init = entry0_init * (1.0 + step_init)
+
+            smart = {
+                "enabled": self.dca_enabled,
+                "avg_entry": float(entry_price),
+                "adds_done": 0,
+                "max_adds": self.max_adds,
+                "dca_step_pct": dca_step_pct,
+                "dca_mode": self.dca_mode,
+                "dca_factor": self.dca_factor,
+                "tp_from_avg_pct": tp_from_avg_pct,
+                "alt_tp_from_avg_pct": alt_tp_from_avg_pct,
+                "tp_price": float(entry_price * (Decimal("1")+Decimal(str(tp_from_avg_pct)) if is_long else Decimal("1")-Decimal(str(tp_from_avg_pct)))),
+                "tp_order_id": None,  # біржовий TP не використовуємо (якщо USE_EXCHANGE_TP=False)
+                "total_margin_used": float(amount or 0.0),
+                "total_qty": init_qty,
+                "max_margin_per_trade": self.max_margin_per_trade,
+                "min_liq_buffer": self.min_liq_buffer,
+                "atr_pause_pct": self.atr_pause_pct,
+                "trend_flip_cut_pct": self.trend_flip_cut_pct,
+                "cooldown_min": cooldown_min,
+
+                # --- нові ключі для "драбини" ---
+                "anchor": anchor_default,                 # "ladder" | "avg" | "entry0"
+                "entry0": entry0_init,                    # початковий вхід
+                "ladder_next_price": float(ladder_next_init)  # наступний рівень для add
+            }
+        self.smart = smart
+
+        # Локальний стан
+        self.avg_entry = Decimal(str(smart.get("avg_entry", float(entry_price))))
+        self.adds_done = int(smart.get("adds_done", 0))
+        self.total_margin_used = float(smart.get("total_margin_used", float(amount or 0.0)))
+        self.total_qty = float(smart.get("total_qty", 0.0))
+        self.tp_price = Decimal(str(smart.get("tp_price", float(self.avg_entry * (Decimal("1")+Decimal(str(tp_from_avg_pct)) if is_long else Decimal("1")-Decimal(str(tp_from_avg_pct)))))))
+        self.tp_order_id = smart.get("tp_order_id")
+
+        # нові поля стану (беквард-сумісно)
+        self.anchor_mode = str(smart.get("anchor", anchor_default)).lower()
+        self.entry0 = Decimal(str(smart.get("entry0", float(entry_price))))
+        self.ladder_next_price = Decimal(str(smart.get("ladder_next_price", float(entry_price * (Decimal("1")-Decimal(str(dca_step_pct))) if is_long else entry_price * (Decimal("1")+Decimal(str(dca_step_pct)))))))
+
+        # --- анти-спам між докупками (сек) ---
+        self.min_seconds_between_adds = int(SMART_AVG.get("min_seconds_between_adds", 45))
+        self.last_add_ts = 0.0
+
+        self.peak_pnl_percent = -9999.0
+        self.worst_pnl_percent = 9999.0
+        self.closed = False
+
+    # ---------- стан ----------
+    def save_state(self):
+        if not self._persist:
             return
-        smart["avg_entry"] = float(avg_entry)
-        smart["adds_done"] = int(adds_done)
-        smart["total_margin_used"] = float(total_margin_used)
-        smart["total_qty"] = float(total_qty)
-        smart["tp_price"] = float(tp_price)
-        smart["tp_order_id"] = tp_order_id
+        smart = self.smart
+        smart["avg_entry"] = float(self.avg_entry)
+        smart["adds_done"] = int(self.adds_done)
+        smart["total_margin_used"] = float(self.total_margin_used)
+        smart["total_qty"] = float(self.total_qty)
+        smart["tp_price"] = float(self.tp_price)
+        smart["tp_order_id"] = self.tp_order_id
         # нові
-        smart["anchor"] = anchor_mode
-        smart["entry0"] = float(entry0)
-        smart["ladder_next_price"] = float(ladder_next_price)
+        smart["anchor"] = self.anchor_mode
+        smart["entry0"] = float(self.entry0)
+        smart["ladder_next_price"] = float(self.ladder_next_price)
         try:
             if 'update_active_trade' in globals():
-                update_active_trade(trade_id, {"smart_avg": smart})
+                update_active_trade(self.trade_id, {"smart_avg": smart})
         except Exception as e:
-            log_error(f"⚠️ update_active_trade failed для {trade_id}: {e}")
+            log_error(f"⚠️ update_active_trade failed для {self.trade_id}: {e}")
+
+    def reload_state(self):
+        """🔄 Перечитати smart_avg з ActiveTrades (могли змінити ззовні/відновлення)."""
+        if self._persist and 'get_active_trade' in globals():
+            tr = get_active_trade(self.trade_id)
+            if tr and isinstance(tr, dict):
+                self.smart = tr.get("smart_avg", self.smart)
+                if self.smart:
+                    self.avg_entry = Decimal(str(self.smart.get("avg_entry", self.avg_entry)))
+                    self.adds_done = int(self.smart.get("adds_done", self.adds_done))
+                    self.tp_price = Decimal(str(self.smart.get("tp_price", self.calc_tp_from_avg())))
+                    log_message(f"📊 [TP-DIAG] Перечитано avg_entry={self.avg_entry}, tp_price={self.tp_price}, adds={self.adds_done}")
 
-    def calc_tp_from_avg():
-        return avg_entry * (Decimal("1")+Decimal(str(tp_from_avg_pct)) if is_long else Decimal("1")-Decimal(str(tp_from_avg_pct)))
+    def calc_tp_from_avg(self):
+        return self.avg_entry * (Decimal("1")+Decimal(str(self.tp_from_avg_pct)) if self.is_long else Decimal("1")-Decimal(str(self.tp_from_avg_pct)))
 
     # === Поріг докупки ===
-    def next_dca_price():
-        s = Decimal(str(dca_step_pct))  # 0.035 = 3.5%
-        if anchor_mode == "avg":
-            return avg_entry * (Decimal("1")-s if is_long else Decimal("1")+s)
-        elif anchor_mode == "entry0":
+    def next_dca_price(self):
+        s = Decimal(str(self.dca_step_pct))  # 0.035 = 3.5%
+        if self.anchor_mode == "avg":
+            return self.avg_entry * (Decimal("1")-s if self.is_long else Decimal("1")+s)
+        elif self.anchor_mode == "entry0":
             # компаунд від першого входу: entry0 * (1±s)^(adds_done+1)
-            power = Decimal(str(adds_done + 1))
-            factor = (Decimal("1")-s) if is_long else (Decimal("1")+s)
-            return entry0 * (factor ** power)
+            power = Decimal(str(self.adds_done + 1))
+            factor = (Decimal("1")-s) if self.is_long else (Decimal("1")+s)
+            return self.entry0 * (factor ** power)
         else:
             # "ladder" — від попереднього рівня, що зберігаємо у стані
-            return ladder_next_price
-
-    def price_ok_for_dca(cur):
-        target = next_dca_price()
-        return (cur <= target) if is_long else (cur >= target)
+            return self.ladder_next_price
+
+    def price_ok_for_dca(self, cur):
+        target = self.next_dca_price()
+        return (cur <= target) if self.is_long else (cur >= target)
+
+    def tp_trigger_price(self):
+        """Ціна, від якої починається TP-верифікація (TP з ε-допуском)."""
+        eps = Decimal(str(self.tp_epsilon))
+        tp = self.calc_tp_from_avg()
+        return tp * (Decimal("1") - eps) if self.is_long else tp * (Decimal("1") + eps)
+
+    def hit_tp(self, cur):
+        trigger = self.tp_trigger_price()
+        return (cur >= trigger) if self.is_long else (cur <= trigger)
+
+    def levels(self):
+        """
+        Рівні для PriceEngine: (below, above).
+        LONG: докупка знизу, TP зверху; SHORT — навпаки.
+        """
+        tp = float(self.tp_trigger_price())
+        dca_possible = self.dca_enabled and self.adds_done < self.max_adds
+        dca = [float(self.next_dca_price())] if dca_possible else []
+        if self.is_long:
+            return dca, [tp]
+        return [tp], dca
 
     # === PNL та TP-верифікація перед закриттям ===
+    @staticmethod
     def _get_taker_fee_rate():
         return 0.0006  # ≈0.06% Bybit Taker
 
-    def compute_break_even_with_fees(avg_entry_d: Decimal) -> Decimal:
-        fee = _get_taker_fee_rate()
+    def compute_break_even_with_fees(self, avg_entry_d: Decimal) -> Decimal:
+        fee = self._get_taker_fee_rate()
         be = float(avg_entry_d) * (1.0 + fee * 2.0 + 1e-4)
         return Decimal(str(be))
 
+    @staticmethod
     def get_safe_price(symbol_str: str) -> Decimal:
         return Decimal(str(get_current_futures_price(symbol_str)))
 
-    def finalize_trade(reason, final_price):
-        nonlocal peak_pnl_percent, worst_pnl_percent, trade_closed, total_qty
-
-        if trade_closed:
-            log_debug(f"⏭ finalize_trade вже викликано раніше для {symbol_clean} → скіп")
+    def track(self, current_price):
+        """PnL від середньої + peak/worst. Повертає pnl_percent."""
+        current_price = Decimal(str(current_price))
+        pnl = ((current_price - self.avg_entry) / self.avg_entry)
+        if not self.is_long:
+            pnl *= -1
+        pnl_percent = float(pnl * Decimal(str(self.leverage)) * Decimal("100"))
+
+        if pnl_percent > self.peak_pnl_percent:
+            self.peak_pnl_percent = pnl_percent
+        if pnl_percent < self.worst_pnl_percent:
+            self.worst_pnl_percent = pnl_percent
+        return pnl_percent
+
+    def finalize_trade(self, reason, final_price):
+        if self.closed:
+            log_debug(f"⏭ finalize_trade вже викликано раніше для {self.symbol} → скіп")
             return
 
-        be = compute_break_even_with_fees(avg_entry)
-        if is_long:
+        symbol_clean = self.symbol
+        trade_id = self.trade_id if self._persist else None
+        leverage = self.leverage
+        be = self.compute_break_even_with_fees(self.avg_entry)
+        if self.is_long:
             pnl_ratio = (Decimal(str(final_price)) - be) / be
         else:
             pnl_ratio = (be - Decimal(str(final_price))) / be
         pnl_percent = float(pnl_ratio * Decimal(str(leverage)) * Decimal("100"))
 
-        duration_seconds = (datetime.now() - entry_time).total_seconds()
+        duration_seconds = (datetime.now() - self.entry_time).total_seconds()
         duration_str = str(timedelta(seconds=int(duration_seconds)))
         result = "WIN" if pnl_percent > 0 else "LOSS" if pnl_percent < 0 else "BREAKEVEN"
 
         executor = OrderExecutor(
             symbol=symbol_clean,
-            side=("Sell" if is_long else "Buy"),
-            position_side=side,
+            side=("Sell" if self.is_long else "Buy"),
+            position_side=self.side,
             leverage=leverage,
             amount_to_use=0.0,
             bypass_price_check=True
@@ -1356,8 +1563,8 @@ def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summ
             log_error(f"❌ НЕ ВДАЛОСЯ закрити {symbol_clean} ({reason}) → залишаємо моніторинг")
             return
 
-        trade_closed = True
-        total_qty = 0.0
+        self.closed = True
+        self.total_qty = 0.0
 
         try:
             update_signal_record(trade_id, {
@@ -1365,8 +1572,8 @@ def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summ
                 "close_time": datetime.utcnow().isoformat(),
                 "exit_reason": reason,
                 "result_percent": round(pnl_percent, 2),
-                "peak_pnl_percent": round(peak_pnl_percent, 2),
-                "worst_pnl_percent": round(worst_pnl_percent, 2),
+                "peak_pnl_percent": round(self.peak_pnl_percent, 2),
+                "worst_pnl_percent": round(self.worst_pnl_percent, 2),
                 "duration": duration_str,
                 "result": result
             })
@@ -1374,18 +1581,18 @@ def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summ
             pass
 
         try:
-            if signals:
+            if self.signals:
                 log_final_trade_result(
                     symbol=symbol_clean,
                     trade_id=trade_id,
-                    entry_price=float(avg_entry),
+                    entry_price=float(self.avg_entry),
                     exit_price=float(final_price),
                     result=result,
-                    peak_pnl=round(peak_pnl_percent, 2),
-                    worst_pnl=round(worst_pnl_percent, 2),
+                    peak_pnl=round(self.peak_pnl_percent, 2),
+                    worst_pnl=round(self.worst_pnl_percent, 2),
                     duration=duration_str,
                     exit_reason=reason,
-                    snapshot=signals
+                    snapshot=self.signals
                 )
         except Exception as e:
             log_message(f"📊 Запис трейду {trade_id} завершено у signal_stats.json (fallback ok)")
@@ -1411,271 +1618,320 @@ def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summ
             log_error(f"⚠️ Не вдалося оновити ActiveTrades для {trade_id}: {e}")
 
     # ===== Початковий TP — ТІЛЬКИ лог =====
-    if not tp_order_id:
-        try:
-            tp_price = calc_tp_from_avg()
-            if USE_EXCHANGE_TP and 'place_or_update_tp' in globals() and float(total_qty) > 0:
-                tp_order_id = place_or_update_tp(
-                    symbol=symbol_clean,
-                    side=side,
-                    quantity=total_qty,
-                    avg_entry=float(avg_entry),
-                    tp_from_avg_pct=float(tp_from_avg_pct)
-                )
-                log_message(f"🎯 [DCA] Біржовий TP встановлено {symbol_clean} {side}: {float(tp_price):.6f} (qty≈{total_qty:.6f})")
-            else:
-                log_message(f"ℹ️ [DCA] Плановий TP (bot-only) {symbol_clean} {side}: {float(tp_price):.6f} (qty≈{total_qty:.6f})")
-        except Exception as _tp_err:
-            log_message(f"⚠️ Не вдалося поставити TP: {type(_tp_err).__name__}: {_tp_err}")
-    save_state()
+    def init_tp(self):
+        symbol_clean, side, total_qty = self.symbol, self.side, self.total_qty
+        if not self.tp_order_id:
+            try:
+                self.tp_price = self.calc_tp_from_avg()
+                if self.use_exchange_tp and 'place_or_update_tp' in globals() and float(total_qty) > 0:
+                    self.tp_order_id = place_or_update_tp(
+                        symbol=symbol_clean,
+                        side=side,
+                        quantity=total_qty,
+                        avg_entry=float(self.avg_entry),
+                        tp_from_avg_pct=float(self.tp_from_avg_pct)
+                    )
+                    log_message(f"🎯 [DCA] Біржовий TP встановлено {symbol_clean} {side}: {float(self.tp_price):.6f} (qty≈{total_qty:.6f})")
+                else:
+                    log_message(f"ℹ️ [DCA] Плановий TP (bot-only) {symbol_clean} {side}: {float(self.tp_price):.6f} (qty≈{total_qty:.6f})")
+            except Exception as _tp_err:
+                log_message(f"⚠️ Не вдалося поставити TP: {type(_tp_err).__name__}: {_tp_err}")
+        self.save_state()
+
+    def log_tick(self, current_price, pnl_percent):
+        log_message(
+            f"📡 [DCA] {self.symbol} Px: {current_price}, PnL(avg): {round(pnl_percent, 2)}% "
+            f"(Peak: {round(self.peak_pnl_percent, 2)}%, Worst: {round(self.worst_pnl_percent, 2)}%) "
+            f"| avg={float(self.avg_entry):.6f}, adds={self.adds_done}/{self.max_adds}"
+        )
+        # діагностика порогу докупки
+        need_px = self.next_dca_price()
+        log_message(f"[DCA] need {'<=' if self.is_long else '>='} {float(need_px):.6f}; cur={float(current_price):.6f}; "
+                    f"anchor={self.anchor_mode}; step={self.dca_step_pct*100:.2f}%; adds={self.adds_done}/{self.max_adds}")
+
+    # ====== BOT-ONLY TP з ε-допуском + верифікація PnL ======
+    def try_take_profit(self, current_price):
+        """
+        Повертає None (TP не досягнуто), "unconfirmed" (не пройшла верифікація)
+        або "closed" (спроба закриття виконана).
+        """
+        symbol_clean, is_long = self.symbol, self.is_long
+        self.tp_price = self.calc_tp_from_avg()
+        tp_price = self.tp_price
+        if not self.hit_tp(current_price):
+            return None
 
-    # ===== Основний цикл =====
-    try:
-        while True:
-            already_added_in_this_cycle = False
+        px1 = self.get_safe_price(symbol_clean)
+        time.sleep(0.5)
+        px2 = self.get_safe_price(symbol_clean)
+        cond_second = ((is_long and px2 >= tp_price) or ((not is_long) and px2 <= tp_price))
+        if not cond_second:
+            log_message(f"⏸ [TP-VERIFY] {symbol_clean} умова не підтверджена вдруге: {float(px1):.6f}->{float(px2):.6f} vs TP {float(tp_price):.6f}")
+            return "unconfirmed"
+
+        be = self.compute_break_even_with_fees(self.avg_entry)
+        px_eff = px2
+        pnl_ratio = ((px_eff - be) / be) if is_long else ((be - px_eff) / be)
+        pnl_percent_est = float(pnl_ratio * Decimal(str(self.leverage)) * Decimal("100"))
+        if pnl_percent_est <= 0.0:
+            log_message(f"⏸ [TP-VERIFY] {symbol_clean} очікуваний PnL≤0 ({pnl_percent_est:.2f}%) → не закриваємо як TP")
+            return "unconfirmed"
+
+        log_message(f"✅ [TP-VERIFY] {symbol_clean} TP підтверджено: px={float(px_eff):.6f} vs TP={float(tp_price):.6f} | estPnL={pnl_percent_est:.2f}%")
+        self.finalize_trade("Take Profit (verified)", px_eff)
+        return "closed"
+
+    # ====== DCA: докупка ======
+    def try_dca(self, current_price):
+        """
+        Повертає None (докупка не потрібна), "blocked" (потрібна, але заблокована
+        кулдауном/ATR/маржею/буфером/помилкою) або "added".
+        """
+        symbol_clean, side, leverage, is_long = self.symbol, self.side, self.leverage, self.is_long
+        if not (self.dca_enabled and self.adds_done < self.max_adds and self.price_ok_for_dca(current_price)):
+            return None
 
-            current_price = Decimal(str(get_current_futures_price(symbol_clean)))
+        # кулдаун між докупками
+        now_ts = time.time()
+        if now_ts - self.last_add_ts < self.min_seconds_between_adds:
+            log_debug(f"[DCA] skip add: {now_ts - self.last_add_ts:.1f}s < {self.min_seconds_between_adds}s")
+            return "blocked"
 
-            # 🌐 Перевірка позиції
-            exists = None
+        # ATR-пауза
+        if self.atr_pause_pct > 0:
             try:
-                exists = check_position_with_retry(symbol_clean, side, retries=3, delay=2)
-            except Exception as _chk_err:
-                exists = None
-                log_error(f"[DCA] check_position error for {symbol_clean}: {type(_chk_err).__name__}: {_chk_err}")
-
-            if exists is None:
-                _api_fail_streak += 1
-                if _api_fail_streak >= 3:
-                    log_message(f"⏸ [DCA] API unstable (streak={_api_fail_streak}) → пауза без дій")
-                time.sleep(max(3, check_interval))
-                continue
-            else:
-                _api_fail_streak = 0
+                snapshot = build_monitor_snapshot(symbol_clean)
+                cond = convert_snapshot_to_conditions(snapshot) if snapshot else {}
+                atrp = float(cond.get("atr_percent") or 0.0)
+                if atrp and atrp >= (self.atr_pause_pct * 100.0):
+                    log_message(f"⏸ [DCA] ATR%={atrp:.2f} ≥ {self.atr_pause_pct*100:.0f}% → пауза докупки")
+                    return "blocked"
+            except Exception:
+                pass
 
-            if exists is False:
-                log_message(f"ℹ️ [DCA] Позиція {symbol_clean} відсутня (0 qty) → вихід з моніторингу без закриття.")
-                break
+        # Розмір додатку
+        add_margin = self.base_margin * (self.dca_factor ** self.adds_done) if self.dca_mode == "progressive" else self.base_margin
 
-            # PnL від середньої
-            pnl = ((current_price - avg_entry) / avg_entry)
-            if not is_long:
-                pnl *= -1
-            pnl_percent = float(pnl * Decimal(str(leverage)) * Decimal("100"))
+        # Стеля маржі
+        if (self.total_margin_used + add_margin) > self.max_margin_per_trade:
+            log_message(f"🛑 [DCA] max_margin_per_trade досягнуто ({self.total_margin_used + add_margin:.2f} > {self.max_margin_per_trade:.2f}) → докупка скасована")
+            return "blocked"
 
-            if pnl_percent > peak_pnl_percent:
-                peak_pnl_percent = pnl_percent
-            if pnl_percent < worst_pnl_percent:
-                worst_pnl_percent = pnl_percent
+        # Буфер до ліквідації
+        can_add = True
+        if self.min_liq_buffer > 0 and 'has_liq_buffer_after_add' in globals():
+            try:
+                approx_qty = float(add_margin) * float(leverage) / float(current_price)
+                can_add = bool(has_liq_buffer_after_add(symbol_clean, side, approx_qty, self.min_liq_buffer, leverage))
+            except Exception:
+                can_add = True
+        if not can_add:
+            log_message(f"🛑 [DCA] Недостатній буфер до ліквідації → докупка скасована")
+            return "blocked"
 
-            log_message(
-                f"📡 [DCA] {symbol_clean} Px: {current_price}, PnL(avg): {round(pnl_percent, 2)}% "
-                f"(Peak: {round(peak_pnl_percent, 2)}%, Worst: {round(worst_pnl_percent, 2)}%) "
-                f"| avg={float(avg_entry):.6f}, adds={adds_done}/{max_adds}"
-            )
+        # Відправляємо докупку
+        executor = OrderExecutor(
+            symbol=symbol_clean,
+            side=("Buy" if is_long else "Sell"),
+            position_side=side,
+            amount_to_use=float(add_margin),
+            leverage=leverage,
+            target_price=float(current_price)
+        )
+        ok = False
+        fill_price = float(current_price)
+        filled_qty = 0.0
+        try:
+            res = executor.execute()
+            ok = bool(res and res.get("entry_price"))
+            if ok:
+                fill_price = float(res["entry_price"])
+                filled_qty = float(res.get("quantity") or (add_margin * leverage / fill_price))
+        except Exception as e:
+            log_error(f"❌ [DCA] execute() помилка для {symbol_clean}: {e}")
+
+        if not ok:
+            log_message(f"⚠️ [DCA] Докупка не пройшла для {symbol_clean}")
+            return "blocked"
+
+        # Перерахунок середньої
+        prev_qty = self.total_qty
+        prev_avg = float(self.avg_entry)
+        total_qty = prev_qty + filled_qty
+        if total_qty <= 0:
+            log_error(f"❌ [DCA] Аномалія total_qty <= 0 після докупки")
+            return "blocked"
+        self.total_qty = total_qty
+        self.avg_entry = Decimal(str((prev_avg * prev_qty + fill_price * filled_qty) / total_qty))
+        self.total_margin_used += float(add_margin)
+        self.adds_done += 1
+        self.last_add_ts = time.time()
+
+        # Зрушуємо "драбину" на наступний рівень
+        s = Decimal(str(self.dca_step_pct))
+        if self.anchor_mode == "ladder":
+            self.ladder_next_price = self.ladder_next_price * ((Decimal("1") - s) if is_long else (Decimal("1") + s))
+        # для "entry0" рівень рахується по adds_done, для "avg" — нічого не треба
+
+        # Оновлене TP
+        self.tp_price = self.calc_tp_from_avg()
+        if self.use_exchange_tp and 'place_or_update_tp' in globals():
+            try:
+                self.tp_order_id = place_or_update_tp(
+                    symbol=symbol_clean,
+                    side=side,
+                    quantity=self.total_qty,
+                    avg_entry=float(self.avg_entry),
+                    tp_from_avg_pct=float(self.tp_from_avg_pct)
+                )
+                log_message(f"🎯 [DCA] Біржовий TP оновлено {symbol_clean} {side}: {float(self.tp_price):.6f} (qty≈{self.total_qty:.6f})")
+            except Exception as _tp_err:
+                log_message(f"⚠️ [DCA] Не вдалося оновити TP: {type(_tp_err).__name__}: {_tp_err}")
+        else:
+            log_message(f"ℹ️ [DCA] Новий плановий TP (bot-only): {float(self.tp_price):.6f}")
 
-            # діагностика порогу докупки
-            need_px = next_dca_price()
-            log_message(f"[DCA] need {'<=' if is_long else '>='} {float(need_px):.6f}; cur={float(current_price):.6f}; "
-                        f"anchor={anchor_mode}; step={dca_step_pct*100:.2f}%; adds={adds_done}/{max_adds}")
+        self.save_state()
 
-            
-            # 🔄 ОНОВИТИ smart_avg перед перевіркою TP
-            if trade_id and 'get_active_trade' in globals():
-                tr = get_active_trade(trade_id)
-                if tr and isinstance(tr, dict):
-                    smart = tr.get("smart_avg", smart)
-                    if smart:
-                        avg_entry = Decimal(str(smart.get("avg_entry", avg_entry)))
-                        adds_done = int(smart.get("adds_done", adds_done))
-                        tp_price = Decimal(str(smart.get("tp_price", calc_tp_from_avg())))
-                        log_message(f"📊 [TP-DIAG] Перечитано avg_entry={avg_entry}, tp_price={tp_price}, adds={adds_done}")
-
-
-            # ====== BOT-ONLY TP з ε-допуском + верифікація PnL ======
-            tp_price = calc_tp_from_avg()
-            eps = Decimal(str(TP_EPSILON))
-            hit_tp = ((is_long and current_price >= (tp_price * (Decimal("1") - eps)))
-                      or ((not is_long) and current_price <= (tp_price * (Decimal("1") + eps))))
-            if hit_tp:
-                px1 = get_safe_price(symbol_clean)
-                time.sleep(0.5)
-                px2 = get_safe_price(symbol_clean)
-                cond_second = ((is_long and px2 >= tp_price) or ((not is_long) and px2 <= tp_price))
-                if not cond_second:
-                    log_message(f"⏸ [TP-VERIFY] {symbol_clean} умова не підтверджена вдруге: {float(px1):.6f}->{float(px2):.6f} vs TP {float(tp_price):.6f}")
-                    time.sleep(check_interval); continue
+        send_telegram_message(
+            f"➕ <b>DCA додано</b> {symbol_clean}\n"
+            f"Сходинка: {self.adds_done}/{self.max_adds}\n"
+            f"Fill: {fill_price}\n"
+            f"Нова середня: {float(self.avg_entry):.6f}\n"
+            f"Новий TP: {float(self.tp_price):.6f}\n"
+            f"🎯 Наступний рівень: {float(self.next_dca_price()):.6f} (anchor={self.anchor_mode})"
+        )
+        log_debug(f"[DCA] Докупка зроблена. Закінчуємо цикл, щоб уникнути подвійного входу.")
+        return "added"
 
-                be = compute_break_even_with_fees(avg_entry)
-                px_eff = px2
-                pnl_ratio = ((px_eff - be) / be) if is_long else ((be - px_eff) / be)
-                pnl_percent_est = float(pnl_ratio * Decimal(str(leverage)) * Decimal("100"))
-                if pnl_percent_est <= 0.0:
-                    log_message(f"⏸ [TP-VERIFY] {symbol_clean} очікуваний PnL≤0 ({pnl_percent_est:.2f}%) → не закриваємо як TP")
-                    time.sleep(check_interval); continue
+    # ===== Опційний cut при розвороті тренду (частковий) =====
+    def check_trend_flip(self):
+        if self.trend_flip_cut_pct <= 0:
+            return
+        symbol_clean, side, is_long = self.symbol, self.side, self.is_long
+        try:
+            snapshot = build_monitor_snapshot(symbol_clean)
+            cond = convert_snapshot_to_conditions(snapshot) if snapshot else {}
+            gtrend = str(cond.get("global_trend", "")).lower()
+            flip_bad = (is_long and gtrend in {"bearish", "strong_bearish"}) or ((not is_long) and gtrend in {"bullish", "strong_bullish"})
+            if flip_bad and self.total_qty > 0:
+                cut_qty = self.total_qty * float(self.trend_flip_cut_pct)
+                try:
+                    ex = OrderExecutor(
+                        symbol=symbol_clean,
+                        side=("Sell" if is_long else "Buy"),
+                        position_side=side,
+                        leverage=self.leverage,
+                        amount_to_use=0.0,
+                        bypass_price_check=True
+                    )
+                    if hasattr(ex, "close_position_qty"):
+                        ok_cut = bool(ex.close_position_qty(cut_qty))
+                        if ok_cut:
+                            self.total_qty -= cut_qty
+                            if self.use_exchange_tp and 'place_or_update_tp' in globals():
+                                self.tp_order_id = place_or_update_tp(
+                                    symbol=symbol_clean,
+                                    side=side,
+                                    quantity=self.total_qty,
+                                    avg_entry=float(self.avg_entry),
+                                    tp_from_avg_pct=float(self.tp_from_avg_pct)
+                                )
+                            self.save_state()
+                            log_message(f"✂️ [DCA] Trend-flip cut: скорочено {cut_qty:.6f} {symbol_clean}. Залишок qty={self.total_qty:.6f}")
+                    else:
+                        log_message("ℹ️ close_position_qty відсутня в executor.py → пропускаю частковий cut")
+                except Exception as e:
+                    log_error(f"⚠️ [DCA] Trend-flip cut помилка: {e}")
+        except Exception:
+            pass
 
-                log_message(f"✅ [TP-VERIFY] {symbol_clean} TP підтверджено: px={float(px_eff):.6f} vs TP={float(tp_price):.6f} | estPnL={pnl_percent_est:.2f}%")
-                finalize_trade("Take Profit (verified)", px_eff)
-                break
+    # ===== Події PriceEngine =====
+    def on_cross(self, price):
+        """Ціна перетнула рівень TP або DCA → та сама логіка, що й у polling-циклі."""
+        # 🌐 як і polling-цикл — спершу позиція: закрита поза ботом → жодних TP/DCA
+        # (інакше докупка до того, як _sync_price_engine зніме угоду, відкрила б нову позицію)
+        positions = get_positions_service()
+        pos = positions.get(self.symbol, self.side, max_age=1.0)
+        if pos is None or not positions.ok:
+            log_message(f"⏸ [DCA] {self.symbol}: позицію не знайдено / знімок недоступний → подію ціни пропущено")
+            return
+        current_price = Decimal(str(price))
+        self.reload_state()
+        self.log_tick(current_price, self.track(current_price))
+        if self.try_take_profit(current_price) is not None:
+            return
+        self.try_dca(current_price)
 
-            # ====== DCA: докупка ======
-            if dca_enabled and adds_done < max_adds and price_ok_for_dca(current_price) and not already_added_in_this_cycle:
+    def on_timer(self):
+        self.check_trend_flip()
 
-                # кулдаун між докупками
-                now_ts = time.time()
-                if now_ts - _last_add_ts < MIN_SECONDS_BETWEEN_ADDS:
-                    log_debug(f"[DCA] skip add: {now_ts - _last_add_ts:.1f}s < {MIN_SECONDS_BETWEEN_ADDS}s")
-                    time.sleep(check_interval); continue
 
-                # ATR-пауза
-                if atr_pause_pct > 0:
-                    try:
-                        snapshot = build_monitor_snapshot(symbol_clean)
-                        cond = convert_snapshot_to_conditions(snapshot) if snapshot else {}
-                        atrp = float(cond.get("atr_percent") or 0.0)
-                        if atrp and atrp >= (atr_pause_pct * 100.0):
-                            log_message(f"⏸ [DCA] ATR%={atrp:.2f} ≥ {atr_pause_pct*100:.0f}% → пауза докупки")
-                            time.sleep(check_interval); continue
-                    except Exception:
-                        pass
+def manage_open_trade(symbol, entry_price, side, amount, leverage, behavior_summary,
+                      trade_id=None, sessions=None, check_interval=1, entry_time=None, signals=None):
+    """
+    👁 Smart Averaging (DCA) моніторинг відкритої угоди — polling-режим.
+    Уся логіка TP/DCA — у SmartAvgTrade; тут лише цикл опитування ціни.
+    Подієвий режим (без потоку на угоду) — див. PRICE_ENGINE_ENABLED / trading/price_engine.py.
+    """
+    log_message(f"👁 [DCA] Старт manage_open_trade для {symbol} ({side}) @ {entry_price}")
 
-                # Розмір додатку
-                add_margin = base_margin * (dca_factor ** adds_done) if dca_mode == "progressive" else base_margin
+    trade = SmartAvgTrade(symbol, entry_price, side, amount, leverage,
+                          trade_id=trade_id, entry_time=entry_time, signals=signals)
+    symbol_clean = trade.symbol
+    trade.init_tp()
 
-                # Стеля маржі
-                if (total_margin_used + add_margin) > max_margin_per_trade:
-                    log_message(f"🛑 [DCA] max_margin_per_trade досягнуто ({total_margin_used + add_margin:.2f} > {max_margin_per_trade:.2f}) → докупка скасована")
-                    time.sleep(check_interval); continue
+    # --- захист від API-помилок ---
+    _api_fail_streak = 0
 
-                # Буфер до ліквідації
-                can_add = True
-                if min_liq_buffer > 0 and 'has_liq_buffer_after_add' in globals():
-                    try:
-                        approx_qty = float(add_margin) * float(leverage) / float(current_price)
-                        can_add = bool(has_liq_buffer_after_add(symbol_clean, side, approx_qty, min_liq_buffer, leverage))
-                    except Exception:
-                        can_add = True
-                if not can_add:
-                    log_message(f"🛑 [DCA] Недостатній буфер до ліквідації → докупка скасована")
-                    time.sleep(check_interval); continue
+    # ===== Основний цикл =====
+    # ціни / позиція / klines відкритої угоди — у смузі позицій, попереду скану
+    with request_lane(LANE_POSITION):
+        try:
+            while True:
+                current_price = Decimal(str(get_current_futures_price(symbol_clean)))
 
-                # Відправляємо докупку
-                executor = OrderExecutor(
-                    symbol=symbol_clean,
-                    side=("Buy" if is_long else "Sell"),
-                    position_side=side,
-                    amount_to_use=float(add_margin),
-                    leverage=leverage,
-                    target_price=float(current_price)
-                )
-                ok = False
-                fill_price = float(current_price)
-                filled_qty = 0.0
+                # 🌐 Перевірка позиції
+                exists = None
                 try:
-                    res = executor.execute()
-                    ok = bool(res and res.get("entry_price"))
-                    if ok:
-                        fill_price = float(res["entry_price"])
-                        filled_qty = float(res.get("quantity") or (add_margin * leverage / fill_price))
-                except Exception as e:
-                    log_error(f"❌ [DCA] execute() помилка для {symbol_clean}: {e}")
+                    exists = check_position_with_retry(symbol_clean, side, retries=3, delay=2)
+                except Exception as _chk_err:
+                    exists = None
+                    log_error(f"[DCA] check_position error for {symbol_clean}: {type(_chk_err).__name__}: {_chk_err}")
+
+                if exists is None:
+                    _api_fail_streak += 1
+                    if _api_fail_streak >= 3:
+                        log_message(f"⏸ [DCA] API unstable (streak={_api_fail_streak}) → пауза без дій")
+                    time.sleep(max(3, check_interval))
+                    continue
+                else:
+                    _api_fail_streak = 0
 
-                if not ok:
-                    log_message(f"⚠️ [DCA] Докупка не пройшла для {symbol_clean}")
-                    time.sleep(check_interval); continue
+                if exists is False:
+                    log_message(f"ℹ️ [DCA] Позиція {symbol_clean} відсутня (0 qty) → вихід з моніторингу без закриття.")
+                    break
 
-                # Перерахунок середньої
-                prev_qty = total_qty
-                prev_avg = float(avg_entry)
-                total_qty = prev_qty + filled_qty
-                if total_qty <= 0:
-                    log_error(f"❌ [DCA] Аномалія total_qty <= 0 після докупки")
-                    time.sleep(check_interval); continue
-                avg_entry = Decimal(str((prev_avg * prev_qty + fill_price * filled_qty) / total_qty))
-                total_margin_used += float(add_margin)
-                adds_done += 1
-                _last_add_ts = time.time()
-                already_added_in_this_cycle = True 
-
-
-                # Зрушуємо "драбину" на наступний рівень
-                s = Decimal(str(dca_step_pct))
-                if anchor_mode == "ladder":
-                    ladder_next_price = ladder_next_price * ((Decimal("1") - s) if is_long else (Decimal("1") + s))
-                # для "entry0" рівень рахується по adds_done, для "avg" — нічого не треба
-
-                # Оновлене TP
-                tp_price = calc_tp_from_avg()
-                if USE_EXCHANGE_TP and 'place_or_update_tp' in globals():
-                    try:
-                        tp_order_id = place_or_update_tp(
-                            symbol=symbol_clean,
-                            side=side,
-                            quantity=total_qty,
-                            avg_entry=float(avg_entry),
-                            tp_from_avg_pct=float(tp_from_avg_pct)
-                        )
-                        log_message(f"🎯 [DCA] Біржовий TP оновлено {symbol_clean} {side}: {float(tp_price):.6f} (qty≈{total_qty:.6f})")
-                    except Exception as _tp_err:
-                        log_message(f"⚠️ [DCA] Не вдалося оновити TP: {type(_tp_err).__name__}: {_tp_err}")
-                else:
-                    log_message(f"ℹ️ [DCA] Новий плановий TP (bot-only): {float(tp_price):.6f}")
+                # PnL від середньої
+                trade.log_tick(current_price, trade.track(current_price))
 
-                save_state()
+                # 🔄 ОНОВИТИ smart_avg перед перевіркою TP
+                trade.reload_state()
 
-                send_telegram_message(
-                    f"➕ <b>DCA додано</b> {symbol_clean}\n"
-                    f"Сходинка: {adds_done}/{max_adds}\n"
-                    f"Fill: {fill_price}\n"
-                    f"Нова середня: {float(avg_entry):.6f}\n"
-                    f"Новий TP: {float(tp_price):.6f}\n"
-                    f"🎯 Наступний рівень: {float(next_dca_price()):.6f} (anchor={anchor_mode})"
-                )
-                log_debug(f"[DCA] Докупка зроблена. Закінчуємо цикл, щоб уникнути подвійного входу.")
+                tp_state = trade.try_take_profit(current_price)
+                if tp_state == "closed":
+                    break
+                if tp_state == "unconfirmed":
+                    time.sleep(check_interval); continue
 
-            # ===== Опційний cut при розвороті тренду (частковий) =====
-            if trend_flip_cut_pct > 0:
-                try:
-                    snapshot = build_monitor_snapshot(symbol_clean)
-                    cond = convert_snapshot_to_conditions(snapshot) if snapshot else {}
-                    gtrend = str(cond.get("global_trend", "")).lower()
-                    flip_bad = (is_long and gtrend in {"bearish", "strong_bearish"}) or ((not is_long) and gtrend in {"bullish", "strong_bullish"})
-                    if flip_bad and total_qty > 0:
-                        cut_qty = total_qty * float(trend_flip_cut_pct)
-                        try:
-                            ex = OrderExecutor(
-                                symbol=symbol_clean,
-                                side=("Sell" if is_long else "Buy"),
-                                position_side=side,
-                                leverage=leverage,
-                                amount_to_use=0.0,
-                                bypass_price_check=True
-                            )
-                            if hasattr(ex, "close_position_qty"):
-                                ok_cut = bool(ex.close_position_qty(cut_qty))
-                                if ok_cut:
-                                    total_qty -= cut_qty
-                                    if USE_EXCHANGE_TP and 'place_or_update_tp' in globals():
-                                        tp_order_id = place_or_update_tp(
-                                            symbol=symbol_clean,
-                                            side=side,
-                                            quantity=total_qty,
-                                            avg_entry=float(avg_entry),
-                                            tp_from_avg_pct=float(tp_from_avg_pct)
-                                        )
-                                    save_state()
-                                    log_message(f"✂️ [DCA] Trend-flip cut: скорочено {cut_qty:.6f} {symbol_clean}. Залишок qty={total_qty:.6f}")
-                            else:
-                                log_message("ℹ️ close_position_qty відсутня в executor.py → пропускаю частковий cut")
-                        except Exception as e:
-                            log_error(f"⚠️ [DCA] Trend-flip cut помилка: {e}")
-                except Exception:
-                    pass
+                if trade.try_dca(current_price) == "blocked":
+                    time.sleep(check_interval); continue
 
-            time.sleep(check_interval)
+                trade.check_trend_flip()
 
-    except Exception as e:
-        log_error(f"❌ [manage_open_trade] Помилка: {e}")
+                time.sleep(check_interval)
+
+        except Exception as e:
+            log_error(f"❌ [manage_open_trade] Помилка: {e}")
 
 
 
@@ -1704,10 +1960,64 @@ def adjust_risk_by_volatility(symbol, base_leverage=50):
 
 
 
+# ⚡ Подієвий рушій цін (один фід на всі угоди замість потоку на угоду)
+_PRICE_ENGINE = None
+_PRICE_ENGINE_LOCK = threading.Lock()
+
+
+def get_price_engine():
+    """Спільний PriceEngine (ліниво створюється і запускається)."""
+    global _PRICE_ENGINE
+    with _PRICE_ENGINE_LOCK:
+        if _PRICE_ENGINE is None:
+            _PRICE_ENGINE = PriceEngine(
+                price_source=ticker_price_source,
+                tick_sec=PRICE_ENGINE_TICK_SEC,
+                timer_sec=PRICE_ENGINE_TIMER_SEC,
+                workers=PRICE_ENGINE_WORKERS,
+            )
+            # пуш цін зі стріму (якщо увімкнено); polling знімка тікерів лишається як fallback
+            stream = get_market_stream()
+            if stream is not None:
+                _PRICE_ENGINE.attach_stream(stream)
+            _PRICE_ENGINE.start()
+        return _PRICE_ENGINE
+
+
+def _sync_price_engine(live_trades, authoritative):
+    """
+    Реєструє нові живі позиції в PriceEngine і знімає ті, яких на біржі вже нема.
+    authoritative=False (помилка API) → нічого не знімаємо.
+    """
+    engine = get_price_engine()
+    for trade_id, trade in live_trades.items():
+        if engine.has(trade_id):
+            continue
+        try:
+            if float(trade.get("entry_price") or 0.0) <= 0:
+                log_error(f"⚠️ [ENGINE] {trade_id}: entry_price=0 → пропуск реєстрації")
+                continue
+            log_message(f"👁 [DCA] Старт моніторингу {trade_id} ({trade.get('symbol')}) через PriceEngine")
+            st = SmartAvgTrade(
+                trade.get("symbol"), trade.get("entry_price"), trade.get("side", "LONG"),
+                trade.get("amount", 0.0), trade.get("leverage", 10), trade_id=trade_id
+            )
+            st.init_tp()
+            engine.register(st)
+        except Exception as e:
+            log_error(f"❌ [ENGINE] реєстрація {trade_id}: {e}")
+
+    if authoritative:
+        for trade_id in engine.trade_ids() - set(live_trades):
+            log_message(f"ℹ️ [DCA] Позиція {trade_id} відсутня (0 qty) → вихід з моніторингу без закриття.")
+            engine.unregister(trade_id)
+
+
 def monitor_all_open_trades():
     """
     🔄 Безперервно моніторить всі відкриті угоди напряму з біржі (Bybit API).
     ⚠️ Не перетирає повний ActiveTrades.json; спрощений стан пише в ACTIVE_TRADES_FILE_SIMPLE.
+    PRICE_ENGINE_ENABLED=True → угоди реєструються в PriceEngine (без потоку на угоду).
     """
     log_message("🚦 [DEBUG] Старт monitor_all_open_trades() (LIVE API)")
 
@@ -1735,19 +2045,10 @@ def monitor_all_open_trades():
 
     while True:
         try:
-            # 🛡️ Отримуємо всі відкриті позиції з біржі
-            response = bybit.get_positions(category="linear", settleCoin="USDT")
-            positions = response.get("result", {}).get("list", []) or []
-
-            # ⏳ Якщо пусто — кілька ретраїв
-            if not positions:
-                for attempt in range(1, 4):
-                    time.sleep(2)
-                    response = bybit.get_positions(category="linear", settleCoin="USDT")
-                    positions = response.get("result", {}).get("list", []) or []
-                    if positions:
-                        log_debug(f"Позиції знайдено на спробі {attempt}")
-                        break
+            # 🛡️ Відкриті позиції — зі спільного знімка (порожній список підтверджує сам сервіс)
+            positions_service = get_positions_service()
+            positions = positions_service.rows()
+            positions_ok = positions_service.ok
 
             live_trades = {}
             simple_trades = {}
@@ -1803,14 +2104,18 @@ def monitor_all_open_trades():
                     "opened_at": current_time
                 }
 
-            try:
-                with open(ACTIVE_TRADES_FILE_SIMPLE, "w", encoding="utf-8") as f:
-                    json.dump(simple_trades, f, indent=2, ensure_ascii=False)
-                    prune_inactive_trades(set(live_trades.keys()))
+            # ⚠️ Порожній / недоступний знімок (збій API, ще не завантажений) — не затираємо стан угод
+            if positions_ok and positions_service.has_data():
+                try:
+                    with open(ACTIVE_TRADES_FILE_SIMPLE, "w", encoding="utf-8") as f:
+                        json.dump(simple_trades, f, indent=2, ensure_ascii=False)
+                        prune_inactive_trades(set(live_trades.keys()))
 
-                log_debug(f"ActiveTradesSimple.json оновлено ({len(simple_trades)} угод)")
-            except Exception as e:
-                log_error(f"❌ [monitor_all_open_trades] Помилка при записі ActiveTradesSimple.json: {e}")
+                    log_debug(f"ActiveTradesSimple.json оновлено ({len(simple_trades)} угод)")
+                except Exception as e:
+                    log_error(f"❌ [monitor_all_open_trades] Помилка при записі ActiveTradesSimple.json: {e}")
+            else:
+                log_message("⚠️ [monitor_all_open_trades] Знімок позицій недоступний → пропуск оновлення/очищення угод")
 
             # ✅ Відновлення smart_avg, якщо запис був втрачений
             try:
@@ -1824,6 +2129,10 @@ def monitor_all_open_trades():
             except Exception as e:
                 log_error(f"❌ [RECOVERY] Помилка при restore_all_missing_smartavg: {e}")
 
+            if PRICE_ENGINE_ENABLED:
+                _sync_price_engine(live_trades, positions_ok)
+                live_trades = {}
+
             for trade_id, trade in live_trades.items():
                 if trade_id not in active_threads:
                     log_debug(f"Запуск моніторингу для {trade_id} (API)")
@@ -1909,8 +2218,7 @@ def restore_all_missing_smartavg():
     📦 Відновлює smart_avg для всіх відкритих позицій на біржі (якщо вони відсутні в ActiveTrades.json)
     """
     try:
-        response = bybit.get_positions(category="linear", settleCoin="USDT")
-        positions = response.get("result", {}).get("list", []) or []
+        positions = get_positions_service().rows()
 
         restored = 0
         for pos in positions:
@@ -0,0 +1,171 @@
+# utils/account_service.py
+
+"""
+💼 Спільний знімок стану акаунта (Bybit UNIFIED): equity, доступний баланс, зайнята маржа.
+
+Замість окремого get_wallet_balance у get_usdt_balance / get_balance /
+allocator.get_unified_equity / risk_management на кожне відкриття угоди чи тригер watchlist:
+  - знімок кешується на ttl секунд; пачка тригерів за цей час — один запит
+    (конкурентні читачі чекають на той самий запит, а не роблять свої);
+  - власні fills оновлюють знімок інкрементально (apply_fill: available ↓, used_margin ↑),
+    тож наступне відкриття в межах ttl бачить уже зайняту маржу;
+  - закриття позиції — invalidate(): наступне читання піде на біржу;
+  - якщо запит не вдався — віддаємо останній відомий знімок (або None).
+"""
+
+import threading
+import time
+
+from utils.logger import log_error
+
+_RETRY_SEC = 1.0
+
+
+def _to_float(value):
+    try:
+        v = float(value)
+        return v if v == v and abs(v) != float("inf") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_wallet(resp, coin="USDT"):
+    """Відповідь get_wallet_balance (v5) → знімок або None."""
+    lists = (resp.get("result", {}) or {}).get("list", []) or []
+    if not lists:
+        return None
+    acc = lists[0] or {}
+    coin_row = next((c for c in acc.get("coin", []) or [] if c.get("coin") == coin), {}) or {}
+    return {
+        "equity": _to_float(acc.get("totalEquity")),
+        "available": _to_float(acc.get("totalAvailableBalance")),
+        "used_margin": _to_float(acc.get("totalInitialMargin")),
+        "wallet_balance": _to_float(acc.get("totalWalletBalance")),
+        "coin": dict(coin_row),  # сирий рядок монети (walletBalance, availableToWithdraw, ...)
+        "fills_applied": 0,
+    }
+
+
+class AccountService:
+    """🧠 Кеш стану акаунта з TTL і інкрементальними оновленнями від власних fills."""
+
+    def __init__(self, client, account_type="UNIFIED", coin="USDT", ttl=5.0):
+        self._client = client
+        self.account_type = account_type
+        self.coin = coin
+        self.ttl = float(ttl)
+        self._state = None
+        self._updated_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()          # захист _state
+        self._refresh_lock = threading.Lock()  # лише один REST-запит одночасно
+        self.requests = 0
+        self.errors = 0
+
+    # ---------- оновлення ----------
+    def refresh(self):
+        """Один запит get_wallet_balance → новий знімок. True при успіху."""
+        self._last_attempt = time.time()
+        try:
+            self.requests += 1
+            resp = self._client.get_wallet_balance(accountType=self.account_type) or {}
+            if resp.get("retCode") not in (None, 0):
+                self.errors += 1
+                log_error(f"❌ AccountService: retCode={resp.get('retCode')} {resp.get('retMsg')}")
+                return False
+            state = parse_wallet(resp, self.coin)
+            if state is None:
+                self.errors += 1
+                return False
+        except Exception as e:
+            self.errors += 1
+            log_error(f"❌ AccountService.refresh: {e}")
+            return False
+        with self._lock:
+            self._state = state
+            self._updated_at = time.time()
+        return True
+
+    def invalidate(self):
+        """Наступне читання — свіжий запит (напр., після закриття позиції)."""
+        with self._lock:
+            self._updated_at = 0.0
+            self._last_attempt = 0.0
+
+    def apply_fill(self, margin, realized_pnl=0.0):
+        """
+        Власний fill: margin > 0 — відкриття/докупка (маржа зайнята), margin < 0 — звільнення.
+        realized_pnl додається до equity та доступного балансу.
+        """
+        margin, pnl = _to_float(margin), _to_float(realized_pnl)
+        with self._lock:
+            if self._state is None:
+                return
+            s = dict(self._state)
+            s["available"] = max(0.0, s["available"] - margin + pnl)
+            s["used_margin"] = max(0.0, s["used_margin"] + margin)
+            s["equity"] += pnl
+            coin = dict(s["coin"])
+            for key in ("availableToWithdraw", "availableToTrade", "availableBalance"):
+                if coin.get(key) not in (None, ""):
+                    coin[key] = str(max(0.0, _to_float(coin[key]) - margin + pnl))
+            s["coin"] = coin
+            s["fills_applied"] += 1
+            self._state = s
+
+    # ---------- читання ----------
+    def snapshot(self, max_age=None):
+        """Знімок {"equity", "available", "used_margin", "wallet_balance", "coin", ...} або None."""
+        max_age = self.ttl if max_age is None else float(max_age)
+        if time.time() - self._updated_at > max_age:
+            with self._refresh_lock:
+                # інший потік міг оновити, поки чекали; після помилки — не частіше за _RETRY_SEC
+                now = time.time()
+                if now - self._updated_at > max_age and now - self._last_attempt >= min(_RETRY_SEC, max_age):
+                    self.refresh()
+        with self._lock:
+            return dict(self._state) if self._state is not None else None
+
+    def equity(self, max_age=None):
+        s = self.snapshot(max_age)
+        return s["equity"] if s else 0.0
+
+    def available(self, max_age=None):
+        s = self.snapshot(max_age)
+        return s["available"] if s else 0.0
+
+    def coin_value(self, *keys, max_age=None):
+        """Перше непорожнє поле з рядка монети (в порядку keys) або None."""
+        s = self.snapshot(max_age)
+        coin = (s or {}).get("coin") or {}
+        for key in keys:
+            if coin.get(key) not in (None, ""):
+                return _to_float(coin[key])
+        return None
+
+    def age(self):
+        return time.time() - self._updated_at if self._updated_at else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "age_sec": round(self.age(), 3) if self._updated_at else None,
+                "requests": self.requests,
+                "errors": self.errors,
+                "fills_applied": (self._state or {}).get("fills_applied", 0),
+            }
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_account_service():
+    """Повертає спільний AccountService."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            from config import client, ACCOUNT_TTL_SEC
+            _SERVICE = AccountService(client, ttl=ACCOUNT_TTL_SEC)
+        return _SERVICE
@@ -1,19 +1,16 @@
 # allocator.py
 
-from typing import Dict, Any
-from pybit.unified_trading import HTTP
+from typing import Dict, Any, Optional
 from config import (
     MAX_ACTIVE_TRADES,
     SMART_AVG,
     DESIRED_ACTIVE_TRADES,          # скільки ХОЧЕМО активних трейдів
     ACCOUNT_SAFETY_BUFFER_PCT,      # напр. 0.05 = 5% загального балансу тримаємо в запасі
     ACCOUNT_MIN_FREE_USDT,          # напр. 0.0..50.0 — фіксована подушка
-    BYBIT_API_KEY, BYBIT_API_SECRET
+    bybit as _bybit,                # лише для діагностики FUNDING (UNIFIED — з AccountService)
 )
 from utils.logger import log_error, log_message, load_active_trades
-
-# Для реального балансу UNIFIED акаунту
-_bybit = HTTP(api_key=BYBIT_API_KEY, api_secret=BYBIT_API_SECRET)
+from utils.account_service import get_account_service
 
 
 # ============================ Хелпери активних угод ============================
@@ -52,14 +49,15 @@ def has_open_trade_for(symbol: str) -> bool:
 
 # ============================ Баланс / резерви ============================
 
-def get_unified_equity() -> float:
+def get_unified_equity(account: Optional[Dict[str, Any]] = None) -> float:
     """
-    Реальний equity UNIFIED акаунту (USDT).
+    Реальний equity UNIFIED акаунту (USDT) — зі знімка AccountService (або переданого account).
     Якщо UNIFIED тимчасово 0, пробує FUNDING для діагностики.
     """
     try:
-        resp = _bybit.get_wallet_balance(accountType="UNIFIED")
-        eq = float(resp["result"]["list"][0].get("totalEquity", 0.0))
+        if account is None:
+            account = get_account_service().snapshot()
+        eq = float((account or {}).get("equity", 0.0))
         if eq > 0:
             return eq
         # Фолбек (для дебагу/логів): покажемо, якщо гроші зависли у FUNDING
@@ -163,10 +161,10 @@ def _log_alloc_snapshot(avail, keep_reserve, reserved_full_trade, open_cnt, capa
 
 # ============================ Головна функція ============================
 
-def plan_allocation_for_new_trade(symbol: str) -> Dict[str, Any]:
+def plan_allocation_for_new_trade(symbol: str, account: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Динамічний аллокатор:
-    - Рахує capacity за реальним equity (UNIFIED).
+    - Рахує capacity за реальним equity (UNIFIED); account — вже прочитаний знімок AccountService.
     - Обмежує лімітом: MAX_ACTIVE_TRADES, DESIRED_ACTIVE_TRADES.
     - Враховує вже використану маржу відкритими угодами (active_trades.json).
     - Дає стартову суму для 1-ї сходинки (SMART_AVG.base_margin), якщо реально вистачає на повну DCA-угоду.
@@ -187,7 +185,7 @@ def plan_allocation_for_new_trade(symbol: str) -> Dict[str, Any]:
             }
 
         # 1) Реальний баланс та параметри DCA
-        avail = float(get_unified_equity())
+        avail = float(get_unified_equity(account))
         if avail <= 0:
             return {
                 "allow": False,
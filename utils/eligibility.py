@@ -0,0 +1,295 @@
+# utils/eligibility.py
+
+"""
+🚦 Індекс допуску символів: «чи можна зараз сканувати / відкривати symbol?» за O(1).
+
+Замість окремого файлового I/O на кожну перевірку (cooldown_success.json,
+loss_blacklist.json, ActiveTrades, innovation-кеш, opening_symbols), частина з яких
+ще й виконувалась лише після дорогого build_monitor_snapshot:
+  - блоки з TTL у пам'яті: symbol → {reason: until (epoch сек або None — безстроково)};
+  - cooldown / blacklist — write-through у JSON (persist_file), підхоплюються при старті;
+    старі cooldown_success.json / loss_blacklist.json переносяться один раз (import_legacy);
+  - відкриті угоди — множина символів, синхронізується з джерела (TradeStore / ActiveTrades)
+    не частіше, ніж раз на open_sync_sec, і оновлюється одразу при відкритті (mark_open);
+  - «відкривається зараз» — атомарні begin_opening/end_opening (антидубль між потоками);
+  - innovation/young-флаги — з risk_check (реєстр метаданих), результат кешується на risk_ttl.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from utils.logger import log_error
+
+# Причини, що зберігаються на диск (решта — лише в пам'яті)
+PERSISTED_REASONS = ("cooldown", "blacklist")
+
+# Файли до EligibilityIndex: cooldown — {symbol: "YYYY-mm-dd HH:MM:SS" (до, локальний час)},
+# blacklist — {symbol: epoch моменту збитку}
+LEGACY_COOLDOWN_FILE = "data/cooldown_success.json"
+LEGACY_BLACKLIST_FILE = "data/loss_blacklist.json"
+
+
+class EligibilityIndex:
+    """🧠 Блоки символів з TTL + відкриті угоди + антидубль відкриття."""
+
+    def __init__(self, persist_file=None, open_symbols_source=None, open_sync_sec=5.0,
+                 risk_check=None, risk_ttl=600.0):
+        self.persist_file = persist_file
+        self._open_source = open_symbols_source
+        self.open_sync_sec = float(open_sync_sec)
+        self._risk_check = risk_check
+        self.risk_ttl = float(risk_ttl)
+        self._blocks = {}      # symbol -> {reason: until | None}
+        self._open = set()     # символи з відкритими угодами
+        self._opening = set()  # символи, що відкриваються просто зараз
+        self._risk = {}        # symbol -> (flags, until)
+        self._open_synced_at = 0.0
+        self._lock = threading.RLock()
+        self.checks = 0
+        self.rejected = 0
+        if persist_file:
+            self.load()
+
+    # ---------- диск ----------
+    def load(self):
+        try:
+            with open(self.persist_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log_error(f"⚠️ EligibilityIndex.load({self.persist_file}): {e}")
+            return False
+        now = time.time()
+        with self._lock:
+            for symbol, reasons in (data or {}).items():
+                for reason, until in (reasons or {}).items():
+                    if reason in PERSISTED_REASONS and (until is None or until > now):
+                        self._blocks.setdefault(symbol, {})[reason] = until
+        return True
+
+    def import_legacy(self, cooldown_file=None, blacklist_file=None, blacklist_ttl=0):
+        """
+        Переносить ще активні записи зі старих JSON (cooldown / loss blacklist) у індекс.
+        Наявні блоки не перезаписуються. Повертає кількість перенесених записів.
+        """
+        now = time.time()
+        entries = []
+        for path, reason in ((cooldown_file, "cooldown"), (blacklist_file, "blacklist")):
+            if not path or (reason == "blacklist" and not blacklist_ttl):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                log_error(f"⚠️ EligibilityIndex.import_legacy({path}): {e}")
+                continue
+            for symbol, value in data.items():
+                try:
+                    if reason == "cooldown":
+                        until = datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S").timestamp()
+                    else:
+                        until = float(value) + float(blacklist_ttl)
+                except (TypeError, ValueError):
+                    continue
+                if until > now:
+                    entries.append((symbol, reason, until))
+        moved = 0
+        with self._lock:
+            for symbol, reason, until in entries:
+                reasons = self._blocks.setdefault(symbol, {})
+                if reason not in reasons:
+                    reasons[reason] = until
+                    moved += 1
+        if moved:
+            self._save()
+        return moved
+
+    def _save(self):
+        """Write-through: лише persisted-причини, без прострочених."""
+        if not self.persist_file:
+            return
+        now = time.time()
+        with self._lock:
+            data = {}
+            for symbol, reasons in self._blocks.items():
+                keep = {r: u for r, u in reasons.items() if r in PERSISTED_REASONS and (u is None or u > now)}
+                if keep:
+                    data[symbol] = keep
+        try:
+            directory = os.path.dirname(self.persist_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.persist_file}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.persist_file)
+        except Exception as e:
+            log_error(f"⚠️ EligibilityIndex.save({self.persist_file}): {e}")
+
+    # ---------- блоки ----------
+    def block(self, symbol, reason, ttl=None, until=None):
+        """Блокує symbol з причиною reason на ttl секунд (або до until; обидва None — безстроково)."""
+        if until is None and ttl is not None:
+            until = time.time() + float(ttl)
+        with self._lock:
+            self._blocks.setdefault(symbol, {})[reason] = until
+        if reason in PERSISTED_REASONS:
+            self._save()
+
+    def unblock(self, symbol, reason):
+        with self._lock:
+            reasons = self._blocks.get(symbol)
+            if reasons is not None:
+                reasons.pop(reason, None)
+                if not reasons:
+                    self._blocks.pop(symbol, None)
+        if reason in PERSISTED_REASONS:
+            self._save()
+
+    def blocked_until(self, symbol, reason, now=None):
+        """Час завершення активного блоку (None — немає; inf — безстроковий)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            reasons = self._blocks.get(symbol) or {}
+            if reason not in reasons:
+                return None
+            until = reasons[reason]
+            if until is None:
+                return float("inf")
+            if until <= now:
+                del reasons[reason]
+                if not reasons:
+                    self._blocks.pop(symbol, None)
+                return None
+            return until
+
+    # ---------- відкриті угоди ----------
+    def _sync_open(self, now):
+        if self._open_source is None or now - self._open_synced_at < self.open_sync_sec:
+            return
+        self._open_synced_at = now
+        try:
+            symbols = set(self._open_source() or ())
+        except Exception as e:
+            log_error(f"⚠️ EligibilityIndex: джерело відкритих угод: {e}")
+            return
+        with self._lock:
+            self._open = symbols
+
+    def mark_open(self, symbol):
+        with self._lock:
+            self._open.add(symbol)
+
+    def mark_closed(self, symbol):
+        with self._lock:
+            self._open.discard(symbol)
+
+    def begin_opening(self, symbol):
+        """Атомарно «займає» symbol під відкриття. False — інший потік уже відкриває."""
+        with self._lock:
+            if symbol in self._opening:
+                return False
+            self._opening.add(symbol)
+            return True
+
+    def end_opening(self, symbol):
+        with self._lock:
+            self._opening.discard(symbol)
+
+    # ---------- ризик-флаги ----------
+    def _risky(self, symbol, now):
+        if self._risk_check is None:
+            return None
+        cached = self._risk.get(symbol)
+        if cached is None or cached[1] <= now:
+            try:
+                flags = self._risk_check(symbol) or {}
+            except Exception as e:
+                log_error(f"⚠️ EligibilityIndex: risk_check({symbol}): {e}")
+                flags = {}
+            cached = (flags, now + self.risk_ttl)
+            self._risk[symbol] = cached
+        return cached[0] if cached[0].get("risky") else None
+
+    # ---------- головний запит ----------
+    def check(self, symbol, now=None):
+        """(allowed, reason): reason — "opening" / "open_trade" / "cooldown" / "blacklist" / ... / "risky"."""
+        now = time.time() if now is None else now
+        self._sync_open(now)
+        self.checks += 1
+        reason = None
+        with self._lock:
+            if symbol in self._opening:
+                reason = "opening"
+            elif symbol in self._open:
+                reason = "open_trade"
+            else:
+                reasons = self._blocks.get(symbol)
+                if reasons:
+                    for r, until in list(reasons.items()):
+                        if until is not None and until <= now:
+                            del reasons[r]
+                        elif reason is None:
+                            reason = r
+                    if not reasons:
+                        self._blocks.pop(symbol, None)
+        if reason is None and self._risky(symbol, now) is not None:
+            reason = "risky"
+        if reason is not None:
+            self.rejected += 1
+        return reason is None, reason
+
+    def is_eligible(self, symbol):
+        return self.check(symbol)[0]
+
+    def filter(self, symbols):
+        """(eligible, {symbol: reason}) — для всього універсуму за один прохід."""
+        eligible, skipped = [], {}
+        for symbol in symbols:
+            ok, reason = self.check(symbol)
+            if ok:
+                eligible.append(symbol)
+            else:
+                skipped[symbol] = reason
+        return eligible, skipped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "blocked": len(self._blocks),
+                "open": len(self._open),
+                "opening": len(self._opening),
+                "checks": self.checks,
+                "rejected": self.rejected,
+            }
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_eligibility_index():
+    """Спільний EligibilityIndex: ELIGIBILITY_FILE, відкриті угоди з utils.logger, ризик — з utils.tools."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            from config import ELIGIBILITY_FILE, ELIGIBILITY_OPEN_SYNC_SEC, BLOCK_INNOVATION, LOSS_BLACKLIST_SEC
+            from utils.logger import get_open_trade_symbols
+            risk_check = None
+            if BLOCK_INNOVATION:
+                from utils.tools import is_innovation_or_risky_symbol
+                risk_check = is_innovation_or_risky_symbol
+            first_start = not os.path.exists(ELIGIBILITY_FILE)
+            _INDEX = EligibilityIndex(ELIGIBILITY_FILE, open_symbols_source=get_open_trade_symbols,
+                                      open_sync_sec=ELIGIBILITY_OPEN_SYNC_SEC, risk_check=risk_check)
+            if first_start:
+                # одноразова міграція: далі старі файли не читаються
+                _INDEX.import_legacy(LEGACY_COOLDOWN_FILE, LEGACY_BLACKLIST_FILE, LOSS_BLACKLIST_SEC)
+        return _INDEX
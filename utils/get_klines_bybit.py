@@ -1,83 +1,39 @@
 # utils/get_klines_bybit.py
 
 import time
-import pandas as pd
 from utils.logger import log_message, log_error,log_debug
-from config import bybit
+from utils.kline_store import KlineStore
+from utils.ohlcv import OHLCV
+from utils.symbol_registry import get_symbol_registry
+from config import (
+    bybit, KLINE_CACHE_ENABLED, KLINE_CACHE_FORMING_TTL, KLINE_CACHE_DTYPE, KLINE_RESAMPLE_FROM_1M,
+)
 
 
 # --- кеші на рівні модуля ---
-import time
-import pandas as pd
-
-# ── Кеш підтримуваних інструментів / deny-list ────────────────────────────────
-_SUPPORTED = {"ts": 0.0, "linear": set(), "spot": set()}
+# ── Deny-list (підтримувані символи — з реєстру метаданих, utils/symbol_registry.py) ──
 _UNSUPPORTED = {}  # symbol -> ts
-_SUPPORTED_TTL = 900        # 15 хв
 _UNSUPPORTED_TTL = 3600     # 60 хв
 
 # Універсальна мапа інтервалів для v5 (вимагає хвилини як рядок)
 _INTERVAL_MAP = {"1h": "60", "15m": "15", "5m": "5", "1m": "1"}
 
-def _refresh_supported_sets():
-    """Оновлює множини підтримуваних символів для linear/spot з кешем на 15 хв."""
-    now = time.time()
-    if now - _SUPPORTED["ts"] < _SUPPORTED_TTL:
-        return
-
-    try:
-        linear = bybit.get_instruments_info(category="linear").get("result", {}).get("list", []) or []
-        spot   = bybit.get_instruments_info(category="spot").get("result", {}).get("list", []) or []
-        _SUPPORTED["linear"] = {x.get("symbol") for x in linear if x.get("symbol")}
-        _SUPPORTED["spot"]   = {x.get("symbol") for x in spot if x.get("symbol")}
-        _SUPPORTED["ts"] = now
-        log_debug(f"✅ Supported sets refreshed: linear={len(_SUPPORTED['linear'])}, spot={len(_SUPPORTED['spot'])}")
-    except Exception as e:
-        try:
-            lin_t  = bybit.get_tickers(category="linear").get("result", {}).get("list", []) or []
-            spot_t = bybit.get_tickers(category="spot").get("result", {}).get("list", []) or []
-            _SUPPORTED["linear"] = {x.get("symbol") for x in lin_t if x.get("symbol")}
-            _SUPPORTED["spot"]   = {x.get("symbol") for x in spot_t if x.get("symbol")}
-            _SUPPORTED["ts"] = now
-            log_debug(f"♻️ Supported sets via tickers: linear={len(_SUPPORTED['linear'])}, spot={len(_SUPPORTED['spot'])}")
-        except Exception as e2:
-            log_error(f"❌ Не вдалось оновити supported sets: {e2}")
-
 def _resolve_category(symbol: str):
     """Повертає 'linear' або 'spot' якщо символ підтримується; інакше None."""
-    _refresh_supported_sets()
-    if symbol in _SUPPORTED["linear"]:
-        return "linear"
-    if symbol in _SUPPORTED["spot"]:
-        return "spot"
-    return None
+    return get_symbol_registry().category_of(symbol)
 
-def get_klines_clean_bybit(symbol, interval="1h", limit=200, category=None):
+def _fetch_klines_bybit(symbol, converted_interval, limit, cat, start=None):
     """
-    📦 Отримує Kline-дані від Bybit і повертає чистий DataFrame.
-    - Без сліпого fallback з linear → spot (категорію визначаємо наперед).
-    - Позначаємо 'unsupported' (retCode 10001) у deny-list на 60 хв.
-    - Тихо повертаємо None, якщо символ не підтримується або даних нема.
+    🌐 Сирий запит get_kline → чистий OHLCV (без кешу; валідація — тут, один раз).
+    Викликається з KLINE_STORE або напряму, коли кеш вимкнено.
+    start (мс) — лише бари від цього часу (інкрементальне дотягування).
     """
     try:
-        # deny-list: якщо нещодавно було 10001 — пропускаємо
-        ts = _UNSUPPORTED.get(symbol)
-        if ts and (time.time() - ts) < _UNSUPPORTED_TTL:
-            log_debug(f"⛔ {symbol} у deny-list (unsupported) — skip до TTL")
-            return None
-
-        # визначаємо категорію (якщо не передали явно)
-        cat = category or _resolve_category(symbol)
-        if cat is None:
-            log_debug(f"⛔ {symbol} не підтримується ні в linear, ні в spot — skip")
-            _UNSUPPORTED[symbol] = time.time()
-            return None
-
-        # конвертуємо інтервал для v5 (і для linear, і для spot)
-        converted_interval = _INTERVAL_MAP.get(interval, str(interval))
-
         # виклик API
-        resp = bybit.get_kline(category=cat, symbol=symbol, interval=converted_interval, limit=limit)
+        params = {"category": cat, "symbol": symbol, "interval": converted_interval, "limit": limit}
+        if start is not None:
+            params["start"] = int(start)
+        resp = bybit.get_kline(**params)
 
         # обробка коду відповіді
         ret_code = resp.get("retCode")
@@ -96,29 +52,13 @@ def get_klines_clean_bybit(symbol, interval="1h", limit=200, category=None):
             return None
 
         # Bybit v5: елементи — масиви [ts, open, high, low, close, volume, turnover]
-        # інколи приходить без 'turnover' → підлаштуємось під фактичну довжину
-        base_cols = ["timestamp", "open", "high", "low", "close", "volume", "turnover"]
-        df = pd.DataFrame(kline_data, columns=base_cols[:len(kline_data[0])])
-
-        # типи колонок
-        if "timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(pd.to_numeric(df["timestamp"], errors="coerce"), unit="ms", errors="coerce")
-
-        for c in ("open", "high", "low", "close", "volume"):
-            if c in df.columns:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-
-        # чистка і сортування
-        if "timestamp" in df.columns:
-            df = df.sort_values("timestamp").reset_index(drop=True)
-
-        df = df.dropna(subset=[c for c in ("open", "high", "low", "close") if c in df.columns])
-
-        if df.empty:
+        # (інколи без 'turnover'); числові типи, NaN, сортування — у OHLCV.from_rows
+        frame = OHLCV.from_rows(kline_data, dtype=KLINE_CACHE_DTYPE)
+        if frame is None:
             return None
 
-        log_debug(f"✅ kline OK: {symbol} {cat} {interval}->{converted_interval} rows={len(df)}")
-        return df
+        log_debug(f"✅ kline OK: {symbol} {cat} {converted_interval} rows={len(frame)}")
+        return frame
 
     except Exception as e:
         msg = str(e)
@@ -129,3 +69,62 @@ def get_klines_clean_bybit(symbol, interval="1h", limit=200, category=None):
 
         log_error(f"❌ get_klines_clean_bybit помилка для {symbol}: {e}")
         return None
+
+
+# ── Спільний кеш klines (один fetch на symbol/interval/category до закриття бару) ──
+# 5m/15m/1h після backfill оновлюються з 1m-серії того ж символу (KLINE_RESAMPLE_FROM_1M)
+KLINE_STORE = KlineStore(
+    _fetch_klines_bybit,
+    forming_ttl=KLINE_CACHE_FORMING_TTL,
+    dtype=KLINE_CACHE_DTYPE,
+    resample_base="1" if KLINE_RESAMPLE_FROM_1M else None,
+)
+
+
+def get_klines_clean_bybit(symbol, interval="1h", limit=200, category=None):
+    """
+    📦 Отримує Kline-дані від Bybit і повертає чистий DataFrame.
+    - Без сліпого fallback з linear → spot (категорію визначаємо наперед).
+    - Позначаємо 'unsupported' (retCode 10001) у deny-list на 60 хв.
+    - Тихо повертаємо None, якщо символ не підтримується або даних нема.
+    - Будь-який limit обслуговується з кешу KLINE_STORE (див. utils/kline_store.py).
+    DataFrame — нова копія на кожен виклик; для читання без копій — get_ohlcv_bybit().
+    """
+    frame = get_ohlcv_bybit(symbol, interval=interval, limit=limit, category=category)
+    return None if frame is None else frame.to_frame()
+
+
+def get_ohlcv_bybit(symbol, interval="1h", limit=200, category=None):
+    """
+    📊 Те саме, що get_klines_clean_bybit, але повертає OHLCV (utils/ohlcv.py):
+    read-only масиви, спільні для всіх аналізаторів на тому ж барі (без копій і повторної валідації).
+    """
+    try:
+        # deny-list: якщо нещодавно було 10001 — пропускаємо
+        ts = _UNSUPPORTED.get(symbol)
+        if ts and (time.time() - ts) < _UNSUPPORTED_TTL:
+            log_debug(f"⛔ {symbol} у deny-list (unsupported) — skip до TTL")
+            return None
+
+        # визначаємо категорію (якщо не передали явно)
+        cat = category or _resolve_category(symbol)
+        if cat is None:
+            log_debug(f"⛔ {symbol} не підтримується ні в linear, ні в spot — skip")
+            _UNSUPPORTED[symbol] = time.time()
+            return None
+
+        # конвертуємо інтервал для v5 (і для linear, і для spot)
+        converted_interval = _INTERVAL_MAP.get(interval, str(interval))
+
+        if not KLINE_CACHE_ENABLED:
+            return _fetch_klines_bybit(symbol, converted_interval, limit, cat)
+        return KLINE_STORE.get_frame(symbol, converted_interval, limit, cat)
+
+    except Exception as e:
+        log_error(f"❌ get_klines_clean_bybit помилка для {symbol}: {e}")
+        return None
+
+
+def get_kline_cache_stats():
+    """📊 Лічильники hit/miss спільного кешу klines."""
+    return KLINE_STORE.stats()
@@ -0,0 +1,285 @@
+# utils/kline_store.py
+
+"""
+📦 Спільний кеш klines для одного циклу аналізу.
+
+Ключ — (symbol, interval, category). На ключ тримаємо один «надмножинний»
+OHLCV-фрейм (utils/ohlcv.py, найбільший запитаний limit) і віддаємо будь-який
+менший limit через tail(): get() — як DataFrame (копія, як і раніше),
+get_frame() — read-only view без копій. Повторний запит до біржі робимо лише коли:
+  - закрилась нова свічка (поточний час вийшов за межі останнього бару);
+  - формуючий бар старіший за forming_ttl секунд;
+  - запитано більший limit, ніж є в кеші.
+
+Після першого backfill буфер оновлюється інкрементально: тягнемо лише бари,
+новіші за останній збережений timestamp (start=...), перезаписуємо формуючий
+бар і дописуємо нові, обрізаючи буфер до його limit.
+
+Ресемплінг (resample_base="1"): одна авторитетна 1m-серія на символ, а старші
+таймфрейми (5m/15m/1h/...) після одноразового backfill історії з біржі
+добудовуються локально з 1m-барів (включно з формуючим баром). Так усі
+таймфрейми узгоджені між собою, а на оновлення йде один запит на символ замість
+одного на кожен інтервал. Якщо 1m-бари не покривають потрібний відрізок
+(розрив, занадто давній буфер) — звичайне дотягування з біржі.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from utils.ohlcv import OHLCV
+
+# Тривалість бару в хвилинах для v5-інтервалів
+_INTERVAL_MINUTES = {
+    "1": 1, "3": 3, "5": 5, "15": 15, "30": 30,
+    "60": 60, "120": 120, "240": 240, "360": 360, "720": 720,
+    "D": 1440, "W": 10080,
+}
+
+
+def interval_minutes(interval):
+    """Повертає тривалість бару в хвилинах для v5-інтервалу або None."""
+    return _INTERVAL_MINUTES.get(str(interval))
+
+
+class KlineStore:
+    """🧠 Кеш klines: один fetch на (symbol, interval, category) до закриття бару."""
+
+    def __init__(self, fetcher, forming_ttl=15.0, max_limit=1000, dtype="float64", resample_base=None):
+        # fetcher(symbol, interval, limit, category, start=None) -> DataFrame | OHLCV | None
+        # start — час відкриття першого бару (мс), для інкрементальних дотягувань
+        self._fetcher = fetcher
+        self.forming_ttl = float(forming_ttl)
+        self.max_limit = int(max_limit)
+        self.dtype = np.dtype(dtype)  # float32 — удвічі менше пам'яті на великому універсі
+        # інтервал, з якого добудовуються старші таймфрейми ("1") або None — без ресемплінгу
+        self.resample_base = None if resample_base is None else str(resample_base)
+        self._entries = {}      # key -> {"frame", "limit", "fetched_at", "bar_end"}
+        self._key_locks = {}    # key -> Lock (щоб паралельні аналізатори не фетчили одне й те саме)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self.resampled = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            lk = self._key_locks.get(key)
+            if lk is None:
+                lk = self._key_locks[key] = threading.Lock()
+            return lk
+
+    def _ingest(self, data):
+        """Відповідь fetcher-а → OHLCV (валідація один раз, тут) або None."""
+        if isinstance(data, OHLCV):
+            frame = data.astype(self.dtype)
+        else:
+            frame = OHLCV.from_dataframe(data, dtype=self.dtype)
+        return None if frame is None or frame.empty else frame
+
+    @staticmethod
+    def _bar_end(frame, interval):
+        """Час (epoch сек) закриття останнього (формуючого) бару або None."""
+        minutes = interval_minutes(interval)
+        if minutes is None or frame is None or frame.empty:
+            return None
+        return frame.last_timestamp / 1000.0 + minutes * 60
+
+    def _is_fresh(self, entry, limit, now):
+        if entry is None or entry["limit"] < limit:
+            return False
+        if now - entry["fetched_at"] >= self.forming_ttl:
+            return False
+        bar_end = entry["bar_end"]
+        if bar_end is not None and now >= bar_end:
+            return False
+        return True
+
+    def _fetch_incremental(self, symbol, interval, category, entry, now):
+        """
+        🔁 Дотягує бари, новіші за останній збережений, і зливає з буфером.
+        Повертає новий OHLCV або None (тоді робимо повний fetch).
+        """
+        minutes = interval_minutes(interval)
+        frame = entry["frame"]
+        if minutes is None or frame is None or frame.empty:
+            return None
+
+        start_ms = frame.last_timestamp
+        bar_sec = minutes * 60
+        # скільки барів (включно з поточним формуючим) з'явилось від last_open
+        missing = int((now - start_ms / 1000.0) // bar_sec) + 1
+        if missing >= entry["limit"]:
+            return None
+
+        fresh = self._ingest(self._fetcher(symbol, interval, missing + 1, category, start=start_ms))
+        if fresh is None:
+            return None
+        # перший бар відповіді має збігатися з останнім збереженим, інакше є розрив
+        if fresh.timestamp[0] != start_ms:
+            return None
+
+        return frame.merge(fresh, entry["limit"])
+
+    def _can_resample(self, interval):
+        base, minutes = self.resample_base, interval_minutes(interval)
+        if base is None or str(interval) == base or minutes is None:
+            return False
+        base_minutes = interval_minutes(base)
+        # бакети рахуються від epoch, як у Bybit — це вірно лише для інтервалів, що ділять добу (не W)
+        return bool(base_minutes) and minutes % base_minutes == 0 and 1440 % minutes == 0
+
+    def _resample_incremental(self, symbol, interval, category, entry, now):
+        """
+        🧩 Оновлює буфер старшого таймфрейму з 1m-серії (без запиту цього інтервалу до біржі).
+        Потрібні безперервні base-бари від відкриття останнього збереженого бару до зараз.
+        Повертає новий OHLCV або None (тоді — дотягування з біржі).
+        """
+        if not self._can_resample(interval):
+            return None
+        frame = entry["frame"]
+        if frame is None or frame.empty:
+            return None
+
+        start_ms = frame.last_timestamp
+        base_ms = interval_minutes(self.resample_base) * 60_000
+        need = int((now * 1000 - start_ms) // base_ms) + 2
+        if need > self.max_limit:
+            return None
+        base = self.get_frame(symbol, self.resample_base, need, category)
+        if base is None or base.empty:
+            return None
+
+        base = base._take(base.timestamp >= start_ms)
+        if base.empty or base.timestamp[0] != start_ms or (np.diff(base.timestamp) != base_ms).any():
+            return None
+        return frame.merge(base.resample(interval_minutes(interval)), entry["limit"])
+
+    def get(self, symbol, interval, limit, category):
+        """Повертає DataFrame з не більше ніж `limit` останніх барів або None."""
+        frame = self.get_frame(symbol, interval, limit, category)
+        # аналізатори додають колонки у df → DataFrame завжди нова копія
+        return None if frame is None else frame.to_frame()
+
+    def get_frame(self, symbol, interval, limit, category):
+        """
+        Повертає OHLCV з не більше ніж `limit` останніх барів або None.
+        Масиви read-only і спільні для всіх викликів на тому ж барі — без копій.
+        """
+        limit = max(1, min(int(limit), self.max_limit))
+        key = (symbol, str(interval), category)
+
+        entry = self._entries.get(key)
+        if self._is_fresh(entry, limit, time.time()):
+            with self._lock:
+                self.hits += 1
+            return entry["frame"].tail(limit)
+
+        with self._key_lock(key):
+            # поки чекали на lock — інший потік міг уже оновити запис
+            entry = self._entries.get(key)
+            if self._is_fresh(entry, limit, time.time()):
+                with self._lock:
+                    self.hits += 1
+                return entry["frame"].tail(limit)
+
+            with self._lock:
+                self.misses += 1
+
+            frame = None
+            if entry is not None and entry["limit"] >= limit:
+                frame = self._resample_incremental(symbol, interval, category, entry, time.time())
+                if frame is not None:
+                    with self._lock:
+                        self.resampled += 1
+            if frame is None and entry is not None and entry["limit"] >= limit:
+                frame = self._fetch_incremental(symbol, interval, category, entry, time.time())
+                if frame is not None:
+                    with self._lock:
+                        self.incremental += 1
+
+            fetch_limit = max(limit, entry["limit"] if entry else 0)
+            if frame is None:
+                frame = self._ingest(self._fetcher(symbol, interval, fetch_limit, category))
+            if frame is None:
+                return None
+
+            entry = {
+                "frame": frame,
+                "limit": fetch_limit,
+                "fetched_at": time.time(),
+                "bar_end": self._bar_end(frame, interval),
+            }
+            with self._lock:
+                self._entries[key] = entry
+            return frame.tail(limit)
+
+    def apply_kline(self, symbol, interval, category, bar):
+        """
+        📡 Пуш бару зі стріму (kline.{interval}.{symbol}, формат Bybit v5):
+        перезаписує формуючий бар або дописує новий. Працює лише для вже
+        заповнених буферів; при розриві — скидає запис (наступний get зробить backfill).
+        """
+        key = (symbol, str(interval), category)
+        minutes = interval_minutes(interval)
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is None or minutes is None:
+                return False
+            frame = entry["frame"]
+            try:
+                ts = int(bar["start"])
+                values = [float(bar[c]) for c in ("open", "high", "low", "close", "volume")]
+                turnover = float(bar["turnover"]) if bar.get("turnover") not in (None, "") else None
+            except (KeyError, TypeError, ValueError):
+                return False
+
+            last_open = frame.last_timestamp
+            if ts < last_open:
+                return False
+            if ts > last_open + minutes * 60_000:
+                # пропущені бари — стрім їх не відновить
+                with self._lock:
+                    self._entries.pop(key, None)
+                return False
+
+            merged = frame.with_bar(ts, *values, turnover=turnover, limit=entry["limit"])
+            new_entry = {
+                "frame": merged,
+                "limit": entry["limit"],
+                "fetched_at": time.time(),
+                "bar_end": self._bar_end(merged, interval),
+            }
+            with self._lock:
+                self._entries[key] = new_entry
+            return True
+
+    def invalidate(self, symbol=None):
+        """Скидає кеш для символу (або весь кеш, якщо symbol=None)."""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == symbol]:
+                    self._entries.pop(key, None)
+
+    def stats(self):
+        """Лічильники hit/miss та кількість ключів у кеші."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "incremental": self.incremental,
+                "resampled": self.resampled,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.incremental = 0
+            self.resampled = 0
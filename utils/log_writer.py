@@ -0,0 +1,162 @@
+# utils/log_writer.py
+
+"""
+📝 Буферизований append-only запис логів.
+
+Замість "прочитати весь файл → дописати рядок → переписати файл" на кожен виклик:
+  - write(path, text) лише кладе рядок у чергу (потік торгівлі не чекає на диск);
+  - фоновий потік пачками дописує рядки у файли в режимі "a";
+  - ротація за розміром: лічильник рядків на файл; коли перевищено max_lines —
+    файл обрізається до останніх keep_lines (та сама семантика "останні N рядків",
+    але переписування раз на ~max_lines/2 записів, а не на кожен).
+
+Модуль не залежить від utils.logger (помилки — через print), щоб не було циклічних імпортів.
+"""
+
+import atexit
+import os
+import queue
+import threading
+
+
+class AppendLogWriter:
+    """🧵 Черга записів + фоновий потік-писар з ротацією по кількості рядків."""
+
+    def __init__(self, max_lines=1000, keep_lines=None, flush_sec=0.5, background=True):
+        self.max_lines = int(max_lines)
+        self.keep_lines = int(keep_lines) if keep_lines else self.max_lines // 2
+        self.flush_sec = float(flush_sec)
+        self.background = bool(background)
+        self._queue = queue.Queue()
+        self._counts = {}      # path -> кількість рядків у файлі
+        self._limits = {}      # path -> (max_lines, keep_lines) для окремих файлів
+        self._io_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.rotations = 0
+
+    # ---------- API ----------
+    def write(self, path, text, max_lines=None, keep_lines=None):
+        """Додає рядок до черги (text без завершального \\n)."""
+        if max_lines is not None:
+            keep = int(keep_lines) if keep_lines else int(max_lines) // 2
+            self._limits[path] = (int(max_lines), keep)
+        if not self.background:
+            self._write_batch({path: [text]})
+            return
+        self._ensure_thread()
+        self._queue.put((path, text))
+
+    def flush(self, timeout=5.0):
+        """Чекає, поки черга буде записана на диск."""
+        if not self.background:
+            return
+        done = threading.Event()
+        self._queue.put((None, done))
+        done.wait(timeout)
+
+    # ---------- фоновий потік ----------
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_sec)
+            except queue.Empty:
+                continue
+            batch, waiters = {}, []
+            while item is not None:
+                path, text = item
+                if path is None:
+                    waiters.append(text)
+                else:
+                    batch.setdefault(path, []).append(text)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            self._write_batch(batch)
+            for event in waiters:
+                event.set()
+
+    # ---------- запис і ротація ----------
+    def _write_batch(self, batch):
+        with self._io_lock:
+            for path, texts in batch.items():
+                try:
+                    self._append(path, texts)
+                except Exception as e:
+                    print(f"❌ [log_writer] Помилка запису {path}: {e}")
+
+    def _append(self, path, texts):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path not in self._counts:
+            self._counts[path] = self._count_lines(path)
+
+        data = "".join(text + "\n" for text in texts)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(data)
+        self._counts[path] += data.count("\n")
+        self.written += len(texts)
+
+        max_lines, keep_lines = self._limits.get(path, (self.max_lines, self.keep_lines))
+        if self._counts[path] > max_lines:
+            self._rotate(path, keep_lines)
+
+    def _rotate(self, path, keep_lines):
+        """Обрізає файл до останніх keep_lines рядків (атомарна заміна)."""
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.readlines()[-keep_lines:]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp, path)
+        self._counts[path] = len(lines)
+        self.rotations += 1
+
+    @staticmethod
+    def _count_lines(path):
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                count += chunk.count(b"\n")
+        return count
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "rotations": self.rotations,
+            "files": len(self._counts),
+        }
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_log_writer():
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                try:
+                    from config import LOG_MAX_LINES, LOG_ASYNC, LOG_FLUSH_SEC
+                except Exception:
+                    LOG_MAX_LINES, LOG_ASYNC, LOG_FLUSH_SEC = 1000, True, 0.5
+                _WRITER = AppendLogWriter(max_lines=LOG_MAX_LINES, flush_sec=LOG_FLUSH_SEC, background=LOG_ASYNC)
+                atexit.register(_WRITER.flush)
+    return _WRITER
@@ -6,11 +6,13 @@ import os
 import copy
 import numpy as np
 import pandas as pd
-from config import bybit
 from config import ACTIVE_TRADES_FILE,MAX_ACTIVE_TRADES
+from config import LOG_LEVEL
 import tempfile
 from threading import Lock
 import threading
+import atexit
+from utils.log_writer import get_log_writer
 
 
 
@@ -18,7 +20,6 @@ SIDE_BUY = "Buy"
 SIDE_SELL = "Sell"
 
 
-BLACKLIST_PATH = "data/loss_blacklist.json"
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
@@ -97,49 +98,87 @@ MAX_LOG_LINES = 1000
 MAX_LINES_IN_LOG = 1000  # максимум рядків у лог-файлі
 
 def _write_log(path: str, message: str):
+    """
+    📝 Append-only запис через фонову чергу (utils.log_writer).
+    Ротація: коли у файлі > MAX_LINES_IN_LOG рядків — лишаються останні MAX_LINES_IN_LOG // 2.
+    """
     try:
-        # Читаємо існуючі рядки (захищено)
-        lines = []
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                lines = f.readlines()
+        get_log_writer().write(path, message, max_lines=MAX_LINES_IN_LOG)
+    except Exception as e:
+        print(f"❌ [_write_log] Помилка: {e}")
 
-        # Якщо перевищено ліміт — обрізаємо
-        if len(lines) >= MAX_LINES_IN_LOG:
-            lines = lines[-MAX_LINES_IN_LOG // 2:]  # залишаємо останні 500 рядків
+# ============================ 🎚️ РІВНІ ЛОГУВАННЯ ============================
+# DEBUG → logs/debug.log; INFO/WARN → data/trades.log + консоль; ERROR → data/analytics.log + консоль.
+# Повідомлення нижче LOG_LEVEL відкидаються ДО форматування:
+#   log_debug("Close=%.5f ATR=%.6f", close, atr)    # %-аргументи форматуються лише якщо рівень увімкнено
+#   log_debug(lambda: json.dumps(big, indent=2))    # callable викликається лише якщо рівень увімкнено
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "WARNING": 30, "ERROR": 40}
+_log_threshold = LOG_LEVELS.get(str(LOG_LEVEL).upper(), 10)
 
-        # Додаємо новий рядок
-        lines.append(message + "\n")
 
-        # Записуємо все назад
-        with open(path, "w", encoding="utf-8") as f:
-            f.writelines(lines)
+def set_log_level(level: str):
+    """Змінює поріг логування під час роботи (DEBUG / INFO / WARN / ERROR)."""
+    global _log_threshold
+    _log_threshold = LOG_LEVELS.get(str(level).upper(), _log_threshold)
+
+
+def is_log_enabled(level: str) -> bool:
+    return LOG_LEVELS.get(level, 10) >= _log_threshold
 
-    except Exception as e:
-        print(f"❌ [_write_log] Помилка: {e}")
 
-def log_debug(msg: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    full_msg = f"{timestamp} | {msg}"
-    _write_log(DEBUG_LOG_PATH, full_msg)
+def is_debug_enabled() -> bool:
+    """Для охорони дорогих блоків, які не вкладаються в один виклик log_debug."""
+    return _log_threshold <= LOG_LEVELS["DEBUG"]
 
-def log_message(msg: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    full_msg = f"{timestamp} | {msg}"
+
+def _render(msg, args) -> str:
+    if callable(msg):
+        msg = msg()
+    if args:
+        try:
+            msg = msg % args
+        except Exception:
+            msg = " ".join([str(msg), *map(str, args)])
+    return str(msg)
+
+
+def log_at(level: str, msg, *args):
+    """Запис на рівні level; args/callable обчислюються лише для увімкнених рівнів."""
+    level = "WARN" if level == "WARNING" else level
+    if LOG_LEVELS.get(level, 10) < _log_threshold:
+        return
     try:
-        if any(tag in msg for tag in DEBUG_KEYWORDS):
-            _write_log(DEBUG_LOG_PATH, full_msg)
-            return
-        _write_log(TRADES_LOG_PATH, full_msg)
-        print(f"📘 {full_msg}")
+        text = _render(msg, args)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if level == "DEBUG":
+            _write_log(DEBUG_LOG_PATH, f"{timestamp} | {text}")
+        elif level == "ERROR":
+            full_msg = f"{timestamp} | ❌ ERROR: {text}"
+            _write_log(ANALYTICS_LOG_PATH, full_msg)
+            print(f"🚨 {full_msg}")
+        else:
+            full_msg = f"{timestamp} | {text}"
+            _write_log(TRADES_LOG_PATH, full_msg)
+            print(f"📘 {full_msg}")
     except Exception as e:
-        print(f"❌ [log_message] Помилка: {e}")
+        print(f"❌ [log_at] Помилка: {e}")
 
-def log_error(error_msg: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    full_msg = f"{timestamp} | ❌ ERROR: {error_msg}"
-    _write_log(ANALYTICS_LOG_PATH, full_msg)
-    print(f"🚨 {full_msg}")
+
+def log_debug(msg, *args):
+    log_at("DEBUG", msg, *args)
+
+def log_message(msg, *args):
+    # повідомлення з тегами [DEBUG]/[TRACE]/... — це DEBUG-рівень (як і раніше, у debug.log)
+    if isinstance(msg, str) and any(tag in msg for tag in DEBUG_KEYWORDS):
+        log_at("DEBUG", msg, *args)
+    else:
+        log_at("INFO", msg, *args)
+
+def log_warning(msg, *args):
+    log_at("WARN", msg, *args)
+
+def log_error(error_msg, *args):
+    log_at("ERROR", error_msg, *args)
 
 def log_trade_result(symbol, side, entry_price, exit_price, quantity, result_type="TP", leverage=1):
     try:
@@ -180,16 +219,8 @@ def log_scalping_trade(symbol, entry_price, exit_price, side, pnl, reason):
         log_message(f"📄 {message}")
 
         if pnl < 0:
-            blacklist = {}
-            if os.path.exists(BLACKLIST_PATH):
-                with open(BLACKLIST_PATH, "r", encoding="utf-8") as f:
-                    blacklist = json.load(f)
-
-            blacklist[symbol] = datetime.now().timestamp()
-
-            with open(BLACKLIST_PATH, "w", encoding="utf-8") as f:
-                json.dump(blacklist, f, indent=2)
-            log_message(f"⚠️ {symbol} додано до blacklist через збиток")
+            from utils.tools import add_to_blacklist
+            add_to_blacklist(symbol)
 
     except Exception as e:
         log_error(f"❌ [log_scalping_trade] Помилка: {e}")
@@ -336,12 +367,38 @@ def log_candidate_simple(symbol, score):
 
 
 # --- ActiveTrades: thread-safe & atomic, key = trade_id ---
+# Основне сховище — SQLite (WAL) з рядком на угоду (utils.trade_store);
+# ACTIVE_TRADES_FILE лишається JSON-експортом {trade_id: record} для бекенду.
+# Якщо SQLite недоступний — старий режим: JSON-файл під _AT_LOCK.
 
 
 
 _AT_LOCK = Lock()  # глобальний лок на ActiveTrades
 # використовуємо існуючий ACTIVE_TRADES_FILE з config
 
+_TRADE_STORE = None
+_TRADE_STORE_FAILED = False
+
+
+def get_trade_store():
+    """Спільне сховище угод (лінива ініціалізація); None → JSON-фолбек."""
+    global _TRADE_STORE, _TRADE_STORE_FAILED
+    if _TRADE_STORE is None and not _TRADE_STORE_FAILED:
+        with _AT_LOCK:
+            if _TRADE_STORE is None and not _TRADE_STORE_FAILED:
+                try:
+                    from utils.trade_store import TradeStore
+                    from config import ACTIVE_TRADES_DB, ACTIVE_TRADES_EXPORT_SEC
+                    if ACTIVE_TRADES_DB:
+                        _TRADE_STORE = TradeStore(ACTIVE_TRADES_DB, export_path=ACTIVE_TRADES_FILE,
+                                                  export_sec=ACTIVE_TRADES_EXPORT_SEC)
+                        atexit.register(_TRADE_STORE.flush)
+                    else:
+                        _TRADE_STORE_FAILED = True
+                except Exception as e:
+                    _TRADE_STORE_FAILED = True
+                    print(f"❌ [get_trade_store] SQLite недоступний → JSON-режим: {e}")
+    return _TRADE_STORE
 
 
 def _at_atomic_save(data: dict) -> None:
@@ -360,53 +417,94 @@ def append_active_trade(trade_record: dict) -> None:
     if not trade_id:
         log_error("❌ append_active_trade: відсутній trade_id")
         return
+    store = get_trade_store()
+    if store is not None:
+        store.upsert(deep_sanitize(trade_record))
+    else:
+        with _AT_LOCK:
+            trades = _at_safe_load()
+            trades[trade_id] = deep_sanitize(trade_record)
+            _at_atomic_save(trades)
+    log_message(f"📥 Записано трейд {trade_id} до ActiveTrades.json")
+
+def update_active_trade(trade_id: str, patch: dict) -> bool:
+    """Зливає patch у запис угоди (один рядок у сховищі). False — якщо угоди немає."""
+    store = get_trade_store()
+    if store is not None:
+        return store.patch(trade_id, deep_sanitize(patch or {}))
     with _AT_LOCK:
         trades = _at_safe_load()
-        trades[trade_id] = deep_sanitize(trade_record)
+        if trade_id not in trades:
+            return False
+        trades[trade_id].update(deep_sanitize(patch or {}))
         _at_atomic_save(trades)
-    log_message(f"📥 Записано трейд {trade_id} до ActiveTrades.json")
+        return True
 
 def mark_trade_closed(trade_id: str, updates: dict | None = None) -> None:
     """Позначає угоду закритою та оновлює поля."""
-    with _AT_LOCK:
-        trades = _at_safe_load()
-        if trade_id in trades:
-            trades[trade_id]["closed"] = True
-            if isinstance(updates, dict):
-                trades[trade_id].update(deep_sanitize(updates))
-            _at_atomic_save(trades)
-            log_message(f"🔒 Позначено closed у ActiveTrades для {trade_id}")
-        else:
-            log_message(f"⚠️ mark_trade_closed: {trade_id} не знайдено")
+    patch = deep_sanitize(updates) if isinstance(updates, dict) else {}
+    store = get_trade_store()
+    if store is not None:
+        found = store.mark_closed(trade_id, patch)
+    else:
+        with _AT_LOCK:
+            trades = _at_safe_load()
+            found = trade_id in trades
+            if found:
+                trades[trade_id]["closed"] = True
+                trades[trade_id].update(patch)
+                _at_atomic_save(trades)
+    if found:
+        log_message(f"🔒 Позначено closed у ActiveTrades для {trade_id}")
+    else:
+        log_message(f"⚠️ mark_trade_closed: {trade_id} не знайдено")
 
 def remove_active_trade(trade_id: str) -> None:
     """Видаляє угоду з ActiveTrades.json за trade_id."""
+    store = get_trade_store()
+    if store is not None:
+        found = store.remove(trade_id)
+    else:
+        with _AT_LOCK:
+            trades = _at_safe_load()
+            found = trades.pop(trade_id, None) is not None
+            if found:
+                _at_atomic_save(trades)
+    if found:
+        log_message(f"🧹 Угода {trade_id} видалена з ActiveTrades")
+    else:
+        log_message(f"⚠️ remove_active_trade: {trade_id} не знайдено")
+
+def _remove_trades_where(predicate) -> tuple[list, int]:
+    """
+    Видаляє угоди за predicate(trade_id, record): рішення приймається на тих самих даних,
+    що й видалення (під локом сховища / _AT_LOCK), тож запис, оновлений між читанням
+    і видаленням, не зникне за застарілим станом. → (видалені trade_id, кількість до).
+    """
+    store = get_trade_store()
+    if store is not None:
+        return store.remove_where(predicate)
     with _AT_LOCK:
         trades = _at_safe_load()
-        if trade_id in trades:
-            trades.pop(trade_id, None)
+        stale = [tid for tid, rec in trades.items() if predicate(tid, rec or {})]
+        for tid in stale:
+            trades.pop(tid, None)
+        if stale:
             _at_atomic_save(trades)
-            log_message(f"🧹 Угода {trade_id} видалена з ActiveTrades")
-        else:
-            log_message(f"⚠️ remove_active_trade: {trade_id} не знайдено")
+        return stale, len(trades) + len(stale)
 
 def prune_inactive_trades(live_ids: set[str]) -> None:
     """
     Видаляє записи, яких немає серед live_ids або які мають closed=True.
     ⚠️ РЕКОМЕНДАЦІЯ: викликати лише для угод із джерелом LIVE_MONITOR.
     """
-    with _AT_LOCK:
-        trades = _at_safe_load()
-        removed = False
-        for tid in list(trades.keys()):
-            rec = trades[tid]
-            is_live_mon = (rec.get("behavior_summary", {}) or {}).get("entry_reason") == "LIVE_MONITOR"
-            if rec.get("closed") or (is_live_mon and tid not in live_ids):
-                trades.pop(tid, None)
-                removed = True
-        if removed:
-            _at_atomic_save(trades)
-            log_message("🧹 ActiveTrades прунінг виконано")
+    def _stale(tid, rec):
+        is_live_mon = (rec.get("behavior_summary", {}) or {}).get("entry_reason") == "LIVE_MONITOR"
+        return bool(rec.get("closed") or (is_live_mon and tid not in live_ids))
+
+    removed, _ = _remove_trades_where(_stale)
+    if removed:
+        log_message("🧹 ActiveTrades прунінг виконано")
 
 
 def reconcile_active_trades_with_exchange():
@@ -416,9 +514,13 @@ def reconcile_active_trades_with_exchange():
     - видаляє локальні записи, яких немає на біржі, або які вже closed=True
     """
     try:
-        # 1) забираємо живі пози з біржі
-        resp = bybit.get_positions(category="linear", settleCoin="USDT") or {}
-        items = (resp.get("result", {}) or {}).get("list", []) or []
+        # 1) живі пози — зі спільного знімка; без успішного запиту нічого не чистимо
+        from utils.positions_service import get_positions_service
+        positions = get_positions_service()
+        items = positions.rows()
+        if not positions.ok:
+            log_message("⚠️ Reconcile: знімок позицій недоступний → пропуск")
+            return
 
         live = set()
         for pos in items:
@@ -431,31 +533,12 @@ def reconcile_active_trades_with_exchange():
                 side = "LONG" if str(pos.get("side","")).upper()=="BUY" else "SHORT"
             live.add((symbol, side))
 
-        # 2) вантажимо локальні трейди та чистимо
-        with _AT_LOCK:
-            trades = _at_safe_load()  # dict {trade_id: record}
-            if not isinstance(trades, dict):
-                trades = {}
-
-            before = len(trades)
-            removed_any = False
-
-            for tid in list(trades.keys()):
-                rec = trades.get(tid) or {}
-                if rec.get("closed"):
-                    trades.pop(tid, None)
-                    removed_any = True
-                    continue
-                sym = rec.get("symbol")
-                sd  = str(rec.get("side", "")).upper()
-                if (sym, sd) not in live:
-                    trades.pop(tid, None)
-                    removed_any = True
-
-            if removed_any:
-                _at_atomic_save(trades)
+        # 2) чистимо локальні трейди (рішення і видалення — під одним локом)
+        stale, before = _remove_trades_where(
+            lambda tid, rec: bool(rec.get("closed")) or (rec.get("symbol"), str(rec.get("side", "")).upper()) not in live
+        )
 
-            log_message(f"🧼 Reconcile: live={len(live)}, before={before}, after={len(trades)}")
+        log_message(f"🧼 Reconcile: live={len(live)}, before={before}, after={before - len(stale)}")
 
     except Exception as e:
         log_error(f"reconcile_active_trades_with_exchange: {e}")
@@ -479,6 +562,9 @@ def load_active_trades():
 # ---- OpenTrades helpers (рахуємо лише незакриті) ----------------------------
 def get_open_trades_count() -> int:
     try:
+        store = get_trade_store()
+        if store is not None:
+            return store.count_open()
         trades = load_active_trades() or {}
         if isinstance(trades, dict):
             return sum(1 for t in trades.values() if not t.get("closed"))
@@ -488,8 +574,24 @@ def get_open_trades_count() -> int:
         log_error(f"[get_open_trades_count] {e}")
     return 0
 
+def get_open_trade_symbols() -> set:
+    """Символи з незакритими угодами (одним запитом; для EligibilityIndex)."""
+    try:
+        store = get_trade_store()
+        if store is not None:
+            return store.open_symbols()
+        trades = load_active_trades() or {}
+        return {rec.get("symbol") for rec in trades.values()
+                if isinstance(rec, dict) and rec.get("symbol") and not rec.get("closed")}
+    except Exception as e:
+        log_error(f"[get_open_trade_symbols] {e}")
+    return set()
+
 def has_open_trade_for(symbol: str) -> bool:
     try:
+        store = get_trade_store()
+        if store is not None:
+            return store.has_open(symbol)
         trades = load_active_trades() or {}
         if isinstance(trades, dict):
             for rec in trades.values():
@@ -504,12 +606,26 @@ def has_open_trade_for(symbol: str) -> bool:
     return False
 
 
+def load_active_trade(trade_id: str) -> dict | None:
+    """📥 Один запис угоди за trade_id (без завантаження всіх угод)."""
+    try:
+        store = get_trade_store()
+        if store is not None:
+            return store.get(trade_id)
+        return _at_safe_load().get(trade_id)
+    except Exception as e:
+        log_error(f"❌ load_active_trade: {e}")
+        return None
+
 def resolve_trade_id(symbol: str, side: str) -> str | None:
     """
     Підхоплює наш локальний trade_id (той самий, що записали у signal_stats/ActiveTrades)
     для пари symbol+side. Якщо не знайдено — повертає None.
     """
     try:
+        store = get_trade_store()
+        if store is not None:
+            return store.find(symbol, side)  # індекс (symbol, side)
         local_active = load_active_trades()  # очікуємо dict {trade_id: rec}
         if isinstance(local_active, dict):
             side_u = (side or "").upper()
@@ -526,9 +642,8 @@ def get_active_trades() -> dict:
     Повертає dict{trade_id: rec} з ActiveTrades.json.
     (Без автосинху з біржі — за це відповідає monitor_all_open_trades.)
     """
-    with _AT_LOCK:
-        return _at_safe_load() or {}
-    
+    return _at_safe_load() or {}
+
 
 def is_position_open_live(symbol, side):
   
@@ -560,9 +675,9 @@ def is_position_open_live(symbol, side):
                     log_message(f"✅ is_position_open_live: знайдено {symbol} локально (список)")
                     return True
 
-        # 📡 Перевірка на біржі
-        response = bybit.get_positions(category="linear", symbol=symbol.split("_")[0])
-        positions = response.get("result", {}).get("list", [])
+        # 📡 Перевірка на біржі (спільний знімок PositionsService)
+        from utils.positions_service import get_positions_service
+        positions = get_positions_service().rows(symbol)
         for pos in positions:
             size = float(pos.get("size", 0))
             if size > 0:
@@ -591,7 +706,14 @@ def check_position_with_retry(symbol, side, retries=3, delay=2):
     return False
 
 def _at_safe_load() -> dict:
-    """Потокобезпечне читання ActiveTrades.json. Завжди повертає dict{trade_id: rec}."""
+    """Потокобезпечне читання ActiveTrades (сховище або JSON). Завжди повертає dict{trade_id: rec}."""
+    store = get_trade_store()
+    if store is not None:
+        try:
+            return store.all()
+        except Exception as e:
+            print(f"❌ [_at_safe_load] Помилка читання сховища: {e}")
+            return {}
     if not os.path.exists(ACTIVE_TRADES_FILE):
         return {}
     try:
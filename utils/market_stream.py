@@ -0,0 +1,262 @@
+# utils/market_stream.py
+
+"""
+📡 Стрімінговий шар ринкових даних (tickers / klines / orderbook).
+
+Інтерфейс повторює публічний стрім Bybit v5 (pybit.unified_trading.WebSocket):
+    ticker_stream(symbol, callback)
+    kline_stream(interval, symbol, callback)
+    orderbook_stream(depth, symbol, callback)
+Повідомлення — у форматі Bybit v5: {"topic", "type", "ts", "data"}.
+
+Реалізації:
+  - BybitMarketStream  — справжній WebSocket через pybit (live);
+  - ReplayMarketStream — in-process заміна: publish() / програвання JSONL-запису;
+    працює офлайн і замінює live-стрім, якщо MARKET_STREAM="bybit", а клієнт — MockHTTP.
+
+attach_market_stream() підписує на стрім спільні споживачі:
+кеш klines (KLINE_STORE) і знімок тікерів (TickerService).
+PriceEngine підписується сам (див. PriceEngine.attach_stream).
+"""
+
+import json
+import threading
+
+from utils.logger import log_error, log_debug
+
+
+def _as_list(symbol):
+    return list(symbol) if isinstance(symbol, (list, tuple, set)) else [symbol]
+
+
+class MarketStream:
+    """🧩 Реєстр підписок topic -> callbacks + розсилка повідомлень."""
+
+    def __init__(self):
+        self._subs = {}   # topic -> [callback, ...]
+        self._lock = threading.Lock()
+        self.messages = 0
+
+    # ---------- pybit-сумісні підписки ----------
+    def ticker_stream(self, symbol, callback):
+        for s in _as_list(symbol):
+            self._subscribe(f"tickers.{s}", callback)
+
+    def kline_stream(self, interval, symbol, callback):
+        for s in _as_list(symbol):
+            self._subscribe(f"kline.{interval}.{s}", callback)
+
+    def orderbook_stream(self, depth, symbol, callback):
+        for s in _as_list(symbol):
+            self._subscribe(f"orderbook.{depth}.{s}", callback)
+
+    def _subscribe(self, topic, callback):
+        with self._lock:
+            callbacks = self._subs.setdefault(topic, [])
+            first = not callbacks
+            if callback not in callbacks:
+                callbacks.append(callback)
+        if first:
+            self._on_new_topic(topic)
+
+    def _on_new_topic(self, topic):
+        """Хук для реалізацій, яким треба підписатися на біржі."""
+
+    def subscribed_topics(self):
+        with self._lock:
+            return set(self._subs)
+
+    # ---------- розсилка ----------
+    def dispatch(self, message):
+        topic = message.get("topic") if isinstance(message, dict) else None
+        if not topic:
+            return
+        with self._lock:
+            callbacks = list(self._subs.get(topic, ()))
+        self.messages += 1
+        for cb in callbacks:
+            try:
+                cb(message)
+            except Exception as e:
+                log_error(f"❌ MarketStream callback ({topic}): {e}")
+
+    def exit(self):
+        """Закриття з'єднання (як у pybit)."""
+
+
+class BybitMarketStream(MarketStream):
+    """🌐 Live-стрім Bybit v5 (public, linear) через pybit WebSocket."""
+
+    def __init__(self, channel_type="linear", testnet=False):
+        super().__init__()
+        from pybit.unified_trading import WebSocket  # type: ignore
+        self._ws = WebSocket(testnet=testnet, channel_type=channel_type)
+
+    def _on_new_topic(self, topic):
+        kind, *rest = topic.split(".")
+        symbol = rest[-1]
+        if kind == "tickers":
+            self._ws.ticker_stream(symbol=symbol, callback=self.dispatch)
+        elif kind == "kline":
+            self._ws.kline_stream(interval=rest[0], symbol=symbol, callback=self.dispatch)
+        elif kind == "orderbook":
+            self._ws.orderbook_stream(depth=int(rest[0]), symbol=symbol, callback=self.dispatch)
+
+    def exit(self):
+        try:
+            self._ws.exit()
+        except Exception as e:
+            log_error(f"❌ BybitMarketStream.exit: {e}")
+
+
+class ReplayMarketStream(MarketStream):
+    """
+    ▶️ In-process заміна стріму.
+    - publish(message) — синхронно розсилає повідомлення підписникам;
+    - play(messages | path, speed) — програє послідовність (JSONL: одне повідомлення на рядок)
+      з паузами за полем ts; speed=0 — без пауз.
+    """
+
+    def __init__(self, path=None, speed=1.0, loop=False):
+        super().__init__()
+        self.path = path
+        self.speed = float(speed)
+        self.loop = bool(loop)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def publish(self, message):
+        self.dispatch(message)
+
+    @staticmethod
+    def load(path):
+        messages = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    messages.append(json.loads(line))
+        return messages
+
+    def play(self, messages=None, speed=None):
+        """Програє повідомлення у поточному потоці."""
+        messages = self.load(self.path) if messages is None else messages
+        speed = self.speed if speed is None else float(speed)
+        prev_ts = None
+        for msg in messages:
+            if self._stop.is_set():
+                break
+            ts = msg.get("ts")
+            if speed > 0 and prev_ts is not None and ts is not None:
+                delay = (float(ts) - float(prev_ts)) / 1000.0 / speed
+                if delay > 0:
+                    self._stop.wait(delay)
+            prev_ts = ts
+            self.dispatch(msg)
+
+    def start(self):
+        """Фонове програвання файлу self.path (опційно по колу)."""
+        if not self.path:
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            try:
+                messages = self.load(self.path)
+            except Exception as e:
+                log_error(f"❌ ReplayMarketStream: не вдалося прочитати {self.path}: {e}")
+                return
+            while not self._stop.is_set():
+                self.play(messages)
+                if not self.loop:
+                    break
+
+        self._thread = threading.Thread(target=_run, name="market-replay", daemon=True)
+        self._thread.start()
+        log_debug(f"ReplayMarketStream: програвання {self.path} (speed={self.speed})")
+
+    def exit(self):
+        self._stop.set()
+
+
+# ── Адаптери для спільних споживачів ──
+def ticker_callback(service):
+    """tickers.* → TickerService.apply_ticker_update."""
+    def _cb(message):
+        data = message.get("data")
+        for row in (data if isinstance(data, list) else [data]):
+            if isinstance(row, dict):
+                service.apply_ticker_update(row)
+    return _cb
+
+
+def kline_callback(store, category="linear"):
+    """kline.{interval}.{symbol} → KlineStore.apply_kline."""
+    def _cb(message):
+        _, interval, symbol = message.get("topic", "..").split(".", 2)
+        for bar in message.get("data", []) or []:
+            store.apply_kline(symbol, interval, category, bar)
+    return _cb
+
+
+def attach_market_stream(stream, symbols, intervals=("1", "5", "15"), ticker_service=None, kline_store=None):
+    """
+    Підписує кеш klines і знімок тікерів на стрім для заданих символів.
+    Для klines стрім лише оновлює вже заповнені (backfill через REST) буфери.
+    """
+    if ticker_service is None:
+        from utils.ticker_service import get_ticker_service
+        ticker_service = get_ticker_service()
+    if kline_store is None:
+        from utils.get_klines_bybit import KLINE_STORE
+        kline_store = KLINE_STORE
+
+    with _STREAM_LOCK:
+        symbols = [s for s in _as_list(symbols) if s not in _ATTACHED]
+        _ATTACHED.update(symbols)
+    if not symbols:
+        return
+
+    stream.ticker_stream(symbols, ticker_callback(ticker_service))
+    on_kline = kline_callback(kline_store)
+    for interval in intervals:
+        stream.kline_stream(interval, symbols, on_kline)
+
+    # ціни тепер приходять пушем → фоновий REST-опит тікерів не потрібен
+    # (символи поза стрімом оновляться лінивим refresh при застарінні)
+    ticker_service.stop()
+    if hasattr(stream, "start"):
+        stream.start()
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_STREAM = None
+_STREAM_LOCK = threading.Lock()
+_ATTACHED = set()   # символи, вже підписані через attach_market_stream
+
+
+def get_market_stream():
+    """
+    Спільний стрім за MARKET_STREAM: "off" → None (незалежно від клієнта), "bybit" → live WebSocket,
+    "replay" → ReplayMarketStream(MARKET_STREAM_REPLAY_FILE); "bybit" з MockHTTP-клієнтом → теж replay.
+    """
+    global _STREAM
+    with _STREAM_LOCK:
+        if _STREAM is not None:
+            return _STREAM
+        from config import MARKET_STREAM, MARKET_STREAM_REPLAY_FILE, MARKET_STREAM_REPLAY_SPEED, bybit, MockHTTP
+        mode = str(MARKET_STREAM or "off").lower()
+        if mode == "off":
+            return None
+        if mode == "bybit" and not isinstance(bybit, MockHTTP):
+            try:
+                _STREAM = BybitMarketStream()
+            except Exception as e:
+                log_error(f"❌ BybitMarketStream недоступний: {e} → REST-режим")
+                return None
+        else:
+            # програвання стартує після підписок (attach_market_stream)
+            _STREAM = ReplayMarketStream(path=MARKET_STREAM_REPLAY_FILE, speed=MARKET_STREAM_REPLAY_SPEED)
+        return _STREAM
@@ -0,0 +1,209 @@
+# utils/ohlcv.py
+
+"""
+📊 Компактний OHLCV-фрейм на суцільних NumPy-масивах.
+
+Замість DataFrame, який кожен аналізатор знову проганяє через pd.to_numeric /
+astype(float) / dropna / copy():
+  - дані валідуються ОДИН раз при надходженні (from_dataframe / from_rows):
+    числові типи, відкинуті рядки з NaN в OHLC, сортування і дедуплікація за часом;
+  - колонки — C-contiguous float64 (або float32 для великих універсів), timestamp — int64 (мс);
+  - масиви read-only, тож один фрейм можна без копій роздавати всім аналізаторам;
+    tail()/slice — це view, а не копія;
+  - DataFrame — лише на вимогу (to_frame()).
+"""
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COLUMNS = PRICE_COLUMNS + ("volume", "turnover")
+
+
+def _readonly(arr):
+    arr = np.ascontiguousarray(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+class OHLCV:
+    """🕯️ Незмінний набір барів: timestamp (мс) + open/high/low/close/volume[/turnover]."""
+
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume", "turnover", "dtype")
+
+    def __init__(self, timestamp, open, high, low, close, volume, turnover=None, dtype=np.float64):
+        """Без валідації — для вже перевірених масивів (див. from_dataframe / from_rows)."""
+        self.dtype = np.dtype(dtype)
+        self.timestamp = _readonly(np.asarray(timestamp, dtype=np.int64))
+        self.open = _readonly(np.asarray(open, dtype=self.dtype))
+        self.high = _readonly(np.asarray(high, dtype=self.dtype))
+        self.low = _readonly(np.asarray(low, dtype=self.dtype))
+        self.close = _readonly(np.asarray(close, dtype=self.dtype))
+        self.volume = _readonly(np.asarray(volume, dtype=self.dtype))
+        self.turnover = None if turnover is None else _readonly(np.asarray(turnover, dtype=self.dtype))
+
+    # ---------- створення (з валідацією) ----------
+    @classmethod
+    def _validated(cls, ts, cols, dtype):
+        """Відкидає рядки з NaN в OHLC, сортує за часом, лишає останній з дублікатів."""
+        n = len(ts)
+        ok = np.ones(n, dtype=bool)
+        for name in PRICE_COLUMNS:
+            ok &= np.isfinite(cols[name])
+        if "timestamp_ok" in cols:
+            ok &= cols.pop("timestamp_ok")
+        ts = ts[ok]
+        cols = {name: values[ok] for name, values in cols.items()}
+        if len(ts) > 1 and not (np.diff(ts) > 0).all():
+            order = np.argsort(ts, kind="stable")
+            ts = ts[order]
+            keep = np.ones(len(ts), dtype=bool)
+            keep[:-1] = ts[1:] != ts[:-1]
+            ts = ts[keep]
+            cols = {name: values[order][keep] for name, values in cols.items()}
+        return cls(ts, *(cols[name] for name in PRICE_COLUMNS), cols["volume"],
+                   cols.get("turnover"), dtype=dtype)
+
+    @classmethod
+    def from_dataframe(cls, df, dtype=np.float64):
+        """DataFrame (timestamp: datetime або мс) → OHLCV. None для порожніх даних."""
+        if df is None or df.empty or "timestamp" not in df.columns:
+            return None
+        ts_raw = df["timestamp"]
+        if pd.api.types.is_datetime64_any_dtype(ts_raw):
+            ts_ok = ts_raw.notna().to_numpy()
+            ts = ts_raw.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        else:
+            ts_num = pd.to_numeric(ts_raw, errors="coerce")
+            ts_ok = ts_num.notna().to_numpy()
+            ts = ts_num.fillna(0).to_numpy(dtype=np.int64)
+        cols = {"timestamp_ok": ts_ok}
+        for name in COLUMNS:
+            if name in df.columns:
+                cols[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+        if "volume" not in cols:
+            cols["volume"] = np.zeros(len(df))
+        if not all(name in cols for name in PRICE_COLUMNS):
+            return None
+        frame = cls._validated(ts, cols, dtype)
+        return frame if len(frame) else None
+
+    @classmethod
+    def from_rows(cls, rows, dtype=np.float64):
+        """
+        Bybit v5 get_kline list: [[ts, open, high, low, close, volume(, turnover)], ...]
+        (рядки, новіші першими) → OHLCV без проміжного DataFrame.
+        """
+        if not rows:
+            return None
+        width = min(len(r) for r in rows)
+        if width < 6:
+            return None
+        table = np.array([r[:min(width, 7)] for r in rows], dtype=object)
+        try:
+            values = table[:, 1:].astype(np.float64)
+            ts = table[:, 0].astype(np.int64)
+        except (TypeError, ValueError):
+            return None
+        cols = dict(zip(COLUMNS[:values.shape[1]], values.T))
+        frame = cls._validated(ts, cols, dtype)
+        return frame if len(frame) else None
+
+    # ---------- доступ ----------
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in COLUMNS or name == "timestamp" else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    @property
+    def empty(self):
+        return len(self.timestamp) == 0
+
+    @property
+    def columns(self):
+        return ("timestamp",) + tuple(c for c in COLUMNS if getattr(self, c) is not None)
+
+    @property
+    def last_timestamp(self):
+        """Час відкриття останнього бару (мс) або None."""
+        return int(self.timestamp[-1]) if len(self.timestamp) else None
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, c).nbytes for c in self.columns)
+
+    def _take(self, index):
+        return OHLCV(self.timestamp[index], self.open[index], self.high[index], self.low[index],
+                     self.close[index], self.volume[index],
+                     None if self.turnover is None else self.turnover[index], dtype=self.dtype)
+
+    def tail(self, n):
+        """Останні n барів — view на ті самі масиви (без копій)."""
+        n = max(0, int(n))
+        return self._take(slice(max(0, len(self) - n), None))
+
+    def astype(self, dtype):
+        dtype = np.dtype(dtype)
+        if dtype == self.dtype:
+            return self
+        return OHLCV(self.timestamp, self.open, self.high, self.low, self.close, self.volume,
+                     self.turnover, dtype=dtype)
+
+    def resample(self, minutes):
+        """
+        Агрегує бари у старший таймфрейм: бакети по `minutes` від epoch (як у Bybit),
+        open — перший, high/low — max/min, close — останній, volume/turnover — сума.
+        Останній бакет може бути неповним — це формуючий бар старшого таймфрейму.
+        """
+        if self.empty:
+            return self
+        step = int(minutes) * 60_000
+        bucket = self.timestamp // step * step
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], len(self)] - 1
+        return OHLCV(
+            bucket[starts], self.open[starts],
+            np.maximum.reduceat(self.high, starts), np.minimum.reduceat(self.low, starts),
+            self.close[ends], np.add.reduceat(self.volume, starts),
+            None if self.turnover is None else np.add.reduceat(self.turnover, starts),
+            dtype=self.dtype,
+        )
+
+    # ---------- оновлення (нові об'єкти; старі view лишаються валідними) ----------
+    def merge(self, fresh, limit=None):
+        """Бари self до початку fresh + fresh (fresh перекриває формуючий бар), обрізка до limit."""
+        if fresh is None or fresh.empty:
+            return self
+        head = self._take(self.timestamp < fresh.timestamp[0])
+        turnover = None
+        if head.turnover is not None and fresh.turnover is not None:
+            turnover = np.concatenate((head.turnover, fresh.turnover))
+        merged = OHLCV(
+            np.concatenate((head.timestamp, fresh.timestamp)),
+            *(np.concatenate((getattr(head, c), getattr(fresh, c))) for c in PRICE_COLUMNS + ("volume",)),
+            turnover=turnover, dtype=self.dtype,
+        )
+        return merged.tail(limit) if limit else merged
+
+    def with_bar(self, timestamp, open, high, low, close, volume, turnover=None, limit=None):
+        """Перезаписує бар з тим самим timestamp або дописує новий."""
+        bar = OHLCV([timestamp], [open], [high], [low], [close], [volume],
+                    None if self.turnover is None else [np.nan if turnover is None else turnover],
+                    dtype=self.dtype)
+        return self.merge(bar, limit)
+
+    def to_frame(self):
+        """DataFrame на вимогу (нова копія; timestamp → datetime64)."""
+        data = {"timestamp": pd.to_datetime(self.timestamp, unit="ms")}
+        for name in COLUMNS:
+            values = getattr(self, name)
+            if values is not None:
+                data[name] = values.astype(np.float64)
+        return pd.DataFrame(data)
+
+    def __repr__(self):
+        return f"OHLCV(bars={len(self)}, dtype={self.dtype.name}, last_ts={self.last_timestamp})"
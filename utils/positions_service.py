@@ -0,0 +1,238 @@
+# utils/positions_service.py
+
+"""
+📌 Спільний знімок позицій Bybit (linear, settleCoin=USDT).
+
+Замість окремих get_positions у monitor_all_open_trades (кожні 2 с + ретраї),
+reconcile_active_trades_with_exchange, is_position_open_api, get_current_position_size,
+check_position_with_retry, OrderExecutor.close_position, has_liq_buffer_after_add:
+  - один запит (з пагінацією) раз на refresh_sec у фоновому потоці;
+  - усі читачі бачать той самий узгоджений знімок з номером версії (version);
+  - пуш-оновлення (приватний стрім position або його замінник) — apply_position_update;
+  - після власних ордерів — refresh_now(): наступні читання вже бачать результат
+    (без гонок «записали → прочитали старе» між потоками);
+  - порожня відповідь при непорожньому знімку у фонових оновленнях публікується лише після
+    empty_confirmations поспіль (замість ретраїв у кожному виклику); refresh_now(trust_empty=True)
+    після власного закриття — одразу.
+"""
+
+import threading
+import time
+
+from utils.logger import log_error, log_debug
+
+_PAGE_LIMIT = 200
+_MAX_PAGES = 10
+
+
+def _to_float(value):
+    try:
+        v = float(value)
+        return v if v == v and abs(v) != float("inf") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def position_side(pos):
+    """LONG / SHORT для рядка позиції (positionSide у hedge-режимі, інакше side Buy/Sell)."""
+    raw_ps = str(pos.get("positionSide", "")).upper()
+    if raw_ps in ("LONG", "SHORT"):
+        return raw_ps
+    return "LONG" if str(pos.get("side", "")).upper() == "BUY" else "SHORT"
+
+
+class PositionsService:
+    """🧠 Знімок позицій: rows (як у result.list get_positions) + version."""
+
+    def __init__(self, client, category="linear", settle_coin="USDT", refresh_sec=2.0, max_age=5.0,
+                 empty_confirmations=2):
+        self._client = client
+        self.category = category
+        self.settle_coin = settle_coin
+        self.refresh_sec = float(refresh_sec)
+        self.max_age = float(max_age)
+        self.empty_confirmations = max(1, int(empty_confirmations))
+        self._rows = {}            # (symbol, side) -> рядок позиції
+        self._updated_at = 0.0
+        self._last_attempt = 0.0
+        self._empty_streak = 0
+        self.version = 0
+        self.ok = False            # чи вдався останній REST-запит
+        self._lock = threading.Lock()          # захист _rows/version
+        self._refresh_lock = threading.Lock()  # лише один REST-запит одночасно
+        self._thread = None
+        self._stop = threading.Event()
+        self.requests = 0
+        self.errors = 0
+
+    # ---------- оновлення ----------
+    def _fetch(self):
+        rows, cursor = [], None
+        for _ in range(_MAX_PAGES):
+            params = {"category": self.category, "settleCoin": self.settle_coin, "limit": _PAGE_LIMIT}
+            if cursor:
+                params["cursor"] = cursor
+            self.requests += 1
+            resp = self._client.get_positions(**params) or {}
+            if resp.get("retCode") not in (None, 0):
+                raise RuntimeError(f"retCode={resp.get('retCode')} {resp.get('retMsg')}")
+            result = resp.get("result", {}) or {}
+            rows.extend(result.get("list", []) or [])
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                break
+        return rows
+
+    def refresh(self, trust_empty=False):
+        """
+        Один bulk-запит → новий знімок. Повертає True при успіху.
+        trust_empty=True — порожня відповідь публікується одразу (refresh_now після власного закриття);
+        інакше (фонові оновлення) — лише після empty_confirmations поспіль.
+        """
+        self._last_attempt = time.time()
+        try:
+            rows = self._fetch()
+        except Exception as e:
+            self.errors += 1
+            self.ok = False
+            log_error(f"❌ PositionsService.refresh: {e}")
+            return False
+        self.ok = True
+        live = [r for r in rows if r.get("symbol")]
+        with self._lock:
+            # біржа інколи віддає порожній список на мить — підтверджуємо повторно
+            if not live and self._rows and not trust_empty:
+                self._empty_streak += 1
+                if self._empty_streak < self.empty_confirmations:
+                    return True
+            self._empty_streak = 0
+            self._rows = {(r["symbol"], position_side(r)): r for r in live}
+            self._updated_at = time.time()
+            self.version += 1
+        return True
+
+    def refresh_now(self, trust_empty=False):
+        """
+        Синхронне оновлення (після власного ордера). Повертає нову версію знімка.
+        trust_empty=True (після власного закриття) — порожній результат публікується одразу:
+        після закриття останньої позиції читачі не повинні бачити її ще один цикл.
+        """
+        with self._refresh_lock:
+            self.refresh(trust_empty=trust_empty)
+        return self.version
+
+    def apply_position_update(self, rows):
+        """
+        Пуш зі стріму position (Bybit v5): рядки з size=0 — закриті позиції.
+        Оновлює лише ці (symbol, side), решта знімка лишається.
+        """
+        now = time.time()
+        with self._lock:
+            for r in rows or []:
+                symbol = r.get("symbol")
+                if not symbol:
+                    continue
+                key = (symbol, position_side(r))
+                if _to_float(r.get("size")) > 0:
+                    self._rows[key] = {**self._rows.get(key, {}), **r}
+                else:
+                    self._rows.pop(key, None)
+            self._updated_at = now
+            self.version += 1
+
+    def _ensure_fresh(self, max_age):
+        """Синхронне оновлення, якщо знімок застарів (не частіше за refresh_sec)."""
+        if time.time() - self._updated_at <= max_age:
+            return
+        with self._refresh_lock:
+            now = time.time()
+            if now - self._updated_at <= max_age or now - self._last_attempt < min(self.refresh_sec, max_age):
+                return
+            self.refresh()
+
+    # ---------- фоновий потік ----------
+    def start(self):
+        """Запускає фоновий refresh кожні refresh_sec (ідемпотентно)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="positions-service", daemon=True)
+            self._thread.start()
+        log_debug(f"PositionsService запущено ({self.category}/{self.settle_coin}, кожні {self.refresh_sec}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            with self._refresh_lock:
+                self.refresh()
+            self._stop.wait(self.refresh_sec)
+
+    # ---------- читання ----------
+    def snapshot(self, max_age=None):
+        """(version, [рядки позицій]) — узгоджений знімок."""
+        max_age = self.max_age if max_age is None else float(max_age)
+        self._ensure_fresh(max_age)
+        with self._lock:
+            return self.version, list(self._rows.values())
+
+    def rows(self, symbol=None, max_age=None):
+        """Рядки позицій (формат result.list get_positions); symbol — лише для нього."""
+        _, rows = self.snapshot(max_age)
+        if symbol is None:
+            return rows
+        symbol = str(symbol).split("_")[0]
+        return [r for r in rows if r.get("symbol") == symbol]
+
+    def get(self, symbol, side, max_age=None):
+        """Відкрита позиція (size > 0) для (symbol, LONG/SHORT) або None."""
+        side = "LONG" if str(side).upper() in ("LONG", "BUY") else "SHORT"
+        for r in self.rows(symbol, max_age):
+            if position_side(r) == side and _to_float(r.get("size")) > 0:
+                return r
+        return None
+
+    def size(self, symbol, side, max_age=None):
+        pos = self.get(symbol, side, max_age)
+        return _to_float(pos.get("size")) if pos else 0.0
+
+    def count_by_side(self, side, max_age=None):
+        side = str(side).upper()
+        return sum(1 for r in self.rows(max_age=max_age)
+                   if position_side(r) == side and _to_float(r.get("size")) > 0)
+
+    def has_data(self):
+        return self._updated_at > 0
+
+    def age(self):
+        return time.time() - self._updated_at if self._updated_at else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "positions": len(self._rows),
+                "version": self.version,
+                "age_sec": round(self.age(), 3) if self._updated_at else None,
+                "requests": self.requests,
+                "errors": self.errors,
+                "running": bool(self._thread and self._thread.is_alive()),
+            }
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_positions_service():
+    """Повертає спільний PositionsService (фоновий потік — за POSITIONS_SERVICE_BACKGROUND)."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            from config import client, POSITIONS_REFRESH_SEC, POSITIONS_MAX_AGE, POSITIONS_SERVICE_BACKGROUND
+            _SERVICE = PositionsService(client, refresh_sec=POSITIONS_REFRESH_SEC, max_age=POSITIONS_MAX_AGE)
+            if POSITIONS_SERVICE_BACKGROUND:
+                _SERVICE.start()
+        return _SERVICE
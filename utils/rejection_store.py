@@ -0,0 +1,287 @@
+# utils/rejection_store.py
+
+"""
+🗃️ Сховище відмов (rejections) для аналітики порогів на SQLite у режимі WAL.
+
+Замість rejections.jsonl, який для будь-якого аналізу треба перечитати й розпарсити:
+  - одна відмова = один рядок з типізованими колонками (ts, symbol, side, score, threshold);
+  - причини — коди (reason_code: "anti:hysteresis", "below_threshold", ...) у словнику
+    reason_codes і таблиці зв'язків (rejection_id, code_id) з індексом — агрегати без JSON;
+  - лише дописування (append_many — одна транзакція на пачку) і періодичне
+    видалення записів, старших за retention_sec;
+  - запити: top_reasons() — «топ причин блокування по символу за 24 год»,
+    score_distribution() — «розподіл score біля порогу».
+
+TTLDedupIndex — обмежений індекс дедуплікації (TTL + стеля ключів) замість
+необмеженого dict: однакові відмови (symbol, side) у межах вікна не пишуться.
+Модуль не залежить від utils.logger (щоб не було циклічних імпортів).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rejections (
+    id        INTEGER PRIMARY KEY,
+    ts        REAL NOT NULL,
+    symbol    TEXT NOT NULL,
+    side      TEXT NOT NULL,
+    score     REAL,
+    threshold REAL,
+    summary   TEXT,
+    evidence  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rejections_ts ON rejections(ts);
+CREATE INDEX IF NOT EXISTS idx_rejections_symbol_ts ON rejections(symbol, ts);
+CREATE TABLE IF NOT EXISTS reason_codes (
+    code_id INTEGER PRIMARY KEY,
+    code    TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rejection_reasons (
+    rejection_id INTEGER NOT NULL,
+    code_id      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rejection_reasons_code ON rejection_reasons(code_id, rejection_id);
+CREATE INDEX IF NOT EXISTS idx_rejection_reasons_rej ON rejection_reasons(rejection_id);
+"""
+
+# Причини, що реально блокують вхід (решта — інформаційні: core/pairs hits, regime, ...)
+_BLOCKING_PREFIXES = ("anti", "align", "long", "short")
+_CODE_RE = re.compile(r"[a-z_ ]+")
+
+
+def reason_codes(reasons, score=None, threshold=None):
+    """
+    Тексти причин → стабільні коди без параметрів:
+    "anti: atr_out(0.2 not in 0.35-7.0)" → "anti:atr_out", "anti: hysteresis<1" → "anti:hysteresis".
+    score < threshold дає код "below_threshold".
+    """
+    codes = []
+    if score is not None and threshold is not None and score < threshold:
+        codes.append("below_threshold")
+    for text in reasons or []:
+        head, sep, rest = str(text).partition(":")
+        head = head.strip().lower()
+        if not sep or head not in _BLOCKING_PREFIXES:
+            continue
+        m = _CODE_RE.match(rest.strip().lower())
+        name = m.group(0).strip().replace(" ", "_") if m else ""
+        code = f"{head}:{name}" if name else head
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+class TTLDedupIndex:
+    """⏱️ key → (sig, ts): той самий sig у межах ttl — дублікат. Розмір обмежений max_keys."""
+
+    def __init__(self, ttl=15.0, max_keys=10_000):
+        self.ttl = float(ttl)
+        self.max_keys = int(max_keys)
+        self._items = OrderedDict()  # впорядковано за часом останнього запису
+        self._lock = threading.Lock()
+
+    def seen(self, key, sig, now=None):
+        """True — дублікат (не записувати); інакше запам'ятовує (sig, now) і повертає False."""
+        now = time.time() if now is None else now
+        with self._lock:
+            # найстаріші записи — спереду: прострочені прибираємо, поки не натрапимо на свіжий
+            while self._items:
+                _, (_, ts) = next(iter(self._items.items()))
+                if now - ts < self.ttl:
+                    break
+                self._items.popitem(last=False)
+            prev = self._items.get(key)
+            if prev is not None and prev[0] == sig and (now - prev[1]) < self.ttl:
+                return True
+            self._items[key] = (sig, now)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+            return False
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RejectionStore:
+    """📊 Append-only журнал відмов з агрегатними запитами."""
+
+    def __init__(self, db_path, retention_sec=7 * 86400, prune_every_sec=3600.0):
+        self.db_path = db_path
+        self.retention_sec = float(retention_sec)
+        self.prune_every_sec = float(prune_every_sec)
+        self._lock = threading.RLock()
+        self._codes = {}  # code -> code_id
+        self._last_prune = 0.0
+        self.appended = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._codes = dict(self._conn.execute("SELECT code, code_id FROM reason_codes").fetchall())
+        # старе прибираємо при відкритті, далі — не частіше, ніж раз на prune_every_sec
+        self.prune(time.time() - self.retention_sec)
+
+    # ---------- запис ----------
+    def _code_id(self, code):
+        code_id = self._codes.get(code)
+        if code_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO reason_codes(code) VALUES (?)", (code,))
+            code_id = self._conn.execute("SELECT code_id FROM reason_codes WHERE code = ?", (code,)).fetchone()[0]
+            self._codes[code] = code_id
+        return code_id
+
+    def append_many(self, rows):
+        """
+        rows: [{"ts", "symbol", "side", "score", "threshold", "codes", "summary", "evidence"}]
+        (ts — epoch сек, codes — список reason-кодів, evidence — dict). Одна транзакція на пачку.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    cur = self._conn.execute(
+                        "INSERT INTO rejections(ts, symbol, side, score, threshold, summary, evidence) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            float(row.get("ts") or now),
+                            str(row.get("symbol") or "UNKNOWN"),
+                            str(row.get("side") or "").upper(),
+                            row.get("score"),
+                            row.get("threshold"),
+                            row.get("summary"),
+                            json.dumps(row.get("evidence") or {}, ensure_ascii=False, default=str),
+                        ),
+                    )
+                    rid = cur.lastrowid
+                    self._conn.executemany(
+                        "INSERT INTO rejection_reasons(rejection_id, code_id) VALUES (?, ?)",
+                        [(rid, self._code_id(code)) for code in row.get("codes") or []],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._codes = dict(self._conn.execute("SELECT code, code_id FROM reason_codes").fetchall())
+                raise
+            self.appended += len(rows)
+            if now - self._last_prune >= self.prune_every_sec:
+                self.prune(now - self.retention_sec)
+        return len(rows)
+
+    def prune(self, older_than):
+        """Видаляє відмови, старші за older_than (epoch сек). Повертає кількість."""
+        with self._lock:
+            self._last_prune = time.time()
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM rejection_reasons WHERE rejection_id IN (SELECT id FROM rejections WHERE ts < ?)",
+                (older_than,),
+            )
+            removed = self._conn.execute("DELETE FROM rejections WHERE ts < ?", (older_than,)).rowcount
+            self._conn.execute("COMMIT")
+        return removed or 0
+
+    # ---------- запити ----------
+    @staticmethod
+    def _where(since, symbol=None, side=None):
+        sql, args = ["r.ts >= ?"], [since]
+        if symbol:
+            sql.append("r.symbol = ?")
+            args.append(symbol)
+        if side:
+            sql.append("r.side = ?")
+            args.append(str(side).upper())
+        return " AND ".join(sql), args
+
+    def top_reasons(self, symbol=None, side=None, window_sec=86400, limit=10, now=None):
+        """
+        Топ причин блокування за останні window_sec: [{"symbol", "code", "count"}]
+        (по кожному символу окремо — limit на символ; з symbol — лише для нього).
+        """
+        now = time.time() if now is None else now
+        where, args = self._where(now - window_sec, symbol, side)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.symbol, c.code, COUNT(*) AS n FROM rejections r "
+                "JOIN rejection_reasons rr ON rr.rejection_id = r.id "
+                "JOIN reason_codes c ON c.code_id = rr.code_id "
+                f"WHERE {where} GROUP BY r.symbol, c.code ORDER BY r.symbol, n DESC, c.code",
+                args,
+            ).fetchall()
+        out, per_symbol = [], {}
+        for sym, code, n in rows:
+            if per_symbol.get(sym, 0) < limit:
+                per_symbol[sym] = per_symbol.get(sym, 0) + 1
+                out.append({"symbol": sym, "code": code, "count": n})
+        return out
+
+    def scores(self, symbol=None, side=None, window_sec=86400, now=None):
+        """(score[], threshold[]) відмов за вікно — numpy-колонки без парсингу JSON."""
+        now = time.time() if now is None else now
+        where, args = self._where(now - window_sec, symbol, side)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT r.score, r.threshold FROM rejections r WHERE {where} AND r.score IS NOT NULL", args
+            ).fetchall()
+        arr = np.array(rows, dtype=float).reshape(-1, 2)
+        return arr[:, 0], arr[:, 1]
+
+    def score_distribution(self, threshold=None, band=3.0, bins=6, symbol=None, side=None,
+                           window_sec=86400, now=None):
+        """
+        Розподіл score відмов у смузі [threshold - band, threshold):
+        {"threshold", "edges", "counts", "total", "near"} — скільки сигналів «не дотягнули» трохи.
+        threshold=None — медіана записаних порогів.
+        """
+        score, thr = self.scores(symbol, side, window_sec, now)
+        if threshold is None:
+            finite = thr[np.isfinite(thr)]
+            threshold = float(np.median(finite)) if finite.size else None
+        if threshold is None:
+            return {"threshold": None, "edges": [], "counts": [], "total": int(score.size), "near": 0}
+        edges = np.linspace(threshold - band, threshold, int(bins) + 1)
+        near = score[(score >= edges[0]) & (score < threshold)]
+        counts, _ = np.histogram(near, bins=edges)
+        return {
+            "threshold": float(threshold),
+            "edges": [round(float(e), 4) for e in edges],
+            "counts": counts.tolist(),
+            "total": int(score.size),
+            "near": int(near.size),
+        }
+
+    def count(self, symbol=None, side=None, window_sec=86400, now=None):
+        now = time.time() if now is None else now
+        where, args = self._where(now - window_sec, symbol, side)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM rejections r WHERE {where}", args).fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM rejections").fetchone()[0]
+        return {"rejections": total, "codes": len(self._codes), "appended": self.appended}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,334 @@
+# utils/request_scheduler.py
+
+"""
+🚦 Центральний планувальник REST-запитів до Bybit: token bucket на групу ендпоінтів + пріоритетні смуги.
+
+Усі потоки (сканер, watchlist, монітори угод, reconcile, бекенд) ділять один config.bybit;
+ScheduledClient обгортає його так, що кожен виклик спершу отримує «слот»:
+  - група ендпоінтів (order / position / account / market) — власний token bucket (rate/сек, burst);
+  - спільний глобальний bucket (IP-ліміт Bybit) з резервом: нижчі смуги не з'їдають останні токени;
+  - смуги: LANE_ORDER (place/cancel/leverage) > LANE_POSITION (позиції, баланс, ціни відкритих угод)
+    > LANE_SCAN (klines, orderbook, instruments); у межах групи вищий пріоритет іде першим;
+  - адаптивний backoff: заголовки X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp
+    (пауза групи до скидання квоти, коли залишок малий) і retCode 10006 (експоненційна пауза);
+  - метрики: глибина черги та час очікування по смугах, backoff-и по групах — stats().
+
+Модуль імпортується з config.py, тому utils.logger підтягується ліниво.
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+LANE_ORDER = 0
+LANE_POSITION = 1
+LANE_SCAN = 2
+LANE_NAMES = {LANE_ORDER: "order", LANE_POSITION: "position", LANE_SCAN: "scan"}
+
+# метод pybit → (група ендпоінтів, смуга за замовчуванням)
+METHOD_ROUTES = {
+    "place_order": ("order", LANE_ORDER),
+    "amend_order": ("order", LANE_ORDER),
+    "cancel_order": ("order", LANE_ORDER),
+    "cancel_all_orders": ("order", LANE_ORDER),
+    "set_trading_stop": ("order", LANE_ORDER),
+    "set_leverage": ("position", LANE_ORDER),
+    "switch_position_mode": ("position", LANE_ORDER),
+    "get_positions": ("position", LANE_POSITION),
+    "get_open_orders": ("order", LANE_POSITION),
+    "get_order_history": ("order", LANE_POSITION),
+    "get_executions": ("order", LANE_POSITION),
+    "get_closed_pnl": ("position", LANE_POSITION),
+    "get_wallet_balance": ("account", LANE_POSITION),
+    "get_tickers": ("market", LANE_POSITION),
+    "get_kline": ("market", LANE_SCAN),
+    "get_orderbook": ("market", LANE_SCAN),
+    "get_instruments_info": ("market", LANE_SCAN),
+}
+
+DEFAULT_LIMITS = {
+    # група: {"rate": токенів/сек, "burst": ємність}
+    "order": {"rate": 10.0, "burst": 10},
+    "position": {"rate": 10.0, "burst": 20},
+    "account": {"rate": 5.0, "burst": 10},
+    "market": {"rate": 20.0, "burst": 40},
+    "global": {"rate": 50.0, "burst": 100},
+}
+# Скільки токенів глобального bucket лишаємо вищим смугам
+DEFAULT_LANE_RESERVE = {LANE_ORDER: 0, LANE_POSITION: 5, LANE_SCAN: 15}
+
+_RATE_LIMIT_CODES = (10006, 10018)
+
+
+def _log(message, error=False):
+    try:
+        from utils.logger import log_error, log_debug
+        (log_error if error else log_debug)(message)
+    except Exception:
+        pass
+
+
+class TokenBucket:
+    """Класичний token bucket (час — time.monotonic)."""
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = max(float(rate), 1e-6)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self._ts = time.monotonic() if now is None else now
+
+    def refill(self, now):
+        if now > self._ts:
+            self.tokens = min(self.burst, self.tokens + (now - self._ts) * self.rate)
+            self._ts = now
+
+    def wait_time(self, need, now):
+        """Скільки чекати, доки в bucket буде need токенів (0 — вже є)."""
+        self.refill(now)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self, n=1.0):
+        self.tokens -= n
+
+    def cap(self, tokens):
+        """Біржа бачить менший залишок — не даємо локальному bucket бути оптимістичнішим."""
+        self.tokens = min(self.tokens, max(0.0, float(tokens)))
+
+
+class RequestScheduler:
+    """🧠 Видає слоти на запити: per-group bucket + глобальний bucket + смуги + backoff."""
+
+    def __init__(self, limits=None, lane_reserve=None, low_quota_frac=0.2, max_backoff=10.0,
+                 max_wait=30.0, report_sec=60.0, clock=time.monotonic):
+        self._clock = clock
+        now = clock()
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._global = TokenBucket(limits["global"]["rate"], limits["global"]["burst"], now)
+        self._buckets = {g: TokenBucket(cfg["rate"], cfg["burst"], now)
+                         for g, cfg in limits.items() if g != "global"}
+        self.lane_reserve = {**DEFAULT_LANE_RESERVE, **(lane_reserve or {})}
+        self.low_quota_frac = float(low_quota_frac)
+        self.max_backoff = float(max_backoff)
+        self.max_wait = float(max_wait)
+        self.report_sec = float(report_sec or 0.0)
+        self._last_report = now
+        self._backoff_until = {}   # group -> monotonic
+        self._strikes = {}         # group -> кількість 10006 поспіль
+        self._waiting = {}         # (group, lane) -> кількість потоків у черзі
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        # метрики
+        self._lane_stats = {lane: {"requests": 0, "wait_total": 0.0, "wait_max": 0.0, "queued": 0, "queued_max": 0,
+                                   "slow": 0}
+                            for lane in LANE_NAMES}
+        self._group_stats = {g: {"requests": 0, "backoffs": 0, "remaining": None} for g in self._buckets}
+
+    # ---------- маршрутизація ----------
+    def route(self, method):
+        """(group, lane) для методу клієнта з урахуванням поточного lane()-override потоку."""
+        group, lane = METHOD_ROUTES.get(method, ("market" if method.startswith("get_") else "order", LANE_SCAN))
+        override = getattr(self._local, "lane", None)
+        # override лише підвищує пріоритет: ордер усередині lane(LANE_POSITION) лишається LANE_ORDER
+        return group, (lane if override is None else min(lane, override))
+
+    def current_lane(self):
+        """Активний lane()-override потоку (None — смуги за METHOD_ROUTES)."""
+        return getattr(self._local, "lane", None)
+
+    @contextmanager
+    def lane(self, lane):
+        """Підвищена смуга для всіх запитів поточного потоку в межах with."""
+        prev = getattr(self._local, "lane", None)
+        self._local.lane = lane
+        try:
+            yield
+        finally:
+            self._local.lane = prev
+
+    # ---------- слоти ----------
+    def _bucket(self, group):
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            cfg = DEFAULT_LIMITS["market"]
+            bucket = self._buckets[group] = TokenBucket(cfg["rate"], cfg["burst"], self._clock())
+            self._group_stats[group] = {"requests": 0, "backoffs": 0, "remaining": None}
+        return bucket
+
+    def _wait_needed(self, group, lane, now):
+        """0 — можна брати слот; інакше скільки секунд почекати (None — чекати на notify)."""
+        backoff = self._backoff_until.get(group, 0.0) - now
+        if backoff > 0:
+            return backoff
+        if any(n > 0 for (g, l), n in self._waiting.items() if g == group and l < lane):
+            return None
+        reserve = min(self.lane_reserve.get(lane, 0), self._global.burst - 1.0)
+        return max(self._bucket(group).wait_time(1.0, now), self._global.wait_time(1.0 + reserve, now))
+
+    def acquire(self, group, lane):
+        """Блокує до отримання слота. Повертає час очікування (сек)."""
+        start = self._clock()
+        stats = self._lane_stats.setdefault(lane, {"requests": 0, "wait_total": 0.0, "wait_max": 0.0,
+                                                   "queued": 0, "queued_max": 0, "slow": 0})
+        key = (group, lane)
+        with self._cond:
+            self._waiting[key] = self._waiting.get(key, 0) + 1
+            stats["queued"] += 1
+            stats["queued_max"] = max(stats["queued_max"], stats["queued"])
+            warned = False
+            try:
+                # слот без токена не видаємо ніколи: max_wait — лише поріг попередження
+                while True:
+                    now = self._clock()
+                    wait = self._wait_needed(group, lane, now)
+                    if wait == 0.0:
+                        break
+                    if not warned and now - start >= self.max_wait:
+                        warned = True
+                        stats["slow"] += 1
+                        _log(f"⚠️ RequestScheduler: {group}/{LANE_NAMES.get(lane, lane)} "
+                             f"чекає слот понад {self.max_wait:.1f}s", error=True)
+                    timeout = 0.05 if wait is None else min(wait, 0.25)
+                    if not warned:
+                        timeout = min(timeout, max(0.001, self.max_wait - (now - start)))
+                    self._cond.wait(timeout=timeout)
+                self._bucket(group).take()
+                self._global.take()
+            finally:
+                self._waiting[key] -= 1
+                stats["queued"] -= 1
+                self._cond.notify_all()
+            waited = self._clock() - start
+            stats["requests"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+            self._group_stats[group]["requests"] += 1
+        self._maybe_report()
+        return waited
+
+    def _maybe_report(self):
+        """Періодичний рядок метрик у debug-лог (report_sec=0 — вимкнено)."""
+        now = self._clock()
+        if not self.report_sec or now - self._last_report < self.report_sec:
+            return
+        self._last_report = now
+        lanes = self.stats()["lanes"]
+        _log("📊 RequestScheduler: " + ", ".join(
+            f"{name}: n={s['requests']} q={s['queued']}/{s['queued_max']} "
+            f"wait avg={s['wait_avg_ms']}ms max={s['wait_max_ms']}ms"
+            for name, s in lanes.items()))
+
+    # ---------- зворотний зв'язок від біржі ----------
+    def observe(self, group, headers=None, ret_code=None):
+        """Оновлює стан групи з заголовків X-Bapi-* та retCode відповіді."""
+        now = self._clock()
+        if ret_code in _RATE_LIMIT_CODES:
+            with self._cond:
+                strikes = self._strikes.get(group, 0) + 1
+                self._strikes[group] = strikes
+                pause = min(self.max_backoff, 0.5 * 2 ** (strikes - 1))
+                self._set_backoff(group, now + pause)
+                self._group_stats.setdefault(group, {"requests": 0, "backoffs": 0, "remaining": None})["backoffs"] += 1
+            _log(f"⚠️ RequestScheduler: rate limit ({ret_code}) для групи {group} → пауза {pause:.1f}s", error=True)
+            return
+        with self._cond:
+            stats = self._group_stats.setdefault(group, {"requests": 0, "backoffs": 0, "remaining": None})
+            self._strikes[group] = 0
+            if not headers:
+                return
+            try:
+                remaining = int(headers.get("X-Bapi-Limit-Status"))
+                limit = int(headers.get("X-Bapi-Limit") or 0)
+            except (TypeError, ValueError):
+                return
+            stats["remaining"] = remaining
+            self._bucket(group).cap(remaining)
+            if remaining <= max(1, int(limit * self.low_quota_frac)):
+                try:
+                    reset_in = float(headers.get("X-Bapi-Limit-Reset-Timestamp")) / 1000.0 - time.time()
+                except (TypeError, ValueError):
+                    reset_in = 1.0
+                self._set_backoff(group, now + min(self.max_backoff, max(0.0, reset_in)))
+                stats["backoffs"] += 1
+
+    def _set_backoff(self, group, until):
+        self._backoff_until[group] = max(self._backoff_until.get(group, 0.0), until)
+
+    # ---------- метрики ----------
+    def stats(self):
+        with self._cond:
+            lanes = {}
+            for lane, s in self._lane_stats.items():
+                lanes[LANE_NAMES.get(lane, str(lane))] = {
+                    "requests": s["requests"],
+                    "queued": s["queued"],
+                    "queued_max": s["queued_max"],
+                    "wait_avg_ms": round(1000 * s["wait_total"] / s["requests"], 2) if s["requests"] else 0.0,
+                    "wait_max_ms": round(1000 * s["wait_max"], 2),
+                    "slow": s["slow"],
+                }
+            now = self._clock()
+            groups = {g: {**s, "backoff_sec": round(max(0.0, self._backoff_until.get(g, 0.0) - now), 3)}
+                      for g, s in self._group_stats.items()}
+            return {"lanes": lanes, "groups": groups}
+
+
+class ScheduledClient:
+    """Обгортка клієнта pybit: кожен виклик методу — через RequestScheduler.acquire/observe."""
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self.scheduler = scheduler
+        # pybit повертає (json, elapsed, headers) — заголовки потрібні для адаптивного backoff
+        if hasattr(client, "return_response_headers"):
+            client.return_response_headers = True
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        scheduler = self.scheduler
+
+        def _call(*args, **kwargs):
+            group, lane = scheduler.route(name)
+            scheduler.acquire(group, lane)
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                code = getattr(e, "status_code", None)
+                if code in _RATE_LIMIT_CODES:
+                    scheduler.observe(group, ret_code=code)
+                raise
+            headers = None
+            if isinstance(result, tuple):
+                result, headers = result[0], (result[2] if len(result) > 2 else None)
+            scheduler.observe(group, headers, result.get("retCode") if isinstance(result, dict) else None)
+            return result
+
+        return _call
+
+
+def _shared_scheduler():
+    """Планувальник спільного config.bybit або None (MockHTTP / клієнт не обгорнутий)."""
+    from config import bybit
+    return bybit.scheduler if isinstance(bybit, ScheduledClient) else None
+
+
+def request_lane(lane):
+    """
+    Контекст примусової смуги для запитів через спільний config.bybit у поточному потоці.
+    lane=None або клієнт без планувальника — нічого не змінює.
+    """
+    scheduler = _shared_scheduler() if lane is not None else None
+    return scheduler.lane(lane) if scheduler is not None else nullcontext()
+
+
+def current_request_lane():
+    """Смуга, примусово задана поточному потоку (щоб передати її в пул потоків)."""
+    scheduler = _shared_scheduler()
+    return scheduler.current_lane() if scheduler is not None else None
+
+
+def get_request_scheduler_stats():
+    """📊 Метрики планувальника спільного config.bybit (None — клієнт не обгорнутий)."""
+    scheduler = _shared_scheduler()
+    return scheduler.stats() if scheduler is not None else None
@@ -0,0 +1,323 @@
+# utils/symbol_registry.py
+
+"""
+🏷️ Реєстр метаданих інструментів Bybit (linear + spot) у пам'яті.
+
+Замість get_instruments_info на кожен символ у кожному ордері
+(round_qty_bybit / round_price_bybit / _ensure_min_qty / set_safe_leverage),
+окремих повних списків для _resolve_category і читання innovation-кешу з диска
+на кожен виклик:
+  - один bulk-запит на категорію (з пагінацією) раз на refresh_sec (фоновий потік);
+  - O(1) get(symbol) → {tick_size, qty_step, min_qty, max_leverage, category, innovation, listing_ts, ...};
+  - знімок зберігається на диск (cache_file) і підхоплюється при старті —
+    відкриття ордера не робить жодного запиту за метаданими;
+  - символ, якого нема у знімку (свіжий лістинг), дотягується одним точковим запитом
+    (не частіше, ніж раз на miss_ttl).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+from utils.logger import log_error, log_debug
+
+CATEGORIES = ("linear", "spot")
+_PAGE_LIMIT = 1000
+_MAX_PAGES = 20
+_RETRY_SEC = 60.0
+
+
+def _to_float(value):
+    try:
+        v = float(value)
+        return v if v == v and abs(v) != float("inf") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_instrument(item, category):
+    """Рядок instruments-info (Bybit v5) → компактні метадані або None."""
+    symbol = item.get("symbol")
+    if not symbol:
+        return None
+    price = item.get("priceFilter", {}) or {}
+    lot = item.get("lotSizeFilter", {}) or {}
+    lev = item.get("leverageFilter", {}) or {}
+    tick = _to_float(price.get("tickSize"))
+    return {
+        "symbol": symbol,
+        "category": category,
+        "status": item.get("status"),
+        "tick_size": tick,
+        # як у round_price_bybit: кількість знаків після коми з tickSize
+        "price_precision": abs(round(math.log10(tick))) if tick else None,
+        # spot: крок кількості — basePrecision
+        "qty_step": _to_float(lot.get("qtyStep") or lot.get("basePrecision")),
+        "min_qty": _to_float(lot.get("minOrderQty")),
+        "max_qty": _to_float(lot.get("maxOrderQty")),
+        "min_notional": _to_float(lot.get("minNotionalValue") or lot.get("minOrderAmt")),
+        "min_leverage": _to_float(lev.get("minLeverage")),
+        "max_leverage": _to_float(lev.get("maxLeverage")),
+        "innovation": str(item.get("innovation", "0")) in {"1", "true", "True"},
+        "listing_ts": _to_int(item.get("launchTime") or item.get("listTime") or item.get("createdTime")),
+    }
+
+
+class SymbolRegistry:
+    """🧠 symbol → метадані інструмента (окремо для кожної категорії)."""
+
+    def __init__(self, client, cache_file=None, refresh_sec=900.0, miss_ttl=600.0, categories=CATEGORIES):
+        self._client = client
+        self.cache_file = cache_file
+        self.refresh_sec = float(refresh_sec)
+        self.miss_ttl = float(miss_ttl)
+        self.categories = tuple(categories)
+        self._meta = {cat: {} for cat in self.categories}
+        self._missing = {}  # (category, symbol) -> ts невдалого точкового запиту
+        self._updated_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()          # захист _meta/_missing
+        self._refresh_lock = threading.Lock()  # лише один bulk-запит одночасно
+        self._thread = None
+        self._stop = threading.Event()
+        self.requests = 0
+        self.errors = 0
+        self.misses = 0
+        if cache_file:
+            self.load()
+
+    # ---------- диск ----------
+    def load(self):
+        """Теплий старт зі знімка на диску. True, якщо щось завантажено."""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log_error(f"⚠️ SymbolRegistry.load({self.cache_file}): {e}")
+            return False
+        with self._lock:
+            for cat in self.categories:
+                rows = data.get(cat)
+                if isinstance(rows, dict):
+                    self._meta[cat] = rows
+            self._updated_at = float(data.get("ts") or 0.0)
+        return any(self._meta.values())
+
+    def save(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = {"ts": self._updated_at, **{cat: dict(rows) for cat, rows in self._meta.items()}}
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.cache_file}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            log_error(f"⚠️ SymbolRegistry.save({self.cache_file}): {e}")
+
+    # ---------- оновлення ----------
+    def _fetch(self, category, **params):
+        """Усі сторінки instruments-info для категорії (spot — без пагінації)."""
+        items, cursor = [], None
+        for _ in range(_MAX_PAGES):
+            query = {"category": category, **params}
+            if category != "spot":
+                query["limit"] = _PAGE_LIMIT
+                if cursor:
+                    query["cursor"] = cursor
+            self.requests += 1
+            resp = self._client.get_instruments_info(**query) or {}
+            if resp.get("retCode") not in (None, 0):
+                raise RuntimeError(f"retCode={resp.get('retCode')} {resp.get('retMsg')}")
+            result = resp.get("result", {}) or {}
+            items.extend(result.get("list", []) or [])
+            cursor = result.get("nextPageCursor")
+            if not cursor or category == "spot" or params:
+                break
+        return items
+
+    def refresh(self):
+        """Bulk-оновлення всіх категорій. True, якщо хоч одна оновилась."""
+        self._last_attempt = time.time()
+        fresh = {}
+        for cat in self.categories:
+            try:
+                rows = (parse_instrument(it, cat) for it in self._fetch(cat))
+                parsed = {m["symbol"]: m for m in rows if m}
+                if parsed:
+                    fresh[cat] = parsed
+            except Exception as e:
+                self.errors += 1
+                log_error(f"❌ SymbolRegistry.refresh({cat}): {e}")
+        if not fresh:
+            return False
+        with self._lock:
+            self._meta.update(fresh)
+            self._missing.clear()
+            self._updated_at = time.time()
+        log_debug("✅ SymbolRegistry: " + ", ".join(f"{cat}={len(rows)}" for cat, rows in fresh.items()))
+        self.save()
+        return True
+
+    def ensure_loaded(self):
+        """Холодний старт без знімка: один синхронний bulk-запит (невдалий — не частіше, ніж раз на хвилину)."""
+        if self._updated_at or time.time() - self._last_attempt < _RETRY_SEC:
+            return
+        with self._refresh_lock:
+            if not self._updated_at and time.time() - self._last_attempt >= _RETRY_SEC:
+                self.refresh()
+
+    def _fetch_one(self, symbol, category):
+        """Точковий запит для символу, якого нема у знімку (не частіше, ніж раз на miss_ttl)."""
+        key = (category, symbol)
+        with self._lock:
+            if time.time() - self._missing.get(key, 0.0) < self.miss_ttl:
+                return None
+            self._missing[key] = time.time()
+        self.misses += 1
+        try:
+            items = self._fetch(category, symbol=symbol)
+        except Exception as e:
+            self.errors += 1
+            log_error(f"❌ SymbolRegistry: {symbol} ({category}): {e}")
+            return None
+        meta = next((m for m in (parse_instrument(it, category) for it in items) if m and m["symbol"] == symbol), None)
+        if meta:
+            with self._lock:
+                self._meta.setdefault(category, {})[symbol] = meta
+                self._missing.pop(key, None)
+        return meta
+
+    # ---------- фоновий потік ----------
+    def start(self):
+        """Фоновий bulk-refresh кожні refresh_sec (ідемпотентно)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="symbol-registry", daemon=True)
+            self._thread.start()
+        log_debug(f"SymbolRegistry запущено (кожні {self.refresh_sec}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # знімок з диска ще свіжий → перший запит лише після його «доживання»
+            wait = self.refresh_sec - (time.time() - self._updated_at)
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            with self._refresh_lock:
+                ok = self.refresh()
+            if not ok:
+                self._stop.wait(min(_RETRY_SEC, self.refresh_sec))
+
+    # ---------- читання ----------
+    def get(self, symbol, category="linear", fetch_missing=True):
+        """Метадані символу або None; без запитів, якщо символ є у знімку."""
+        symbol = str(symbol).split("_")[0]
+        meta = self._meta.get(category, {}).get(symbol)
+        if meta is not None:
+            return meta
+        self.ensure_loaded()
+        meta = self._meta.get(category, {}).get(symbol)
+        if meta is None and fetch_missing:
+            meta = self._fetch_one(symbol, category)
+        return meta
+
+    def category_of(self, symbol, fetch_missing=True):
+        """
+        'linear' / 'spot' для підтримуваного символу, інакше None.
+        Символ, залістений після останнього refresh, шукається точковим запитом
+        по категоріях (не частіше, ніж раз на miss_ttl для кожної).
+        """
+        self.ensure_loaded()
+        for cat in self.categories:
+            if symbol in self._meta.get(cat, {}):
+                return cat
+        if fetch_missing:
+            for cat in self.categories:
+                if self._fetch_one(symbol, cat) is not None:
+                    return cat
+        return None
+
+    def symbols(self, category="linear"):
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._meta.get(category, {}))
+
+    def all(self, category="linear"):
+        """Метадані всіх символів категорії (список dict)."""
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._meta.get(category, {}).values())
+
+    def listed_days(self, symbol, category="linear", now=None):
+        meta = self.get(symbol, category, fetch_missing=False) or {}
+        ts = meta.get("listing_ts")
+        if not ts:
+            return None
+        now = time.time() if now is None else now
+        return int((now - ts / 1000.0) // 86400)
+
+    def round_qty(self, symbol, qty, category="linear"):
+        """Вниз до кроку qtyStep (як round_qty_bybit); без метаданих — round(qty, 8)."""
+        meta = self.get(symbol, category) or {}
+        step = meta.get("qty_step")
+        if not step:
+            return round(qty, 8)
+        return round(math.floor(qty / step) * step, 8)
+
+    def round_price(self, symbol, price, category="linear"):
+        """До точності tickSize (як round_price_bybit); без метаданих — без змін."""
+        meta = self.get(symbol, category) or {}
+        precision = meta.get("price_precision")
+        return price if precision is None else round(price, precision)
+
+    def age(self):
+        return time.time() - self._updated_at if self._updated_at else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                **{cat: len(rows) for cat, rows in self._meta.items()},
+                "age_sec": round(self.age(), 3) if self._updated_at else None,
+                "requests": self.requests,
+                "errors": self.errors,
+                "misses": self.misses,
+                "running": bool(self._thread and self._thread.is_alive()),
+            }
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_symbol_registry():
+    """Повертає спільний SymbolRegistry (теплий старт з SYMBOL_REGISTRY_FILE, фоновий refresh)."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            from config import client, SYMBOL_REGISTRY_FILE, SYMBOL_REGISTRY_REFRESH_SEC, SYMBOL_REGISTRY_BACKGROUND
+            _REGISTRY = SymbolRegistry(client, cache_file=SYMBOL_REGISTRY_FILE, refresh_sec=SYMBOL_REGISTRY_REFRESH_SEC)
+            if SYMBOL_REGISTRY_BACKGROUND:
+                _REGISTRY.start()
+        return _REGISTRY
@@ -0,0 +1,207 @@
+# utils/ticker_service.py
+
+"""
+📡 Спільний знімок тікерів Bybit (linear).
+
+Один запит get_tickers(category="linear") на всі символи з фіксованою
+частотою (фоновий потік) замість окремого запиту на кожен символ.
+Ціни/оборот віддаються з пам'яті; якщо знімок старіший за max_age —
+робимо синхронне оновлення (лише один потік, решта чекають на результат).
+"""
+
+import threading
+import time
+
+from utils.logger import log_error, log_debug
+
+
+def _to_float(value):
+    try:
+        v = float(value)
+        return v if v == v and abs(v) != float("inf") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TickerService:
+    """🧠 Кеш тікерів: symbol -> {last, mark, turnover24h, ts, raw}."""
+
+    def __init__(self, client, category="linear", refresh_sec=1.0, max_age=3.0):
+        self._client = client
+        self.category = category
+        self.refresh_sec = float(refresh_sec)
+        self.max_age = float(max_age)
+        self._rows = {}
+        self._updated_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()          # захист _rows/_updated_at
+        self._refresh_lock = threading.Lock()  # лише один REST-запит одночасно
+        self._thread = None
+        self._stop = threading.Event()
+        self.requests = 0
+        self.errors = 0
+
+    # ---------- оновлення ----------
+    def refresh(self):
+        """Один bulk-запит get_tickers → новий знімок. Повертає True при успіху."""
+        self._last_attempt = time.time()
+        try:
+            self.requests += 1
+            resp = self._client.get_tickers(category=self.category) or {}
+            if resp.get("retCode") not in (None, 0):
+                self.errors += 1
+                log_error(f"❌ TickerService: retCode={resp.get('retCode')} {resp.get('retMsg')}")
+                return False
+            rows = (resp.get("result", {}) or {}).get("list", []) or []
+            if not rows:
+                return False
+            self.apply_rows(rows)
+            return True
+        except Exception as e:
+            self.errors += 1
+            log_error(f"❌ TickerService.refresh: {e}")
+            return False
+
+    def apply_rows(self, rows):
+        """Замінює знімок списком тікерів Bybit v5 (як у result.list)."""
+        now = time.time()
+        parsed = {}
+        for it in rows:
+            symbol = it.get("symbol")
+            if not symbol:
+                continue
+            parsed[symbol] = {
+                "last": _to_float(it.get("lastPrice")),
+                "mark": _to_float(it.get("markPrice")),
+                "turnover24h": _to_float(it.get("turnover24h")),
+                "ts": now,
+                "raw": it,
+            }
+        with self._lock:
+            self._rows = parsed
+            self._updated_at = now
+
+    def apply_ticker_update(self, data):
+        """
+        Оновлення одного символу зі стріму tickers.{symbol}.
+        Delta містить лише змінені поля → зливаємо з попереднім raw.
+        """
+        symbol = data.get("symbol")
+        if not symbol:
+            return
+        now = time.time()
+        with self._lock:
+            prev = self._rows.get(symbol)
+            raw = {**(prev["raw"] if prev else {}), **data}
+            self._rows[symbol] = {
+                "last": _to_float(raw.get("lastPrice")),
+                "mark": _to_float(raw.get("markPrice")),
+                "turnover24h": _to_float(raw.get("turnover24h")),
+                "ts": now,
+                "raw": raw,
+            }
+
+    def _ensure_fresh(self, max_age):
+        """Синхронне оновлення, якщо знімок застарів (не частіше за refresh_sec)."""
+        if time.time() - self._updated_at <= max_age:
+            return
+        with self._refresh_lock:
+            # інший потік міг оновити (або щойно пробував), поки чекали
+            now = time.time()
+            if now - self._updated_at <= max_age or now - self._last_attempt < self.refresh_sec:
+                return
+            self.refresh()
+
+    # ---------- фоновий потік ----------
+    def start(self):
+        """Запускає фоновий refresh кожні refresh_sec (ідемпотентно)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="ticker-service", daemon=True)
+            self._thread.start()
+        log_debug(f"TickerService запущено ({self.category}, кожні {self.refresh_sec}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            with self._refresh_lock:
+                self.refresh()
+            self._stop.wait(self.refresh_sec)
+
+    # ---------- читання ----------
+    def get(self, symbol, max_age=None):
+        """Рядок тікера або None (символу нема / знімок старший за max_age)."""
+        max_age = self.max_age if max_age is None else float(max_age)
+        row = self._fresh_row(symbol, max_age)
+        if row is not None:
+            return row
+        self._ensure_fresh(max_age)
+        return self._fresh_row(symbol, max_age)
+
+    def _fresh_row(self, symbol, max_age):
+        # свіжість — по самому рядку (bulk-знімок або пуш зі стріму)
+        with self._lock:
+            row = self._rows.get(symbol)
+            if row and time.time() - row["ts"] <= max_age:
+                return row
+            return None
+
+    def get_last_price(self, symbol, max_age=None):
+        row = self.get(symbol, max_age)
+        return row.get("last") if row else None
+
+    def get_mark_price(self, symbol, max_age=None):
+        row = self.get(symbol, max_age)
+        return row.get("mark") if row else None
+
+    def get_turnover_24h(self, symbol, max_age=None):
+        row = self.get(symbol, max_age)
+        return row.get("turnover24h") if row else None
+
+    def rows(self, max_age=None):
+        """Сирі рядки тікерів (як у відповіді get_tickers) для всіх символів."""
+        max_age = self.max_age if max_age is None else float(max_age)
+        self._ensure_fresh(max_age)
+        with self._lock:
+            if time.time() - self._updated_at > max_age:
+                return []
+            return [r["raw"] for r in self._rows.values()]
+
+    def has_data(self):
+        with self._lock:
+            return bool(self._rows)
+
+    def age(self):
+        return time.time() - self._updated_at if self._updated_at else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "symbols": len(self._rows),
+                "age_sec": round(self.age(), 3) if self._updated_at else None,
+                "requests": self.requests,
+                "errors": self.errors,
+                "running": bool(self._thread and self._thread.is_alive()),
+            }
+
+
+
+# ── Спільний екземпляр (лінива ініціалізація) ──
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_ticker_service():
+    """Повертає спільний TickerService (фоновий потік — за TICKER_SERVICE_BACKGROUND)."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            from config import client, TICKER_REFRESH_SEC, TICKER_MAX_AGE, TICKER_SERVICE_BACKGROUND
+            _SERVICE = TickerService(client, refresh_sec=TICKER_REFRESH_SEC, max_age=TICKER_MAX_AGE)
+            if TICKER_SERVICE_BACKGROUND:
+                _SERVICE.start()
+        return _SERVICE
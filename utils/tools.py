@@ -7,9 +7,12 @@ import time
 from datetime import datetime, timezone
 from config import EXCHANGE, client
 from config import ACTIVE_TRADES_FILE
-from datetime import datetime, timedelta
-from config import bybit
-from utils.logger import load_active_trades
+from utils.ticker_service import get_ticker_service
+from utils.symbol_registry import get_symbol_registry
+from utils.eligibility import get_eligibility_index
+from utils.positions_service import get_positions_service
+from utils.account_service import get_account_service
+from config import TICKER_SERVICE_ENABLED
 
 
 # -------------------- BALANCE --------------------
@@ -31,24 +34,11 @@ def get_balance():
             return 0.0
 
         elif EXCHANGE == "bybit":
-            # Unified account
-            resp = client.get_wallet_balance(accountType="UNIFIED")
-            if resp.get("retCode") != 0:
-                log_error(f"get_balance() → bad resp: {resp.get('retMsg')}")
-                return 0.0
-            lists = (resp.get("result", {}) or {}).get("list", []) or []
-            if not lists:
-                return 0.0
-            coins = lists[0].get("coin", []) or []
-            for c in coins:
-                if c.get("coin") == "USDT":
-                    # пріоритет: availableToTrade → availableToWithdraw → availableBalance → equity
-                    val = (c.get("availableToTrade") or
-                           c.get("availableToWithdraw") or
-                           c.get("availableBalance") or
-                           c.get("equity") or 0)
-                    return float(val or 0.0)
-            return 0.0
+            # Unified account — зі спільного знімка AccountService (TTL-кеш)
+            # пріоритет: availableToTrade → availableToWithdraw → availableBalance → equity
+            val = get_account_service().coin_value(
+                "availableToTrade", "availableToWithdraw", "availableBalance", "equity")
+            return float(val or 0.0)
 
         else:
             log_error(f"get_balance() → unknown EXCHANGE='{EXCHANGE}'")
@@ -72,29 +62,21 @@ def get_usdt_balance():
             log_message(f"💸 Використовуємо MANUAL_BALANCE: {MANUAL_BALANCE} USDT")
             return MANUAL_BALANCE
 
-        # 🔥 Реальний API запит
-        response = client.get_wallet_balance(accountType="UNIFIED", recvWindow=10000)
-
-        if response["retCode"] != 0:
-            log_error(f"❌ get_usdt_balance() → Bad response: {response.get('retMsg')}")
+        # 🔥 Реальний баланс — зі спільного знімка AccountService (TTL-кеш)
+        snapshot = get_account_service().snapshot()
+        if snapshot is None:
+            log_error("❌ get_usdt_balance() → немає даних акаунта")
             return 0.0
 
-        balances = response.get("result", {}).get("list", [])
-        if not balances:
-            log_error("⚠️ get_usdt_balance() → Порожній список активів")
+        coin = snapshot.get("coin") or {}
+        if not coin:
+            log_error("⚠️ USDT не знайдено серед монет")
             return 0.0
-
-        coins_info = balances[0].get("coin", [])
-        for coin_data in coins_info:
-            if coin_data.get("coin") == "USDT":
-                raw_value = coin_data.get("availableToWithdraw", "0.0")
-                if raw_value == "":
-                    log_message("⚠️ Bybit повернув порожній баланс для USDT → вважаємо 0.0")
-                    return 0.0
-                return float(raw_value)
-
-        log_error("⚠️ USDT не знайдено серед монет")
-        return 0.0
+        raw_value = coin.get("availableToWithdraw", "0.0")
+        if raw_value in (None, ""):
+            log_message("⚠️ Bybit повернув порожній баланс для USDT → вважаємо 0.0")
+            return 0.0
+        return float(raw_value)
 
     except Exception as e:
         error_text = str(e)
@@ -113,8 +95,7 @@ def get_all_usdt_pairs(min_volume_usdt=0, min_trade_usdt=5.0):
     - мають minNotionalValue <= min_trade_usdt
     """
     try:
-        response = client.get_instruments_info(category="linear")
-        data = response.get("result", {}).get("list", [])
+        data = get_symbol_registry().all("linear")
         usdt_pairs = []
 
         if not data:
@@ -132,7 +113,7 @@ def get_all_usdt_pairs(min_volume_usdt=0, min_trade_usdt=5.0):
                 continue
 
             try:
-                min_notional = float(item.get("lotSizeFilter", {}).get("minNotionalValue", 0))
+                min_notional = float(item.get("min_notional") or 0)
                 if min_notional > min_trade_usdt:
                     continue  # Занадто дорогий для мікротрейду
 
@@ -151,7 +132,19 @@ def get_all_usdt_pairs(min_volume_usdt=0, min_trade_usdt=5.0):
 
 
 def get_current_futures_price(symbol: str):
-    """💰 Отримує поточну ціну фʼючерсного контракту з Bybit (unified API)"""
+    """
+    💰 Отримує поточну ціну фʼючерсного контракту з Bybit (unified API).
+    Спершу — зі спільного знімка тікерів (utils/ticker_service.py),
+    прямий запит по символу лише якщо знімок недоступний/застарів.
+    """
+    if TICKER_SERVICE_ENABLED:
+        try:
+            price = get_ticker_service().get_last_price(symbol)
+            if price is not None:
+                return price
+        except Exception as e:
+            log_error(f"⚠️ TickerService для {symbol}: {e} → прямий запит")
+
     try:
         response = client.get_tickers(category="linear", symbol=symbol)
         
@@ -193,25 +186,14 @@ def get_historical_data(symbol, interval='1m', limit=100):
         return None
     
 
-BLACKLIST_PATH = "data/loss_blacklist.json"
-BLACKLIST_DURATION_SECONDS = 2 * 60 * 60  # 2 години
-
-
 def add_to_blacklist(symbol):
+    """🚫 Блок символу після збитку на LOSS_BLACKLIST_SEC (EligibilityIndex, write-through на диск)."""
     try:
-        if not os.path.exists(BLACKLIST_PATH):
-            with open(BLACKLIST_PATH, "w", encoding="utf-8") as f:
-                json.dump({}, f)
-
-        with open(BLACKLIST_PATH, "r", encoding="utf-8") as f:
-            blacklist = json.load(f)
-
-        blacklist[symbol] = time.time()  # ✅ Зберігаємо timestamp (секунди)
-
-        with open(BLACKLIST_PATH, "w", encoding="utf-8") as f:
-            json.dump(blacklist, f, indent=2)
-
-        log_message(f"🚫 {symbol} додано до blacklist на 4 години")
+        from config import LOSS_BLACKLIST_SEC
+        if not LOSS_BLACKLIST_SEC:
+            return
+        get_eligibility_index().block(symbol, "blacklist", ttl=LOSS_BLACKLIST_SEC)
+        log_message(f"🚫 {symbol} додано до blacklist на {LOSS_BLACKLIST_SEC / 3600:g} год")
 
     except Exception as e:
         log_error(f"❌ add_to_blacklist помилка: {e}")
@@ -367,44 +349,21 @@ def get_klines(symbol: str, interval: str = "1m", lookback: int = 30) -> pd.Data
         return None
 
 
-COOLDOWN_FILE = "data/cooldown_success.json"
-
 def add_successful_cooldown(symbol: str, hours: int = 0, minutes: int = 20):
     try:
-        cooldown_data = {}
-        if os.path.exists(COOLDOWN_FILE):
-            with open(COOLDOWN_FILE, "r") as f:
-                cooldown_data = json.load(f)
-
-        cooldown_until = datetime.now() + timedelta(hours=hours, minutes=minutes)
-        cooldown_data[symbol] = cooldown_until.strftime("%Y-%m-%d %H:%M:%S")
-
-        with open(COOLDOWN_FILE, "w") as f:
-            json.dump(cooldown_data, f, indent=2)
+        get_eligibility_index().block(symbol, "cooldown", ttl=hours * 3600 + minutes * 60)
     except Exception as e:
         log_error(f"❌ [add_successful_cooldown] Error: {e}")
 
 
 def is_in_cooldown(symbol: str) -> bool:
     try:
-        if not os.path.exists(COOLDOWN_FILE):
-            return False
-
-        with open(COOLDOWN_FILE, "r") as f:
-            cooldown_data = json.load(f)
-
-        cooldown_str = cooldown_data.get(symbol)
-        if not cooldown_str:
-            return False
-
-        cooldown_until = datetime.strptime(cooldown_str, "%Y-%m-%d %H:%M:%S")
-        return datetime.now() < cooldown_until
+        return get_eligibility_index().blocked_until(symbol, "cooldown") is not None
     except Exception as e:
         log_error(f"❌ [is_in_cooldown] Error: {e}")
         return False
 
 
-
 def make_json_safe(obj):
     """
     🔒 Рекурсивно конвертує всі об'єкти в JSON-friendly формат.
@@ -435,16 +394,11 @@ def make_json_safe(obj):
 
 def get_active_trade(trade_id: str):
     """
-    Повертає один трейд з load_active_trades() (який у тебе вже є).
+    Повертає один трейд за trade_id (одне читання рядка зі сховища ActiveTrades).
     """
     try:
-        trades = load_active_trades() or {}
-        if isinstance(trades, dict):
-            return trades.get(trade_id)
-        elif isinstance(trades, list):
-            for t in trades:
-                if isinstance(t, dict) and t.get("trade_id") == trade_id:
-                    return t
+        from utils.logger import load_active_trade
+        return load_active_trade(trade_id)
     except Exception as e:
         log_error(f"[compat] get_active_trade error: {e}")
     return None
@@ -462,8 +416,8 @@ def is_position_open_api(symbol, side, retries=3, delay=1):
 
     for attempt in range(retries):
         try:
-            response = bybit.get_positions(category="linear", symbol=symbol_clean)
-            positions = response.get("result", {}).get("list", [])
+            # повторні спроби — лише зі знімка, новішого за паузу між ними
+            positions = get_positions_service().rows(symbol_clean, max_age=delay if attempt else None)
 
             for pos in positions:
                 size = float(pos.get("size", 0))
@@ -490,8 +444,7 @@ def get_current_position_size(symbol, side):
     📦 Повертає розмір відкритої позиції на біржі (size) або 0 якщо нема
     """
     try:
-        response = bybit.get_positions(category="linear", symbol=symbol.split("_")[0])
-        positions = response.get("result", {}).get("list", [])
+        positions = get_positions_service().rows(symbol)
         for pos in positions:
             size = float(pos.get("size", 0))
             pos_side = pos.get("side", "").upper()
@@ -510,21 +463,8 @@ def get_current_position_size(symbol, side):
 
 
 # ---------- Innovation / Risky symbols helpers ----------
-import json, os
 from datetime import datetime, timezone
 
-def _load_json(path, default):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return default
-
-def _save_json(path, obj):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
-
 def _days_since_ts_ms(ts_ms):
     if not ts_ms:
         return None
@@ -536,32 +476,15 @@ def _days_since_ts_ms(ts_ms):
 
 def build_innovation_cache():
     """
-    Спроба оновити кеш із Bybit instruments info (якщо client доступний).
-    Якщо ні — створимо/залишимо порожній кеш.
+    Оновлює реєстр метаданих (utils/symbol_registry.py), якщо він порожній або застарів.
+    Innovation/listing_ts тепер живуть там (у пам'яті + знімок на диску).
     """
-    from config import INNOVATION_CACHE_FILE
-    cache = {}
-    try:
-        from config import client
-        # Unified Trading: /v5/market/instruments-info  (linear)
-        res = client.get_instruments_info(category="linear") or {}
-        items = (res.get("result") or {}).get("list") or []
-        for it in items:
-            sym = it.get("symbol")
-            if not sym:
-                continue
-            innovation = str(it.get("innovation", "0")) in {"1","true","True"}
-            list_ts = it.get("launchTime") or it.get("listTime") or it.get("createdTime")
-            try:
-                list_ts = int(list_ts)
-            except Exception:
-                list_ts = None
-            cache[sym] = {"innovation": innovation, "listing_ts": list_ts}
-    except Exception:
-        # нічого страшного — працюватимемо тільки по евристиках обороту/віку, якщо з’являться
-        cache = _load_json(INNOVATION_CACHE_FILE, {})  # не перетираємо старе
-    _save_json(INNOVATION_CACHE_FILE, cache)
-    return cache
+    registry = get_symbol_registry()
+    age = registry.age()
+    if age is None or age > registry.refresh_sec:
+        registry.refresh()
+    return {m["symbol"]: {"innovation": m.get("innovation", False), "listing_ts": m.get("listing_ts")}
+            for m in registry.all("linear")}
 
 def is_innovation_or_risky_symbol(symbol: str,
                                   turnover_24h_usd: float | None = None,
@@ -573,9 +496,8 @@ def is_innovation_or_risky_symbol(symbol: str,
     - thin: 24h оборот < INNOVATION_MIN_24H_TURNOVER (якщо переданий)
     - risky: об’єднаний прапорець (будь-який True)
     """
-    from config import INNOVATION_CACHE_FILE, INNOVATION_MIN_LISTING_DAYS, INNOVATION_MIN_24H_TURNOVER
-    cache = _load_json(INNOVATION_CACHE_FILE, {})
-    meta = cache.get(symbol) or {}
+    from config import INNOVATION_MIN_LISTING_DAYS, INNOVATION_MIN_24H_TURNOVER
+    meta = get_symbol_registry().get(symbol, fetch_missing=False) or {}
 
     innovation = bool(meta.get("innovation", False))
 
@@ -602,10 +524,15 @@ ACTIVE_TRADES_FILE_SIMPLE = "data/ActiveTradesSimple.json"
 def get_open_trades_count_by_side(position_side: str, retries: int = 2, delay_sec: float = 0.3) -> int:
     """
     📊 Повертає кількість відкритих угод за напрямком LONG або SHORT
+    Зі спільного знімка позицій (PositionsService); поки його немає — з ActiveTradesSimple.json
     🔁 Перевіряє 2 рази (із затримкою), щоб переконатись, якщо файл оновлюється.
     """
     position_side = position_side.upper()
-    
+
+    positions = get_positions_service()
+    if positions.has_data():
+        return positions.count_by_side(position_side)
+
     for attempt in range(retries):
         try:
             with open(ACTIVE_TRADES_FILE_SIMPLE, "r", encoding="utf-8") as f:
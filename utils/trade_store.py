@@ -0,0 +1,238 @@
+# utils/trade_store.py
+
+"""
+🗄️ Сховище стану активних угод (ActiveTrades) на SQLite у режимі WAL.
+
+Замість "прочитати весь active_trades.json → змінити → переписати файл":
+  - одна угода = один рядок (trade_id PRIMARY KEY, повний запис — JSON у колонці data);
+  - оновлення однієї угоди (докупка DCA, closed) — один UPSERT одного рядка;
+  - індекс (symbol, side) для resolve_trade_id;
+  - JSON-експорт у ACTIVE_TRADES_FILE (формат як раніше: {trade_id: record}) для бекенду
+    та зовнішніх читачів; експорт відкладений (не частіше за export_sec), тож не на кожен запис.
+
+При першому відкритті порожньої бази записи імпортуються з існуючого JSON.
+Модуль не залежить від utils.logger (щоб не було циклічних імпортів).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id   TEXT PRIMARY KEY,
+    symbol     TEXT,
+    side       TEXT,
+    closed     INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_side ON trades(symbol, side);
+"""
+
+
+def _json_default(obj):
+    # numpy-скаляри / дати тощо — як у deep_sanitize: у float або рядок
+    try:
+        return float(obj)
+    except Exception:
+        return str(obj)
+
+
+class TradeStore:
+    """🔑 Key-value сховище угод: trade_id → record (dict)."""
+
+    def __init__(self, db_path, export_path=None, export_sec=2.0):
+        self.db_path = db_path
+        self.export_path = export_path
+        self.export_sec = float(export_sec)
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_export = 0.0
+        self._timer = None
+        self.writes = 0
+        self.exports = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._import_json_if_empty()
+
+    # ---------- запис ----------
+    def _write_row(self, trade_id, record):
+        self._conn.execute(
+            "INSERT INTO trades(trade_id, symbol, side, closed, data, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(trade_id) DO UPDATE SET symbol=excluded.symbol, side=excluded.side, "
+            "closed=excluded.closed, data=excluded.data, updated_at=excluded.updated_at",
+            (
+                trade_id,
+                record.get("symbol"),
+                str(record.get("side", "")).upper(),
+                1 if record.get("closed") else 0,
+                json.dumps(record, ensure_ascii=False, default=_json_default),
+                time.time(),
+            ),
+        )
+        self.writes += 1
+
+    def upsert(self, record):
+        """Додає/замінює запис угоди (ключ — record["trade_id"])."""
+        trade_id = record.get("trade_id")
+        if not trade_id:
+            raise ValueError("TradeStore.upsert: відсутній trade_id")
+        with self._lock:
+            self._write_row(trade_id, dict(record))
+            self._mark_dirty()
+
+    def patch(self, trade_id, updates):
+        """Зливає updates у запис угоди. False — якщо угоди немає."""
+        with self._lock:
+            record = self.get(trade_id)
+            if record is None:
+                return False
+            record.update(updates or {})
+            self._write_row(trade_id, record)
+            self._mark_dirty()
+            return True
+
+    def mark_closed(self, trade_id, updates=None):
+        return self.patch(trade_id, {**(updates or {}), "closed": True})
+
+    def remove(self, trade_id):
+        return self.remove_many([trade_id]) > 0
+
+    def remove_many(self, trade_ids):
+        trade_ids = list(trade_ids)
+        if not trade_ids:
+            return 0
+        with self._lock:
+            cur = self._conn.executemany("DELETE FROM trades WHERE trade_id = ?", [(t,) for t in trade_ids])
+            removed = cur.rowcount if cur.rowcount is not None else 0
+            if removed:
+                self._mark_dirty()
+            return removed
+
+    def remove_where(self, predicate):
+        """
+        Видаляє угоди, для яких predicate(trade_id, record) істинний — читання й видалення під одним локом.
+        → (видалені trade_id, кількість угод до видалення).
+        """
+        with self._lock:
+            trades = self.all()
+            stale = [tid for tid, rec in trades.items() if predicate(tid, rec or {})]
+            self.remove_many(stale)
+            return stale, len(trades)
+
+    # ---------- читання ----------
+    def get(self, trade_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM trades WHERE trade_id = ?", (trade_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self):
+        """dict{trade_id: record} — формат старого active_trades.json."""
+        with self._lock:
+            rows = self._conn.execute("SELECT trade_id, data FROM trades ORDER BY rowid").fetchall()
+        return {tid: json.loads(data) for tid, data in rows}
+
+    def find(self, symbol, side, include_closed=True):
+        """trade_id для пари (symbol, side); незакриті мають пріоритет."""
+        sql = "SELECT trade_id FROM trades WHERE symbol = ? AND side = ?"
+        if not include_closed:
+            sql += " AND closed = 0"
+        sql += " ORDER BY closed, rowid LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(sql, (symbol, str(side or "").upper())).fetchone()
+        return row[0] if row else None
+
+    def count_open(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM trades WHERE closed = 0").fetchone()[0]
+
+    def has_open(self, symbol):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM trades WHERE symbol = ? AND closed = 0 LIMIT 1", (symbol,)
+            ).fetchone()
+        return row is not None
+
+    def open_symbols(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT symbol FROM trades WHERE closed = 0").fetchall()
+        return {r[0] for r in rows if r[0]}
+
+    # ---------- JSON-експорт ----------
+    def _mark_dirty(self):
+        if not self.export_path:
+            return
+        self._dirty = True
+        # експорт завжди у фоновому таймері — потік, що пише угоду, не переписує JSON
+        if self._timer is None:
+            delay = max(0.0, self._last_export + self.export_sec - time.time())
+            self._timer = threading.Timer(delay, self.export_json)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def export_json(self, path=None):
+        """Атомарно пише {trade_id: record} у JSON (tempfile + os.replace)."""
+        path = path or self.export_path
+        if not path:
+            return
+        with self._lock:
+            self._timer = None
+            self._dirty = False
+            self._last_export = time.time()
+            content = json.dumps(self.all(), indent=2, ensure_ascii=False)
+        dirn = os.path.dirname(path) or "."
+        os.makedirs(dirn, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8",
+                                         dir=dirn, prefix=".swap_", suffix=".json") as tmp:
+            tmp.write(content)
+            tmp_path = tmp.name
+        os.replace(tmp_path, path)
+        self.exports += 1
+
+    def flush(self):
+        """Примусовий експорт, якщо є незаписані зміни."""
+        if self._dirty:
+            self.export_json()
+
+    def _import_json_if_empty(self):
+        if not self.export_path or not os.path.exists(self.export_path):
+            return
+        if self._conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]:
+            return
+        try:
+            with open(self.export_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if isinstance(data, list):
+            data = {t.get("trade_id", f"trade_{i}"): t for i, t in enumerate(data) if isinstance(t, dict)}
+        if not isinstance(data, dict):
+            return
+        # імпорт — одна транзакція; JSON не переписується (дані ті самі)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for trade_id, record in data.items():
+                if isinstance(record, dict):
+                    self._write_row(trade_id, record)
+            self._conn.execute("COMMIT")
+
+    def stats(self):
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        return {"trades": total, "open": self.count_open(), "writes": self.writes, "exports": self.exports}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()